@@ -0,0 +1,5 @@
+"""
+Benchmark suite for the calculation and lookup hot paths.
+
+Run from the project folder with `python -m benchmarks`; see __main__.py.
+"""
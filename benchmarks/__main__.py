@@ -0,0 +1,119 @@
+"""
+Command-line benchmark runner: python -m benchmarks [options]
+
+    python -m benchmarks -o results.json                      # full suite
+    python -m benchmarks --quick --baseline benchmarks/baseline.json
+    python -m benchmarks --save-baseline benchmarks/baseline.json
+
+Results are written as JSON (see suite.run_suite for the layout). With
+--baseline, every case is compared to the stored run and the exit status is
+1 if any case is more than --tolerance slower, or if a baseline case did not
+run although -k, --quick and the size options selected it. Cases with no
+baseline entry are listed with a warning. Baselines are only comparable
+on the same machine; regenerate one with --save-baseline when the hardware
+changes.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .suite import (
+    DEFAULT_FACILITY_COUNTS,
+    DEFAULT_SITE_COUNTS,
+    DEFAULT_MAX_PAIRS,
+    DEFAULT_REPEAT,
+    DEFAULT_MIN_TIME,
+    DEFAULT_TOLERANCE,
+    compare,
+    format_seconds,
+    run_suite,
+)
+
+QUICK_FACILITY_COUNTS = (20, 1000)
+QUICK_SITE_COUNTS = (1000, 10000)
+
+def _counts(text):
+    return tuple(int(float(value)) for value in text.split(','))
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmark the Clean Futures calculation and lookup hot paths")
+    parser.add_argument('--facilities', type=_counts, default=None,
+                        help="Comma-separated synthetic facility counts (default 20,1000,100000)")
+    parser.add_argument('--sites', type=_counts, default=None,
+                        help="Comma-separated batch site counts (default 1000,100000,1000000)")
+    parser.add_argument('--quick', action='store_true',
+                        help="Small sizes and short timings for a fast check (20,1000 facilities; 1k,10k sites)")
+    parser.add_argument('--max-pairs', type=float, default=DEFAULT_MAX_PAIRS,
+                        help="Skip batch cases with more site x facility pairs than this (default 1e8)")
+    parser.add_argument('--repeat', type=int, default=None, help=f"Timed repeats per case (default {DEFAULT_REPEAT})")
+    parser.add_argument('--min-time', type=float, default=None,
+                        help=f"Minimum seconds per repeat (default {DEFAULT_MIN_TIME})")
+    parser.add_argument('-k', '--only', action='append', default=None,
+                        help="Only run cases whose key contains this text (repeatable)")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic data seed")
+    parser.add_argument('-o', '--output', default=None, help="Write the results JSON here ('-' for stdout)")
+    parser.add_argument('--baseline', default=None, help="Compare against this results JSON")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a case fails, as a fraction (default 0.25)")
+    parser.add_argument('--save-baseline', default=None, help="Also write the results as a new baseline here")
+    return parser
+
+def _print_progress(key, result):
+    print(f"  {key:<60} {format_seconds(result['seconds']):>10}/item  ({result['repeat']} x {result['number']})",
+          file=sys.stderr)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    facility_counts = args.facilities or (QUICK_FACILITY_COUNTS if args.quick else DEFAULT_FACILITY_COUNTS)
+    site_counts = args.sites or (QUICK_SITE_COUNTS if args.quick else DEFAULT_SITE_COUNTS)
+    repeat = args.repeat or (3 if args.quick else DEFAULT_REPEAT)
+    min_time = args.min_time or (0.05 if args.quick else DEFAULT_MIN_TIME)
+    
+    document = run_suite(facility_counts, site_counts, int(args.max_pairs), repeat, min_time,
+                         seed=args.seed, only=args.only, progress=_print_progress)
+    text = json.dumps(document, indent=2)
+    if args.output == '-':
+        print(text)
+    elif args.output:
+        Path(args.output).write_text(text + '\n')
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text + '\n')
+    print(f"{len(document['results'])} cases in {document['total_seconds']:.1f} s", file=sys.stderr)
+    
+    if not args.baseline:
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text())
+    rows = compare(document, baseline, args.tolerance)
+    print(f"\nCompared with {args.baseline} ({baseline['meta'].get('git_commit')}, "
+          f"{baseline['meta'].get('created_at')}):", file=sys.stderr)
+    for row in rows:
+        if row['status'] == 'skipped':
+            continue
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else ''
+        print(f"  {row['status']:<10} {row['key']:<60} {format_seconds(row['baseline']):>10} -> "
+              f"{format_seconds(row['current']):>10} {ratio}", file=sys.stderr)
+    new = [row['key'] for row in rows if row['status'] == 'new']
+    if new:
+        print(f"\nWARNING: {len(new)} case(s) have no baseline entry and were not compared; "
+              f"regenerate the baseline with --save-baseline: {', '.join(new)}", file=sys.stderr)
+    
+    failed = False
+    regressions = [row for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} case(s) more than {args.tolerance:.0%} slower than the baseline",
+              file=sys.stderr)
+        failed = True
+    missing = [row['key'] for row in rows if row['status'] == 'missing']
+    if missing:
+        print(f"\nFAIL: {len(missing)} baseline case(s) did not run: {', '.join(missing)}", file=sys.stderr)
+        failed = True
+    if failed:
+        return 1
+    print("\nNo regressions", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
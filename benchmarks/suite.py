@@ -0,0 +1,285 @@
+"""
+Benchmark cases, timing and baseline comparison.
+
+Each case times one hot path on synthetic data (see synthetic.py) and
+reports seconds per item - per call for the single-site functions, per site
+for batch evaluation. A case is run once untimed (so lazily built tables and
+indexes are excluded), then `repeat` times; the fastest repeat is kept, as
+the least disturbed by other load on the machine.
+"""
+
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from cleanfutures import (
+    haversine_distance,
+    determine_state_county,
+    find_nearest_qualified_landfill,
+    find_nearest_cf_facility,
+    calculate_dig_and_haul,
+    calculate_onsite_remediation,
+    calculate_surface_facility,
+    generate_recommendation,
+    evaluate_site,
+    find_alternatives,
+    EvaluationPipeline,
+)
+from cleanfutures.batch import evaluate_batch
+from cleanfutures.facilities import FacilitiesDatabase
+from cleanfutures.routing import set_distance_provider
+
+from .synthetic import make_analyses, make_database, make_sites
+
+DEFAULT_FACILITY_COUNTS = (20, 1000, 100000)
+DEFAULT_SITE_COUNTS = (1000, 100000, 1000000)
+
+# Batch cases above this many site x facility pairs are skipped
+DEFAULT_MAX_PAIRS = 100_000_000
+
+# Single-site cases cycle through this many different sites per call
+SITES_PER_CALL = 256
+
+# Timing: each repeat runs for at least MIN_TIME seconds, and a case stops
+# repeating once it has used MAX_CASE_SECONDS
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.2
+MAX_CASE_SECONDS = 10.0
+
+# Default allowed slowdown before a case counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+def _run(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - start
+
+def measure(fn, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME, max_seconds=MAX_CASE_SECONDS):
+    """(fastest seconds per call, calls per repeat, repeats run)"""
+    first = _run(fn, 1)
+    number = max(1, math.ceil(min_time / max(first, 1e-9)))
+    best = math.inf
+    spent = first
+    runs = 0
+    while runs < repeat and (runs == 0 or spent < max_seconds):
+        elapsed = _run(fn, number)
+        best = min(best, elapsed / number)
+        spent += elapsed
+        runs += 1
+    return best, number, runs
+
+# ============================================================================
+# CASES
+# ============================================================================
+
+def _key(name, facilities=None, sites=None):
+    params = [f"{label}={value}" for label, value in (('facilities', facilities), ('sites', sites))
+              if value is not None]
+    return f"{name}[{','.join(params)}]" if params else name
+
+def _cycle(analyses, call):
+    """Function calling call(analysis) once for every analysis"""
+    def run():
+        for a in analyses:
+            call(a)
+    return run
+
+def build_cases(facility_counts=DEFAULT_FACILITY_COUNTS, site_counts=DEFAULT_SITE_COUNTS,
+                max_pairs=DEFAULT_MAX_PAIRS, seed=0):
+    """Yield (key, name, facilities, sites, items, fn) for every case
+    
+    fn processes `items` items per call. Databases and site frames are
+    built lazily, one facility count at a time, to keep memory bounded.
+    """
+    analyses = make_analyses(SITES_PER_CALL, seed)
+    small_db = make_database(20, seed)
+    options = evaluate_site(analyses[0], small_db)
+    # One site re-evaluated with a different truck rate each time
+    rate_edits = [dict(analyses[0], advanced_params={'truck_hourly_rate': 80.0 + i % 40})
+                  for i in range(len(analyses))]
+    points = [(a['site_lat'], a['site_lon'], b['site_lat'], b['site_lon'])
+              for a, b in zip(analyses, analyses[1:] + analyses[:1])]
+    
+    # Independent of the facility count
+    yield ('haversine_distance', 'haversine_distance', None, None, len(points),
+           lambda: [haversine_distance(*p) for p in points])
+    yield ('calculate_onsite_remediation', 'calculate_onsite_remediation', None, None, len(analyses),
+           _cycle(analyses, lambda a: calculate_onsite_remediation(
+               a['volume_cy'], a['site_lat'], a['site_lon'], a['soil_permeability'],
+               a['tph_level'], a['chloride_level'])))
+    yield ('generate_recommendation', 'generate_recommendation', None, None, len(analyses),
+           _cycle(analyses, lambda a: generate_recommendation(
+               options['dig_haul'], options['onsite'], options['surface'], a['priorities'])))
+    
+    for count in facility_counts:
+        db = make_database(count, seed)
+        raw = dict(db)
+        pipeline = EvaluationPipeline()
+    
+        def build_indexes():
+            fresh = FacilitiesDatabase(raw)
+            for table in ('landfills', 'clean_futures_facilities'):
+                if fresh.lookup_index(table) is None:
+                    fresh.facility_table(table)
+    
+        single = {
+            'facility_index_build': (1, build_indexes),
+            'find_nearest_qualified_landfill': (len(analyses), _cycle(analyses, lambda a: find_nearest_qualified_landfill(
+                a['site_lat'], a['site_lon'], a['tph_level'], a['chloride_level'], a['needs_backfill'], db))),
+            'find_nearest_cf_facility': (len(analyses), _cycle(analyses, lambda a: find_nearest_cf_facility(
+                a['site_lat'], a['site_lon'], db))),
+            'determine_state_county': (len(analyses), _cycle(analyses, lambda a: determine_state_county(
+                a['site_lat'], a['site_lon'], db))),
+            'calculate_dig_and_haul': (len(analyses), _cycle(analyses, lambda a: calculate_dig_and_haul(
+                a['volume_cy'], a['site_lat'], a['site_lon'], a['needs_backfill'],
+                a['tph_level'], a['chloride_level'], db))),
+            'calculate_surface_facility': (len(analyses), _cycle(analyses, lambda a: calculate_surface_facility(
+                a['volume_cy'], a['site_lat'], a['site_lon'], a['needs_backfill'],
+                a['tph_level'], a['chloride_level'], db))),
+            'evaluate_site': (len(analyses), _cycle(analyses, lambda a: evaluate_site(a, db))),
+            'find_alternatives': (len(analyses), _cycle(analyses, lambda a: find_alternatives(a, db))),
+            'pipeline_rate_change': (len(rate_edits), _cycle(rate_edits, lambda a: pipeline.evaluate(a, db))),
+        }
+        for name, (items, fn) in single.items():
+            yield _key(name, count), name, count, None, items, fn
+    
+        for sites in site_counts:
+            if sites * count > max_pairs:
+                continue
+            frame = make_sites(sites, seed)
+            yield (_key('evaluate_batch', count, sites), 'evaluate_batch', count, sites, sites,
+                   lambda frame=frame: evaluate_batch(frame, db))
+
+def run_suite(facility_counts=DEFAULT_FACILITY_COUNTS, site_counts=DEFAULT_SITE_COUNTS,
+              max_pairs=DEFAULT_MAX_PAIRS, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME,
+              seed=0, only=None, progress=None):
+    """Run every case (or those whose key contains one of `only`) and return the results document"""
+    # Straight-line distances only, whatever the environment configures
+    set_distance_provider(None)
+    started = time.perf_counter()
+    results = {}
+    for key, name, facilities, sites, items, fn in build_cases(facility_counts, site_counts, max_pairs, seed):
+        if only and not any(pattern in key for pattern in only):
+            continue
+        seconds, number, runs = measure(fn, repeat, min_time)
+        results[key] = {
+            'name': name,
+            'facilities': facilities,
+            'sites': sites,
+            'seconds': seconds / items,
+            'per_second': items / seconds if seconds else None,
+            'number': number,
+            'repeat': runs,
+        }
+        if progress:
+            progress(key, results[key])
+    
+    return {
+        'meta': environment_info({
+            'facility_counts': list(facility_counts),
+            'site_counts': list(site_counts),
+            'max_pairs': max_pairs,
+            'repeat': repeat,
+            'min_time': min_time,
+            'seed': seed,
+            'only': list(only) if only else None,
+        }),
+        'total_seconds': time.perf_counter() - started,
+        'results': results,
+    }
+
+def environment_info(parameters):
+    """Machine, library and source versions recorded with the results"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import pandas as pd
+    
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'parameters': parameters,
+    }
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+def _selected(key, result, parameters):
+    """Whether a run with these parameters includes the case"""
+    only = parameters.get('only')
+    if only and not any(pattern in key for pattern in only):
+        return False
+    facilities, sites = result.get('facilities'), result.get('sites')
+    if facilities is not None and facilities not in parameters.get('facility_counts', ()):
+        return False
+    if sites is not None:
+        if sites not in parameters.get('site_counts', ()):
+            return False
+        if sites * (facilities or 1) > parameters.get('max_pairs', DEFAULT_MAX_PAIRS):
+            return False
+    return True
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare two results documents case by case
+    
+    Returns a list of {key, baseline, current, ratio, status} rows; status is
+    'regression' when a case got more than `tolerance` slower, 'improved'
+    when it got as much faster and 'ok' in between. Cases in only one
+    document are 'skipped' / 'extra' when the other run's -k patterns or
+    sizes left them out, and otherwise 'missing' (absent from the current
+    run) or 'new' (absent from the baseline, which is then out of date).
+    """
+    rows = []
+    baseline_results = baseline.get('results', {})
+    for key, result in current['results'].items():
+        before = baseline_results.get(key)
+        if before is None:
+            status = 'new' if _selected(key, result, baseline['meta'].get('parameters', {})) else 'extra'
+            rows.append({'key': key, 'baseline': None, 'current': result['seconds'], 'ratio': None, 'status': status})
+            continue
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else math.inf
+        if ratio > 1 + tolerance:
+            status = 'regression'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({'key': key, 'baseline': before['seconds'], 'current': result['seconds'],
+                     'ratio': ratio, 'status': status})
+    parameters = current['meta'].get('parameters', {})
+    for key, before in baseline_results.items():
+        if key not in current['results']:
+            status = 'missing' if _selected(key, before, parameters) else 'skipped'
+            rows.append({'key': key, 'baseline': before['seconds'], 'current': None, 'ratio': None,
+                         'status': status})
+    return rows
+
+def format_seconds(seconds):
+    """Human-readable duration"""
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
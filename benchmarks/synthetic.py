@@ -0,0 +1,105 @@
+"""
+Synthetic facilities databases and sites for benchmarking.
+
+Facilities and sites are spread uniformly over the questionnaire bounds with
+acceptance limits and prices in the ranges of permian_facilities_db.json.
+Everything is drawn from a seeded generator, so a given count and seed always
+produce the same data.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cleanfutures.facilities import FacilitiesDatabase
+from cleanfutures.raster import PERMIAN_BOUNDS
+
+COUNTIES = ['ANDREWS', 'CRANE', 'CULBERSON', 'ECTOR', 'GLASSCOCK', 'HOWARD', 'LOVING', 'MARTIN',
+            'MIDLAND', 'PECOS', 'REAGAN', 'REEVES', 'UPTON', 'WARD', 'WINKLER', 'EDDY', 'LEA']
+REGIONS = ['Central Basin', 'Delaware Basin', 'Eastern Basin', 'Midland Basin']
+
+def _points(rng, count, bounds=PERMIAN_BOUNDS):
+    lat = rng.uniform(bounds[0], bounds[1], count)
+    lon = rng.uniform(bounds[2], bounds[3], count)
+    return np.round(lat, 6), np.round(lon, 6)
+
+def make_database(count, seed=0):
+    """FacilitiesDatabase with `count` landfills and `count` Clean Futures facilities"""
+    rng = np.random.default_rng(seed)
+    lat, lon = _points(rng, count)
+    tph_max = rng.choice([1000, 5000, 10000, 20000], count)
+    chloride_max = rng.choice([5000, 10000, 20000, 50000], count)
+    backfill = rng.random(count) < 0.6
+    disposal = rng.integers(18, 40, count)
+    counties = rng.choice(COUNTIES, count)
+    landfills = [{
+        'id': f"LF{i + 1:06d}",
+        'company': 'SYNTHETIC',
+        'site_name': f"SITE {i + 1}",
+        'county': str(counties[i]),
+        'latitude': float(lat[i]),
+        'longitude': float(lon[i]),
+        'accepts_tph': True,
+        'tph_max_mgkg': int(tph_max[i]),
+        'accepts_chloride': True,
+        'chloride_max_mgkg': int(chloride_max[i]),
+        'disposal_cost_cy': int(disposal[i]),
+        'backfill_available': bool(backfill[i]),
+        'backfill_cost_cy': 10 if backfill[i] else 0,
+    } for i in range(count)]
+    
+    lat, lon = _points(rng, count)
+    processing = rng.integers(20, 35, count)
+    regions = rng.choice(REGIONS, count)
+    facilities = [{
+        'id': f"CF{i + 1:06d}",
+        'facility_name': f"Synthetic Facility {i + 1}",
+        'region': str(regions[i]),
+        'latitude': float(lat[i]),
+        'longitude': float(lon[i]),
+        'processing_cost_cy': int(processing[i]),
+        'includes_backfill': True,
+        'backfill_cost_cy': 0,
+        'typical_turnaround_days': 30,
+    } for i in range(count)]
+    
+    return FacilitiesDatabase({'landfills': landfills, 'clean_futures_facilities': facilities},
+                              version=f"synthetic-{count}-{seed}")
+
+def make_sites(count, seed=0):
+    """DataFrame of `count` sites with every evaluate_batch() input column"""
+    rng = np.random.default_rng(seed + 1)
+    lat, lon = _points(rng, count)
+    levels = np.array(['low', 'medium', 'high'])
+    return pd.DataFrame({
+        'site_lat': lat,
+        'site_lon': lon,
+        'volume_cy': np.round(rng.uniform(50, 20000, count), 1),
+        'tph_level': rng.choice([0, 800, 2000, 6000, 12000], count),
+        'chloride_level': rng.choice([0, 3000, 8000, 15000, 30000], count),
+        'needs_backfill': rng.random(count) < 0.5,
+        'soil_permeability': levels[rng.integers(0, 3, count)],
+        'cost_priority': levels[rng.integers(0, 3, count)],
+        'speed_priority': levels[rng.integers(0, 3, count)],
+        'esg_priority': levels[rng.integers(0, 3, count)],
+    })
+
+def make_analyses(count, seed=0):
+    """List of `count` analysis dicts as built by the questionnaires"""
+    analyses = []
+    for row in make_sites(count, seed).to_dict('records'):
+        analyses.append({
+            'site_lat': row['site_lat'],
+            'site_lon': row['site_lon'],
+            'tph_level': int(row['tph_level']),
+            'chloride_level': int(row['chloride_level']),
+            'volume_cy': row['volume_cy'],
+            'needs_backfill': bool(row['needs_backfill']),
+            'priorities': {
+                'cost': row['cost_priority'],
+                'speed': row['speed_priority'],
+                'esg': row['esg_priority'],
+            },
+            'advanced_params': None,
+            'soil_permeability': row['soil_permeability'],
+        })
+    return analyses
@@ -6,14 +6,68 @@ Compares three remediation approaches:
 1. Dig & Haul to Landfill
 2. Clean Futures Onsite Remediation
 3. Clean Futures Surface Facility Treatment
+
+This module is the Streamlit UI. All calculations live in the headless
+`cleanfutures` engine package so they can be used without Streamlit.
 """
 
+import argparse
+import io
+import sys
+
 import streamlit as st
 import pandas as pd
-import json
-import math
 from datetime import datetime, timedelta
-from pathlib import Path
+
+from cleanfutures import (
+    EvaluationPipeline,
+    calculate_volume_cy,
+    configure_facilities_database,
+    evaluate_site_cached,
+    get_facility_store,
+    load_facilities_database,
+)
+from cleanfutures import instrumentation
+from cleanfutures.alternatives import DEFAULT_ALTERNATIVES, find_alternatives
+from cleanfutures.history import configure_history, get_analysis_history
+from cleanfutures.raster import build_raster, load_raster
+from cleanfutures.report import ExcelReportWriter, write_analysis_report
+from cleanfutures.routing import configure_distance_provider
+from cleanfutures.vectorized import OPTION_NAMES
+
+# ============================================================================
+# COMMAND-LINE SETTINGS
+# ============================================================================
+
+def parse_app_args(argv):
+    """Parse app settings passed after `--` on the streamlit command line"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--facilities-db', default=None,
+                        help="Path to the facilities database JSON")
+    parser.add_argument('--road-graph', default=None,
+                        help="Road graph (.json or OSM .osm) for drive distances")
+    parser.add_argument('--route-cache', default=None,
+                        help="Directory for precomputed facility drive-time tables")
+    parser.add_argument('--raster-dir', default=None,
+                        help="Directory of the precomputed recommendation raster")
+    parser.add_argument('--history-db', default=None,
+                        help="SQLite file for the analysis history (default ~/.local/share/cleanfutures)")
+    parser.add_argument('--instrument', action='store_true',
+                        help="Time each stage of the results page (sidebar panel and JSON logs)")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+@st.cache_resource(show_spinner=False)
+def configure_engine(facilities_db, road_graph, route_cache, instrument=False, history_db=None):
+    """Apply command-line settings to the engine once per process"""
+    if facilities_db:
+        configure_facilities_database(facilities_db)
+    if history_db:
+        configure_history(history_db)
+    if road_graph:
+        configure_distance_provider(road_graph, route_cache)
+    if instrument:
+        instrumentation.enable()
 
 # ============================================================================
 # PAGE CONFIGURATION
@@ -26,6 +80,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+app_args = parse_app_args(sys.argv[1:])
+configure_engine(app_args.facilities_db, app_args.road_graph, app_args.route_cache, app_args.instrument,
+                 app_args.history_db)
+
 # ============================================================================
 # CUSTOM CSS - DISTINCTIVE DESIGN
 # ============================================================================
@@ -227,426 +285,6 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# ============================================================================
-# HELPER FUNCTIONS - DISTANCE AND GEOSPATIAL
-# ============================================================================
-
-# ============================================================================
-# HELPER FUNCTIONS - DISTANCE AND GEOSPATIAL
-# ============================================================================
-
-def determine_state_county(lat, lon, db):
-    """Determine state and county from GPS coordinates"""
-    # Texas/New Mexico boundary is roughly at -103° longitude
-    state = "Texas" if lon > -103.0 else "New Mexico"
-    
-    # Find nearest county from the landfill database (use county centroids)
-    county_distances = {}
-    counties_seen = set()
-    
-    for lf in db['landfills']:
-        county = lf['county']
-        if county not in counties_seen:
-            # Use first landfill in each county as representative
-            distance = haversine_distance(lat, lon, lf['latitude'], lf['longitude'])
-            county_distances[county] = distance
-            counties_seen.add(county)
-    
-    nearest_county = min(county_distances, key=county_distances.get) if county_distances else "Unknown"
-    
-    return state, nearest_county
-
-def get_soil_type(lat, lon, state):
-    """Estimate soil type based on location in Permian Basin"""
-    # Simplified soil classification for Permian Basin
-    # In production, this would query USDA Web Soil Survey or similar database
-    
-    # Eastern Permian (more clay-rich)
-    if lon > -102.0:
-        return "Clay Loam / Silty Clay"
-    # Central Permian (mixed)
-    elif lon > -103.5:
-        return "Sandy Clay Loam / Caliche"
-    # Western Permian (more sandy)
-    else:
-        return "Sandy Loam / Desert Soils"
-
-def get_regulatory_thresholds(state):
-    """Get soil regulatory thresholds for TPH and Chlorides"""
-    # Texas TCEQ Protective Concentration Levels (PCLs)
-    # New Mexico NMED Soil Screening Levels (SSLs)
-    
-    if state == "Texas":
-        return {
-            'tph_residential_mgkg': 100,
-            'tph_industrial_mgkg': 500,
-            'chloride_soil_mgkg': 'Not directly regulated in soil; groundwater standard: 300 mg/L',
-            'regulatory_agency': 'TCEQ (Texas Commission on Environmental Quality)',
-            'notes': 'Risk-based, site-specific cleanup levels may vary'
-        }
-    else:  # New Mexico
-        return {
-            'tph_residential_mgkg': 100,
-            'tph_industrial_mgkg': 1000,
-            'chloride_soil_mgkg': 'Not directly regulated in soil; groundwater standard: 250 mg/L',
-            'regulatory_agency': 'NMED (New Mexico Environment Department)',
-            'notes': 'Risk-based corrective action (RBCA) standards apply'
-        }
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two GPS coordinates in miles"""
-    R = 3959  # Earth's radius in miles
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
-
-def load_facilities_database():
-    """Load the facilities database from JSON"""
-    db_path = Path('/home/claude/permian_facilities_db.json')
-    if db_path.exists():
-        with open(db_path, 'r') as f:
-            return json.load(f)
-    return {"landfills": [], "clean_futures_facilities": []}
-
-def find_nearest_qualified_landfill(lat, lon, tph_level, chloride_level, needs_backfill, db):
-    """Find the nearest landfill that accepts the contamination levels"""
-    qualified = []
-    
-    for lf in db['landfills']:
-        # Check if landfill accepts the contamination levels
-        accepts_tph = tph_level <= lf['tph_max_mgkg'] if tph_level > 0 else True
-        accepts_chloride = chloride_level <= lf['chloride_max_mgkg'] if chloride_level > 0 else True
-        
-        if accepts_tph and accepts_chloride:
-            # If backfill is needed, prefer landfills with backfill
-            if needs_backfill and not lf['backfill_available']:
-                continue  # Skip landfills without backfill if it's needed
-            
-            distance = haversine_distance(lat, lon, lf['latitude'], lf['longitude'])
-            qualified.append({
-                'landfill': lf,
-                'distance_miles': distance
-            })
-    
-    # Sort by distance
-    qualified.sort(key=lambda x: x['distance_miles'])
-    
-    return qualified[0] if qualified else None
-
-def find_nearest_cf_facility(lat, lon, db):
-    """Find the nearest Clean Futures facility"""
-    facilities = []
-    
-    for cf in db['clean_futures_facilities']:
-        distance = haversine_distance(lat, lon, cf['latitude'], cf['longitude'])
-        facilities.append({
-            'facility': cf,
-            'distance_miles': distance
-        })
-    
-    facilities.sort(key=lambda x: x['distance_miles'])
-    
-    return facilities[0] if facilities else None
-
-# ============================================================================
-# CALCULATION FUNCTIONS
-# ============================================================================
-
-def calculate_volume_cy(surface_area_sqft, depth_ft):
-    """Calculate volume in cubic yards from surface area and depth"""
-    cubic_feet = surface_area_sqft * depth_ft
-    cubic_yards = cubic_feet / 27
-    return cubic_yards
-
-def calculate_co2_emissions(fuel_gallons):
-    """Calculate CO2 emissions from fuel consumption"""
-    # Diesel produces approximately 22.38 lbs CO2 per gallon
-    co2_lbs = fuel_gallons * 22.38
-    co2_tons = co2_lbs / 2000
-    return co2_lbs, co2_tons
-
-def calculate_dig_and_haul(volume_cy, site_lat, site_lon, needs_backfill, 
-                          tph_level, chloride_level, db, advanced_params=None):
-    """Calculate costs and metrics for Dig & Haul option"""
-    
-    # Find nearest qualified landfill
-    nearest_lf = find_nearest_qualified_landfill(site_lat, site_lon, tph_level, 
-                                                  chloride_level, needs_backfill, db)
-    
-    if not nearest_lf:
-        return None
-    
-    landfill = nearest_lf['landfill']
-    distance_miles = nearest_lf['distance_miles']
-    
-    # Use advanced parameters or defaults
-    if advanced_params:
-        truck_capacity = advanced_params.get('truck_capacity_cy', 18)
-        num_trucks = advanced_params.get('num_trucks', 3)
-        truck_hourly_rate = advanced_params.get('truck_hourly_rate', 85)
-        excavator_rate = advanced_params.get('excavator_rate', 150)
-        loader_rate = advanced_params.get('loader_rate', 125)
-        work_hours_per_day = advanced_params.get('work_hours_per_day', 10)
-        disposal_cost = advanced_params.get('disposal_cost_cy', landfill['disposal_cost_cy'])
-        backfill_cost = advanced_params.get('backfill_cost_cy', landfill['backfill_cost_cy'])
-    else:
-        # Default parameters
-        truck_capacity = 18
-        num_trucks = 3
-        truck_hourly_rate = 85
-        excavator_rate = 150
-        loader_rate = 125
-        work_hours_per_day = 10
-        disposal_cost = landfill['disposal_cost_cy']
-        backfill_cost = landfill['backfill_cost_cy'] if needs_backfill else 0
-    
-    # Trip time calculation (simplified)
-    avg_speed_mph = 45
-    travel_time_hours = distance_miles / avg_speed_mph
-    loading_time = 0.25
-    unloading_time = 0.5
-    trip_time = loading_time + travel_time_hours + unloading_time + travel_time_hours + loading_time
-    
-    # Calculate number of trips and duration
-    num_trips = math.ceil(volume_cy / truck_capacity)
-    trips_per_truck_per_day = work_hours_per_day / trip_time
-    total_trips_per_day = trips_per_truck_per_day * num_trucks
-    project_days = math.ceil(num_trips / total_trips_per_day)
-    project_hours = project_days * work_hours_per_day
-    
-    # Equipment capacity (simplified - assume balanced)
-    excavation_capacity = 40  # CY/hr
-    loading_capacity = 35  # CY/hr
-    equipment_capacity = min(excavation_capacity, loading_capacity)
-    
-    # Costs
-    total_equipment_hours = project_hours
-    equipment_cost = (excavator_rate + loader_rate) * total_equipment_hours
-    
-    total_truck_hours = num_trips * trip_time
-    trucking_cost = total_truck_hours * truck_hourly_rate
-    
-    disposal_total = volume_cy * disposal_cost
-    backfill_total = volume_cy * backfill_cost if needs_backfill else 0
-    
-    total_cost = equipment_cost + trucking_cost + disposal_total + backfill_total
-    cost_per_cy = total_cost / volume_cy
-    
-    # CO2 calculations (simplified)
-    excavator_fuel_gph = 6
-    loader_fuel_gph = 5
-    truck_fuel_gph = 4
-    
-    total_fuel = (excavator_fuel_gph * total_equipment_hours + 
-                  loader_fuel_gph * total_equipment_hours +
-                  truck_fuel_gph * total_truck_hours)
-    
-    co2_lbs, co2_tons = calculate_co2_emissions(total_fuel)
-    
-    return {
-        'option_name': 'Dig & Haul to Landfill',
-        'total_cost': total_cost,
-        'cost_per_cy': cost_per_cy,
-        'project_days': project_days,
-        'landfill_name': f"{landfill['company']} - {landfill['site_name']}",
-        'distance_miles': distance_miles,
-        'co2_tons': co2_tons,
-        'equipment_cost': equipment_cost,
-        'trucking_cost': trucking_cost,
-        'disposal_cost': disposal_total,
-        'backfill_cost': backfill_total,
-        'includes_backfill': needs_backfill,
-        'backfill_available_at_landfill': landfill['backfill_available']
-    }
-
-def calculate_onsite_remediation(volume_cy, site_lat, site_lon, soil_permeability='medium',
-                                tph_level=0, chloride_level=0, advanced_params=None):
-    """Calculate costs and metrics for Onsite Remediation option"""
-    
-    # Processing cost
-    if advanced_params:
-        processing_cost_cy = advanced_params.get('onsite_processing_cost_cy', 25)
-    else:
-        processing_cost_cy = 25
-    
-    # Treatment duration estimation based on soil permeability
-    base_treatment_days = 45
-    if soil_permeability == 'high':
-        treatment_days = base_treatment_days * 0.7  # Faster treatment
-    elif soil_permeability == 'low':
-        treatment_days = base_treatment_days * 1.5  # Slower treatment
-    else:
-        treatment_days = base_treatment_days
-    
-    # Adjust for contamination levels
-    if tph_level > 3000:
-        treatment_days *= 1.2
-    if chloride_level > 7000:
-        treatment_days *= 1.2
-    
-    treatment_days = int(treatment_days)
-    
-    # Costs
-    total_processing_cost = volume_cy * processing_cost_cy
-    
-    # Mobilization cost (estimated)
-    mobilization_cost = 5000 if volume_cy < 1000 else 10000
-    
-    # Amendment costs (estimated based on permeability)
-    if soil_permeability == 'low':
-        amendment_cost = volume_cy * 3  # Need more amendments for poor permeability
-    else:
-        amendment_cost = volume_cy * 1
-    
-    total_cost = total_processing_cost + mobilization_cost + amendment_cost
-    cost_per_cy = total_cost / volume_cy
-    
-    # CO2 estimation (much lower than dig & haul)
-    # Onsite equipment and limited trucking
-    estimated_fuel_gallons = volume_cy * 0.1  # Much less fuel than hauling
-    co2_lbs, co2_tons = calculate_co2_emissions(estimated_fuel_gallons)
-    
-    return {
-        'option_name': 'Clean Futures Onsite Remediation',
-        'total_cost': total_cost,
-        'cost_per_cy': cost_per_cy,
-        'project_days': treatment_days,
-        'processing_cost': total_processing_cost,
-        'mobilization_cost': mobilization_cost,
-        'amendment_cost': amendment_cost,
-        'co2_tons': co2_tons,
-        'includes_backfill': True,
-        'soil_returned_clean': True,
-        'permeability_factor': soil_permeability
-    }
-
-def calculate_surface_facility(volume_cy, site_lat, site_lon, needs_backfill,
-                               tph_level, chloride_level, db, advanced_params=None):
-    """Calculate costs and metrics for Surface Facility option"""
-    
-    # Find nearest CF facility
-    nearest_cf = find_nearest_cf_facility(site_lat, site_lon, db)
-    
-    if not nearest_cf:
-        return None
-    
-    facility = nearest_cf['facility']
-    distance_miles = nearest_cf['distance_miles']
-    
-    # Transportation parameters
-    if advanced_params:
-        truck_capacity = advanced_params.get('truck_capacity_cy', 18)
-        num_trucks = advanced_params.get('num_trucks', 3)
-        truck_hourly_rate = advanced_params.get('truck_hourly_rate', 85)
-        processing_cost_cy = advanced_params.get('surface_processing_cost_cy', 25)
-    else:
-        truck_capacity = 18
-        num_trucks = 3
-        truck_hourly_rate = 85
-        processing_cost_cy = facility['processing_cost_cy']
-    
-    # Trip calculations
-    avg_speed_mph = 45
-    travel_time_hours = distance_miles / avg_speed_mph
-    loading_time = 0.25
-    unloading_time = 0.5
-    
-    # Round trip (haul contaminated + return clean)
-    trip_time = loading_time + travel_time_hours + unloading_time + travel_time_hours + loading_time
-    
-    num_trips = math.ceil(volume_cy / truck_capacity)
-    total_truck_hours = num_trips * trip_time
-    
-    # Costs
-    trucking_cost = total_truck_hours * truck_hourly_rate
-    processing_cost = volume_cy * processing_cost_cy
-    
-    total_cost = trucking_cost + processing_cost
-    cost_per_cy = total_cost / volume_cy
-    
-    # Timeline
-    turnaround_days = facility['typical_turnaround_days']
-    
-    # CO2 (trucking both ways but treatment is efficient)
-    truck_fuel_gph = 4
-    total_fuel = truck_fuel_gph * total_truck_hours
-    co2_lbs, co2_tons = calculate_co2_emissions(total_fuel)
-    
-    return {
-        'option_name': 'Clean Futures Surface Facility',
-        'total_cost': total_cost,
-        'cost_per_cy': cost_per_cy,
-        'project_days': turnaround_days,
-        'facility_name': facility['facility_name'],
-        'distance_miles': distance_miles,
-        'trucking_cost': trucking_cost,
-        'processing_cost': processing_cost,
-        'co2_tons': co2_tons,
-        'includes_backfill': True,
-        'soil_returned_clean': True
-    }
-
-def generate_recommendation(dig_haul, onsite, surface_facility, user_priorities):
-    """Generate recommendation based on calculations and user priorities"""
-    
-    options = []
-    if dig_haul:
-        options.append(('dig_haul', dig_haul))
-    if onsite:
-        options.append(('onsite', onsite))
-    if surface_facility:
-        options.append(('surface', surface_facility))
-    
-    if not options:
-        return None
-    
-    # Score each option based on priorities
-    scores = {}
-    for opt_type, opt in options:
-        score = 0
-        
-        # Cost priority
-        if user_priorities.get('cost', 'medium') == 'high':
-            # Lower cost = higher score
-            min_cost = min([o[1]['cost_per_cy'] for o in options])
-            score += 40 * (1 - (opt['cost_per_cy'] - min_cost) / min_cost) if min_cost > 0 else 20
-        elif user_priorities.get('cost', 'medium') == 'medium':
-            min_cost = min([o[1]['cost_per_cy'] for o in options])
-            score += 20 * (1 - (opt['cost_per_cy'] - min_cost) / min_cost) if min_cost > 0 else 10
-        
-        # Timeline priority
-        if user_priorities.get('speed', 'medium') == 'high':
-            min_days = min([o[1]['project_days'] for o in options])
-            score += 30 * (1 - (opt['project_days'] - min_days) / min_days) if min_days > 0 else 15
-        elif user_priorities.get('speed', 'medium') == 'medium':
-            min_days = min([o[1]['project_days'] for o in options])
-            score += 15 * (1 - (opt['project_days'] - min_days) / min_days) if min_days > 0 else 7
-        
-        # ESG priority
-        if user_priorities.get('esg', 'medium') == 'high':
-            min_co2 = min([o[1]['co2_tons'] for o in options])
-            score += 30 * (1 - (opt['co2_tons'] - min_co2) / min_co2) if min_co2 > 0 else 15
-            # Bonus for treatment vs disposal
-            if opt_type in ['onsite', 'surface']:
-                score += 10
-        elif user_priorities.get('esg', 'medium') == 'medium':
-            min_co2 = min([o[1]['co2_tons'] for o in options])
-            score += 15 * (1 - (opt['co2_tons'] - min_co2) / min_co2) if min_co2 > 0 else 7
-        
-        scores[opt_type] = score
-    
-    # Find recommendation
-    recommended = max(scores, key=scores.get)
-    
-    return recommended, scores
-
 # ============================================================================
 # WELCOME PAGE
 # ============================================================================
@@ -708,30 +346,63 @@ def show_welcome_page():
             st.session_state.mode = 'advanced'
             st.rerun()
     
+    st.markdown("""
+        <div class="mode-card">
+            <div class="mode-card-title">📋 Portfolio Planning</div>
+            <p><strong>Assign many active sites at once</strong> - respects facility intake limits 
+            and a shared truck fleet instead of sending every site to its nearest facility.</p>
+        </div>
+    """, unsafe_allow_html=True)
+    if st.button("Start Portfolio Planning", key="portfolio", use_container_width=True):
+        st.session_state.mode = 'portfolio'
+        st.rerun()
+    
+    st.markdown("""
+        <div class="mode-card">
+            <div class="mode-card-title">📍 Facility Siting</div>
+            <p><strong>Plan new surface facilities</strong> - proposes where to build the next 
+            Clean Futures facilities to cut haul cost and CO2 for a set of historical spills.</p>
+        </div>
+    """, unsafe_allow_html=True)
+    if st.button("Start Facility Siting", key="siting", use_container_width=True):
+        st.session_state.mode = 'siting'
+        st.rerun()
+    
+    st.markdown("""
+        <div class="mode-card">
+            <div class="mode-card-title">🗂️ Analysis History</div>
+            <p><strong>Search past analyses</strong> - every analysis is saved with its inputs and results, 
+            searchable by county, date, recommended option and cost.</p>
+        </div>
+    """, unsafe_allow_html=True)
+    if st.button("Browse History", key="history", use_container_width=True):
+        st.session_state.mode = 'history'
+        st.rerun()
+    
     st.markdown("---")
     
     # Additional info
     with st.expander("📚 About This Tool"):
         st.markdown("""
             ### What This Tool Does
-            
+    
             This recommendation engine analyzes your contaminated soil situation and compares three 
             remediation approaches:
-            
+    
             1. **Dig & Haul to Landfill** - Excavate, transport to qualified landfill, replace with clean fill
             2. **Clean Futures Onsite Remediation** - Treat soil in place using our proven methods
             3. **Clean Futures Surface Facility** - Transport to our facility for treatment, return clean soil
-            
+    
             ### What You'll Get
-            
+    
             - **Cost Analysis** - Detailed breakdown of all costs for each option
             - **Timeline Estimates** - Project duration from start to completion
             - **Environmental Impact** - CO2 emissions and sustainability metrics
             - **Pros & Cons** - Clear comparison of advantages and limitations
             - **Smart Recommendation** - AI-powered suggestion based on your priorities
-            
+    
             ### Coverage Area
-            
+    
             Currently optimized for the **Permian Basin** region (West Texas & SE New Mexico), with:
             - 14 qualified landfills in the database
             - 4 Clean Futures surface facilities
@@ -761,11 +432,11 @@ def show_simple_questionnaire():
             site_lat = st.number_input("Latitude", value=31.9, min_value=30.0, max_value=35.0, format="%.4f")
         with col2:
             site_lon = st.number_input("Longitude", value=-102.0, min_value=-105.0, max_value=-100.0, format="%.4f")
-        
+    
         st.markdown("### 🧪 Contamination Details")
         contam_type = st.selectbox("Contamination Type", 
                                    ["TPH Only", "Chloride Only", "Both TPH and Chloride"])
-        
+    
         col1, col2 = st.columns(2)
         with col1:
             if contam_type in ["TPH Only", "Both TPH and Chloride"]:
@@ -777,17 +448,19 @@ def show_simple_questionnaire():
                 chloride_level = st.number_input("Chloride Level (mg/kg)", value=5000, min_value=0, max_value=20000)
             else:
                 chloride_level = 0
-        
+    
         st.markdown("### 📏 Site Dimensions")
         col1, col2 = st.columns(2)
         with col1:
             surface_area = st.number_input("Surface Area (square feet)", value=5000, min_value=100)
         with col2:
             depth = st.number_input("Depth of Contamination (feet)", value=5.0, min_value=0.5, max_value=30.0, step=0.5)
-        
+    
         volume_cy = calculate_volume_cy(surface_area, depth)
         st.info(f"📦 **Estimated Volume:** {volume_cy:,.0f} cubic yards")
-        
+        project_date = st.date_input("Project Start Date", value=datetime.now().date(),
+                                     help="Prices and diesel costs in effect on this date are used")
+    
         st.markdown("### 🎯 Project Priorities")
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -802,11 +475,11 @@ def show_simple_questionnaire():
             esg_priority = st.select_slider("ESG/Sustainability",
                                            options=['low', 'medium', 'high'],
                                            value='medium')
-        
+    
         needs_backfill = st.checkbox("Clean backfill required", value=True)
-        
+    
         submitted = st.form_submit_button("🔍 Analyze Solutions", type="primary", use_container_width=True)
-        
+    
         if submitted:
             # Store in session state
             st.session_state.analysis = {
@@ -815,6 +488,8 @@ def show_simple_questionnaire():
                 'tph_level': tph_level,
                 'chloride_level': chloride_level,
                 'volume_cy': volume_cy,
+                'surface_area_sqft': surface_area,
+                'depth_ft': depth,
                 'needs_backfill': needs_backfill,
                 'priorities': {
                     'cost': cost_priority,
@@ -822,7 +497,8 @@ def show_simple_questionnaire():
                     'esg': esg_priority
                 },
                 'advanced_params': None,
-                'soil_permeability': 'medium'
+                'soil_permeability': 'medium',
+                'project_date': project_date.isoformat()
             }
             st.session_state.show_results = True
             st.rerun()
@@ -850,11 +526,11 @@ def show_advanced_questionnaire():
             site_lat = st.number_input("Latitude", value=31.9, min_value=30.0, max_value=35.0, format="%.4f")
         with col2:
             site_lon = st.number_input("Longitude", value=-102.0, min_value=-105.0, max_value=-100.0, format="%.4f")
-        
+    
         st.markdown("### 🧪 Contamination Details")
         contam_type = st.selectbox("Contamination Type", 
                                    ["TPH Only", "Chloride Only", "Both TPH and Chloride"])
-        
+    
         col1, col2 = st.columns(2)
         with col1:
             if contam_type in ["TPH Only", "Both TPH and Chloride"]:
@@ -866,22 +542,24 @@ def show_advanced_questionnaire():
                 chloride_level = st.number_input("Chloride Level (mg/kg)", value=5000, min_value=0, max_value=20000)
             else:
                 chloride_level = 0
-        
+    
         st.markdown("### 📏 Site Dimensions")
         col1, col2 = st.columns(2)
         with col1:
             surface_area = st.number_input("Surface Area (square feet)", value=5000, min_value=100)
         with col2:
             depth = st.number_input("Depth of Contamination (feet)", value=5.0, min_value=0.5, max_value=30.0, step=0.5)
-        
+    
         volume_cy = calculate_volume_cy(surface_area, depth)
         st.info(f"📦 **Estimated Volume:** {volume_cy:,.0f} cubic yards")
-        
+        project_date = st.date_input("Project Start Date", value=datetime.now().date(),
+                                     help="Prices and diesel costs in effect on this date are used")
+    
         st.markdown("### 🌍 Soil Characteristics")
         soil_permeability = st.selectbox("Soil Permeability", 
                                         ["high", "medium", "low"],
                                         help="Affects onsite treatment duration")
-        
+    
         st.markdown("### 🚜 Equipment & Operations")
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -893,10 +571,15 @@ def show_advanced_questionnaire():
         with col3:
             loader_rate = st.number_input("Loader Rate ($/hr)", value=125, min_value=75, max_value=250)
             work_hours_per_day = st.number_input("Work Hours/Day", value=10, min_value=6, max_value=16)
-        
+        simulate_schedule = st.checkbox(
+            "Simulate the haul schedule",
+            help="Plays out the excavator, loader, trucks and landfill gate hour by hour, "
+                 "including shift end and gate queues, instead of the quick estimate"
+        )
+    
         st.markdown("### 💰 Custom Pricing (Optional)")
         use_custom_pricing = st.checkbox("Override default pricing")
-        
+    
         if use_custom_pricing:
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -911,7 +594,7 @@ def show_advanced_questionnaire():
             backfill_cost = 10
             onsite_cost = 25
             surface_cost = 25
-        
+    
         st.markdown("### 🎯 Project Priorities")
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -926,11 +609,11 @@ def show_advanced_questionnaire():
             esg_priority = st.select_slider("ESG/Sustainability",
                                            options=['low', 'medium', 'high'],
                                            value='medium')
-        
+    
         needs_backfill = st.checkbox("Clean backfill required", value=True)
-        
+    
         submitted = st.form_submit_button("🔍 Analyze Solutions", type="primary", use_container_width=True)
-        
+    
         if submitted:
             advanced_params = {
                 'truck_capacity_cy': truck_capacity,
@@ -942,15 +625,18 @@ def show_advanced_questionnaire():
                 'disposal_cost_cy': disposal_cost,
                 'backfill_cost_cy': backfill_cost,
                 'onsite_processing_cost_cy': onsite_cost,
-                'surface_processing_cost_cy': surface_cost
+                'surface_processing_cost_cy': surface_cost,
+                'simulate_schedule': simulate_schedule
             }
-            
+    
             st.session_state.analysis = {
                 'site_lat': site_lat,
                 'site_lon': site_lon,
                 'tph_level': tph_level,
                 'chloride_level': chloride_level,
                 'volume_cy': volume_cy,
+                'surface_area_sqft': surface_area,
+                'depth_ft': depth,
                 'needs_backfill': needs_backfill,
                 'priorities': {
                     'cost': cost_priority,
@@ -958,7 +644,8 @@ def show_advanced_questionnaire():
                     'esg': esg_priority
                 },
                 'advanced_params': advanced_params if use_custom_pricing or True else None,
-                'soil_permeability': soil_permeability
+                'soil_permeability': soil_permeability,
+                'project_date': project_date.isoformat()
             }
             st.session_state.show_results = True
             st.rerun()
@@ -967,36 +654,183 @@ def show_advanced_questionnaire():
 # RESULTS DISPLAY
 # ============================================================================
 
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+ALTERNATIVE_RANKINGS = {
+    'cheapest': 'Lowest Cost',
+    'fastest': 'Fastest',
+    'lowest_co2': 'Lowest CO₂',
+}
+
+def show_alternatives(analysis, db):
+    """Expander listing the best landfills and CF facilities beyond the nearest one"""
+    with st.expander("🔀 Alternative Destinations"):
+        ranking = st.radio("Rank By", list(ALTERNATIVE_RANKINGS), format_func=ALTERNATIVE_RANKINGS.get,
+                           horizontal=True, key='alternatives_ranking')
+        alternatives = find_alternatives(analysis, db, k=DEFAULT_ALTERNATIVES)
+    
+        for opt_type, title in (('dig_haul', 'Dig & Haul - Landfills'),
+                                ('surface', 'Surface Facility - Clean Futures Facilities')):
+            ranked = alternatives[opt_type]
+            st.markdown(f"**{title}** ({ranked['qualified']} qualified)")
+            if not ranked[ranking]:
+                st.info("No qualified destinations for this soil.")
+                continue
+            st.dataframe(pd.DataFrame([{
+                'Destination': alt['name'],
+                'Distance': f"{alt['distance_miles']:.1f} mi",
+                'Total Cost': f"${alt['total_cost']:,.0f}",
+                'Cost per CY': f"${alt['cost_per_cy']:.2f}",
+                'Timeline': f"{alt['project_days']:.0f} days",
+                'CO₂ Emissions': f"{alt['co2_tons']:.1f} tons",
+            } for alt in ranked[ranking]]), hide_index=True, use_container_width=True)
+    
+        st.caption(f"Every qualified destination is costed; the top {DEFAULT_ALTERNATIVES} are shown. "
+                   "Distances are straight-line, so they can differ from road-routed results above.")
+
+# Partial reruns: interacting with a fragment reruns only that function.
+# Older Streamlit releases without fragments fall back to full reruns.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda fn: fn)
+
+# What-if sliders: (parameter, option whose destination it needs, or None)
+WHAT_IF_PARAMETERS = (
+    ('volume_cy', None),
+    ('num_trucks', None),
+    ('truck_hourly_rate', None),
+    ('disposal_cost_cy', 'dig_haul'),
+    ('onsite_processing_cost_cy', None),
+    ('surface_processing_cost_cy', 'surface'),
+)
+
+def _reset_what_if():
+    for key in [key for key in st.session_state if str(key).startswith('what_if_')]:
+        del st.session_state[key]
+
+def _what_if_slider(param, label, value):
+    """Slider over the sensitivity bounds, widened to include the current value"""
+    low, high = SWEEP_BOUNDS[param]
+    if isinstance(low, int) and float(value).is_integer():
+        return st.slider(label, min_value=min(low, int(value)), max_value=max(high, int(value)),
+                         value=int(value), key=f"what_if_{param}")
+    return st.slider(label, min_value=float(min(low, value)), max_value=float(max(high, value)),
+                     value=float(value), step=1.0, key=f"what_if_{param}")
+
+@fragment
+def show_what_if(analysis, db, result):
+    """Sliders that re-evaluate a modified copy of the analysis in place
+    
+    Runs as a fragment, so moving a slider reruns only this panel, and the
+    session's what-if pipeline recomputes only the stages the change touches.
+    """
+    from cleanfutures.sweep import SWEEP_PARAMETERS
+    
+    base_params = st.session_state.pipeline.effective_parameters(analysis, db)
+    
+    col1, col2 = st.columns(2)
+    params = {}
+    sliders = [(param, option) for param, option in WHAT_IF_PARAMETERS if option is None or result[option]]
+    for idx, (param, option) in enumerate(sliders):
+        with [col1, col2][idx % 2]:
+            value = analysis['volume_cy'] if param == 'volume_cy' else base_params.get(param)
+            if value is not None:
+                params[param] = _what_if_slider(param, SWEEP_PARAMETERS[param], value)
+    
+    col1, col2, col3 = st.columns(3)
+    priorities = {}
+    for col, key in zip((col1, col2, col3), ('cost', 'speed', 'esg')):
+        with col:
+            priorities[key] = st.select_slider(SWEEP_PARAMETERS[f'{key}_priority'], options=['low', 'medium', 'high'],
+                                               value=analysis['priorities'][key], key=f"what_if_{key}_priority")
+    
+    volume_cy = params.pop('volume_cy', analysis['volume_cy'])
+    what_if = dict(analysis, volume_cy=volume_cy, advanced_params=dict(base_params, **params), priorities=priorities)
+    if analysis.get('surface_area_sqft') and volume_cy != analysis['volume_cy']:
+        what_if['depth_ft'] = volume_cy * 27 / analysis['surface_area_sqft']
+    changed = (volume_cy != analysis['volume_cy'] or priorities != analysis['priorities']
+               or any(params[p] != base_params.get(p) for p in params))
+    
+    if 'what_if_pipeline' not in st.session_state:
+        st.session_state.what_if_pipeline = EvaluationPipeline()
+    started = datetime.now()
+    scenario = evaluate_site_cached(what_if, db, evaluate=st.session_state.what_if_pipeline.evaluate)
+    elapsed = (datetime.now() - started).total_seconds()
+    
+    options = [key for key in OPTION_NAMES if result[key] and scenario[key]]
+    for col, key in zip(st.columns(len(options) or 1), options):
+        base, opt = result[key], scenario[key]
+        with col:
+            st.markdown(f"**{'⭐ ' if key == scenario['recommended'] else ''}{OPTION_NAMES[key]}**")
+            st.metric("Total Cost", f"${opt['total_cost']:,.0f}",
+                      delta=f"{opt['total_cost'] - base['total_cost']:+,.0f}", delta_color='inverse')
+            st.metric("Timeline", f"{opt['project_days']} days",
+                      delta=f"{opt['project_days'] - base['project_days']:+} days", delta_color='inverse')
+            st.metric("CO₂ Emissions", f"{opt['co2_tons']:.1f} tons",
+                      delta=f"{opt['co2_tons'] - base['co2_tons']:+.1f} tons", delta_color='inverse')
+    
+    if scenario['recommended'] != result['recommended']:
+        st.warning(f"The recommendation changes to **{OPTION_NAMES[scenario['recommended']]}** in this scenario.")
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        st.caption(f"Deltas are against the analysis above. Updated in {elapsed * 1000:.0f} ms.")
+    with col2:
+        st.button("↺ Reset", on_click=_reset_what_if, disabled=not changed, use_container_width=True,
+                  key='what_if_reset')
+    with col3:
+        if st.button("Apply to Analysis", disabled=not changed, use_container_width=True, key='what_if_apply'):
+            st.session_state.analysis = what_if
+            _reset_what_if()
+            st.rerun()
+
 def show_results():
     """Display analysis results and recommendations"""
     
     analysis = st.session_state.analysis
-    db = load_facilities_database()
+    try:
+        db = load_facilities_database()
+    except FileNotFoundError as e:
+        st.error(f"⚠️ {e}")
+        return
     
     st.markdown("## 🎯 Solution Analysis & Recommendations")
     
+    # ========================================================================
+    # PERFORM CALCULATIONS
+    # ========================================================================
+    
+    # One pipeline per session, so an edited analysis only recomputes the
+    # stages whose inputs changed
+    if 'pipeline' not in st.session_state:
+        st.session_state.pipeline = EvaluationPipeline()
+    
+    with st.spinner("Analyzing remediation options..."):
+        result = evaluate_site_cached(analysis, db, evaluate=st.session_state.pipeline.evaluate)
+    
+    # Save each analysis to the history once, not on every rerun
+    if st.session_state.get('recorded_analysis') != analysis:
+        history = get_analysis_history()
+        if history is not None:
+            history.record(analysis, result, db_version=getattr(db, 'version', None))
+        st.session_state.recorded_analysis = analysis
+    
+    state = result['state']
+    county = result['county']
+    soil_type = result['soil_type']
+    reg_thresholds = result['reg_thresholds']
+    nearest_lf = result['nearest_landfill']
+    dig_haul = result['dig_haul']
+    onsite = result['onsite']
+    surface = result['surface']
+    recommended = result['recommended']
+    scores = result['scores']
+    
     # ========================================================================
     # LOCATION SUMMARY
     # ========================================================================
     
     st.markdown("### 📍 Location Summary")
     
-    # Get location details
-    state, county = determine_state_county(analysis['site_lat'], analysis['site_lon'], db)
-    soil_type = get_soil_type(analysis['site_lat'], analysis['site_lon'], state)
-    reg_thresholds = get_regulatory_thresholds(state)
-    
-    # Find nearest qualified landfill for distance
-    nearest_lf = find_nearest_qualified_landfill(
-        analysis['site_lat'], 
-        analysis['site_lon'],
-        analysis['tph_level'],
-        analysis['chloride_level'],
-        analysis['needs_backfill'],
-        db
-    )
-    
-    distance_to_landfill = nearest_lf['distance_miles'] if nearest_lf else "N/A"
+    distance_to_landfill = f"{nearest_lf['distance_miles']:.1f} mi" if nearest_lf else "N/A"
     nearest_landfill_name = f"{nearest_lf['landfill']['company']} - {nearest_lf['landfill']['site_name']}" if nearest_lf else "None found"
     
     # Display location info in columns
@@ -1029,7 +863,7 @@ def show_results():
         st.markdown(f"""
         <div class="metric-box">
             <p class="metric-label">Nearest Landfill</p>
-            <p class="metric-value" style="font-size: 1.3rem;">{distance_to_landfill:.1f} mi</p>
+            <p class="metric-value" style="font-size: 1.3rem;">{distance_to_landfill}</p>
             <p style="color: #5a8a6f; margin: 0.5rem 0 0 0; font-size: 0.85rem;">
                 {nearest_landfill_name}
             </p>
@@ -1040,62 +874,23 @@ def show_results():
     with st.expander("📋 Regulatory Thresholds & Standards", expanded=False):
         st.markdown(f"""
         **Regulatory Agency:** {reg_thresholds['regulatory_agency']}
-        
+    
         **TPH (Total Petroleum Hydrocarbons) - Soil Cleanup Standards:**
         - Residential Use: {reg_thresholds['tph_residential_mgkg']} mg/kg
         - Industrial/Commercial Use: {reg_thresholds['tph_industrial_mgkg']} mg/kg
-        
+    
         **Chlorides:**
         - {reg_thresholds['chloride_soil_mgkg']}
-        
+    
         **Your Site:**
         - TPH Level: {analysis['tph_level']} mg/kg {'✅ Below industrial threshold' if analysis['tph_level'] < reg_thresholds['tph_industrial_mgkg'] else '⚠️ Exceeds industrial threshold'}
         - Chloride Level: {analysis['chloride_level']} mg/kg
-        
+    
         *Note: {reg_thresholds['notes']}*
         """)
     
     st.markdown("---")
-    
-    # ========================================================================
-    # PERFORM CALCULATIONS
-    # ========================================================================
-    
-    with st.spinner("Analyzing remediation options..."):
-        dig_haul = calculate_dig_and_haul(
-            analysis['volume_cy'],
-            analysis['site_lat'],
-            analysis['site_lon'],
-            analysis['needs_backfill'],
-            analysis['tph_level'],
-            analysis['chloride_level'],
-            db,
-            analysis['advanced_params']
-        )
-        
-        onsite = calculate_onsite_remediation(
-            analysis['volume_cy'],
-            analysis['site_lat'],
-            analysis['site_lon'],
-            analysis.get('soil_permeability', 'medium'),
-            analysis['tph_level'],
-            analysis['chloride_level'],
-            analysis['advanced_params']
-        )
-        
-        surface = calculate_surface_facility(
-            analysis['volume_cy'],
-            analysis['site_lat'],
-            analysis['site_lon'],
-            analysis['needs_backfill'],
-            analysis['tph_level'],
-            analysis['chloride_level'],
-            db,
-            analysis['advanced_params']
-        )
-    
-    # Generate recommendation
-    recommended, scores = generate_recommendation(dig_haul, onsite, surface, analysis['priorities'])
+    instrumentation.lap('render_location_summary')
     
     # ========================================================================
     # COMPARISON TABLE
@@ -1116,7 +911,7 @@ def show_results():
     comparison_data = []
     for opt_type, opt in options_list:
         is_recommended = (opt_type == recommended)
-        
+    
         row = {
             '': '⭐ RECOMMENDED' if is_recommended else '',
             'Solution': opt['option_name'],
@@ -1126,20 +921,22 @@ def show_results():
             'CO₂ Emissions': f"{opt['co2_tons']:.2f} tons",
             'Backfill Included': '✅ Yes' if opt.get('includes_backfill', False) else '❌ No',
         }
-        
+    
         # Add specific details
+        distance_note = " (road)" if opt.get('distance_source') == 'road' else ""
         if opt_type == 'dig_haul':
-            row['Key Details'] = f"{opt['distance_miles']:.0f} mi to landfill"
+            row['Key Details'] = f"{opt['distance_miles']:.0f} mi{distance_note} to landfill"
             if not opt.get('backfill_available_at_landfill'):
                 row['Key Details'] += " ⚠️ Separate backfill needed"
         elif opt_type == 'onsite':
             row['Key Details'] = "Soil treated in place"
         else:  # surface
-            row['Key Details'] = f"{opt['distance_miles']:.0f} mi to facility"
-        
+            row['Key Details'] = f"{opt['distance_miles']:.0f} mi{distance_note} to facility"
+    
         comparison_data.append(row)
     
     df_comparison = pd.DataFrame(comparison_data)
+    instrumentation.lap('build_comparison_table')
     
     # Display table with custom styling
     st.dataframe(
@@ -1159,6 +956,18 @@ def show_results():
     )
     
     st.markdown("---")
+    instrumentation.lap('render_comparison_table')
+    
+    # ========================================================================
+    # WHAT-IF EXPLORER
+    # ========================================================================
+    
+    with st.expander("🎚️ What-If Explorer"):
+        st.write("Adjust volume, trucks, rates and priorities to see how each option responds.")
+        show_what_if(analysis, db, result)
+    
+    st.markdown("---")
+    instrumentation.lap('render_what_if')
     
     # ========================================================================
     # DETAILED BREAKDOWNS
@@ -1171,13 +980,13 @@ def show_results():
     for idx, (opt_type, opt) in enumerate(options_list):
         col = [col1, col2, col3][idx]
         is_recommended = (opt_type == recommended)
-        
+    
         with col:
             if is_recommended:
                 st.markdown('<div class="recommended-badge">⭐ RECOMMENDED</div>', unsafe_allow_html=True)
-            
+    
             st.markdown(f"**{opt['option_name']}**")
-            
+    
             if opt_type == 'dig_haul':
                 breakdown = {
                     'Equipment': f"${opt['equipment_cost']:,.0f}",
@@ -1196,13 +1005,45 @@ def show_results():
                     'Trucking': f"${opt['trucking_cost']:,.0f}",
                     'Processing': f"${opt['processing_cost']:,.0f}",
                 }
-            
+    
+            if opt.get('fuel_adjustment'):
+                breakdown['Diesel Price Adjustment'] = f"${opt['fuel_adjustment']:,.0f}"
+    
             for category, cost in breakdown.items():
                 st.write(f"• {category}: {cost}")
-            
+    
             st.markdown(f"**Total: ${opt['total_cost']:,.0f}**")
     
+    schedule = dig_haul.get('schedule') if dig_haul else None
+    if schedule:
+        with st.expander("🚚 Simulated Haul Schedule"):
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Project Days", schedule['project_days'])
+            with col2:
+                st.metric("Truck Utilization", f"{schedule['truck_utilization']:.0%}")
+            with col3:
+                st.metric("Excavator Utilization", f"{schedule['excavator_utilization']:.0%}")
+            with col4:
+                st.metric("Loader Utilization", f"{schedule['loader_utilization']:.0%}")
+            idle_labels = {
+                'waiting_for_loader': 'Waiting for loader',
+                'waiting_for_soil': 'Waiting for excavated soil',
+                'gate_queue': 'Queued at landfill gate',
+                'shift_end': 'Parked - trip would not finish before close',
+                'released': 'Released after last load',
+            }
+            st.markdown("**Truck idle hours**")
+            st.bar_chart(pd.DataFrame({
+                'Hours': [schedule['truck_idle_hours'][key] for key in idle_labels],
+            }, index=list(idle_labels.values())))
+            st.caption(f"{schedule['trips']:,} trips; {schedule['productive_truck_hours']:,.0f} of "
+                       f"{schedule['truck_hours']:,.0f} billed truck-hours spent loading, driving or unloading.")
+    
+    show_alternatives(analysis, db)
+    
     st.markdown("---")
+    instrumentation.lap('render_cost_breakdowns')
     
     # ========================================================================
     # PROS & CONS
@@ -1260,18 +1101,18 @@ def show_results():
     
     for idx, (opt_type, opt) in enumerate(options_list):
         col = [col1, col2, col3][idx]
-        
+    
         with col:
             st.markdown(f"**{opt['option_name']}**")
-            
+    
             st.markdown('<div class="pros-list">', unsafe_allow_html=True)
             st.markdown("**✅ Advantages**")
             for pro in pros_cons[opt_type]['pros']:
                 st.markdown(f"• {pro}")
             st.markdown('</div>', unsafe_allow_html=True)
-            
+    
             st.markdown("")
-            
+    
             st.markdown('<div class="cons-list">', unsafe_allow_html=True)
             st.markdown("**⚠️ Considerations**")
             for con in pros_cons[opt_type]['cons']:
@@ -1315,13 +1156,15 @@ def show_results():
             - Excellent for sites requiring backfill
         """)
     
+    instrumentation.lap('render_pros_cons')
+    
     # ========================================================================
     # DOWNLOAD & RESTART
     # ========================================================================
     
     st.markdown("---")
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         # Create downloadable report
@@ -1336,10 +1179,11 @@ def show_results():
                 'CO2_Tons': opt['co2_tons'],
                 'Includes_Backfill': 'Yes' if opt.get('includes_backfill', False) else 'No'
             })
-        
+    
         df_report = pd.DataFrame(report_data)
         csv = df_report.to_csv(index=False)
-        
+        instrumentation.lap('build_report_csv')
+    
         st.download_button(
             label="📥 Download Report (CSV)",
             data=csv,
@@ -1348,10 +1192,869 @@ def show_results():
             use_container_width=True
         )
     
+        # Build the workbook once per analysis, not on every rerun
+        if st.session_state.get('report_analysis') != analysis:
+            buffer = io.BytesIO()
+            write_analysis_report(buffer, analysis, result, db,
+                                  parameters=st.session_state.pipeline.effective_parameters(analysis, db))
+            st.session_state.report_xlsx = buffer.getvalue()
+            st.session_state.report_analysis = analysis
+        instrumentation.lap('build_report_xlsx')
+    
+        st.download_button(
+            label="📊 Download Report (Excel)",
+            data=st.session_state.report_xlsx,
+            file_name=f"clean_futures_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime=XLSX_MIME,
+            use_container_width=True
+        )
+    
     with col2:
+        if st.button("🔬 Sensitivity Analysis", use_container_width=True):
+            st.session_state.show_sweep = True
+            st.rerun()
+    
+    with col3:
+        if st.button("🎲 Uncertainty Analysis", use_container_width=True):
+            st.session_state.show_monte_carlo = True
+            st.rerun()
+    
+    with col4:
         if st.button("🔄 New Analysis", use_container_width=True):
             st.session_state.clear()
             st.rerun()
+    instrumentation.lap('render_downloads')
+
+# ============================================================================
+# SENSITIVITY ANALYSIS
+# ============================================================================
+
+# Slider bounds for each sweepable parameter (match the questionnaire limits)
+SWEEP_BOUNDS = {
+    'volume_cy': (10.0, 50000.0),
+    'depth_ft': (0.5, 30.0),
+    'num_trucks': (1, 10),
+    'truck_capacity_cy': (10, 30),
+    'truck_hourly_rate': (50, 200),
+    'excavator_rate': (75, 300),
+    'loader_rate': (75, 250),
+    'work_hours_per_day': (6, 16),
+    'disposal_cost_cy': (10, 100),
+    'backfill_cost_cy': (5, 50),
+    'onsite_processing_cost_cy': (15, 75),
+    'surface_processing_cost_cy': (15, 75),
+}
+
+def show_sensitivity_analysis():
+    """Display scenario sweep, tornado chart and break-even curves"""
+    import altair as alt
+    import numpy as np
+    from cleanfutures.sweep import SWEEP_PARAMETERS, break_even, resolve_site, run_sweep, tornado
+    
+    analysis = st.session_state.analysis
+    db = load_facilities_database()
+    
+    st.title("🔬 Sensitivity Analysis")
+    st.write("See how the recommendation changes as project parameters vary.")
+    
+    if st.button("← Back to Results", key="back_sweep"):
+        st.session_state.show_sweep = False
+        st.rerun()
+    
+    site = resolve_site(analysis, db)
+    base = site['base']
+    
+    # ========================================================================
+    # PARAMETER RANGES
+    # ========================================================================
+    
+    st.markdown("### 🎚️ Parameter Ranges")
+    available_params = [p for p in SWEEP_BOUNDS if p != 'depth_ft' or base.get('surface_area_sqft')]
+    selected = st.multiselect(
+        "Parameters to vary",
+        available_params,
+        default=['volume_cy', 'num_trucks', 'disposal_cost_cy'],
+        format_func=lambda p: SWEEP_PARAMETERS[p]
+    )
+    if 'volume_cy' in selected and 'depth_ft' in selected:
+        st.warning("Vary either volume or depth, not both - depth is ignored.")
+        selected.remove('depth_ft')
+    
+    ranges = {}
+    for param in selected:
+        low, high = SWEEP_BOUNDS[param]
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            value_range = st.slider(SWEEP_PARAMETERS[param], min_value=low, max_value=high,
+                                    value=(low, high), key=f"sweep_range_{param}")
+        with col2:
+            steps = st.number_input("Steps", value=25, min_value=2, max_value=1000,
+                                    key=f"sweep_steps_{param}")
+        values = np.linspace(value_range[0], value_range[1], int(steps))
+        if isinstance(low, int):
+            values = np.unique(np.round(values).astype(int))
+        ranges[param] = values
+    
+    vary_priorities = st.checkbox("Also vary cost / speed / ESG priorities")
+    if vary_priorities:
+        for param in ('cost_priority', 'speed_priority', 'esg_priority'):
+            ranges[param] = np.array(['low', 'medium', 'high'])
+    
+    grid_size = int(np.prod([len(v) for v in ranges.values()])) if ranges else 1
+    st.caption(f"Grid size: {grid_size:,} scenarios")
+    
+    # ========================================================================
+    # RECOMMENDATION SHARE
+    # ========================================================================
+    
+    with st.spinner("Evaluating scenarios..."):
+        started = datetime.now()
+        result = run_sweep(analysis, db, ranges, site=site)
+        elapsed = (datetime.now() - started).total_seconds()
+    
+    st.markdown("### 🏆 How Often Each Option Wins")
+    share = result.recommendation_share()
+    st.bar_chart(pd.DataFrame({
+        'Share of scenarios': [share[key] for key in OPTION_NAMES],
+    }, index=list(OPTION_NAMES.values())))
+    st.caption(f"{result.size:,} scenarios evaluated in {elapsed:.2f} s")
+    
+    # ========================================================================
+    # TORNADO CHART
+    # ========================================================================
+    
+    st.markdown("### 🌪️ Tornado Chart")
+    col1, col2 = st.columns(2)
+    with col1:
+        tornado_option = st.selectbox("Option", [k for k in OPTION_NAMES if result.options[k] is not None],
+                                      format_func=OPTION_NAMES.get)
+    with col2:
+        tornado_metric = st.selectbox("Metric", ['total_cost', 'project_days', 'co2_tons'],
+                                      format_func=lambda m: {'total_cost': 'Total Cost',
+                                                             'project_days': 'Timeline (days)',
+                                                             'co2_tons': 'CO₂ (tons)'}[m])
+    
+    numeric_ranges = {p: v for p, v in ranges.items() if p in SWEEP_BOUNDS}
+    if numeric_ranges:
+        df_tornado = tornado(analysis, db, numeric_ranges, tornado_option, tornado_metric, site=site)
+        base_value = df_tornado.attrs['base_value']
+        df_tornado['low_end'] = df_tornado[['metric_at_low', 'metric_at_high']].min(axis=1)
+        df_tornado['high_end'] = df_tornado[['metric_at_low', 'metric_at_high']].max(axis=1)
+        bars = alt.Chart(df_tornado).mark_bar(color='#2d7a4f').encode(
+            x=alt.X('low_end:Q', title=tornado_metric.replace('_', ' ').title()),
+            x2='high_end:Q',
+            y=alt.Y('label:N', sort=list(df_tornado['label']), title=None),
+            tooltip=['label', 'low_value', 'high_value', 'metric_at_low', 'metric_at_high']
+        )
+        base_rule = alt.Chart(pd.DataFrame({'base': [base_value]})).mark_rule(color='#1a4d2e').encode(x='base:Q')
+        st.altair_chart(bars + base_rule, use_container_width=True)
+    else:
+        st.info("Select at least one numeric parameter to build a tornado chart.")
+    
+    # ========================================================================
+    # BREAK-EVEN CURVES
+    # ========================================================================
+    
+    st.markdown("### ⚖️ Break-Even Volume")
+    st.write("Volume at which each Clean Futures option becomes cheaper than Dig & Haul.")
+    
+    if result.options['dig_haul'] is None:
+        st.info("No qualified landfill for this site - Dig & Haul is not available.")
+        return
+    
+    volumes = np.linspace(*SWEEP_BOUNDS['volume_cy'], 2000)
+    y_choices = [p for p in SWEEP_BOUNDS if p not in ('volume_cy', 'depth_ft')]
+    y_param = st.selectbox("Break-even curve against", y_choices,
+                           index=y_choices.index('disposal_cost_cy'),
+                           format_func=lambda p: SWEEP_PARAMETERS[p])
+    y_low, y_high = SWEEP_BOUNDS[y_param]
+    y_values = np.linspace(y_low, y_high, 40)
+    if isinstance(y_low, int):
+        y_values = np.unique(np.round(y_values).astype(int))
+    
+    curves = []
+    for option in ('onsite', 'surface'):
+        if result.options[option] is None:
+            continue
+        df_curve = break_even(analysis, db, 'volume_cy', volumes, option, 'dig_haul',
+                              y_param=y_param, y_values=y_values, site=site)
+        df_curve = df_curve.drop_duplicates(subset=[y_param], keep='first')
+        df_curve['Option'] = OPTION_NAMES[option]
+        curves.append(df_curve)
+    
+    if curves and any(len(c) for c in curves):
+        df_curves = pd.concat(curves, ignore_index=True)
+        chart = alt.Chart(df_curves).mark_line(point=True).encode(
+            x=alt.X(f'{y_param}:Q', title=SWEEP_PARAMETERS[y_param]),
+            y=alt.Y('volume_cy:Q', title='Break-even Volume (CY)'),
+            color=alt.Color('Option:N', scale=alt.Scale(range=['#2d7a4f', '#81c995'])),
+            tooltip=[y_param, 'volume_cy', 'better_above', 'Option']
+        )
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.info("No break-even point in the volume range - one option dominates throughout.")
+
+# ============================================================================
+# UNCERTAINTY ANALYSIS
+# ============================================================================
+
+def show_monte_carlo():
+    """Display Monte Carlo P10/P50/P90 ranges and recommendation probabilities"""
+    import altair as alt
+    from cleanfutures.montecarlo import run_monte_carlo, spread
+    from cleanfutures.sweep import resolve_site
+    
+    analysis = st.session_state.analysis
+    db = load_facilities_database()
+    
+    st.title("🎲 Uncertainty Analysis")
+    st.write("Vary the model assumptions and rates to see the likely range of outcomes.")
+    
+    if st.button("← Back to Results", key="back_monte_carlo"):
+        st.session_state.show_monte_carlo = False
+        st.rerun()
+    
+    site = resolve_site(analysis, db)
+    base = site['base']
+    
+    # ========================================================================
+    # INPUT DISTRIBUTIONS
+    # ========================================================================
+    
+    st.markdown("### 📐 Assumption Ranges")
+    st.caption("Each range is sampled as a triangular distribution peaking at the standard assumption.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        speed = st.slider("Average Haul Speed (mph)", 20, 65, (35, 55))
+        loading = st.slider("Loading Time (hours)", 0.1, 1.0, (0.2, 0.4), step=0.05)
+        unloading = st.slider("Unloading Time (hours)", 0.25, 1.5, (0.4, 0.75), step=0.05)
+    with col2:
+        treatment = st.slider("Base Treatment Days", 20, 120, (35, 70))
+        co2_factor = st.slider("CO₂ per Gallon Diesel (lbs)", 21.0, 24.0, (22.0, 22.8), step=0.1)
+        n_samples = st.select_slider("Samples", options=[10_000, 50_000, 100_000, 250_000], value=100_000)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        rate_spread = st.slider("Equipment & Truck Rates (± %)", 0, 50, 15)
+    with col2:
+        price_spread = st.slider("Disposal, Backfill & Processing Prices (± %)", 0, 50, 10)
+    
+    def triangular(bounds, mode):
+        low, high = bounds
+        return ('triangular', low, min(max(mode, low), high), high)
+    
+    distributions = {
+        'avg_speed_mph': triangular(speed, 45),
+        'loading_time': triangular(loading, 0.25),
+        'unloading_time': triangular(unloading, 0.5),
+        'base_treatment_days': triangular(treatment, 45),
+        'co2_lbs_per_gallon': triangular(co2_factor, 22.38),
+    }
+    for param in ('truck_hourly_rate', 'excavator_rate', 'loader_rate'):
+        distributions[param] = spread(base[param], rate_spread)
+    for param in ('disposal_cost_cy', 'backfill_cost_cy', 'onsite_processing_cost_cy', 'surface_processing_cost_cy'):
+        distributions[param] = spread(base[param], price_spread)
+    
+    with st.spinner("Running simulation..."):
+        started = datetime.now()
+        result = run_monte_carlo(analysis, db, distributions, n_samples=n_samples, seed=0, site=site)
+        elapsed = (datetime.now() - started).total_seconds()
+    st.caption(f"{n_samples:,} samples simulated in {elapsed:.2f} s")
+    
+    # ========================================================================
+    # RESULTS
+    # ========================================================================
+    
+    st.markdown("### 🏆 Probability of Being Recommended")
+    probability = result.recommendation_probability()
+    st.bar_chart(pd.DataFrame({
+        'Probability': [probability[key] for key in OPTION_NAMES],
+    }, index=list(OPTION_NAMES.values())))
+    
+    st.markdown("### 📊 Outcome Ranges (P10 / P50 / P90)")
+    summary = result.summary()
+    table = []
+    for _, row in summary.iterrows():
+        table.append({
+            'Solution': OPTION_NAMES[row['option']],
+            'Total Cost': f"${row['total_cost_p10']:,.0f} / ${row['total_cost_p50']:,.0f} / ${row['total_cost_p90']:,.0f}",
+            'Timeline (days)': f"{row['project_days_p10']:.0f} / {row['project_days_p50']:.0f} / {row['project_days_p90']:.0f}",
+            'CO₂ (tons)': f"{row['co2_tons_p10']:.2f} / {row['co2_tons_p50']:.2f} / {row['co2_tons_p90']:.2f}",
+            'Chance Recommended': f"{row['p_recommended']:.0%}",
+        })
+    st.dataframe(pd.DataFrame(table), hide_index=True, use_container_width=True)
+    
+    st.markdown("### 📈 Total Cost Distribution")
+    frames = []
+    for key, metrics in result.options.items():
+        if metrics is None:
+            continue
+        costs = metrics['total_cost'][:5000]
+        frames.append(pd.DataFrame({'Total Cost': costs, 'Option': OPTION_NAMES[key]}))
+    chart = alt.Chart(pd.concat(frames, ignore_index=True)).mark_area(opacity=0.5, interpolate='step').encode(
+        x=alt.X('Total Cost:Q', bin=alt.Bin(maxbins=60)),
+        y=alt.Y('count()', stack=None, title='Samples'),
+        color=alt.Color('Option:N', scale=alt.Scale(range=['#ff9800', '#2d7a4f', '#81c995']))
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+# ============================================================================
+# PORTFOLIO PLANNING
+# ============================================================================
+
+def show_portfolio_planner():
+    """Assign a portfolio of concurrent sites under facility and fleet limits"""
+    from cleanfutures.batch import evaluate_batch
+    from cleanfutures.portfolio import (
+        CAPACITY_FIELD,
+        DEFAULT_CO2_COST_PER_TON,
+        DEFAULT_HORIZON_DAYS,
+        optimize_portfolio,
+    )
+    
+    st.title("📋 Portfolio Planning")
+    st.write("Upload your active sites to find the lowest-cost assignment that fits facility "
+             "intake limits and your shared truck fleet.")
+    
+    if st.button("← Back to Home", key="back_portfolio"):
+        st.session_state.mode = None
+        st.rerun()
+    
+    try:
+        db = load_facilities_database()
+    except FileNotFoundError as e:
+        st.error(f"⚠️ {e}")
+        return
+    
+    st.markdown("### 📍 Active Sites")
+    st.caption("CSV with site_id, site_lat, site_lon and volume_cy; optional tph_level, chloride_level, "
+               "needs_backfill and soil_permeability columns use Simple Mode defaults when missing.")
+    uploaded = st.file_uploader("Sites CSV", type=['csv'])
+    if uploaded is None:
+        return
+    sites = pd.read_csv(uploaded)
+    if 'site_id' not in sites.columns:
+        sites.insert(0, 'site_id', [f"Site {i + 1}" for i in range(len(sites))])
+    
+    st.markdown("### ⚙️ Shared Limits")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        limit_fleet = st.checkbox("Limit shared truck fleet", value=True)
+        fleet_size = st.number_input("Trucks in Fleet", min_value=1, max_value=500, value=20,
+                                     disabled=not limit_fleet)
+    with col2:
+        horizon_days = st.number_input("Planning Horizon (days)", min_value=1, max_value=365,
+                                       value=DEFAULT_HORIZON_DAYS)
+    with col3:
+        co2_cost = st.number_input("Carbon Cost ($ per ton CO₂)", min_value=0, max_value=1000,
+                                   value=DEFAULT_CO2_COST_PER_TON)
+    
+    st.markdown("**Daily Intake Limits (CY/day, blank = unlimited)**")
+    limits = pd.DataFrame(
+        [{'id': lf['id'], 'Facility': f"{lf['company']} - {lf['site_name']}",
+          'Daily Limit (CY)': lf.get(CAPACITY_FIELD)} for lf in db['landfills']] +
+        [{'id': cf['id'], 'Facility': cf['facility_name'],
+          'Daily Limit (CY)': cf.get(CAPACITY_FIELD)} for cf in db['clean_futures_facilities']]
+    )
+    limits = st.data_editor(limits, hide_index=True, disabled=['id', 'Facility'], use_container_width=True,
+                            column_config={'Daily Limit (CY)': st.column_config.NumberColumn(min_value=0)})
+    capacities = {
+        row['id']: (None if pd.isna(row['Daily Limit (CY)']) else float(row['Daily Limit (CY)']))
+        for _, row in limits.iterrows()
+    }
+    
+    try:
+        with st.spinner("Optimizing assignments..."):
+            result = optimize_portfolio(sites, db, fleet_size=fleet_size if limit_fleet else None,
+                                        horizon_days=horizon_days, co2_cost_per_ton=co2_cost,
+                                        capacities=capacities)
+            independent = evaluate_batch(sites, db)
+    except ValueError as exc:
+        st.error(f"⚠️ {exc}")
+        return
+    
+    st.markdown("### 💰 Portfolio Totals")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Cost", f"${result.total('total_cost'):,.0f}")
+    with col2:
+        st.metric("CO₂ Emissions", f"{result.total('co2_tons'):,.1f} tons")
+    with col3:
+        hours = result.total('truck_hours')
+        if result.fleet_hours:
+            st.metric("Truck-Hours Used", f"{hours:,.0f} / {result.fleet_hours:,.0f}")
+        else:
+            st.metric("Truck-Hours Used", f"{hours:,.0f}")
+    
+    st.markdown("### 🗺️ Site Assignments")
+    assignments = result.assignments()
+    st.dataframe(pd.DataFrame({
+        'Site': assignments['site_id'],
+        'Volume (CY)': assignments['volume_cy'].map('{:,.0f}'.format),
+        'Solution': assignments['option'].map(OPTION_NAMES),
+        'Destination': assignments['destination_name'],
+        'Split': assignments['split'].map({True: 'Yes', False: ''}),
+        'Cost': assignments['total_cost'].map('${:,.0f}'.format),
+        'CO₂ (tons)': assignments['co2_tons'].map('{:.2f}'.format),
+    }), hide_index=True, use_container_width=True)
+    
+    with st.expander("Split sites - volume by destination"):
+        allocations = result.allocations()
+        split_sites = assignments.loc[assignments['split'], 'site_id']
+        st.dataframe(allocations[allocations['site_id'].isin(split_sites)], hide_index=True,
+                     use_container_width=True)
+    
+    st.markdown("### 🏭 Facility Loads")
+    st.caption("Optimized intake compared with every site independently taking its own recommendation.")
+    loads = result.facility_loads()
+    uncoordinated = pd.concat([
+        independent.loc[independent['recommended'] == 'dig_haul', ['dig_haul_landfill_id']]
+            .set_axis(['destination_id'], axis=1).assign(volume_cy=sites['volume_cy']),
+        independent.loc[independent['recommended'] == 'surface', ['surface_facility_id']]
+            .set_axis(['destination_id'], axis=1).assign(volume_cy=sites['volume_cy']),
+    ]).groupby('destination_id')['volume_cy'].sum()
+    chart = pd.DataFrame({
+        'Optimized': loads['assigned_cy'].to_numpy(),
+        'Independent': loads['destination_id'].map(uncoordinated).fillna(0).to_numpy(),
+        'Capacity': loads['capacity_cy'].to_numpy(dtype=float),
+    }, index=loads['destination_name'])
+    st.bar_chart(chart[['Optimized', 'Independent']])
+    st.dataframe(chart.reset_index().rename(columns={'destination_name': 'Facility'}),
+                 hide_index=True, use_container_width=True)
+    
+    csv = result.allocations().to_csv(index=False)
+    st.download_button(
+        label="📥 Download Assignments (CSV)",
+        data=csv,
+        file_name=f"clean_futures_portfolio_{datetime.now().strftime('%Y%m%d')}.csv",
+        mime="text/csv",
+        use_container_width=True
+    )
+    
+    # Every site evaluated on its own, as the batch command reports them
+    sites_key = int(pd.util.hash_pandas_object(sites).sum())
+    if st.session_state.get('portfolio_report_sites') != sites_key:
+        buffer = io.BytesIO()
+        writer = ExcelReportWriter(buffer, db)
+        writer.write(pd.concat([sites, independent], axis=1))
+        writer.close()
+        st.session_state.portfolio_report_xlsx = buffer.getvalue()
+        st.session_state.portfolio_report_sites = sites_key
+    st.download_button(
+        label="📊 Download Site Report (Excel)",
+        data=st.session_state.portfolio_report_xlsx,
+        file_name=f"clean_futures_sites_{datetime.now().strftime('%Y%m%d')}.xlsx",
+        mime=XLSX_MIME,
+        use_container_width=True
+    )
+
+def show_facility_siting():
+    """Propose locations for new Clean Futures surface facilities"""
+    import json
+    
+    import altair as alt
+    from cleanfutures.siting import (
+        DEFAULT_CANDIDATE_SPACING_DEG,
+        DEFAULT_CO2_COST_PER_TON,
+        propose_facilities,
+    )
+    from cleanfutures.calculators import DEFAULT_PROCESSING_COST_CY
+    
+    st.title("📍 Facility Siting")
+    st.write("Upload historical spills to see where new surface facilities would save the most "
+             "in trucking, processing and carbon cost.")
+    
+    if st.button("← Back to Home", key="back_siting"):
+        st.session_state.mode = None
+        st.rerun()
+    
+    try:
+        db = load_facilities_database()
+    except FileNotFoundError as e:
+        st.error(f"⚠️ {e}")
+        return
+    
+    st.markdown("### 🛢️ Historical Spills")
+    st.caption("CSV with site_lat, site_lon and volume_cy (or surface_area_sqft and depth_ft); "
+               "an optional site_id column labels the spills.")
+    uploaded = st.file_uploader("Spills CSV", type=['csv'], key="siting_upload")
+    if uploaded is None:
+        return
+    spills = pd.read_csv(uploaded)
+    
+    st.markdown("### ⚙️ Siting Settings")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        k = st.slider("New Facilities", min_value=1, max_value=10, value=3)
+    with col2:
+        spacing = st.select_slider("Candidate Spacing (°)", options=[0.02, 0.05, 0.1, 0.25],
+                                   value=DEFAULT_CANDIDATE_SPACING_DEG)
+    with col3:
+        co2_cost = st.number_input("Carbon Cost ($ per ton CO₂)", min_value=0, max_value=1000,
+                                   value=DEFAULT_CO2_COST_PER_TON, key="siting_co2")
+    with col4:
+        processing_cost = st.number_input("Processing Cost ($/CY)", min_value=0.0,
+                                          value=float(DEFAULT_PROCESSING_COST_CY), step=1.0)
+    include_existing = st.checkbox("Keep existing Clean Futures facilities open", value=True)
+    
+    try:
+        with st.spinner(f"Searching candidate sites for {len(spills):,} spills..."):
+            result = propose_facilities(spills, db, k, spacing=spacing, co2_cost_per_ton=co2_cost,
+                                        processing_cost_cy=processing_cost,
+                                        include_existing=include_existing)
+    except (ValueError, KeyError) as exc:
+        st.error(f"⚠️ {exc}")
+        return
+    proposed = result.sites()
+    
+    st.markdown("### 💰 Network Cost")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if result.baseline_cost is not None:
+            st.metric("Existing Network", f"${result.baseline_cost:,.0f}")
+        else:
+            st.metric("Existing Network", "—")
+    with col2:
+        st.metric(f"With {k} New Site{'s' if k > 1 else ''}", f"${result.total_cost:,.0f}")
+    with col3:
+        if result.baseline_cost is not None:
+            savings = result.baseline_cost - result.total_cost
+            st.metric("Savings", f"${savings:,.0f}", f"{savings / result.baseline_cost:.1%}")
+    
+    st.markdown("### 🗺️ Proposed Sites")
+    assignments = result.assignments()
+    points = pd.concat([
+        pd.DataFrame({'lat': spills['site_lat'], 'lon': spills['site_lon'],
+                      'Name': assignments['site_id'].astype(str), 'Type': 'Spill'}),
+        pd.DataFrame([{'lat': cf['latitude'], 'lon': cf['longitude'], 'Name': cf['facility_name'],
+                       'Type': 'Existing Facility'} for cf in db['clean_futures_facilities']]
+                     if include_existing else None),
+        pd.DataFrame({'lat': proposed['latitude'], 'lon': proposed['longitude'],
+                      'Name': proposed['id'], 'Type': 'Proposed Facility'}),
+    ], ignore_index=True)
+    chart = alt.Chart(points).mark_point(filled=True).encode(
+        x=alt.X('lon:Q', title='Longitude', scale=alt.Scale(zero=False)),
+        y=alt.Y('lat:Q', title='Latitude', scale=alt.Scale(zero=False)),
+        color=alt.Color('Type:N', scale=alt.Scale(
+            domain=['Spill', 'Existing Facility', 'Proposed Facility'],
+            range=['#b0bec5', '#2d7a4f', '#ff9800'])),
+        shape=alt.Shape('Type:N'),
+        size=alt.condition(alt.datum.Type == 'Spill', alt.value(20), alt.value(160)),
+        tooltip=['Name', 'Type']
+    )
+    st.altair_chart(chart.properties(height=500), use_container_width=True)
+    
+    st.markdown("### 📈 Marginal Benefit of Each Site")
+    st.caption("Sites are listed in the order they pay off; each row is the saving from adding that "
+               "site on top of the ones above it.")
+    if result.baseline_cost is not None:
+        st.bar_chart(proposed.set_index('id')['marginal_savings'])
+    st.dataframe(pd.DataFrame({
+        'Site': proposed['id'],
+        'Latitude': proposed['latitude'].map('{:.4f}'.format),
+        'Longitude': proposed['longitude'].map('{:.4f}'.format),
+        'Marginal Savings': proposed['marginal_savings'].map(
+            lambda value: '—' if pd.isna(value) else f"${value:,.0f}"),
+        'Network Cost': proposed['total_cost'].map('${:,.0f}'.format),
+        'Spills Served': proposed['spills_served'],
+    }), hide_index=True, use_container_width=True)
+    
+    st.download_button(
+        label="📥 Download Proposed Facilities (JSON)",
+        data=json.dumps(result.proposed_facilities(), indent=2),
+        file_name=f"clean_futures_proposed_facilities_{datetime.now().strftime('%Y%m%d')}.json",
+        mime="application/json",
+        use_container_width=True
+    )
+
+# ============================================================================
+# ANALYSIS HISTORY
+# ============================================================================
+
+def show_analysis_history():
+    """Search saved analyses a page at a time and reopen any of them"""
+    from cleanfutures.history import DEFAULT_PAGE_SIZE
+    
+    st.title("🗂️ Analysis History")
+    st.write("Every analysis is saved with its inputs, results and a timestamp.")
+    
+    if st.button("← Back to Home", key="back_history"):
+        st.session_state.mode = None
+        st.rerun()
+    
+    history = get_analysis_history()
+    if history is None:
+        st.error("⚠️ The analysis history file could not be opened. Start the app with "
+                 "`-- --history-db PATH` pointing at a writable location.")
+        return
+    
+    # ========================================================================
+    # FILTERS
+    # ========================================================================
+    
+    st.markdown("### 🔎 Search")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        county = st.selectbox("County", ['All'] + history.counties())
+        recommended = st.selectbox("Recommended Option", ['All'] + list(OPTION_NAMES),
+                                   format_func=lambda key: OPTION_NAMES.get(key, key))
+    with col2:
+        date_from = st.date_input("From", value=None)
+        date_to = st.date_input("To", value=None)
+    with col3:
+        min_cost = st.number_input("Min Cost ($)", value=None, min_value=0.0, step=10000.0)
+        max_cost = st.number_input("Max Cost ($)", value=None, min_value=0.0, step=10000.0)
+    
+    filters = {
+        'county': None if county == 'All' else county,
+        'recommended': None if recommended == 'All' else recommended,
+        'date_from': date_from,
+        'date_to': date_to,
+        'min_cost': min_cost,
+        'max_cost': max_cost,
+    }
+    
+    # Cursors of the pages visited so far; new filters start from the top
+    if st.session_state.get('history_filters') != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+    
+    # ========================================================================
+    # RESULTS PAGE
+    # ========================================================================
+    
+    page = history.search(after=cursors[-1], limit=DEFAULT_PAGE_SIZE, **filters)
+    total = history.count(**filters)
+    first = (len(cursors) - 1) * DEFAULT_PAGE_SIZE
+    st.markdown(f"### 📄 {total:,} Matching Analyses")
+    
+    if not page['rows']:
+        st.info("No saved analyses match these filters.")
+        return
+    
+    st.dataframe(pd.DataFrame([{
+        'ID': row['id'],
+        'Saved (UTC)': row['created_at'][:19].replace('T', ' '),
+        'State': row['state'],
+        'County': row['county'],
+        'Recommended': OPTION_NAMES.get(row['recommended'], row['recommended']),
+        'Total Cost': f"${row['total_cost']:,.0f}" if row['total_cost'] is not None else "N/A",
+        'Volume': f"{row['volume_cy']:,.0f} CY",
+        'Coordinates': f"{row['site_lat']:.4f}, {row['site_lon']:.4f}",
+    } for row in page['rows']]), hide_index=True, use_container_width=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("← Newer", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Showing {first + 1:,}-{first + len(page['rows']):,} of {total:,}")
+    with col3:
+        if st.button("Older →", disabled=page['next'] is None, use_container_width=True):
+            cursors.append(page['next'])
+            st.rerun()
+    
+    # ========================================================================
+    # REOPEN
+    # ========================================================================
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        entry_id = st.selectbox("Analysis", [row['id'] for row in page['rows']],
+                                format_func=lambda i: f"#{i}")
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("📂 Open Results", type="primary", use_container_width=True):
+            entry = history.get(entry_id)
+            st.session_state.analysis = entry['analysis']
+            # Reopening is not a new analysis
+            st.session_state.recorded_analysis = entry['analysis']
+            st.session_state.show_results = True
+            st.session_state.mode = None
+            st.rerun()
+    st.caption("Results are recomputed with today's facilities database; saved results are kept as "
+               "they were for the audit trail.")
+    
+    # ========================================================================
+    # TRENDS
+    # ========================================================================
+    
+    if st.toggle("📈 Show trends for these filters"):
+        period = st.radio("Period", ['month', 'day', 'year'], horizontal=True, format_func=str.title)
+        trends = pd.DataFrame(history.trends(period=period, **filters))
+        if trends.empty:
+            st.info("No data for these filters.")
+            return
+        trends['recommended'] = trends['recommended'].map(lambda key: OPTION_NAMES.get(key, key))
+        st.markdown("**Analyses by recommended option**")
+        st.bar_chart(trends.pivot(index='period', columns='recommended', values='analyses').fillna(0))
+        st.markdown("**Average recommended cost**")
+        counts = trends.groupby('period')['analyses'].sum()
+        weighted = (trends['avg_cost'] * trends['analyses']).groupby(trends['period']).sum() / counts
+        st.line_chart(weighted.rename('Average cost ($)'))
+
+# ============================================================================
+# BASIN MAP
+# ============================================================================
+
+@st.cache_resource
+def get_raster(raster_dir):
+    """Open the precomputed recommendation raster once per process"""
+    return load_raster(raster_dir)
+
+def show_basin_map():
+    """Display where each option is recommended across the basin"""
+    import altair as alt
+    
+    st.title("🗺️ Basin Recommendation Map")
+    st.write("Where each solution comes out on top for a standard spill profile.")
+    
+    if st.button("← Back", key="back_map"):
+        st.session_state.show_map = False
+        st.rerun()
+    
+    raster = get_raster(app_args.raster_dir)
+    if raster is None:
+        st.info("Map data has not been built yet. Use ⚡ Instant Estimate in the sidebar to build it.")
+        return
+    db = load_facilities_database()
+    if not raster.is_current(db):
+        st.warning("⚠️ Map data was built from an older facilities database. Rebuild it from the sidebar.")
+    
+    profiles = raster.metadata['profiles']
+    profile = st.selectbox("Spill Profile", list(profiles), index=list(profiles).index('typical') if 'typical' in profiles else 0,
+                           format_func=lambda name: profiles[name].get('label', name))
+    layer = st.radio("Color By", ['recommended', 'cheapest'], horizontal=True,
+                     format_func=lambda name: {'recommended': 'Recommended option', 'cheapest': 'Lowest cost'}[name])
+    
+    # About 100 x 100 cells keeps the chart responsive at any raster resolution
+    step = max(1, round(0.05 / raster.resolution))
+    cells = raster.win_map(profile, layer, step=step)
+    cells['Solution'] = cells['option'].map(OPTION_NAMES)
+    half = raster.resolution * step / 2
+    cells['lat2'] = cells['lat'] + half
+    cells['lon2'] = cells['lon'] + half
+    cells['lat'] -= half
+    cells['lon'] -= half
+    
+    facilities = pd.DataFrame(
+        [{'lat': lf['latitude'], 'lon': lf['longitude'], 'Facility': f"{lf['company']} - {lf['site_name']}",
+          'Type': 'Landfill'} for lf in db['landfills']] +
+        [{'lat': cf['latitude'], 'lon': cf['longitude'], 'Facility': cf['facility_name'],
+          'Type': 'Clean Futures Facility'} for cf in db['clean_futures_facilities']]
+    )
+    
+    lat_min, lat_max, lon_min, lon_max = raster.metadata['bounds']
+    x_scale = alt.Scale(domain=[lon_min, lon_max])
+    y_scale = alt.Scale(domain=[lat_min, lat_max])
+    grid = alt.Chart(cells).mark_rect(opacity=0.75).encode(
+        x=alt.X('lon:Q', title='Longitude', scale=x_scale), x2='lon2:Q',
+        y=alt.Y('lat:Q', title='Latitude', scale=y_scale), y2='lat2:Q',
+        color=alt.Color('Solution:N', scale=alt.Scale(
+            domain=list(OPTION_NAMES.values()), range=['#ff9800', '#2d7a4f', '#81c995'])),
+        tooltip=['Solution']
+    )
+    points = alt.Chart(facilities).mark_point(filled=True, size=90, color='#1a1a1a').encode(
+        x=alt.X('lon:Q', scale=x_scale), y=alt.Y('lat:Q', scale=y_scale),
+        shape=alt.Shape('Type:N'), tooltip=['Facility', 'Type']
+    )
+    st.altair_chart((grid + points).properties(height=600), use_container_width=True)
+    
+    shares = cells['Solution'].value_counts(normalize=True)
+    st.caption(" · ".join(f"{label}: {shares.get(label, 0):.0%} of the basin" for label in OPTION_NAMES.values()))
+
+# ============================================================================
+# SIDEBAR
+# ============================================================================
+
+def show_database_status():
+    """Show facilities database load stats in the sidebar"""
+    store = get_facility_store()
+    try:
+        stats = load_facilities_database().stats()
+    except FileNotFoundError:
+        st.sidebar.warning(f"Facilities database not found: {store.path}")
+        return
+    
+    with st.sidebar.expander("🗄️ Facilities Database"):
+        st.write(f"**Landfills:** {stats['landfills']}")
+        st.write(f"**CF Facilities:** {stats['clean_futures_facilities']}")
+        st.caption(f"{stats['path']}")
+        st.caption(f"Version {stats['version']} · loaded in {stats['load_seconds'] * 1000:.1f} ms "
+                   f"at {datetime.fromtimestamp(stats['loaded_at']).strftime('%H:%M:%S')}")
+
+def show_instant_estimate():
+    """Answer a location from the precomputed raster in the sidebar"""
+    with st.sidebar.expander("⚡ Instant Estimate"):
+        raster = get_raster(app_args.raster_dir)
+        if raster is None:
+            st.caption("Precompute answers for the whole basin to get instant estimates and the map.")
+            if st.button("Build Map Data", key="build_raster"):
+                with st.spinner("Evaluating the basin grid..."):
+                    build_raster(load_facilities_database(), app_args.raster_dir)
+                get_raster.clear()
+                st.rerun()
+            return
+    
+        profiles = raster.metadata['profiles']
+        lat = st.number_input("Latitude", value=31.9, min_value=30.0, max_value=35.0, format="%.4f", key="instant_lat")
+        lon = st.number_input("Longitude", value=-102.0, min_value=-105.0, max_value=-100.0, format="%.4f", key="instant_lon")
+        profile = st.selectbox("Spill Profile", list(profiles), key="instant_profile",
+                               format_func=lambda name: profiles[name].get('label', name))
+    
+        answer = raster.query(lat, lon, profile)
+        if answer is None or answer['recommended'] is None:
+            st.write("No estimate for this location.")
+        else:
+            st.markdown(f"**{OPTION_NAMES[answer['recommended']]}**")
+            for key, label in OPTION_NAMES.items():
+                cost = answer[f'{key}_cost_per_cy']
+                st.write(f"• {label}: " + (f"${cost:,.2f}/CY" if cost is not None else "not available"))
+            if answer['landfill_miles'] is not None:
+                st.caption(f"Nearest qualified landfill {answer['landfill_miles']:.1f} mi · "
+                           f"nearest CF facility {answer['facility_miles']:.1f} mi")
+    
+        if not raster.is_current(load_facilities_database()):
+            st.warning("Built from an older facilities database.")
+            if st.button("Rebuild Map Data", key="rebuild_raster"):
+                with st.spinner("Evaluating the basin grid..."):
+                    build_raster(load_facilities_database(), app_args.raster_dir)
+                get_raster.clear()
+                st.rerun()
+        if st.button("🗺️ Open Basin Map", key="open_map", use_container_width=True):
+            st.session_state.show_map = True
+            st.rerun()
+
+def show_performance_panel(page_trace):
+    """Show stage timings in the sidebar when instrumentation is on"""
+    if not instrumentation.is_enabled():
+        return
+    
+    with st.sidebar.expander("⏱️ Performance"):
+        if page_trace is not None:
+            st.markdown(f"**Results page: {page_trace.seconds * 1000:,.1f} ms**")
+            st.dataframe(pd.DataFrame([{
+                'Stage': '\u2003' * row['depth'] + row['stage'],
+                'Calls': row['calls'],
+                'ms': round(row['seconds'] * 1000, 2),
+            } for row in page_trace.rows()]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Open a results page to see its stage timings.")
+    
+        totals = instrumentation.stage_totals()
+        if totals:
+            st.markdown("**Since start (all sessions)**")
+            st.dataframe(pd.DataFrame([{
+                'Stage': name,
+                'Calls': total['calls'],
+                'Mean ms': round(total['seconds'] / total['calls'] * 1000, 3),
+                'Max ms': round(total['max_seconds'] * 1000, 3),
+            } for name, total in totals.items()]), hide_index=True, use_container_width=True)
+        st.download_button("Prometheus Metrics", instrumentation.prometheus_text(),
+                           file_name="cleanfutures_metrics.txt", mime="text/plain", key="download_metrics")
 
 # ============================================================================
 # MAIN APP
@@ -1366,15 +2069,33 @@ def main():
     if 'show_results' not in st.session_state:
         st.session_state.show_results = False
     
+    show_database_status()
+    show_instant_estimate()
+    
     # Show appropriate page
-    if st.session_state.show_results:
-        show_results()
+    page_trace = None
+    if st.session_state.get('show_map'):
+        show_basin_map()
+    elif st.session_state.get('show_sweep'):
+        show_sensitivity_analysis()
+    elif st.session_state.get('show_monte_carlo'):
+        show_monte_carlo()
+    elif st.session_state.show_results:
+        with instrumentation.trace('show_results') as page_trace:
+            show_results()
     elif st.session_state.mode == 'simple':
         show_simple_questionnaire()
     elif st.session_state.mode == 'advanced':
         show_advanced_questionnaire()
+    elif st.session_state.mode == 'portfolio':
+        show_portfolio_planner()
+    elif st.session_state.mode == 'siting':
+        show_facility_siting()
+    elif st.session_state.mode == 'history':
+        show_analysis_history()
     else:
         show_welcome_page()
+    show_performance_panel(page_trace)
     
     # Footer
     st.markdown("---")
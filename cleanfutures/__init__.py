@@ -0,0 +1,81 @@
+"""
+Clean Futures recommendation engine.
+
+Headless calculation core for the Permian Basin soil remediation tool.
+Importing this package does not pull in Streamlit, so the calculators can be
+used from batch jobs, workers and services.
+"""
+
+from .geo import (
+    haversine_distance,
+    determine_state_county,
+    get_soil_type,
+    get_regulatory_thresholds,
+)
+from .facilities import (
+    FacilitiesDatabase,
+    FacilityStore,
+    get_facility_store,
+    configure_facilities_database,
+    load_facilities_database,
+    find_nearest_qualified_landfill,
+    find_nearest_cf_facility,
+    find_k_nearest_qualified_landfills,
+    find_k_nearest_cf_facilities,
+    facility_table,
+)
+from .columnar import FacilityTable
+from .spatial import FacilityIndex
+from .counties import CountyIndex, get_county_index, configure_counties
+from .pricing import Pricing, get_pricing
+from .calculators import (
+    calculate_volume_cy,
+    calculate_co2_emissions,
+    calculate_dig_and_haul,
+    calculate_onsite_remediation,
+    calculate_surface_facility,
+)
+from .recommendation import generate_recommendation
+from .evaluate import evaluate_site
+from .alternatives import find_alternatives
+from .cache import evaluate_site_cached, get_result_cache
+from .pipeline import EvaluationPipeline
+from .history import AnalysisHistory, get_analysis_history, configure_history
+
+__all__ = [
+    'haversine_distance',
+    'determine_state_county',
+    'get_soil_type',
+    'get_regulatory_thresholds',
+    'FacilitiesDatabase',
+    'FacilityStore',
+    'get_facility_store',
+    'configure_facilities_database',
+    'load_facilities_database',
+    'find_nearest_qualified_landfill',
+    'find_nearest_cf_facility',
+    'find_k_nearest_qualified_landfills',
+    'find_k_nearest_cf_facilities',
+    'facility_table',
+    'FacilityTable',
+    'FacilityIndex',
+    'CountyIndex',
+    'get_county_index',
+    'configure_counties',
+    'Pricing',
+    'get_pricing',
+    'calculate_volume_cy',
+    'calculate_co2_emissions',
+    'calculate_dig_and_haul',
+    'calculate_onsite_remediation',
+    'calculate_surface_facility',
+    'generate_recommendation',
+    'evaluate_site',
+    'find_alternatives',
+    'evaluate_site_cached',
+    'get_result_cache',
+    'EvaluationPipeline',
+    'AnalysisHistory',
+    'get_analysis_history',
+    'configure_history',
+]
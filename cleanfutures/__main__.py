@@ -0,0 +1,7 @@
+"""Allow running the engine as python -m cleanfutures"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Top-k alternative destinations for one site.
+
+calculate_dig_and_haul() and calculate_surface_facility() cost only the
+nearest destination, which is not always the cheapest once per-facility
+disposal, backfill and processing prices differ. Here every qualified
+landfill and every Clean Futures facility is costed in one vectorized pass
+with the batch kernels (vectorized.py) - one distance per facility instead
+of one per site - and the k best by cost, duration and CO2 are returned.
+
+Haul distances are straight-line at the average truck speed, and the dig &
+haul duration is the estimate (not the simulated schedule), so the nearest
+row matches the calculators when no road graph is configured.
+"""
+
+import numpy as np
+
+from .calculators import (
+    BASE_DIESEL_PRICE_PER_GALLON,
+    DEFAULT_TRUCK_CAPACITY_CY,
+    DEFAULT_NUM_TRUCKS,
+    DEFAULT_TRUCK_HOURLY_RATE,
+    DEFAULT_EXCAVATOR_RATE,
+    DEFAULT_LOADER_RATE,
+    DEFAULT_WORK_HOURS_PER_DAY,
+    DEFAULT_PROCESSING_COST_CY,
+)
+from .facilities import facility_table, landfill_minimums
+from .instrumentation import timed
+from .pricing import get_pricing, to_ordinal
+from .vectorized import haversine_matrix, dig_and_haul_arrays, surface_facility_arrays
+
+DEFAULT_ALTERNATIVES = 5
+
+# Ranking name -> (sort field, tie-break field)
+RANKINGS = {
+    'cheapest': ('total_cost', 'distance_miles'),
+    'fastest': ('project_days', 'total_cost'),
+    'lowest_co2': ('co2_tons', 'total_cost'),
+}
+
+# Result fields reported per alternative, per option
+LANDFILL_FIELDS = ('distance_miles', 'total_cost', 'cost_per_cy', 'project_days', 'co2_tons',
+                   'equipment_cost', 'trucking_cost', 'disposal_cost', 'backfill_cost', 'fuel_adjustment')
+FACILITY_FIELDS = ('distance_miles', 'total_cost', 'cost_per_cy', 'project_days', 'co2_tons',
+                   'trucking_cost', 'processing_cost', 'fuel_adjustment')
+
+# ============================================================================
+# COSTING EVERY DESTINATION
+# ============================================================================
+
+def _dated_inputs(db, project_date):
+    """(pricing, day number, equipment rates, diesel price delta) for a project date"""
+    ordinal = to_ordinal(project_date)
+    if ordinal is None:
+        return None, None, {}, 0.0
+    pricing = get_pricing(db)
+    diesel_price = pricing.diesel_price(project_date)
+    fuel_delta = diesel_price - BASE_DIESEL_PRICE_PER_GALLON if diesel_price is not None else 0.0
+    return pricing, ordinal, pricing.equipment_rates(project_date), fuel_delta
+
+def _per_destination(arrays, distance):
+    """Kernel outputs broadcast to one value per destination, plus distance_miles"""
+    out = {key: np.broadcast_to(np.asarray(value, dtype=float), distance.shape) for key, value in arrays.items()}
+    out['distance_miles'] = distance
+    return out
+
+def _prices(table, pricing, name, field, ordinal):
+    """One price column for every facility, as of the project date if given"""
+    if pricing is None:
+        return table.column(field).astype(float)
+    return pricing.facilities[name].take(field, np.arange(len(table)), ordinal)
+
+def cost_all_landfills(volume_cy, site_lat, site_lon, needs_backfill, tph_level, chloride_level,
+                       db, advanced_params=None, project_date=None):
+    """Dig & haul results for every landfill that accepts the soil
+    
+    Returns (positions, arrays): positions index the landfill table, arrays
+    holds the dig_and_haul_arrays() outputs plus distance_miles, aligned
+    with positions. Parameters match calculate_dig_and_haul().
+    """
+    landfills = facility_table(db, 'landfills')
+    mask = landfills.mask(landfill_minimums(tph_level, chloride_level, needs_backfill))
+    positions = np.arange(len(landfills)) if mask is None else np.flatnonzero(mask)
+    pricing, ordinal, rates, fuel_delta = _dated_inputs(db, project_date)
+    
+    distance = haversine_matrix(site_lat, site_lon, landfills.column('latitude')[positions],
+                                landfills.column('longitude')[positions])
+    lf_disposal = _prices(landfills, pricing, 'landfills', 'disposal_cost_cy', ordinal)[positions]
+    lf_backfill = _prices(landfills, pricing, 'landfills', 'backfill_cost_cy', ordinal)[positions]
+    
+    if advanced_params:
+        truck_capacity = advanced_params.get('truck_capacity_cy', DEFAULT_TRUCK_CAPACITY_CY)
+        num_trucks = advanced_params.get('num_trucks', DEFAULT_NUM_TRUCKS)
+        truck_hourly_rate = advanced_params.get('truck_hourly_rate',
+                                                rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE))
+        excavator_rate = advanced_params.get('excavator_rate', rates.get('excavator_rate', DEFAULT_EXCAVATOR_RATE))
+        loader_rate = advanced_params.get('loader_rate', rates.get('loader_rate', DEFAULT_LOADER_RATE))
+        work_hours_per_day = advanced_params.get('work_hours_per_day', DEFAULT_WORK_HOURS_PER_DAY)
+        disposal_cost = advanced_params.get('disposal_cost_cy', lf_disposal)
+        backfill_cost = advanced_params.get('backfill_cost_cy', lf_backfill)
+    else:
+        truck_capacity = DEFAULT_TRUCK_CAPACITY_CY
+        num_trucks = DEFAULT_NUM_TRUCKS
+        truck_hourly_rate = rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE)
+        excavator_rate = rates.get('excavator_rate', DEFAULT_EXCAVATOR_RATE)
+        loader_rate = rates.get('loader_rate', DEFAULT_LOADER_RATE)
+        work_hours_per_day = DEFAULT_WORK_HOURS_PER_DAY
+        disposal_cost = lf_disposal
+        backfill_cost = lf_backfill if needs_backfill else 0
+    
+    arrays = dig_and_haul_arrays(volume_cy, distance, needs_backfill, truck_capacity, num_trucks,
+                                 truck_hourly_rate, excavator_rate, loader_rate, work_hours_per_day,
+                                 disposal_cost, backfill_cost, fuel_price_delta=fuel_delta)
+    return positions, _per_destination(arrays, distance)
+
+def cost_all_cf_facilities(volume_cy, site_lat, site_lon, db, advanced_params=None, project_date=None):
+    """Surface facility results for every Clean Futures facility
+    
+    Returns (positions, arrays) like cost_all_landfills(); parameters match
+    calculate_surface_facility().
+    """
+    facilities = facility_table(db, 'clean_futures_facilities')
+    positions = np.arange(len(facilities))
+    pricing, ordinal, rates, fuel_delta = _dated_inputs(db, project_date)
+    
+    distance = haversine_matrix(site_lat, site_lon, facilities.column('latitude'),
+                                facilities.column('longitude'))
+    if advanced_params:
+        truck_capacity = advanced_params.get('truck_capacity_cy', DEFAULT_TRUCK_CAPACITY_CY)
+        truck_hourly_rate = advanced_params.get('truck_hourly_rate',
+                                                rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE))
+        processing_cost_cy = advanced_params.get('surface_processing_cost_cy', DEFAULT_PROCESSING_COST_CY)
+    else:
+        truck_capacity = DEFAULT_TRUCK_CAPACITY_CY
+        truck_hourly_rate = rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE)
+        processing_cost_cy = _prices(facilities, pricing, 'clean_futures_facilities',
+                                     'processing_cost_cy', ordinal)
+    
+    arrays = surface_facility_arrays(volume_cy, distance, truck_capacity, truck_hourly_rate,
+                                     processing_cost_cy, facilities.column('typical_turnaround_days'),
+                                     fuel_price_delta=fuel_delta)
+    return positions, _per_destination(arrays, distance)
+
+# ============================================================================
+# RANKING
+# ============================================================================
+
+def top_k(arrays, field, tie_break, k):
+    """Row numbers of the k smallest values of arrays[field], ties broken by arrays[tie_break]
+    
+    Rows with no value (a missing price) are never returned. Only the rows
+    that can make the top k are sorted, even when many share a value.
+    """
+    values = np.asarray(arrays[field], dtype=float)
+    secondary = np.asarray(arrays[tie_break], dtype=float)
+    rows = np.flatnonzero(np.isfinite(values))
+    if k <= 0 or not len(rows):
+        return np.array([], dtype=np.int64)
+    if k < len(rows):
+        kth = np.partition(values[rows], k - 1)[k - 1]
+        below = rows[values[rows] < kth]
+        tied = rows[values[rows] == kth]
+        need = k - len(below)
+        if need < len(tied):
+            kth_secondary = np.partition(secondary[tied], need - 1)[need - 1]
+            tied = tied[secondary[tied] <= kth_secondary]
+        rows = np.concatenate([below, tied])
+    order = np.lexsort((rows, secondary[rows], values[rows]))
+    return rows[order][:k]
+
+def _describe(records, positions, arrays, rows, fields, name):
+    out = []
+    for row in rows:
+        record = records[positions[row]]
+        entry = {'id': record.get('id'), 'name': name(record)}
+        for field in fields:
+            entry[field] = float(arrays[field][row])
+        out.append(entry)
+    return out
+
+def rank_alternatives(records, positions, arrays, fields, name, k=DEFAULT_ALTERNATIVES):
+    """{'qualified': count, ranking: [k alternative dicts]} for every ranking in RANKINGS"""
+    ranked = {'qualified': len(positions)}
+    for ranking, (field, tie_break) in RANKINGS.items():
+        ranked[ranking] = _describe(records, positions, arrays, top_k(arrays, field, tie_break, k), fields, name)
+    return ranked
+
+@timed('find_alternatives')
+def find_alternatives(analysis, db, k=DEFAULT_ALTERNATIVES):
+    """Top-k cheapest, fastest and lowest-CO2 landfills and CF facilities for an analysis dict
+    
+    Returns {'dig_haul': ranked, 'surface': ranked}; each ranked dict has the
+    number of qualified destinations and 'cheapest' / 'fastest' /
+    'lowest_co2' lists of {'id', 'name', 'distance_miles', 'total_cost', ...}.
+    """
+    advanced_params = analysis.get('advanced_params')
+    project_date = analysis.get('project_date')
+    
+    positions, arrays = cost_all_landfills(
+        analysis['volume_cy'], analysis['site_lat'], analysis['site_lon'], analysis['needs_backfill'],
+        analysis['tph_level'], analysis['chloride_level'], db, advanced_params, project_date
+    )
+    dig_haul = rank_alternatives(facility_table(db, 'landfills').records, positions, arrays, LANDFILL_FIELDS,
+                                 lambda lf: f"{lf['company']} - {lf['site_name']}", k)
+    
+    positions, arrays = cost_all_cf_facilities(
+        analysis['volume_cy'], analysis['site_lat'], analysis['site_lon'], db, advanced_params, project_date
+    )
+    surface = rank_alternatives(facility_table(db, 'clean_futures_facilities').records, positions, arrays,
+                                FACILITY_FIELDS, lambda cf: cf['facility_name'], k)
+    
+    return {'dig_haul': dig_haul, 'surface': surface}
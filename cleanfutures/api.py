@@ -0,0 +1,504 @@
+"""
+HTTP/JSON service for the recommendation engine.
+
+`app` is a plain ASGI application with no web framework dependency; serve it
+with any ASGI server, e.g. `python -m cleanfutures serve` (uses uvicorn) or
+`uvicorn cleanfutures.api:app --workers 4`.
+
+    POST /evaluate        one analysis -> location, option dicts and scores
+                          (plus top-k alternative destinations with "alternatives": k)
+    POST /evaluate/batch  {"sites": [analysis, ...]} -> {"results": [...]}
+    GET  /health          database version and cache statistics
+    GET  /metrics         stage timings and cache counters (Prometheus text)
+
+With CLEANFUTURES_INSTRUMENT=1 (or `serve --instrument`) each request's
+stage timings are also logged as one JSON line (see instrumentation.py).
+
+The facilities database, its spatial indexes and the result cache are
+process-wide, so each worker loads them once at startup and every request
+shares them read-only.
+"""
+
+import asyncio
+import json
+import logging
+import math
+from datetime import date
+
+from .alternatives import find_alternatives
+from .cache import evaluate_site_cached, get_result_cache
+from .calculators import calculate_volume_cy
+from .facilities import facility_table, load_facilities_database
+from .geo import get_regulatory_thresholds, get_soil_type
+from .instrumentation import format_metric, prometheus_text, trace
+from .pricing import to_ordinal
+from .routing import get_distance_provider
+from .vectorized import OPTION_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Largest number of sites in one batch request
+MAX_BATCH_SITES = 10_000
+
+# Batches at least this large run in a thread so the event loop stays responsive
+THREAD_BATCH_SITES = 50
+
+# Batches with at least this many plain sites are scored with evaluate_batch()
+VECTORIZED_BATCH_SITES = 50
+
+# Most alternatives per option a request may ask for
+MAX_ALTERNATIVES = 50
+
+# Largest volume accepted with simulate_schedule (the simulation's run time
+# grows with volume, about 2 s per million CY)
+MAX_SIMULATED_VOLUME_CY = 1_000_000
+
+PRIORITY_LEVELS = ('low', 'medium', 'high')
+
+PERMEABILITY_LEVELS = ('low', 'medium', 'high')
+
+# Numeric advanced_params: True where the value must be positive (counts,
+# capacities, hours and rates), False where zero is allowed (prices)
+ADVANCED_PARAMS = {
+    'truck_capacity_cy': True,
+    'num_trucks': True,
+    'truck_hourly_rate': True,
+    'excavator_rate': True,
+    'loader_rate': True,
+    'work_hours_per_day': True,
+    'disposal_cost_cy': False,
+    'backfill_cost_cy': False,
+    'onsite_processing_cost_cy': False,
+    'surface_processing_cost_cy': False,
+}
+
+# advanced_params that must be whole numbers (the schedule simulation counts trucks)
+INTEGER_ADVANCED_PARAMS = ('num_trucks',)
+
+class RequestError(Exception):
+    """Client error reported as a JSON response with the given HTTP status"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# ============================================================================
+# REQUEST PARSING
+# ============================================================================
+
+def _number(payload, key, default=None, minimum=None, name=None):
+    name = name or key
+    value = payload.get(key, default)
+    if value is None:
+        raise RequestError(f"'{name}' is required")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RequestError(f"'{name}' must be a number")
+    if minimum is not None and value < minimum:
+        raise RequestError(f"'{name}' must be at least {minimum}")
+    return value
+
+def _advanced_params(advanced_params):
+    """Validated copy of advanced_params (whole-number counts as ints)"""
+    if not isinstance(advanced_params, dict):
+        raise RequestError("'advanced_params' must be an object")
+    cleaned = dict(advanced_params)
+    for key, value in advanced_params.items():
+        name = f'advanced_params.{key}'
+        if key == 'simulate_schedule':
+            if not isinstance(value, bool):
+                raise RequestError(f"'{name}' must be true or false")
+        elif key not in ADVANCED_PARAMS:
+            raise RequestError(f"Unknown parameter '{name}'")
+        elif ADVANCED_PARAMS[key]:
+            value = _number(advanced_params, key, name=name)
+            if value <= 0:
+                raise RequestError(f"'{name}' must be positive")
+            if key in INTEGER_ADVANCED_PARAMS:
+                if value != int(value):
+                    raise RequestError(f"'{name}' must be a whole number")
+                cleaned[key] = int(value)
+        else:
+            _number(advanced_params, key, minimum=0, name=name)
+    return cleaned
+
+def _level(value, key, levels):
+    if value not in levels:
+        raise RequestError(f"'{key}' must be one of {', '.join(levels)}")
+    return value
+
+def parse_analysis(payload):
+    """Build the analysis dict used by the app from a JSON request body
+    
+    Accepts the keys of st.session_state.analysis. volume_cy may be replaced
+    by surface_area_sqft and depth_ft; priorities may be given as a
+    'priorities' object or as cost_priority / speed_priority / esg_priority.
+    An optional project_date (YYYY-MM-DD) selects dated prices.
+    """
+    if not isinstance(payload, dict):
+        raise RequestError("Each site must be a JSON object")
+    
+    lat = _number(payload, 'site_lat')
+    lon = _number(payload, 'site_lon')
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise RequestError("'site_lat'/'site_lon' are out of range")
+    
+    if payload.get('volume_cy') is None and 'surface_area_sqft' in payload:
+        volume_cy = calculate_volume_cy(_number(payload, 'surface_area_sqft', minimum=0),
+                                        _number(payload, 'depth_ft', minimum=0))
+    else:
+        volume_cy = _number(payload, 'volume_cy')
+    if volume_cy <= 0:
+        raise RequestError("'volume_cy' must be positive")
+    
+    priorities = payload.get('priorities') or {}
+    if not isinstance(priorities, dict):
+        raise RequestError("'priorities' must be an object")
+    priorities = {
+        name: _level(priorities.get(name, payload.get(f'{name}_priority', 'medium')),
+                     f'{name}_priority', PRIORITY_LEVELS)
+        for name in ('cost', 'speed', 'esg')
+    }
+    
+    advanced_params = payload.get('advanced_params')
+    if advanced_params is not None:
+        advanced_params = _advanced_params(advanced_params)
+        if advanced_params.get('simulate_schedule') and volume_cy > MAX_SIMULATED_VOLUME_CY:
+            raise RequestError(f"'volume_cy' may be at most {MAX_SIMULATED_VOLUME_CY:,} with simulate_schedule",
+                               status=413)
+    
+    needs_backfill = payload.get('needs_backfill', True)
+    if not isinstance(needs_backfill, bool):
+        raise RequestError("'needs_backfill' must be true or false")
+    
+    project_date = payload.get('project_date')
+    if project_date is not None:
+        try:
+            project_date = date.fromordinal(to_ordinal(project_date)).isoformat()
+        except (TypeError, ValueError):
+            raise RequestError("'project_date' must be a YYYY-MM-DD date") from None
+    
+    return {
+        'site_lat': lat,
+        'site_lon': lon,
+        'tph_level': _number(payload, 'tph_level', 0, minimum=0),
+        'chloride_level': _number(payload, 'chloride_level', 0, minimum=0),
+        'volume_cy': volume_cy,
+        'needs_backfill': needs_backfill,
+        'priorities': priorities,
+        'advanced_params': advanced_params,
+        'soil_permeability': _level(payload.get('soil_permeability', 'medium'),
+                                    'soil_permeability', PERMEABILITY_LEVELS),
+        'project_date': project_date,
+    }
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+def _alternatives(payload):
+    k = payload.get('alternatives')
+    if k is not None and (isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= MAX_ALTERNATIVES):
+        raise RequestError(f"'alternatives' must be an integer from 1 to {MAX_ALTERNATIVES}")
+    return k
+
+def _evaluate_analysis(analysis, k, db):
+    result = evaluate_site_cached(analysis, db)
+    if k is None:
+        return result
+    return {**result, 'alternatives': find_alternatives(analysis, db, k)}
+
+def evaluate(payload, db):
+    """Evaluate one request body
+    
+    An optional 'alternatives': k adds the k cheapest, fastest and lowest-CO2
+    landfills and CF facilities (see alternatives.py).
+    """
+    analysis = parse_analysis(payload)
+    return _evaluate_analysis(analysis, _alternatives(payload), db)
+
+def _batch_results(analyses, db, advanced_params):
+    """evaluate_site() results for analyses sharing advanced_params, from one evaluate_batch() call
+    
+    Straight-line distances only (no distance provider configured).
+    """
+    import pandas as pd
+    
+    from .batch import evaluate_batch
+    
+    rows = []
+    for analysis in analyses:
+        row = {key: analysis[key] for key in ('site_lat', 'site_lon', 'volume_cy', 'tph_level', 'chloride_level',
+                                              'needs_backfill', 'soil_permeability')}
+        for name, level in analysis['priorities'].items():
+            row[f'{name}_priority'] = level
+        rows.append(row)
+    sites = pd.DataFrame(rows)
+    if any(analysis['project_date'] for analysis in analyses):
+        sites['project_date'] = [analysis['project_date'] for analysis in analyses]
+    landfills = {lf['id']: lf for lf in facility_table(db, 'landfills').records}
+    
+    results = []
+    for analysis, row in zip(analyses, evaluate_batch(sites, db, advanced_params).to_dict('records')):
+        dated = analysis['project_date'] is not None
+        dig_haul = surface = nearest_landfill = None
+        if not pd.isna(row['dig_haul_landfill_id']):
+            dig_haul = {
+                'option_name': OPTION_NAMES['dig_haul'],
+                'total_cost': row['dig_haul_total_cost'],
+                'cost_per_cy': row['dig_haul_cost_per_cy'],
+                'project_days': int(row['dig_haul_project_days']),
+                'landfill_name': row['dig_haul_landfill_name'],
+                'distance_miles': row['dig_haul_distance_miles'],
+                'distance_source': 'straight_line',
+                'co2_tons': row['dig_haul_co2_tons'],
+                'equipment_cost': row['dig_haul_equipment_cost'],
+                'trucking_cost': row['dig_haul_trucking_cost'],
+                'disposal_cost': row['dig_haul_disposal_cost'],
+                'backfill_cost': row['dig_haul_backfill_cost'],
+                'includes_backfill': analysis['needs_backfill'],
+                'backfill_available_at_landfill': row['dig_haul_backfill_available_at_landfill'],
+            }
+            if dated:
+                dig_haul['fuel_adjustment'] = row['dig_haul_fuel_adjustment']
+            nearest_landfill = {'landfill': landfills[row['dig_haul_landfill_id']],
+                                'distance_miles': row['dig_haul_distance_miles']}
+        onsite = {
+            'option_name': OPTION_NAMES['onsite'],
+            'total_cost': row['onsite_total_cost'],
+            'cost_per_cy': row['onsite_cost_per_cy'],
+            'project_days': int(row['onsite_project_days']),
+            'processing_cost': row['onsite_processing_cost'],
+            'mobilization_cost': row['onsite_mobilization_cost'],
+            'amendment_cost': row['onsite_amendment_cost'],
+            'co2_tons': row['onsite_co2_tons'],
+            'includes_backfill': True,
+            'soil_returned_clean': True,
+            'permeability_factor': analysis['soil_permeability'],
+        }
+        if not pd.isna(row['surface_facility_id']):
+            surface = {
+                'option_name': OPTION_NAMES['surface'],
+                'total_cost': row['surface_total_cost'],
+                'cost_per_cy': row['surface_cost_per_cy'],
+                'project_days': int(row['surface_project_days']),
+                'facility_name': row['surface_facility_name'],
+                'distance_miles': row['surface_distance_miles'],
+                'distance_source': 'straight_line',
+                'trucking_cost': row['surface_trucking_cost'],
+                'processing_cost': row['surface_processing_cost'],
+                'co2_tons': row['surface_co2_tons'],
+                'includes_backfill': True,
+                'soil_returned_clean': True,
+            }
+            if dated:
+                surface['fuel_adjustment'] = row['surface_fuel_adjustment']
+        options = {'dig_haul': dig_haul, 'onsite': onsite, 'surface': surface}
+        results.append({
+            'state': row['state'],
+            'county': row['county'],
+            'soil_type': get_soil_type(analysis['site_lat'], analysis['site_lon'], row['state']),
+            'reg_thresholds': get_regulatory_thresholds(row['state']),
+            'nearest_landfill': nearest_landfill,
+            **options,
+            'recommended': row['recommended'],
+            'scores': {key: row[f'score_{key}'] for key, option in options.items() if option is not None},
+        })
+    return results
+
+def evaluate_many(payload, db):
+    """Evaluate a batch request body; invalid sites get an 'error' entry
+    
+    Batches of VECTORIZED_BATCH_SITES or more are scored with
+    evaluate_batch(), one pass per distinct advanced_params, unless road
+    routing is configured. Sites asking for alternatives or a simulated
+    schedule are evaluated one by one, as is a group whose vectorized pass
+    fails. A site whose evaluation fails also gets an 'error' entry.
+    """
+    sites = payload.get('sites') if isinstance(payload, dict) else payload
+    if not isinstance(sites, list):
+        raise RequestError("Expected {\"sites\": [...]}")
+    if len(sites) > MAX_BATCH_SITES:
+        raise RequestError(f"At most {MAX_BATCH_SITES:,} sites per batch", status=413)
+    
+    results = [None] * len(sites)
+    parsed = []
+    for i, site in enumerate(sites):
+        try:
+            parsed.append((i, parse_analysis(site), _alternatives(site)))
+        except RequestError as exc:
+            results[i] = {'error': str(exc)}
+    
+    plain = [(i, analysis) for i, analysis, k in parsed
+             if k is None and not (analysis['advanced_params'] or {}).get('simulate_schedule')]
+    if len(plain) >= VECTORIZED_BATCH_SITES and get_distance_provider() is None:
+        groups = {}
+        for i, analysis in plain:
+            groups.setdefault(json.dumps(analysis['advanced_params'], sort_keys=True), []).append((i, analysis))
+        for group in groups.values():
+            try:
+                batch = _batch_results([analysis for _, analysis in group], db, group[0][1]['advanced_params'])
+            except Exception:
+                logger.exception("Vectorized batch evaluation failed; evaluating its sites one by one")
+                continue
+            for (i, _), result in zip(group, batch):
+                results[i] = result
+    
+    for i, analysis, k in parsed:
+        if results[i] is None:
+            try:
+                results[i] = _evaluate_analysis(analysis, k, db)
+            except Exception:
+                logger.exception(f"Error evaluating batch site {i}")
+                results[i] = {'error': "Could not evaluate this site"}
+    return {'results': results}
+
+def health(db):
+    """Database version and cache statistics"""
+    return {
+        'status': 'ok',
+        'facilities_db': db.stats() if hasattr(db, 'stats') else None,
+        'result_cache': get_result_cache().stats(),
+    }
+
+def metrics():
+    """Stage timings and result cache counters in the Prometheus text format"""
+    cache = get_result_cache().stats()
+    lines = format_metric('cleanfutures_result_cache_hits_total', 'counter', "Result cache hits",
+                          [('', {}, cache['hits'])])
+    lines += format_metric('cleanfutures_result_cache_misses_total', 'counter', "Result cache misses",
+                           [('', {}, cache['misses'])])
+    lines += format_metric('cleanfutures_result_cache_entries', 'gauge', "Cached evaluations",
+                           [('', {}, cache['size'])])
+    return prometheus_text(lines)
+
+# ============================================================================
+# ASGI APPLICATION
+# ============================================================================
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+async def _send_json(send, status, body):
+    payload = json.dumps(body, default=_json_default, separators=(',', ':')).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(payload)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+async def _send_text(send, status, text, content_type=b'text/plain; version=0.0.4; charset=utf-8'):
+    payload = text.encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type),
+                    (b'content-length', str(len(payload)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+async def _read_json(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise RequestError("Client disconnected", status=499)
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise RequestError("Request body too large", status=413)
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(b''.join(chunks) or b'null')
+    except ValueError:
+        raise RequestError("Request body is not valid JSON")
+
+def _warm_up():
+    """Load the database, its lookup tables/indexes and any road graph before the first request"""
+    db = load_facilities_database()
+    for table in ('landfills', 'clean_futures_facilities'):
+        if db.lookup_index(table) is None:
+            db.facility_table(table)
+    get_distance_provider()
+    return db
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                _warm_up()
+            except Exception as exc:
+                await send({'type': 'lifespan.startup.failed', 'message': str(exc)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+ROUTES = {
+    ('POST', '/evaluate'): evaluate,
+    ('POST', '/evaluate/batch'): evaluate_many,
+    ('GET', '/health'): None,
+    ('GET', '/metrics'): None,
+}
+
+def _runs_in_thread(handler, payload):
+    """Whether a request is slow enough to move off the event loop"""
+    if not isinstance(payload, dict):
+        return False
+    if handler is evaluate_many:
+        return len(payload.get('sites') or ()) >= THREAD_BATCH_SITES
+    advanced_params = payload.get('advanced_params')
+    return isinstance(advanced_params, dict) and advanced_params.get('simulate_schedule') is True
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    
+    method = scope['method']
+    path = scope['path'].rstrip('/') or '/'
+    try:
+        if (method, path) not in ROUTES:
+            allowed = [m for m, p in ROUTES if p == path]
+            if allowed:
+                raise RequestError(f"Use {' or '.join(allowed)} for {path}", status=405)
+            raise RequestError(f"No route for {path}", status=404)
+        if path == '/metrics':
+            await _send_text(send, 200, metrics())
+            return
+    
+        with trace(f"{method} {path}"):
+            # The store keeps the database cached; this only re-checks the file
+            db = load_facilities_database()
+            if path == '/health':
+                body = health(db)
+            else:
+                payload = await _read_json(receive)
+                handler = ROUTES[(method, path)]
+                if _runs_in_thread(handler, payload):
+                    body = await asyncio.to_thread(handler, payload, db)
+                else:
+                    body = handler(payload, db)
+        await _send_json(send, 200, body)
+    except RequestError as exc:
+        await _send_json(send, exc.status, {'error': str(exc)})
+    except FileNotFoundError as exc:
+        logger.error(f"Facilities database not found: {exc}")
+        await _send_json(send, 503, {'error': "Facilities database not available"})
+    except Exception:
+        logger.exception(f"Error handling {method} {path}")
+        await _send_json(send, 500, {'error': "Internal server error"})
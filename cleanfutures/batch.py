@@ -0,0 +1,421 @@
+"""
+Vectorized batch evaluation of many sites at once.
+
+evaluate_batch() takes a DataFrame of sites and returns all three option
+results plus the recommendation per row. The site x facility distance matrix
+is computed with NumPy broadcasting and the trip, cost and CO2 math runs on
+whole columns, so results match evaluate_site() without a per-row loop.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .calculators import (
+    AVG_SPEED_MPH,
+    DEFAULT_TRUCK_CAPACITY_CY,
+    DEFAULT_NUM_TRUCKS,
+    DEFAULT_TRUCK_HOURLY_RATE,
+    DEFAULT_EXCAVATOR_RATE,
+    DEFAULT_LOADER_RATE,
+    DEFAULT_WORK_HOURS_PER_DAY,
+    DEFAULT_PROCESSING_COST_CY,
+    BASE_DIESEL_PRICE_PER_GALLON,
+)
+from .counties import get_county_index
+from .facilities import facility_table
+from .geo import TX_NM_BORDER_LAT, TX_NM_BORDER_LON, county_representatives
+from .instrumentation import timed
+from .pricing import DIESEL_PRICE_FIELD, get_pricing, to_ordinals
+from .routing import ROUTE_CANDIDATES, get_distance_provider
+from .vectorized import (
+    OPTION_KEYS,
+    haversine_matrix,
+    landfill_acceptance_mask,
+    nearest_in_matrix,
+    k_nearest_in_matrix,
+    dig_and_haul_arrays,
+    onsite_arrays,
+    surface_facility_arrays,
+    recommendation_arrays,
+)
+
+# Input columns and their defaults when absent (None = required)
+SITE_COLUMNS = {
+    'site_lat': None,
+    'site_lon': None,
+    'volume_cy': None,
+    'tph_level': 0,
+    'chloride_level': 0,
+    'needs_backfill': True,
+    'soil_permeability': 'medium',
+    'cost_priority': 'medium',
+    'speed_priority': 'medium',
+    'esg_priority': 'medium',
+}
+
+# Optional column of project start dates; rows without one use undated prices
+PROJECT_DATE_COLUMN = 'project_date'
+
+# Maximum number of site x facility cells held in memory at once
+MAX_MATRIX_CELLS = 5_000_000
+
+# ============================================================================
+# INPUT PREPARATION
+# ============================================================================
+
+def _prepare_sites(sites):
+    """Validate the input frame and fill optional columns with defaults"""
+    missing = [col for col, default in SITE_COLUMNS.items()
+               if default is None and col not in sites.columns]
+    if missing:
+        raise ValueError(f"Missing required site columns: {', '.join(missing)}")
+    
+    prepared = {}
+    for col, default in SITE_COLUMNS.items():
+        if col in sites.columns:
+            values = sites[col]
+            if default is not None:
+                values = values.fillna(default)
+        else:
+            values = pd.Series(default, index=sites.index)
+        prepared[col] = values.to_numpy()
+    
+    prepared['site_lat'] = prepared['site_lat'].astype(float)
+    prepared['site_lon'] = prepared['site_lon'].astype(float)
+    prepared['volume_cy'] = prepared['volume_cy'].astype(float)
+    prepared['tph_level'] = prepared['tph_level'].astype(float)
+    prepared['chloride_level'] = prepared['chloride_level'].astype(float)
+    prepared['needs_backfill'] = prepared['needs_backfill'].astype(bool)
+    for col in ('soil_permeability', 'cost_priority', 'speed_priority', 'esg_priority'):
+        prepared[col] = prepared[col].astype(str)
+    
+    return prepared
+
+def _chunk_bounds(n_sites, n_facilities):
+    """Row ranges that keep each distance matrix under MAX_MATRIX_CELLS"""
+    rows = max(1, MAX_MATRIX_CELLS // max(1, n_facilities))
+    return [(start, min(start + rows, n_sites)) for start in range(0, n_sites, rows)]
+
+# ============================================================================
+# NEAREST FACILITY SELECTION
+# ============================================================================
+
+def nearest_qualified_landfills(site_lat, site_lon, tph_level, chloride_level, needs_backfill,
+                                landfills, k=1):
+    """Index and distance of the nearest qualified landfill(s) for every site
+    
+    landfills is a FacilityTable. Returns (n,) arrays for k=1, otherwise
+    (n, k) arrays nearest first; -1 / NaN mark missing candidates.
+    """
+    n = len(site_lat)
+    idx = np.full((n, k), -1, dtype=np.int64)
+    distance = np.full((n, k), np.nan)
+    if len(landfills):
+        for start, stop in _chunk_bounds(n, len(landfills)):
+            rows = slice(start, stop)
+            distances = haversine_matrix(site_lat[rows, None], site_lon[rows, None],
+                                         landfills['latitude'][None, :], landfills['longitude'][None, :])
+            mask = landfill_acceptance_mask(tph_level[rows], chloride_level[rows], needs_backfill[rows],
+                                            landfills['tph_max_mgkg'], landfills['chloride_max_mgkg'],
+                                            landfills['backfill_available'])
+            if k == 1:
+                idx[rows, 0], distance[rows, 0] = nearest_in_matrix(distances, mask)
+            else:
+                idx[rows], distance[rows] = k_nearest_in_matrix(distances, mask, k)
+    
+    return (idx[:, 0], distance[:, 0]) if k == 1 else (idx, distance)
+
+def nearest_cf_facilities(site_lat, site_lon, facilities, k=1):
+    """Index and distance of the nearest Clean Futures facility(ies) for every site
+    
+    facilities is a FacilityTable. Returns (n,) arrays for k=1, otherwise
+    (n, k) arrays nearest first.
+    """
+    n = len(site_lat)
+    idx = np.full((n, k), -1, dtype=np.int64)
+    distance = np.full((n, k), np.nan)
+    if len(facilities):
+        for start, stop in _chunk_bounds(n, len(facilities)):
+            rows = slice(start, stop)
+            distances = haversine_matrix(site_lat[rows, None], site_lon[rows, None],
+                                         facilities['latitude'][None, :], facilities['longitude'][None, :])
+            if k == 1:
+                idx[rows, 0], distance[rows, 0] = nearest_in_matrix(distances)
+            else:
+                idx[rows], distance[rows] = k_nearest_in_matrix(distances, k=k)
+    
+    return (idx[:, 0], distance[:, 0]) if k == 1 else (idx, distance)
+
+def route_candidates(provider, site_lat, site_lon, candidate_idx, candidate_distance, records):
+    """Re-rank straight-line candidates by road drive time, site by site
+    
+    Returns (idx, distance_miles, travel_hours); sites the provider cannot
+    route keep their straight-line nearest at the average truck speed.
+    """
+    idx = candidate_idx[:, 0].copy()
+    distance = candidate_distance[:, 0].copy()
+    hours = distance / AVG_SPEED_MPH
+    
+    for i in range(len(idx)):
+        best = None
+        for j in candidate_idx[i]:
+            if j < 0:
+                break
+            route = provider.route(site_lat[i], site_lon[i], records[j])
+            if route is not None and (best is None or route[1] < best[2]):
+                best = (j, route[0], route[1])
+        if best is not None:
+            idx[i], distance[i], hours[i] = best
+    
+    return idx, distance, hours
+
+# ============================================================================
+# BATCH EVALUATION
+# ============================================================================
+
+def _dated_rates(pricing, ordinals):
+    """Per-site equipment rates and diesel price delta on each project date
+    
+    Rates without a scheduled value fall back to the calculator defaults;
+    sites without a diesel price get no fuel adjustment.
+    """
+    groups = np.zeros(len(ordinals), dtype=np.int64)
+    rates = {}
+    for field, default in (('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE),
+                           ('excavator_rate', DEFAULT_EXCAVATOR_RATE),
+                           ('loader_rate', DEFAULT_LOADER_RATE)):
+        values = pricing.equipment.take(field, groups, ordinals)
+        rates[field] = np.where(np.isnan(values), default, values)
+    diesel = pricing.diesel.take(DIESEL_PRICE_FIELD, groups, ordinals)
+    fuel_delta = np.where(np.isnan(diesel), 0.0, diesel - BASE_DIESEL_PRICE_PER_GALLON)
+    return rates, fuel_delta
+
+def _site_pricing(sites, db):
+    """(pricing, ordinals, rates, fuel_delta) for a frame of sites
+    
+    Without a project_date column pricing and ordinals are None, rates is
+    empty and fuel_delta is 0, so callers use undated prices.
+    """
+    if PROJECT_DATE_COLUMN not in sites.columns:
+        return None, None, {}, 0.0
+    ordinals = to_ordinals(sites[PROJECT_DATE_COLUMN])
+    pricing = get_pricing(db)
+    rates, fuel_delta = _dated_rates(pricing, ordinals)
+    return pricing, ordinals, rates, fuel_delta
+
+def _dated_price_matrix(pricing, table, field, n_facilities, ordinals):
+    """Site x facility matrix of one facility price on each site's project date"""
+    groups = np.broadcast_to(np.arange(n_facilities), (len(ordinals), n_facilities))
+    return pricing.facilities[table].take(field, groups, np.asarray(ordinals)[:, None])
+
+def _take(values, idx, fill=np.nan):
+    """Gather values[idx] with -1 meaning 'no facility'"""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.full(len(idx), fill, dtype=object if values.dtype == object else float)
+    out = values[np.maximum(idx, 0)]
+    if out.dtype == object:
+        out = out.copy()
+        out[idx < 0] = fill
+        return out
+    return np.where(idx >= 0, out, fill)
+
+def states_counties(site_lat, site_lon, db):
+    """(state, county) object arrays for every site
+    
+    Vectorized determine_state_county(): sites inside the county boundary
+    index take its state and county; the rest fall back to the state line
+    and the county of the nearest representative landfill.
+    """
+    n = len(site_lat)
+    state = np.where((site_lat >= TX_NM_BORDER_LAT) & (site_lon < TX_NM_BORDER_LON),
+                     'New Mexico', 'Texas').astype(object)
+    county = np.full(n, 'Unknown', dtype=object)
+    index = get_county_index()
+    if index is not None and len(index):
+        found = index.locate_many(site_lat, site_lon)
+        inside = found >= 0
+        states, names = index.names()
+        state[inside] = states[found[inside]]
+        county[inside] = names[found[inside]]
+        outside = np.flatnonzero(~inside)
+    else:
+        outside = np.arange(n)
+    
+    representatives = county_representatives(db)
+    if len(outside) and representatives:
+        names = np.array([rep[0] for rep in representatives], dtype=object)
+        rep_lat = np.array([rep[1] for rep in representatives], dtype=float)
+        rep_lon = np.array([rep[2] for rep in representatives], dtype=float)
+        step = max(1, MAX_MATRIX_CELLS // len(representatives))
+        for start in range(0, len(outside), step):
+            rows = outside[start:start + step]
+            distances = haversine_matrix(site_lat[rows, None], site_lon[rows, None], rep_lat, rep_lon)
+            county[rows] = names[np.argmin(distances, axis=1)]
+    return state, county
+
+@timed('evaluate_batch')
+def evaluate_batch(sites, db, advanced_params=None):
+    """Evaluate every site in a DataFrame and return one result row per site
+    
+    Expected columns match the keys of st.session_state.analysis: site_lat,
+    site_lon, volume_cy, tph_level, chloride_level, needs_backfill,
+    soil_permeability, plus cost_priority / speed_priority / esg_priority.
+    Only site_lat, site_lon and volume_cy are required. advanced_params
+    applies to the whole batch, exactly as in the single-site calculators.
+    
+    An optional project_date column prices each site with the facility
+    prices, equipment rates and diesel price in effect on that date (see
+    pricing.py); it adds dig_haul_fuel_adjustment / surface_fuel_adjustment.
+    
+    Each row also gets the site's state and county (see states_counties).
+    
+    With a road-network distance provider configured, the straight-line
+    candidates are re-ranked by drive time site by site (a per-row loop);
+    otherwise everything stays vectorized.
+    """
+    s = _prepare_sites(sites)
+    n = len(sites)
+    landfills = facility_table(db, 'landfills')
+    facilities = facility_table(db, 'clean_futures_facilities')
+    provider = get_distance_provider()
+    
+    pricing, ordinals, rates, fuel_delta = _site_pricing(sites, db)
+    
+    # ------------------------------------------------------------------
+    # Dig & Haul
+    # ------------------------------------------------------------------
+    if provider is None:
+        lf_idx, lf_distance = nearest_qualified_landfills(
+            s['site_lat'], s['site_lon'], s['tph_level'], s['chloride_level'], s['needs_backfill'], landfills
+        )
+        lf_speed = AVG_SPEED_MPH
+    else:
+        lf_idx, lf_distance, lf_hours = route_candidates(
+            provider, s['site_lat'], s['site_lon'],
+            *nearest_qualified_landfills(s['site_lat'], s['site_lon'], s['tph_level'], s['chloride_level'],
+                                         s['needs_backfill'], landfills, k=ROUTE_CANDIDATES),
+            landfills.records
+        )
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lf_speed = np.where(lf_hours > 0, lf_distance / lf_hours, AVG_SPEED_MPH)
+    has_lf = lf_idx >= 0
+    if pricing is None:
+        lf_disposal = _take(landfills.column('disposal_cost_cy'), lf_idx)
+        lf_backfill = _take(landfills.column('backfill_cost_cy'), lf_idx)
+    else:
+        lf_disposal = pricing.facilities['landfills'].take('disposal_cost_cy', lf_idx, ordinals)
+        lf_backfill = pricing.facilities['landfills'].take('backfill_cost_cy', lf_idx, ordinals)
+    
+    if advanced_params:
+        truck_capacity = advanced_params.get('truck_capacity_cy', DEFAULT_TRUCK_CAPACITY_CY)
+        num_trucks = advanced_params.get('num_trucks', DEFAULT_NUM_TRUCKS)
+        truck_hourly_rate = advanced_params.get('truck_hourly_rate',
+                                                rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE))
+        excavator_rate = advanced_params.get('excavator_rate', rates.get('excavator_rate', DEFAULT_EXCAVATOR_RATE))
+        loader_rate = advanced_params.get('loader_rate', rates.get('loader_rate', DEFAULT_LOADER_RATE))
+        work_hours_per_day = advanced_params.get('work_hours_per_day', DEFAULT_WORK_HOURS_PER_DAY)
+        disposal_cost = advanced_params.get('disposal_cost_cy', lf_disposal)
+        backfill_cost = advanced_params.get('backfill_cost_cy', lf_backfill)
+        onsite_processing = advanced_params.get('onsite_processing_cost_cy', DEFAULT_PROCESSING_COST_CY)
+    else:
+        truck_capacity = DEFAULT_TRUCK_CAPACITY_CY
+        num_trucks = DEFAULT_NUM_TRUCKS
+        truck_hourly_rate = rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE)
+        excavator_rate = rates.get('excavator_rate', DEFAULT_EXCAVATOR_RATE)
+        loader_rate = rates.get('loader_rate', DEFAULT_LOADER_RATE)
+        work_hours_per_day = DEFAULT_WORK_HOURS_PER_DAY
+        disposal_cost = lf_disposal
+        backfill_cost = np.where(s['needs_backfill'], lf_backfill, 0)
+        onsite_processing = DEFAULT_PROCESSING_COST_CY
+    
+    dig_haul = dig_and_haul_arrays(
+        s['volume_cy'], lf_distance, s['needs_backfill'], truck_capacity, num_trucks,
+        truck_hourly_rate, excavator_rate, loader_rate, work_hours_per_day,
+        disposal_cost, backfill_cost, avg_speed_mph=lf_speed, fuel_price_delta=fuel_delta
+    )
+    
+    # ------------------------------------------------------------------
+    # Onsite
+    # ------------------------------------------------------------------
+    onsite = onsite_arrays(s['volume_cy'], s['soil_permeability'], s['tph_level'],
+                           s['chloride_level'], onsite_processing)
+    
+    # ------------------------------------------------------------------
+    # Surface facility
+    # ------------------------------------------------------------------
+    if provider is None:
+        cf_idx, cf_distance = nearest_cf_facilities(s['site_lat'], s['site_lon'], facilities)
+        cf_speed = AVG_SPEED_MPH
+    else:
+        cf_idx, cf_distance, cf_hours = route_candidates(
+            provider, s['site_lat'], s['site_lon'],
+            *nearest_cf_facilities(s['site_lat'], s['site_lon'], facilities, k=ROUTE_CANDIDATES),
+            facilities.records
+        )
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cf_speed = np.where(cf_hours > 0, cf_distance / cf_hours, AVG_SPEED_MPH)
+    has_cf = cf_idx >= 0
+    
+    if advanced_params:
+        surface_processing = advanced_params.get('surface_processing_cost_cy', DEFAULT_PROCESSING_COST_CY)
+    elif pricing is None:
+        surface_processing = _take(facilities.column('processing_cost_cy'), cf_idx)
+    else:
+        surface_processing = pricing.facilities['clean_futures_facilities'].take('processing_cost_cy',
+                                                                                  cf_idx, ordinals)
+    
+    surface = surface_facility_arrays(
+        s['volume_cy'], cf_distance, truck_capacity, truck_hourly_rate, surface_processing,
+        _take(facilities.column('typical_turnaround_days'), cf_idx), avg_speed_mph=cf_speed,
+        fuel_price_delta=fuel_delta
+    )
+    
+    # ------------------------------------------------------------------
+    # Recommendation
+    # ------------------------------------------------------------------
+    available = np.stack([has_lf, np.ones(n, dtype=bool), has_cf], axis=1)
+    option_arrays = [dig_haul, onsite, surface]
+    scores, best = recommendation_arrays(
+        np.stack([opt['cost_per_cy'] for opt in option_arrays], axis=1),
+        np.stack([opt['project_days'] for opt in option_arrays], axis=1),
+        np.stack([opt['co2_tons'] for opt in option_arrays], axis=1),
+        available, s['cost_priority'], s['speed_priority'], s['esg_priority']
+    )
+    
+    # ------------------------------------------------------------------
+    # Assemble output
+    # ------------------------------------------------------------------
+    def option_value(values, present):
+        return np.where(present, values, np.nan)
+    
+    state, county = states_counties(s['site_lat'], s['site_lon'], db)
+    out = {
+        'state': state,
+        'county': county,
+        'dig_haul_landfill_id': _take(landfills.column('id'), lf_idx, None),
+        'dig_haul_landfill_name': _take([f"{lf['company']} - {lf['site_name']}" for lf in landfills.records], lf_idx, None),
+        'dig_haul_distance_miles': lf_distance,
+        'dig_haul_backfill_available_at_landfill': _take(landfills.column('backfill_available'), lf_idx, None),
+    }
+    for key in ('total_cost', 'cost_per_cy', 'project_days', 'co2_tons',
+                'equipment_cost', 'trucking_cost', 'disposal_cost', 'backfill_cost'):
+        out[f'dig_haul_{key}'] = option_value(dig_haul[key], has_lf)
+    if pricing is not None:
+        out['dig_haul_fuel_adjustment'] = option_value(dig_haul['fuel_adjustment'], has_lf)
+    for key in ('total_cost', 'cost_per_cy', 'project_days', 'co2_tons',
+                'processing_cost', 'mobilization_cost', 'amendment_cost'):
+        out[f'onsite_{key}'] = np.asarray(onsite[key], dtype=float)
+    out['surface_facility_id'] = _take(facilities.column('id'), cf_idx, None)
+    out['surface_facility_name'] = _take(facilities.column('facility_name'), cf_idx, None)
+    out['surface_distance_miles'] = cf_distance
+    for key in ('total_cost', 'cost_per_cy', 'project_days', 'co2_tons',
+                'trucking_cost', 'processing_cost'):
+        out[f'surface_{key}'] = option_value(surface[key], has_cf)
+    if pricing is not None:
+        out['surface_fuel_adjustment'] = option_value(surface['fuel_adjustment'], has_cf)
+    for col, key in enumerate(OPTION_KEYS):
+        out[f'score_{key}'] = scores[:, col]
+    out['recommended'] = np.array(OPTION_KEYS, dtype=object)[best]
+    
+    return pd.DataFrame(out, index=sites.index)
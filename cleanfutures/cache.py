@@ -0,0 +1,117 @@
+"""
+Process-wide memoization of site evaluations.
+
+Results are keyed on a canonical hash of the analysis inputs plus the
+facilities database version and the active distance provider, so identical
+analyses from any session return instantly and edits to the database never
+serve stale results. Entries are evicted least-recently-used beyond a size cap.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from .evaluate import evaluate_site
+from .instrumentation import timed
+from .routing import get_distance_provider
+
+# Maximum number of cached evaluations (override with the env var)
+RESULT_CACHE_SIZE_ENV_VAR = 'CLEANFUTURES_RESULT_CACHE_SIZE'
+DEFAULT_RESULT_CACHE_SIZE = 2048
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters"""
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def stats(self):
+        return {'size': len(self._data), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses}
+
+def _normalize(value):
+    """Convert inputs to a canonical JSON-safe form"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        # 1000 and 1000.0 (or numpy scalars) hash the same
+        value = float(value)
+        return int(value) if value.is_integer() else repr(value)
+    if hasattr(value, 'item'):
+        return _normalize(value.item())
+    return str(value)
+
+def analysis_cache_key(analysis, db_version, provider_version=None):
+    """Canonical hash of an analysis dict plus the data versions it depends on"""
+    payload = {
+        'analysis': _normalize(analysis),
+        'db_version': db_version,
+        'provider_version': provider_version,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+_results = LRUCache(int(os.environ.get(RESULT_CACHE_SIZE_ENV_VAR, DEFAULT_RESULT_CACHE_SIZE)))
+
+def get_result_cache():
+    """Return the process-wide result cache"""
+    return _results
+
+@timed('evaluate_site_cached')
+def evaluate_site_cached(analysis, db, evaluate=None):
+    """evaluate_site() memoized on normalized inputs and the database version
+    
+    Cached results are shared between callers and must be treated as
+    read-only. Databases without a version (plain dicts) are not cached.
+    evaluate replaces evaluate_site on a miss - e.g. a session's
+    EvaluationPipeline.evaluate, which recomputes only what changed.
+    """
+    evaluate = evaluate or evaluate_site
+    db_version = getattr(db, 'version', None)
+    if db_version is None:
+        return evaluate(analysis, db)
+    
+    provider = get_distance_provider()
+    provider_version = getattr(getattr(provider, 'graph', None), 'version', None) if provider else None
+    key = analysis_cache_key(analysis, db_version, provider_version)
+    
+    result = _results.get(key)
+    if result is None:
+        result = evaluate(analysis, db)
+        _results.put(key, result)
+    return result
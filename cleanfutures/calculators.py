@@ -0,0 +1,398 @@
+"""
+Cost, duration and CO2 calculators for the three remediation options.
+"""
+
+import math
+
+from .facilities import find_k_nearest_qualified_landfills, find_k_nearest_cf_facilities
+from .instrumentation import timed
+from .pricing import get_pricing
+from .routing import ROUTE_CANDIDATES, get_distance_provider
+
+# ============================================================================
+# MODEL ASSUMPTIONS
+# ============================================================================
+
+# Trucking
+AVG_SPEED_MPH = 45
+LOADING_TIME_HOURS = 0.25
+UNLOADING_TIME_HOURS = 0.5
+
+# Equipment capacity (simplified - assume balanced)
+EXCAVATION_CAPACITY_CYPH = 40
+LOADING_CAPACITY_CYPH = 35
+
+# Fuel burn (gallons per hour)
+EXCAVATOR_FUEL_GPH = 6
+LOADER_FUEL_GPH = 5
+TRUCK_FUEL_GPH = 4
+
+# Diesel produces approximately 22.38 lbs CO2 per gallon
+CO2_LBS_PER_GALLON = 22.38
+
+# Diesel price ($/gal) built into the hourly rates; dated quotes add the difference
+BASE_DIESEL_PRICE_PER_GALLON = 3.50
+
+# Onsite treatment
+BASE_TREATMENT_DAYS = 45
+ONSITE_FUEL_GAL_PER_CY = 0.1
+
+# Simple mode defaults
+DEFAULT_TRUCK_CAPACITY_CY = 18
+DEFAULT_NUM_TRUCKS = 3
+DEFAULT_TRUCK_HOURLY_RATE = 85
+DEFAULT_EXCAVATOR_RATE = 150
+DEFAULT_LOADER_RATE = 125
+DEFAULT_WORK_HOURS_PER_DAY = 10
+DEFAULT_PROCESSING_COST_CY = 25
+
+# ============================================================================
+# BASIC CALCULATIONS
+# ============================================================================
+
+def calculate_volume_cy(surface_area_sqft, depth_ft):
+    """Calculate volume in cubic yards from surface area and depth"""
+    cubic_feet = surface_area_sqft * depth_ft
+    cubic_yards = cubic_feet / 27
+    return cubic_yards
+
+def calculate_co2_emissions(fuel_gallons):
+    """Calculate CO2 emissions from fuel consumption"""
+    co2_lbs = fuel_gallons * CO2_LBS_PER_GALLON
+    co2_tons = co2_lbs / 2000
+    return co2_lbs, co2_tons
+
+def select_haul_destination(site_lat, site_lon, candidates, record_key, provider=None):
+    """Pick the haul destination and its one-way distance and drive time
+    
+    candidates are nearest-first lookup results. With a road-network provider
+    the candidates are re-ranked by drive time; otherwise (or if none can be
+    routed) the straight-line nearest is used at the average truck speed.
+    Returns (record, distance_miles, travel_time_hours, distance_source).
+    """
+    if provider is not None:
+        best = None
+        for candidate in candidates:
+            route = provider.route(site_lat, site_lon, candidate[record_key])
+            if route is not None and (best is None or route[1] < best[2]):
+                best = (candidate[record_key], route[0], route[1], 'road')
+        if best is not None:
+            return best
+    
+    nearest = candidates[0]
+    distance_miles = nearest['distance_miles']
+    return nearest[record_key], distance_miles, distance_miles / AVG_SPEED_MPH, 'straight_line'
+
+def dated_prices(db, table, record, project_date):
+    """Facility record, equipment rates and diesel price delta in effect on project_date
+    
+    Without a project date the record is returned as-is with no rate
+    overrides and no fuel adjustment.
+    """
+    if project_date is None:
+        return record, {}, 0.0
+    pricing = get_pricing(db)
+    diesel_price = pricing.diesel_price(project_date)
+    fuel_delta = diesel_price - BASE_DIESEL_PRICE_PER_GALLON if diesel_price is not None else 0.0
+    return pricing.facility_record(table, record, project_date), pricing.equipment_rates(project_date), fuel_delta
+
+# ============================================================================
+# OPTION CALCULATORS
+# ============================================================================
+
+def dig_and_haul_parameters(advanced_params, landfill, rates, needs_backfill):
+    """Truck, equipment and price inputs for dig & haul
+    
+    Advanced parameters win, then dated equipment rates, then the Simple
+    Mode defaults; disposal and backfill prices come from the landfill.
+    """
+    if advanced_params:
+        return {
+            'truck_capacity': advanced_params.get('truck_capacity_cy', DEFAULT_TRUCK_CAPACITY_CY),
+            'num_trucks': advanced_params.get('num_trucks', DEFAULT_NUM_TRUCKS),
+            'truck_hourly_rate': advanced_params.get('truck_hourly_rate',
+                                                     rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE)),
+            'excavator_rate': advanced_params.get('excavator_rate',
+                                                  rates.get('excavator_rate', DEFAULT_EXCAVATOR_RATE)),
+            'loader_rate': advanced_params.get('loader_rate', rates.get('loader_rate', DEFAULT_LOADER_RATE)),
+            'work_hours_per_day': advanced_params.get('work_hours_per_day', DEFAULT_WORK_HOURS_PER_DAY),
+            'disposal_cost': advanced_params.get('disposal_cost_cy', landfill['disposal_cost_cy']),
+            'backfill_cost': advanced_params.get('backfill_cost_cy', landfill['backfill_cost_cy']),
+            'simulate_schedule': bool(advanced_params.get('simulate_schedule')),
+        }
+    # Default parameters
+    return {
+        'truck_capacity': DEFAULT_TRUCK_CAPACITY_CY,
+        'num_trucks': DEFAULT_NUM_TRUCKS,
+        'truck_hourly_rate': rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE),
+        'excavator_rate': rates.get('excavator_rate', DEFAULT_EXCAVATOR_RATE),
+        'loader_rate': rates.get('loader_rate', DEFAULT_LOADER_RATE),
+        'work_hours_per_day': DEFAULT_WORK_HOURS_PER_DAY,
+        'disposal_cost': landfill['disposal_cost_cy'],
+        'backfill_cost': landfill['backfill_cost_cy'] if needs_backfill else 0,
+        'simulate_schedule': False,
+    }
+
+def dig_and_haul_trips(volume_cy, travel_time_hours, truck_capacity, num_trucks, work_hours_per_day,
+                       simulate_schedule=False):
+    """Trip count, project days and truck hours for hauling volume_cy
+    
+    With simulate_schedule the estimate is replaced by a simulated schedule
+    (see simulation.py), returned under 'schedule'.
+    """
+    # Trip time calculation (simplified)
+    trip_time = (LOADING_TIME_HOURS + travel_time_hours + UNLOADING_TIME_HOURS +
+                 travel_time_hours + LOADING_TIME_HOURS)
+    
+    # Calculate number of trips and duration
+    num_trips = math.ceil(volume_cy / truck_capacity)
+    trips_per_truck_per_day = work_hours_per_day / trip_time
+    total_trips_per_day = trips_per_truck_per_day * num_trucks
+    project_days = math.ceil(num_trips / total_trips_per_day)
+    total_truck_hours = num_trips * trip_time
+    
+    # Optionally replace the estimate with a simulated schedule
+    schedule = None
+    if simulate_schedule:
+        from .simulation import simulate_dig_and_haul
+        schedule = simulate_dig_and_haul(volume_cy, travel_time_hours, truck_capacity, num_trucks,
+                                         work_hours_per_day)
+        project_days = schedule['project_days']
+        total_truck_hours = schedule['truck_hours']
+    
+    return {'num_trips': num_trips, 'project_days': project_days, 'truck_hours': total_truck_hours,
+            'schedule': schedule}
+
+def dig_and_haul_costs(volume_cy, needs_backfill, landfill, distance_miles, distance_source,
+                       params, trips, fuel_delta=0.0, dated=False):
+    """Dig & haul result dict from resolved parameters and a trip estimate
+    
+    dated adds the fuel_adjustment key (quotes with a project date).
+    """
+    project_days = trips['project_days']
+    total_truck_hours = trips['truck_hours']
+    project_hours = project_days * params['work_hours_per_day']
+    
+    # Costs
+    total_equipment_hours = project_hours
+    equipment_cost = (params['excavator_rate'] + params['loader_rate']) * total_equipment_hours
+    
+    trucking_cost = total_truck_hours * params['truck_hourly_rate']
+    
+    disposal_total = volume_cy * params['disposal_cost']
+    backfill_total = volume_cy * params['backfill_cost'] if needs_backfill else 0
+    
+    # CO2 calculations (simplified)
+    total_fuel = (EXCAVATOR_FUEL_GPH * total_equipment_hours + 
+                  LOADER_FUEL_GPH * total_equipment_hours +
+                  TRUCK_FUEL_GPH * total_truck_hours)
+    fuel_adjustment = fuel_delta * total_fuel
+    
+    total_cost = equipment_cost + trucking_cost + disposal_total + backfill_total + fuel_adjustment
+    cost_per_cy = total_cost / volume_cy
+    
+    co2_lbs, co2_tons = calculate_co2_emissions(total_fuel)
+    
+    result = {
+        'option_name': 'Dig & Haul to Landfill',
+        'total_cost': total_cost,
+        'cost_per_cy': cost_per_cy,
+        'project_days': project_days,
+        'landfill_name': f"{landfill['company']} - {landfill['site_name']}",
+        'distance_miles': distance_miles,
+        'distance_source': distance_source,
+        'co2_tons': co2_tons,
+        'equipment_cost': equipment_cost,
+        'trucking_cost': trucking_cost,
+        'disposal_cost': disposal_total,
+        'backfill_cost': backfill_total,
+        'includes_backfill': needs_backfill,
+        'backfill_available_at_landfill': landfill['backfill_available']
+    }
+    if dated:
+        result['fuel_adjustment'] = fuel_adjustment
+    if trips['schedule'] is not None:
+        result['schedule'] = trips['schedule']
+    return result
+
+@timed('calculate_dig_and_haul')
+def calculate_dig_and_haul(volume_cy, site_lat, site_lon, needs_backfill, 
+                          tph_level, chloride_level, db, advanced_params=None, project_date=None):
+    """Calculate costs and metrics for Dig & Haul option
+    
+    With a project_date, dated landfill prices, equipment rates and the
+    diesel price in effect on that day are used (see pricing.py).
+    """
+    
+    # Find nearest qualified landfill (by drive time when routing on roads)
+    provider = get_distance_provider()
+    candidates = find_k_nearest_qualified_landfills(site_lat, site_lon, tph_level, chloride_level,
+                                                    needs_backfill, db,
+                                                    k=ROUTE_CANDIDATES if provider else 1)
+    
+    if not candidates:
+        return None
+    
+    landfill, distance_miles, travel_time_hours, distance_source = select_haul_destination(
+        site_lat, site_lon, candidates, 'landfill', provider
+    )
+    landfill, rates, fuel_delta = dated_prices(db, 'landfills', landfill, project_date)
+    
+    params = dig_and_haul_parameters(advanced_params, landfill, rates, needs_backfill)
+    trips = dig_and_haul_trips(volume_cy, travel_time_hours, params['truck_capacity'], params['num_trucks'],
+                               params['work_hours_per_day'], params['simulate_schedule'])
+    return dig_and_haul_costs(volume_cy, needs_backfill, landfill, distance_miles, distance_source,
+                              params, trips, fuel_delta, dated=project_date is not None)
+
+@timed('calculate_onsite_remediation')
+def calculate_onsite_remediation(volume_cy, site_lat, site_lon, soil_permeability='medium',
+                                tph_level=0, chloride_level=0, advanced_params=None):
+    """Calculate costs and metrics for Onsite Remediation option"""
+    
+    # Processing cost
+    if advanced_params:
+        processing_cost_cy = advanced_params.get('onsite_processing_cost_cy', DEFAULT_PROCESSING_COST_CY)
+    else:
+        processing_cost_cy = DEFAULT_PROCESSING_COST_CY
+    
+    # Treatment duration estimation based on soil permeability
+    if soil_permeability == 'high':
+        treatment_days = BASE_TREATMENT_DAYS * 0.7  # Faster treatment
+    elif soil_permeability == 'low':
+        treatment_days = BASE_TREATMENT_DAYS * 1.5  # Slower treatment
+    else:
+        treatment_days = BASE_TREATMENT_DAYS
+    
+    # Adjust for contamination levels
+    if tph_level > 3000:
+        treatment_days *= 1.2
+    if chloride_level > 7000:
+        treatment_days *= 1.2
+    
+    treatment_days = int(treatment_days)
+    
+    # Costs
+    total_processing_cost = volume_cy * processing_cost_cy
+    
+    # Mobilization cost (estimated)
+    mobilization_cost = 5000 if volume_cy < 1000 else 10000
+    
+    # Amendment costs (estimated based on permeability)
+    if soil_permeability == 'low':
+        amendment_cost = volume_cy * 3  # Need more amendments for poor permeability
+    else:
+        amendment_cost = volume_cy * 1
+    
+    total_cost = total_processing_cost + mobilization_cost + amendment_cost
+    cost_per_cy = total_cost / volume_cy
+    
+    # CO2 estimation (much lower than dig & haul)
+    # Onsite equipment and limited trucking
+    estimated_fuel_gallons = volume_cy * ONSITE_FUEL_GAL_PER_CY  # Much less fuel than hauling
+    co2_lbs, co2_tons = calculate_co2_emissions(estimated_fuel_gallons)
+    
+    return {
+        'option_name': 'Clean Futures Onsite Remediation',
+        'total_cost': total_cost,
+        'cost_per_cy': cost_per_cy,
+        'project_days': treatment_days,
+        'processing_cost': total_processing_cost,
+        'mobilization_cost': mobilization_cost,
+        'amendment_cost': amendment_cost,
+        'co2_tons': co2_tons,
+        'includes_backfill': True,
+        'soil_returned_clean': True,
+        'permeability_factor': soil_permeability
+    }
+
+def surface_facility_parameters(advanced_params, facility, rates):
+    """Truck and processing price inputs for the surface facility option"""
+    if advanced_params:
+        return {
+            'truck_capacity': advanced_params.get('truck_capacity_cy', DEFAULT_TRUCK_CAPACITY_CY),
+            'num_trucks': advanced_params.get('num_trucks', DEFAULT_NUM_TRUCKS),
+            'truck_hourly_rate': advanced_params.get('truck_hourly_rate',
+                                                     rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE)),
+            'processing_cost_cy': advanced_params.get('surface_processing_cost_cy', DEFAULT_PROCESSING_COST_CY),
+        }
+    return {
+        'truck_capacity': DEFAULT_TRUCK_CAPACITY_CY,
+        'num_trucks': DEFAULT_NUM_TRUCKS,
+        'truck_hourly_rate': rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE),
+        'processing_cost_cy': facility['processing_cost_cy'],
+    }
+
+def surface_facility_trips(volume_cy, travel_time_hours, truck_capacity):
+    """Trip count and truck hours for hauling volume_cy to a facility and back"""
+    # Round trip (haul contaminated + return clean)
+    trip_time = (LOADING_TIME_HOURS + travel_time_hours + UNLOADING_TIME_HOURS +
+                 travel_time_hours + LOADING_TIME_HOURS)
+    
+    num_trips = math.ceil(volume_cy / truck_capacity)
+    total_truck_hours = num_trips * trip_time
+    return {'num_trips': num_trips, 'truck_hours': total_truck_hours}
+
+def surface_facility_costs(volume_cy, facility, distance_miles, distance_source, params, trips,
+                           fuel_delta=0.0, dated=False):
+    """Surface facility result dict from resolved parameters and a trip estimate"""
+    total_truck_hours = trips['truck_hours']
+    
+    # Costs
+    trucking_cost = total_truck_hours * params['truck_hourly_rate']
+    processing_cost = volume_cy * params['processing_cost_cy']
+    
+    # CO2 (trucking both ways but treatment is efficient)
+    total_fuel = TRUCK_FUEL_GPH * total_truck_hours
+    co2_lbs, co2_tons = calculate_co2_emissions(total_fuel)
+    fuel_adjustment = fuel_delta * total_fuel
+    
+    total_cost = trucking_cost + processing_cost + fuel_adjustment
+    cost_per_cy = total_cost / volume_cy
+    
+    # Timeline
+    turnaround_days = facility['typical_turnaround_days']
+    
+    result = {
+        'option_name': 'Clean Futures Surface Facility',
+        'total_cost': total_cost,
+        'cost_per_cy': cost_per_cy,
+        'project_days': turnaround_days,
+        'facility_name': facility['facility_name'],
+        'distance_miles': distance_miles,
+        'distance_source': distance_source,
+        'trucking_cost': trucking_cost,
+        'processing_cost': processing_cost,
+        'co2_tons': co2_tons,
+        'includes_backfill': True,
+        'soil_returned_clean': True
+    }
+    if dated:
+        result['fuel_adjustment'] = fuel_adjustment
+    return result
+
+@timed('calculate_surface_facility')
+def calculate_surface_facility(volume_cy, site_lat, site_lon, needs_backfill,
+                               tph_level, chloride_level, db, advanced_params=None, project_date=None):
+    """Calculate costs and metrics for Surface Facility option
+    
+    With a project_date, dated facility prices, the truck rate and the
+    diesel price in effect on that day are used (see pricing.py).
+    """
+    
+    # Find nearest CF facility (by drive time when routing on roads)
+    provider = get_distance_provider()
+    candidates = find_k_nearest_cf_facilities(site_lat, site_lon, db,
+                                              k=ROUTE_CANDIDATES if provider else 1)
+    
+    if not candidates:
+        return None
+    
+    facility, distance_miles, travel_time_hours, distance_source = select_haul_destination(
+        site_lat, site_lon, candidates, 'facility', provider
+    )
+    facility, rates, fuel_delta = dated_prices(db, 'clean_futures_facilities', facility, project_date)
+    
+    params = surface_facility_parameters(advanced_params, facility, rates)
+    trips = surface_facility_trips(volume_cy, travel_time_hours, params['truck_capacity'])
+    return surface_facility_costs(volume_cy, facility, distance_miles, distance_source, params, trips,
+                                  fuel_delta, dated=project_date is not None)
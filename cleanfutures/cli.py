@@ -0,0 +1,302 @@
+"""
+Command-line entry point: python -m cleanfutures <command> ...
+
+The raster command builds and queries the precomputed basin raster, the db
+command imports the facilities JSON into SQLite, and the serve command runs
+the HTTP/JSON API in cleanfutures.api under uvicorn.
+
+The batch command streams a CSV or Parquet file of sites through
+evaluate_batch() chunk by chunk and writes results as it goes, so memory
+stays bounded by the chunk size no matter how large the input is. With
+--workers, chunks are scored in a process pool and written back in input
+order. An .xlsx output path writes the multi-sheet report of
+cleanfutures.report instead, streamed the same way.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from .batch import evaluate_batch
+from .counties import COUNTIES_PATH_ENV_VAR
+from .facilities import DB_PATH_ENV_VAR, configure_facilities_database, load_facilities_database
+from .instrumentation import INSTRUMENT_ENV_VAR
+from .routing import ROAD_GRAPH_ENV_VAR, ROUTE_CACHE_ENV_VAR, configure_distance_provider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 50_000
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+EXCEL_SUFFIXES = ('.xlsx',)
+
+# ============================================================================
+# STREAMING READERS AND WRITERS
+# ============================================================================
+
+def _is_parquet(path):
+    return Path(path).suffix.lower() in PARQUET_SUFFIXES
+
+def read_site_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrames of at most chunksize sites from a CSV or Parquet file"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+    
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+class CsvResultWriter:
+    """Append result chunks to a CSV file, writing the header once"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._header = True
+    
+    def write(self, frame):
+        frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+        self._header = False
+    
+    def close(self):
+        if self._header:
+            pd.DataFrame().to_csv(self.path, index=False)
+
+class ParquetResultWriter:
+    """Append result chunks to a Parquet file as row groups
+    
+    The schema is fixed by the first chunk; columns that are entirely empty
+    there are typed as strings so later chunks can fill them.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+    
+    def write(self, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    
+        if self._writer is None:
+            schema = pa.Schema.from_pandas(frame, preserve_index=False)
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            self._writer = pq.ParquetWriter(self.path, schema.remove_metadata())
+        table = pa.Table.from_pandas(frame, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+    
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def open_result_writer(path, db=None):
+    """Writer for the output path, chosen by file extension
+    
+    db is the facilities database the results come from; an Excel report
+    lists its facilities.
+    """
+    if Path(path).suffix.lower() in EXCEL_SUFFIXES:
+        from .report import ExcelReportWriter
+    
+        return ExcelReportWriter(path, db)
+    return ParquetResultWriter(path) if _is_parquet(path) else CsvResultWriter(path)
+
+# ============================================================================
+# CHUNK EVALUATION
+# ============================================================================
+
+_worker_db = None
+
+def _init_worker(db, graph_path, cache_dir):
+    global _worker_db
+    _worker_db = db
+    if graph_path:
+        configure_distance_provider(graph_path, cache_dir)
+
+def _evaluate_chunk(sites):
+    """Input columns followed by the batch results for one chunk"""
+    results = evaluate_batch(sites, _worker_db)
+    return pd.concat([sites, results], axis=1)
+
+def evaluate_chunks(chunks, db, workers=1, graph_path=None, cache_dir=None):
+    """Yield evaluated chunks in input order
+    
+    With more than one worker, at most two chunks per worker are in flight,
+    which keeps memory bounded while every process stays busy.
+    """
+    if workers <= 1:
+        _init_worker(db, graph_path, cache_dir)
+        for sites in chunks:
+            yield _evaluate_chunk(sites)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(db, graph_path, cache_dir)) as pool:
+        pending = deque()
+        for sites in chunks:
+            pending.append(pool.submit(_evaluate_chunk, sites))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def run_batch(input_path, output_path, db, chunksize=DEFAULT_CHUNKSIZE, workers=1,
+              graph_path=None, cache_dir=None):
+    """Stream sites from input_path to output_path and return the row count"""
+    writer = open_result_writer(output_path, db)
+    rows = 0
+    started = time.perf_counter()
+    try:
+        for frame in evaluate_chunks(read_site_chunks(input_path, chunksize), db, workers,
+                                     graph_path, cache_dir):
+            writer.write(frame)
+            rows += len(frame)
+            elapsed = time.perf_counter() - started
+            logger.info(f"{rows:,} sites scored ({rows / max(elapsed, 1e-9):,.0f} sites/s)")
+    finally:
+        writer.close()
+    return rows
+
+# ============================================================================
+# ARGUMENT PARSING
+# ============================================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cleanfutures',
+                                     description="Clean Futures remediation engine")
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    batch = sub.add_parser('batch', help="Score a CSV or Parquet file of sites")
+    batch.add_argument('input', help="Sites file (.csv, .csv.gz or .parquet)")
+    batch.add_argument('-o', '--output', required=True,
+                       help="Results file; .parquet writes Parquet, .xlsx an Excel report, anything else CSV")
+    batch.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                       help=f"Sites per chunk (default {DEFAULT_CHUNKSIZE:,})")
+    batch.add_argument('--workers', type=int, default=1,
+                       help="Worker processes; 0 uses one per CPU (default 1)")
+    batch.add_argument('--facilities-db', default=None,
+                       help="Path to the facilities database (JSON or .sqlite)")
+    batch.add_argument('--counties', default=None,
+                       help="County boundary GeoJSON (default: the bundled Permian counties)")
+    batch.add_argument('--road-graph', default=None,
+                       help="Road graph for drive distances (default: straight line)")
+    batch.add_argument('--route-cache', default=None,
+                       help="Directory for precomputed drive-time tables")
+    batch.add_argument('-q', '--quiet', action='store_true', help="Only report the final summary")
+    
+    serve = sub.add_parser('serve', help="Run the HTTP/JSON API (requires uvicorn)")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--workers', type=int, default=1, help="Worker processes (default 1)")
+    serve.add_argument('--instrument', action='store_true',
+                       help="Time each request's stages (GET /metrics and JSON log lines)")
+    serve.add_argument('--facilities-db', default=None,
+                       help="Path to the facilities database (JSON or .sqlite)")
+    serve.add_argument('--counties', default=None,
+                       help="County boundary GeoJSON (default: the bundled Permian counties)")
+    serve.add_argument('--road-graph', default=None,
+                       help="Road graph for drive distances (default: straight line)")
+    serve.add_argument('--route-cache', default=None,
+                       help="Directory for precomputed drive-time tables")
+    
+    raster = sub.add_parser('raster', help="Build or query the precomputed recommendation raster")
+    raster_sub = raster.add_subparsers(dest='raster_command', required=True)
+    build = raster_sub.add_parser('build', help="Evaluate the basin grid for the standard profiles")
+    build.add_argument('-o', '--output-dir', default=None,
+                       help="Raster directory (default: $CLEANFUTURES_RASTER_DIR or ~/.cache/cleanfutures/raster)")
+    build.add_argument('--resolution', type=float, default=None, help="Grid spacing in degrees (default 0.01)")
+    build.add_argument('--facilities-db', default=None,
+                       help="Path to the facilities database (JSON or .sqlite)")
+    build.add_argument('--road-graph', default=None,
+                       help="Road graph for drive distances (default: straight line)")
+    build.add_argument('--route-cache', default=None,
+                       help="Directory for precomputed drive-time tables")
+    query = raster_sub.add_parser('query', help="Look up a point in a built raster")
+    query.add_argument('lat', type=float)
+    query.add_argument('lon', type=float)
+    query.add_argument('--profile', default='typical')
+    query.add_argument('-d', '--raster-dir', default=None)
+    
+    database = sub.add_parser('db', help="Manage the SQLite facilities database")
+    database_sub = database.add_subparsers(dest='db_command', required=True)
+    load = database_sub.add_parser('import', help="Import a facilities JSON file into SQLite")
+    load.add_argument('json', help="Facilities JSON file")
+    load.add_argument('sqlite', help="SQLite database (created if missing)")
+    load.add_argument('--prune', action='store_true',
+                      help="Delete facilities that are not in the JSON file")
+    return parser
+
+def main(argv=None):
+    """Run a command-line entry point"""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if getattr(args, 'quiet', False) else logging.INFO,
+                        format='%(message)s', stream=sys.stderr)
+    
+    if getattr(args, 'counties', None):
+        # Read lazily, here and in worker processes
+        os.environ[COUNTIES_PATH_ENV_VAR] = str(Path(args.counties).resolve())
+    
+    if args.command == 'batch':
+        if args.facilities_db:
+            configure_facilities_database(args.facilities_db)
+        db = load_facilities_database()
+        if args.road_graph:
+            configure_distance_provider(args.road_graph, args.route_cache)
+        workers = args.workers or os.cpu_count()
+    
+        started = time.perf_counter()
+        rows = run_batch(args.input, args.output, db, chunksize=args.chunksize, workers=workers,
+                         graph_path=args.road_graph, cache_dir=args.route_cache)
+        elapsed = time.perf_counter() - started
+        print(f"{rows:,} sites -> {args.output} in {elapsed:.1f} s", file=sys.stderr)
+    elif args.command == 'raster':
+        from .raster import DEFAULT_RESOLUTION_DEG, build_raster, load_raster
+    
+        if args.raster_command == 'build':
+            if args.facilities_db:
+                configure_facilities_database(args.facilities_db)
+            if args.road_graph:
+                configure_distance_provider(args.road_graph, args.route_cache)
+            raster = build_raster(load_facilities_database(), args.output_dir,
+                                  resolution=args.resolution or DEFAULT_RESOLUTION_DEG)
+            print(f"{' x '.join(map(str, raster.data.shape))} raster -> {raster.path} "
+                  f"in {raster.metadata['build_seconds']:.1f} s", file=sys.stderr)
+        else:
+            raster = load_raster(args.raster_dir)
+            if raster is None:
+                print("No raster found; run: python -m cleanfutures raster build", file=sys.stderr)
+                return 1
+            print(json.dumps(raster.query(args.lat, args.lon, args.profile), indent=2))
+    elif args.command == 'db':
+        from .sqlitedb import import_json_database
+    
+        counts = import_json_database(args.json, args.sqlite, prune=args.prune)
+        print(f"{counts['landfills']:,} landfills and {counts['clean_futures_facilities']:,} CF facilities "
+              f"-> {args.sqlite}", file=sys.stderr)
+    elif args.command == 'serve':
+        try:
+            import uvicorn
+        except ImportError:
+            print("The API server needs uvicorn: pip install uvicorn", file=sys.stderr)
+            return 1
+    
+        # Worker processes configure themselves from the environment
+        if args.facilities_db:
+            os.environ[DB_PATH_ENV_VAR] = str(Path(args.facilities_db).resolve())
+        if args.road_graph:
+            os.environ[ROAD_GRAPH_ENV_VAR] = str(Path(args.road_graph).resolve())
+        if args.route_cache:
+            os.environ[ROUTE_CACHE_ENV_VAR] = str(Path(args.route_cache).resolve())
+        if args.instrument:
+            os.environ[INSTRUMENT_ENV_VAR] = '1'
+        uvicorn.run('cleanfutures.api:app', host=args.host, port=args.port, workers=args.workers,
+                    access_log=False)
+    return 0
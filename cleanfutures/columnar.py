@@ -0,0 +1,103 @@
+"""
+Columnar, typed view of a facility table.
+
+FacilityTable holds one NumPy array per field instead of a list of dicts:
+float64 for numbers, bool for flags and object arrays for text. Each
+facility's latitude/longitude in radians, cos(latitude) and its 3-D unit
+vector are precomputed, so ranking every facility by distance from a point
+is a single matrix-vector product, and acceptance thresholds are checked as
+one boolean mask over the table rather than per-record dict lookups. The
+original records are kept for returning results.
+"""
+
+import math
+
+import numpy as np
+
+from .geo import haversine_distance
+
+class FacilityTable:
+    """Typed column arrays for a list of facility records"""
+    
+    __slots__ = ('records', 'columns', 'lat_rad', 'lon_rad', 'cos_lat', 'unit_vectors', '_limits')
+    
+    def __init__(self, records):
+        self.records = list(records)
+        fields = {}
+        for rec in self.records:
+            fields.update(dict.fromkeys(rec))
+        self.columns = {field: _typed_column([rec.get(field) for rec in self.records]) for field in fields}
+    
+        self.lat_rad = np.radians(self.column('latitude'))
+        self.lon_rad = np.radians(self.column('longitude'))
+        self.cos_lat = np.cos(self.lat_rad)
+        self.unit_vectors = np.stack([self.cos_lat * np.cos(self.lon_rad),
+                                      self.cos_lat * np.sin(self.lon_rad),
+                                      np.sin(self.lat_rad)], axis=1)
+        self._limits = {}
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __getitem__(self, field):
+        return self.columns[field]
+    
+    def column(self, field):
+        """Array of one field; all NaN if no record has it"""
+        values = self.columns.get(field)
+        if values is None:
+            return np.full(len(self.records), np.nan)
+        return values
+    
+    def mask(self, minimums):
+        """Boolean mask of records with record[field] >= minimum for every {field: minimum}"""
+        if not minimums:
+            return None
+        fields = tuple(minimums)
+        limits = self._limits.get(fields)
+        if limits is None:
+            # NaN (missing value) never satisfies a minimum
+            limits = np.stack([self.column(field).astype(float) for field in fields], axis=1)
+            self._limits[fields] = limits
+        return (limits >= np.array([float(minimums[field]) for field in fields])).all(axis=1)
+    
+    def nearest(self, lat, lon, k=1, mask=None):
+        """(index, distance_miles) of the k nearest records allowed by mask, closest first
+    
+        Records are ranked by the dot product of unit vectors (larger is
+        closer); only the returned ones get an exact haversine distance.
+        """
+        if k <= 0 or not self.records:
+            return []
+        lat_rad = math.radians(lat)
+        lon_rad = math.radians(lon)
+        cos_lat = math.cos(lat_rad)
+        point = np.array([cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad)])
+        closeness = self.unit_vectors @ point
+        if mask is not None:
+            closeness[~mask] = -np.inf
+    
+        if k == 1:
+            top = [int(np.argmax(closeness))]
+        else:
+            top = np.argpartition(-closeness, k - 1)[:k] if k < len(closeness) else np.arange(len(closeness))
+            top = top[np.lexsort((top, -closeness[top]))]
+    
+        results = []
+        for i in top:
+            if closeness[i] == -np.inf:
+                break
+            rec = self.records[i]
+            results.append((int(i), haversine_distance(lat, lon, rec['latitude'], rec['longitude'])))
+        return results
+
+def _typed_column(values):
+    """Bool, float64 or object array depending on what the values hold"""
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, bool) for value in present):
+        return np.array([bool(value) for value in values], dtype=bool)
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return np.array([np.nan if value is None else value for value in values], dtype=float)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
@@ -0,0 +1,305 @@
+"""
+County boundary lookup for state / county determination.
+
+County polygons are read once from a GeoJSON FeatureCollection - the bundled
+permian_counties.geojson, or any file named by CLEANFUTURES_COUNTIES (Census
+TIGER / cartographic boundary county files converted to GeoJSON work as-is)
+- and shared by every caller in the process.
+
+Candidate counties for a point come from a packed R-tree over the polygon
+bounding boxes. Each county's rings are prepared once as edge arrays, so the
+point-in-polygon test (even-odd ray casting over all rings, which handles
+holes and multi-part counties) is a short loop for one point and a few NumPy
+operations for a whole batch. Edges are grouped into latitude bands, so a
+point is only tested against the edges that span its latitude - a river
+border with hundreds of vertices costs no more than a survey line.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that overrides the county boundary file
+COUNTIES_PATH_ENV_VAR = 'CLEANFUTURES_COUNTIES'
+
+# Default boundary file shipped alongside the application
+DEFAULT_COUNTIES_PATH = Path(__file__).resolve().parent.parent / 'permian_counties.geojson'
+
+# Census state FIPS codes, for boundary files that carry STATEFP only
+STATE_FIPS = {'35': 'New Mexico', '48': 'Texas'}
+
+# Children per R-tree node
+NODE_CAPACITY = 8
+
+# Point x edge cells evaluated at once by the vectorized test
+MAX_TEST_CELLS = 2_000_000
+
+# Each county's edges are split into latitude bands of about this many edges
+EDGES_PER_BAND = 4
+
+# ============================================================================
+# BOUNDING-BOX R-TREE
+# ============================================================================
+
+def _union(boxes):
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+class BoxTree:
+    """Static R-tree over (min_x, min_y, max_x, max_y) boxes
+    
+    Packed bottom-up with Sort-Tile-Recursive: entries are sorted into
+    vertical slices by x, each slice into nodes by y, and the nodes are
+    packed the same way until one level fits in the root.
+    """
+    
+    def __init__(self, boxes):
+        self.boxes = [tuple(map(float, box)) for box in boxes]
+        level = [(box, i, None) for i, box in enumerate(self.boxes)]
+        while len(level) > NODE_CAPACITY:
+            level = self._pack(level)
+        self.root = level
+    
+    @staticmethod
+    def _pack(entries):
+        node_count = math.ceil(len(entries) / NODE_CAPACITY)
+        per_slice = math.ceil(math.sqrt(node_count)) * NODE_CAPACITY
+        by_x = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+        nodes = []
+        for start in range(0, len(by_x), per_slice):
+            column = sorted(by_x[start:start + per_slice], key=lambda e: e[0][1] + e[0][3])
+            for first in range(0, len(column), NODE_CAPACITY):
+                children = column[first:first + NODE_CAPACITY]
+                nodes.append((_union([c[0] for c in children]), None, children))
+        return nodes
+    
+    def query(self, x, y):
+        """Items (indices into boxes) whose box contains the point"""
+        found = []
+        stack = [self.root]
+        while stack:
+            for box, item, children in stack.pop():
+                if box[0] <= x <= box[2] and box[1] <= y <= box[3]:
+                    if children is None:
+                        found.append(item)
+                    else:
+                        stack.append(children)
+        found.sort()
+        return found
+
+# ============================================================================
+# PREPARED POLYGONS
+# ============================================================================
+
+class CountyPolygon:
+    """One county's rings, prepared for repeated point-in-polygon tests"""
+    
+    def __init__(self, name, state, rings):
+        self.name = name
+        self.state = state
+        edges = []
+        for ring in rings:
+            points = [(float(x), float(y)) for x, y in ring]
+            if points and points[0] != points[-1]:
+                points.append(points[0])
+            for (x1, y1), (x2, y2) in zip(points, points[1:]):
+                if y1 != y2:
+                    # Horizontal edges never cross the test ray
+                    edges.append((x1, y1, x2, y2))
+        if not edges:
+            raise ValueError(f"County {name!r} has no area")
+        self.edges = np.array(edges)
+        x = self.edges[:, [0, 2]]
+        y = self.edges[:, [1, 3]]
+        self.bbox = (x.min(), y.min(), x.max(), y.max())
+    
+        # Latitude bands: an edge belongs to every band its y-range touches.
+        # The vectorized test reads band b's edges from _band_edges[_band_starts[b]:_band_starts[b + 1]].
+        self._band_count = max(1, len(edges) // EDGES_PER_BAND)
+        self._band_height = (self.bbox[3] - self.bbox[1]) / self._band_count
+        low = self._band(y.min(axis=1))
+        high = self._band(y.max(axis=1))
+        members = [np.flatnonzero((low <= band) & (high >= band)) for band in range(self._band_count)]
+        self._band_starts = np.cumsum([0] + [len(m) for m in members])
+        self._band_edges = self.edges[np.concatenate(members)]
+        x1, y1, x2, y2 = self._band_edges.T
+        self._band_slopes = (x2 - x1) / (y2 - y1)
+        # (y1, y2, x1, dx/dy) per edge and band for the scalar test
+        self._bands = [[(y1, y2, x1, (x2 - x1) / (y2 - y1)) for x1, y1, x2, y2 in self.edges[m].tolist()]
+                       for m in members]
+    
+    def _band(self, y):
+        """Band index of latitudes (clamped; points outside the bbox cross no edges)"""
+        band = np.floor((np.asarray(y) - self.bbox[1]) / self._band_height)
+        return np.clip(band, 0, self._band_count - 1).astype(np.int64)
+    
+    def contains(self, x, y):
+        """True if (x, y) = (lon, lat) is inside the county"""
+        if not self.bbox[1] <= y < self.bbox[3]:
+            return False
+        band = min(int((y - self.bbox[1]) / self._band_height), self._band_count - 1)
+        inside = False
+        for y1, y2, x1, slope in self._bands[band]:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * slope:
+                inside = not inside
+        return inside
+    
+    def contains_many(self, x, y):
+        """Boolean array: which of the points (x, y arrays) are inside"""
+        bands = self._band(y)
+        starts = self._band_starts[bands]
+        counts = self._band_starts[bands + 1] - starts
+        inside = np.zeros(len(x), dtype=bool)
+        step = max(1, MAX_TEST_CELLS // max(int(counts.max(initial=0)), 1))
+        for first in range(0, len(x), step):
+            part = slice(first, first + step)
+            n = counts[part]
+            # One (point, edge) pair per edge in each point's band
+            point = np.repeat(np.arange(len(n)), n)
+            edge = np.repeat(starts[part] - np.cumsum(n) + n, n) + np.arange(n.sum())
+            px = x[part][point]
+            py = y[part][point]
+            x1, y1, _, y2 = self._band_edges[edge].T
+            crosses = ((y1 > py) != (y2 > py)) & (px < x1 + (py - y1) * self._band_slopes[edge])
+            inside[part] = np.bincount(point, weights=crosses, minlength=len(n)) % 2 == 1
+        return inside
+
+def _feature_rings(geometry):
+    if geometry['type'] == 'Polygon':
+        return list(geometry['coordinates'])
+    if geometry['type'] == 'MultiPolygon':
+        return [ring for polygon in geometry['coordinates'] for ring in polygon]
+    raise ValueError(f"Unsupported county geometry type {geometry['type']!r}")
+
+def _feature_state(properties):
+    state = properties.get('state') or properties.get('STATE_NAME')
+    if state:
+        return state
+    return STATE_FIPS.get(str(properties.get('STATEFP', '')).zfill(2), 'Unknown')
+
+# ============================================================================
+# COUNTY INDEX
+# ============================================================================
+
+class CountyIndex:
+    """Point -> (state, county) lookups over a set of county polygons
+    
+    County names are upper-cased to match the facilities database. Points
+    outside every polygon return None; if polygons overlap (slivers along
+    simplified borders) the first one in file order wins.
+    """
+    
+    def __init__(self, counties, source=None):
+        self.counties = list(counties)
+        self.source = source
+        self.tree = BoxTree([county.bbox for county in self.counties])
+        self._bboxes = np.array([county.bbox for county in self.counties]).reshape(-1, 4)
+    
+    @classmethod
+    def from_geojson(cls, document, source=None):
+        counties = []
+        for feature in document['features']:
+            properties = feature.get('properties') or {}
+            name = properties.get('name') or properties.get('NAME')
+            counties.append(CountyPolygon(str(name).upper(), _feature_state(properties),
+                                          _feature_rings(feature['geometry'])))
+        return cls(counties, source=source)
+    
+    @classmethod
+    def from_file(cls, path):
+        path = Path(path)
+        return cls.from_geojson(json.loads(path.read_text()), source=path)
+    
+    def __len__(self):
+        return len(self.counties)
+    
+    def locate(self, lat, lon):
+        """(state, county) for one point, or None outside every county"""
+        for i in self.tree.query(lon, lat):
+            county = self.counties[i]
+            if county.contains(lon, lat):
+                return county.state, county.name
+        return None
+    
+    def locate_many(self, lat, lon):
+        """Index of the containing county per point (-1 outside every county)
+    
+        lat, lon: arrays. Each county's bounding box narrows the points still
+        unassigned before its polygon test runs.
+        """
+        x = np.asarray(lon, dtype=float)
+        y = np.asarray(lat, dtype=float)
+        found = np.full(len(x), -1, dtype=np.int64)
+        pending = np.arange(len(x))
+        for i, county in enumerate(self.counties):
+            if not len(pending):
+                break
+            min_x, min_y, max_x, max_y = self._bboxes[i]
+            px = x[pending]
+            py = y[pending]
+            near = (px >= min_x) & (px <= max_x) & (py >= min_y) & (py <= max_y)
+            if not near.any():
+                continue
+            candidates = pending[near]
+            hit = candidates[county.contains_many(x[candidates], y[candidates])]
+            found[hit] = i
+            pending = pending[found[pending] < 0]
+        return found
+    
+    def names(self):
+        """(states, counties) arrays aligned with the county indices"""
+        return (np.array([county.state for county in self.counties], dtype=object),
+                np.array([county.name for county in self.counties], dtype=object))
+
+# ============================================================================
+# SHARED INDEX
+# ============================================================================
+
+_lock = threading.Lock()
+_path = None
+_index = None
+_loaded = False
+
+def counties_path():
+    """Configured path, else $CLEANFUTURES_COUNTIES, else the bundled file"""
+    if _path:
+        return _path
+    env_path = os.environ.get(COUNTIES_PATH_ENV_VAR)
+    return Path(env_path) if env_path else DEFAULT_COUNTIES_PATH
+
+def configure_counties(path):
+    """Use a different county boundary file (None for the default)"""
+    global _path, _index, _loaded
+    with _lock:
+        _path = Path(path) if path else None
+        _index = None
+        _loaded = False
+
+def get_county_index():
+    """The process-wide CountyIndex, loaded on first use
+    
+    Returns None if the boundary file is missing, so callers can fall back
+    to their approximate lookups.
+    """
+    global _index, _loaded
+    if _loaded:
+        return _index
+    with _lock:
+        if not _loaded:
+            path = counties_path()
+            try:
+                _index = CountyIndex.from_file(path)
+                logger.info("Loaded %d county boundaries from %s", len(_index), path)
+            except FileNotFoundError:
+                logger.warning("County boundaries not found at %s; state and county are approximated. "
+                               "Set %s to point at a county GeoJSON file.", path, COUNTIES_PATH_ENV_VAR)
+                _index = None
+            _loaded = True
+    return _index
@@ -0,0 +1,82 @@
+"""
+Single-site evaluation: location lookup, the three calculators and the
+recommendation, bundled the same way the results page consumes them.
+"""
+
+from .geo import determine_state_county, get_soil_type, get_regulatory_thresholds
+from .facilities import find_nearest_qualified_landfill
+from .calculators import (
+    calculate_dig_and_haul,
+    calculate_onsite_remediation,
+    calculate_surface_facility,
+)
+from .recommendation import generate_recommendation
+from .instrumentation import timed
+
+@timed('evaluate_site')
+def evaluate_site(analysis, db):
+    """Evaluate a site analysis dict and return location details, options and scores"""
+    
+    # Location details
+    state, county = determine_state_county(analysis['site_lat'], analysis['site_lon'], db)
+    soil_type = get_soil_type(analysis['site_lat'], analysis['site_lon'], state)
+    reg_thresholds = get_regulatory_thresholds(state)
+    
+    nearest_lf = find_nearest_qualified_landfill(
+        analysis['site_lat'],
+        analysis['site_lon'],
+        analysis['tph_level'],
+        analysis['chloride_level'],
+        analysis['needs_backfill'],
+        db
+    )
+    
+    # Option calculations
+    dig_haul = calculate_dig_and_haul(
+        analysis['volume_cy'],
+        analysis['site_lat'],
+        analysis['site_lon'],
+        analysis['needs_backfill'],
+        analysis['tph_level'],
+        analysis['chloride_level'],
+        db,
+        analysis.get('advanced_params'),
+        analysis.get('project_date')
+    )
+    
+    onsite = calculate_onsite_remediation(
+        analysis['volume_cy'],
+        analysis['site_lat'],
+        analysis['site_lon'],
+        analysis.get('soil_permeability', 'medium'),
+        analysis['tph_level'],
+        analysis['chloride_level'],
+        analysis.get('advanced_params')
+    )
+    
+    surface = calculate_surface_facility(
+        analysis['volume_cy'],
+        analysis['site_lat'],
+        analysis['site_lon'],
+        analysis['needs_backfill'],
+        analysis['tph_level'],
+        analysis['chloride_level'],
+        db,
+        analysis.get('advanced_params'),
+        analysis.get('project_date')
+    )
+    
+    recommended, scores = generate_recommendation(dig_haul, onsite, surface, analysis['priorities'])
+    
+    return {
+        'state': state,
+        'county': county,
+        'soil_type': soil_type,
+        'reg_thresholds': reg_thresholds,
+        'nearest_landfill': nearest_lf,
+        'dig_haul': dig_haul,
+        'onsite': onsite,
+        'surface': surface,
+        'recommended': recommended,
+        'scores': scores
+    }
@@ -0,0 +1,265 @@
+"""
+Facilities database access and nearest-facility lookups.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from .columnar import FacilityTable
+from .instrumentation import timed
+from .spatial import FacilityIndex
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that overrides the database location
+DB_PATH_ENV_VAR = 'CLEANFUTURES_FACILITIES_DB'
+
+# Default database shipped alongside the application
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / 'permian_facilities_db.json'
+
+# Acceptance fields indexed for threshold pruning, per facility table
+INDEX_THRESHOLD_FIELDS = {
+    'landfills': ('tph_max_mgkg', 'chloride_max_mgkg', 'backfill_available'),
+    'clean_futures_facilities': (),
+}
+
+# Tables up to this size are scanned with masks; larger ones use the k-d tree
+SCAN_MAX_FACILITIES = 2048
+
+# Database files with these suffixes are opened as SQLite
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+# ============================================================================
+# DATABASE LOADING
+# ============================================================================
+
+class FacilitiesDatabase(dict):
+    """Parsed facilities database plus metadata about the load
+    
+    Behaves exactly like the JSON dict ({'landfills': [...],
+    'clean_futures_facilities': [...]}). `version` is a content hash that
+    changes whenever the underlying file changes.
+    """
+    
+    def __init__(self, data, path=None, version=None, load_seconds=0.0):
+        super().__init__(data)
+        self.path = path
+        self.version = version
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self._indexes = {}
+        self._index_lock = threading.Lock()
+    
+    def __reduce__(self):
+        # Pickle as data + metadata (for process pools); tables and indexes are rebuilt lazily
+        return (FacilitiesDatabase, (dict(self), self.path, self.version, self.load_seconds))
+    
+    def _cached(self, kind, table, build):
+        key = (kind, table)
+        value = self._indexes.get(key)
+        if value is None:
+            with self._index_lock:
+                value = self._indexes.get(key)
+                if value is None:
+                    value = build()
+                    self._indexes[key] = value
+        return value
+    
+    def facility_table(self, table):
+        """Columnar view of one facility table, built on first use"""
+        return self._cached('table', table, lambda: FacilityTable(self.get(table, [])))
+    
+    def spatial_index(self, table):
+        """Spatial index over one facility table, built on first use"""
+        return self._cached('index', table, lambda: FacilityIndex(
+            self.get(table, []), INDEX_THRESHOLD_FIELDS.get(table, ())))
+    
+    def lookup_index(self, table):
+        """Index used for point lookups, or None when a columnar scan is faster"""
+        if len(self.get(table, [])) > SCAN_MAX_FACILITIES:
+            return self.spatial_index(table)
+        return None
+    
+    def stats(self):
+        """Record counts and load timing for display and logging"""
+        return {
+            'path': str(self.path) if self.path else None,
+            'version': self.version,
+            'landfills': len(self.get('landfills', [])),
+            'clean_futures_facilities': len(self.get('clean_futures_facilities', [])),
+            'load_seconds': self.load_seconds,
+            'loaded_at': self.loaded_at
+        }
+
+class FacilityStore:
+    """Process-wide cache of the facilities database
+    
+    The file is parsed once and shared by every caller. Each access does a
+    cheap stat() of the file; when its mtime or size changes the contents are
+    hashed and, if different, re-parsed - so the JSON can be edited live
+    without restarting the app. Paths ending in .sqlite/.sqlite3/.db open a
+    SQLite database instead (see sqlitedb.py), reloaded when its revision
+    changes.
+    """
+    
+    def __init__(self, path=None):
+        self._path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._db = None
+        self._signature = None
+    
+    @property
+    def path(self):
+        """Explicit path, else $CLEANFUTURES_FACILITIES_DB, else the bundled file"""
+        if self._path:
+            return self._path
+        env_path = os.environ.get(DB_PATH_ENV_VAR)
+        return Path(env_path) if env_path else DEFAULT_DB_PATH
+    
+    def configure(self, path):
+        """Point the store at a different database file"""
+        with self._lock:
+            self._path = Path(path) if path else None
+            self._db = None
+            self._signature = None
+    
+    def get(self):
+        """Return the cached database, reloading it if the file changed"""
+        path = self.path
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Facilities database not found at {path}. "
+                f"Set {DB_PATH_ENV_VAR} or pass --facilities-db to point at the JSON file."
+            ) from None
+    
+        signature = (str(path), stat.st_mtime_ns, stat.st_size)
+        if path.suffix.lower() in SQLITE_SUFFIXES:
+            # Committed writes land in the -wal file until a checkpoint
+            wal = path.with_name(path.name + '-wal')
+            if wal.exists():
+                wal_stat = wal.stat()
+                signature += (wal_stat.st_mtime_ns, wal_stat.st_size)
+        db = self._db
+        if db is not None and signature == self._signature:
+            return db
+    
+        with self._lock:
+            if self._db is not None and signature == self._signature:
+                return self._db
+    
+            start = time.perf_counter()
+            if path.suffix.lower() in SQLITE_SUFFIXES:
+                from .sqlitedb import SQLiteFacilitiesDatabase, sqlite_version
+                version = sqlite_version(path)
+            else:
+                raw = path.read_bytes()
+                version = hashlib.sha256(raw).hexdigest()[:16]
+    
+            if self._db is not None and self._db.version == version and self._db.path == path:
+                # Touched but unchanged - keep the parsed copy
+                self._signature = signature
+                return self._db
+    
+            if path.suffix.lower() in SQLITE_SUFFIXES:
+                db = SQLiteFacilitiesDatabase(path, version=version,
+                                              load_seconds=time.perf_counter() - start)
+            else:
+                db = FacilitiesDatabase(json.loads(raw), path=path, version=version,
+                                        load_seconds=time.perf_counter() - start)
+            self._db = db
+            self._signature = signature
+    
+        stats = db.stats()
+        logger.info("Loaded facilities database %s (version %s): %d landfills, %d CF facilities in %.1f ms",
+                    stats['path'], stats['version'], stats['landfills'],
+                    stats['clean_futures_facilities'], stats['load_seconds'] * 1000)
+        return db
+    
+    def stats(self):
+        """Stats for the currently cached database (None if nothing loaded yet)"""
+        return self._db.stats() if self._db is not None else None
+
+_store = FacilityStore()
+
+def get_facility_store():
+    """Return the process-wide facility store"""
+    return _store
+
+def configure_facilities_database(path):
+    """Set the facilities database path for the process-wide store"""
+    _store.configure(path)
+
+@timed('db_load')
+def load_facilities_database():
+    """Load the facilities database (cached; reloaded when the file changes)"""
+    return _store.get()
+
+# ============================================================================
+# NEAREST FACILITY LOOKUPS
+# ============================================================================
+
+def facility_table(db, table):
+    """Columnar view of a facility table (cached on a FacilitiesDatabase)"""
+    if isinstance(db, FacilitiesDatabase):
+        return db.facility_table(table)
+    return FacilityTable(db.get(table, []))
+
+def _spatial_index(db, table):
+    """The database's lookup index, or None to scan the columnar table"""
+    if isinstance(db, FacilitiesDatabase):
+        return db.lookup_index(table)
+    return None
+
+def landfill_minimums(tph_level, chloride_level, needs_backfill):
+    """Acceptance thresholds a landfill must meet, as index minimums"""
+    minimums = {}
+    if tph_level > 0:
+        minimums['tph_max_mgkg'] = tph_level
+    if chloride_level > 0:
+        minimums['chloride_max_mgkg'] = chloride_level
+    if needs_backfill:
+        minimums['backfill_available'] = True
+    return minimums
+
+@timed('nearest_landfill_lookup')
+def find_k_nearest_qualified_landfills(lat, lon, tph_level, chloride_level, needs_backfill, db, k=1):
+    """Find the k nearest landfills that accept the contamination levels, closest first"""
+    minimums = landfill_minimums(tph_level, chloride_level, needs_backfill)
+    index = _spatial_index(db, 'landfills')
+    if index is not None:
+        return [{'landfill': lf, 'distance_miles': distance}
+                for lf, distance in index.nearest(lat, lon, k, minimums)]
+    
+    landfills = facility_table(db, 'landfills')
+    return [{'landfill': landfills.records[i], 'distance_miles': distance}
+            for i, distance in landfills.nearest(lat, lon, k, landfills.mask(minimums))]
+
+def find_nearest_qualified_landfill(lat, lon, tph_level, chloride_level, needs_backfill, db):
+    """Find the nearest landfill that accepts the contamination levels"""
+    nearest = find_k_nearest_qualified_landfills(lat, lon, tph_level, chloride_level,
+                                                 needs_backfill, db, k=1)
+    return nearest[0] if nearest else None
+
+@timed('nearest_cf_facility_lookup')
+def find_k_nearest_cf_facilities(lat, lon, db, k=1):
+    """Find the k nearest Clean Futures facilities, closest first"""
+    index = _spatial_index(db, 'clean_futures_facilities')
+    if index is not None:
+        return [{'facility': cf, 'distance_miles': distance}
+                for cf, distance in index.nearest(lat, lon, k)]
+    
+    facilities = facility_table(db, 'clean_futures_facilities')
+    return [{'facility': facilities.records[i], 'distance_miles': distance}
+            for i, distance in facilities.nearest(lat, lon, k)]
+
+def find_nearest_cf_facility(lat, lon, db):
+    """Find the nearest Clean Futures facility"""
+    nearest = find_k_nearest_cf_facilities(lat, lon, db, k=1)
+    return nearest[0] if nearest else None
@@ -0,0 +1,112 @@
+"""
+Geospatial helpers for the Permian Basin recommendation engine.
+
+Distance calculations, state/county lookup, soil classification and
+regulatory thresholds. Pure Python - no UI dependencies.
+"""
+
+import math
+
+from .counties import get_county_index
+from .instrumentation import timed
+
+EARTH_RADIUS_MILES = 3959
+
+# ============================================================================
+# DISTANCE
+# ============================================================================
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance between two GPS coordinates in miles"""
+    R = EARTH_RADIUS_MILES
+    
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+    
+    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    
+    return R * c
+
+# ============================================================================
+# LOCATION LOOKUPS
+# ============================================================================
+
+# Texas / New Mexico line in the Permian: the 32nd parallel, then the
+# meridian at 103°04' W northwards
+TX_NM_BORDER_LAT = 32.0
+TX_NM_BORDER_LON = -103.0647
+
+def state_from_border(lat, lon):
+    """Texas or New Mexico from the state line alone"""
+    return "New Mexico" if lat >= TX_NM_BORDER_LAT and lon < TX_NM_BORDER_LON else "Texas"
+
+def county_representatives(db):
+    """[(county, lat, lon)] using the first landfill listed in each county"""
+    seen = {}
+    for lf in db['landfills']:
+        if lf['county'] not in seen:
+            seen[lf['county']] = (lf['county'], lf['latitude'], lf['longitude'])
+    return list(seen.values())
+
+def nearest_county(lat, lon, db):
+    """County of the nearest representative landfill (approximate fallback)"""
+    best = None
+    best_distance = math.inf
+    for county, county_lat, county_lon in county_representatives(db):
+        distance = haversine_distance(lat, lon, county_lat, county_lon)
+        if distance < best_distance:
+            best, best_distance = county, distance
+    return best or "Unknown"
+
+@timed('determine_state_county')
+def determine_state_county(lat, lon, db):
+    """Determine state and county from GPS coordinates
+    
+    Uses the county boundary index (counties.py). Points outside its
+    coverage fall back to the state line and the nearest landfill's county.
+    """
+    index = get_county_index()
+    found = index.locate(lat, lon) if index is not None else None
+    if found is not None:
+        return found
+    return state_from_border(lat, lon), nearest_county(lat, lon, db)
+
+def get_soil_type(lat, lon, state):
+    """Estimate soil type based on location in Permian Basin"""
+    # Simplified soil classification for Permian Basin
+    # In production, this would query USDA Web Soil Survey or similar database
+    
+    # Eastern Permian (more clay-rich)
+    if lon > -102.0:
+        return "Clay Loam / Silty Clay"
+    # Central Permian (mixed)
+    elif lon > -103.5:
+        return "Sandy Clay Loam / Caliche"
+    # Western Permian (more sandy)
+    else:
+        return "Sandy Loam / Desert Soils"
+
+def get_regulatory_thresholds(state):
+    """Get soil regulatory thresholds for TPH and Chlorides"""
+    # Texas TCEQ Protective Concentration Levels (PCLs)
+    # New Mexico NMED Soil Screening Levels (SSLs)
+    
+    if state == "Texas":
+        return {
+            'tph_residential_mgkg': 100,
+            'tph_industrial_mgkg': 500,
+            'chloride_soil_mgkg': 'Not directly regulated in soil; groundwater standard: 300 mg/L',
+            'regulatory_agency': 'TCEQ (Texas Commission on Environmental Quality)',
+            'notes': 'Risk-based, site-specific cleanup levels may vary'
+        }
+    else:  # New Mexico
+        return {
+            'tph_residential_mgkg': 100,
+            'tph_industrial_mgkg': 1000,
+            'chloride_soil_mgkg': 'Not directly regulated in soil; groundwater standard: 250 mg/L',
+            'regulatory_agency': 'NMED (New Mexico Environment Department)',
+            'notes': 'Risk-based corrective action (RBCA) standards apply'
+        }
@@ -0,0 +1,299 @@
+"""
+Append-only history of evaluated analyses.
+
+Every analysis the app evaluates is stored in a SQLite file with its inputs,
+its evaluate_site() result and a UTC timestamp, for audit trails and trend
+reporting. The inputs and result are kept whole as JSON; the searchable
+fields - state, county, recommended option, the recommended option's total
+cost, volume and coordinates - are copied into plain columns on insert and
+indexed for the searches the history page offers. Triggers reject updates
+and deletes, so an entry is never changed once written.
+
+Pages are read with keyset pagination (newest first, continuing from the
+last row of the previous page), so the cost of a page does not grow with how
+far back it is. Summary rows never parse the stored JSON; get() loads one
+full entry.
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that overrides the history file
+HISTORY_PATH_ENV_VAR = 'CLEANFUTURES_HISTORY_DB'
+
+# Default history file, per user
+DEFAULT_HISTORY_PATH = Path.home() / '.local' / 'share' / 'cleanfutures' / 'history.sqlite'
+
+DEFAULT_PAGE_SIZE = 50
+
+# Seconds a writer waits for another process's write to finish
+BUSY_TIMEOUT_SECONDS = 30
+
+# Summary columns copied out of each entry for searching: name -> SQL type
+SUMMARY_FIELDS = {
+    'state': 'TEXT',
+    'county': 'TEXT',
+    'recommended': 'TEXT',
+    'total_cost': 'REAL',
+    'volume_cy': 'REAL',
+    'site_lat': 'REAL',
+    'site_lon': 'REAL',
+}
+
+# Every search index ends in created_at (plus the implicit rowid), so
+# filtered pages come out of the index already in page order. The last one
+# covers trends(), which then never reads the (large) table rows.
+INDEXES = (('created_at',), ('county', 'created_at'), ('recommended', 'created_at'), ('total_cost',),
+           ('created_at', 'recommended', 'total_cost'))
+
+SUMMARY_COLUMNS = ('id', 'created_at', 'source') + tuple(SUMMARY_FIELDS)
+INSERT_COLUMNS = ('created_at', 'source', 'db_version', 'analysis', 'result') + tuple(SUMMARY_FIELDS)
+
+# Trend periods -> length of the created_at prefix they group by
+TREND_PERIODS = {'year': 4, 'month': 7, 'day': 10}
+
+# ============================================================================
+# SCHEMA
+# ============================================================================
+
+def _schema():
+    columns = ["id INTEGER PRIMARY KEY", "created_at TEXT NOT NULL", "source TEXT", "db_version TEXT",
+               "analysis TEXT NOT NULL", "result TEXT NOT NULL"]
+    columns += [f"{name} {sql_type}" for name, sql_type in SUMMARY_FIELDS.items()]
+    statements = [f"CREATE TABLE IF NOT EXISTS analyses ({', '.join(columns)})"]
+    for index in INDEXES:
+        statements.append(f"CREATE INDEX IF NOT EXISTS analyses_{'_'.join(index)} ON analyses({', '.join(index)})")
+    for event in ('UPDATE', 'DELETE'):
+        statements.append(f"""CREATE TRIGGER IF NOT EXISTS analyses_no_{event.lower()} BEFORE {event} ON analyses
+            BEGIN SELECT RAISE(ABORT, 'analysis history is append-only'); END""")
+    return statements
+
+def _jsonable(value):
+    """Strict-JSON copy of a result: NumPy values unwrapped, NaN and infinity as null"""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'tolist'):
+        return _jsonable(value.tolist())
+    return str(value)
+
+def _timestamp(moment=None):
+    """Fixed-width UTC timestamp, so text order is time order"""
+    moment = moment or datetime.now(timezone.utc)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+def _date_bound(value, end=False):
+    """created_at bound for a date, datetime or ISO string; end bounds are exclusive"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if 'T' in value else date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return _timestamp(value)
+    if end:
+        value += timedelta(days=1)
+    return value.isoformat()
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class AnalysisHistory:
+    """Append-only analysis store in a SQLite file
+    
+    Safe to share between threads (each gets its own connection) and
+    between processes (WAL mode; writers wait for each other).
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._insert = (f"INSERT INTO analyses ({', '.join(INSERT_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(INSERT_COLUMNS))})")
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+        with conn:
+            for statement in _schema():
+                conn.execute(statement)
+    
+    def connection(self):
+        """Connection for the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS)
+            conn.row_factory = sqlite3.Row
+            # With WAL, a crash can lose at most the last commit, never corrupt the file
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def _row(self, analysis, result, source, db_version, created_at):
+        analysis = _jsonable(analysis)
+        result = _jsonable(result)
+        recommended = result.get('recommended')
+        option = result.get(recommended) if recommended else None
+        return (_timestamp(created_at), source, None if db_version is None else str(db_version),
+                json.dumps(analysis, separators=(',', ':')), json.dumps(result, separators=(',', ':')),
+                result.get('state'), result.get('county'), recommended, option['total_cost'] if option else None,
+                analysis.get('volume_cy'), analysis.get('site_lat'), analysis.get('site_lon'))
+    
+    def record(self, analysis, result, source='app', db_version=None, created_at=None):
+        """Append one analysis and its evaluate_site() result; returns the entry id"""
+        conn = self.connection()
+        with conn:
+            cursor = conn.execute(self._insert, self._row(analysis, result, source, db_version, created_at))
+        return cursor.lastrowid
+    
+    def record_many(self, entries, source='app', db_version=None):
+        """Append (analysis, result) pairs in one transaction; returns the count"""
+        conn = self.connection()
+        with conn:
+            cursor = conn.executemany(self._insert, (self._row(analysis, result, source, db_version, None)
+                                                     for analysis, result in entries))
+        return cursor.rowcount
+    
+    def _where(self, county=None, state=None, recommended=None, date_from=None, date_to=None,
+               min_cost=None, max_cost=None):
+        conditions, params = [], []
+        for column, value in (('county', county), ('state', state), ('recommended', recommended)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if date_from is not None:
+            conditions.append("created_at >= ?")
+            params.append(_date_bound(date_from))
+        if date_to is not None:
+            conditions.append("created_at < ?")
+            params.append(_date_bound(date_to, end=True))
+        if min_cost is not None:
+            conditions.append("total_cost >= ?")
+            params.append(float(min_cost))
+        if max_cost is not None:
+            conditions.append("total_cost <= ?")
+            params.append(float(max_cost))
+        return conditions, params
+    
+    def search(self, after=None, limit=DEFAULT_PAGE_SIZE, **filters):
+        """One page of summary rows, newest first
+    
+        filters: county, state, recommended, date_from, date_to (inclusive
+        dates), min_cost and max_cost (the recommended option's total cost).
+        Returns {'rows': [dict], 'next': cursor}; pass the cursor back as
+        `after` for the following page. next is None on the last page.
+        """
+        conditions, params = self._where(**filters)
+        if after is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM analyses"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = [dict(row) for row in self.connection().execute(sql, params + [limit + 1])]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]['created_at'], rows[-1]['id'])
+        return {'rows': rows, 'next': next_cursor}
+    
+    def count(self, **filters):
+        """Number of entries matching the search() filters"""
+        conditions, params = self._where(**filters)
+        sql = "SELECT COUNT(*) FROM analyses"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return self.connection().execute(sql, params).fetchone()[0]
+    
+    def get(self, entry_id):
+        """Full entry (summary fields plus analysis, result and db_version), or None"""
+        row = self.connection().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)}, db_version, analysis, result FROM analyses WHERE id = ?",
+            (entry_id,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['analysis'] = json.loads(entry['analysis'])
+        entry['result'] = json.loads(entry['result'])
+        return entry
+    
+    def counties(self):
+        """Distinct counties in the history, sorted"""
+        return [row[0] for row in self.connection().execute(
+            "SELECT DISTINCT county FROM analyses WHERE county IS NOT NULL ORDER BY county")]
+    
+    def trends(self, period='month', **filters):
+        """Entry count and average recommended cost per period and recommended option
+    
+        Returns a list of {'period', 'recommended', 'analyses', 'avg_cost'}
+        dicts in period order; filters are those of search().
+        """
+        prefix = TREND_PERIODS[period]
+        conditions, params = self._where(**filters)
+        sql = (f"SELECT substr(created_at, 1, {prefix}) AS period, recommended, COUNT(*) AS analyses, "
+               f"AVG(total_cost) AS avg_cost FROM analyses")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " GROUP BY period, recommended ORDER BY period, recommended"
+        return [dict(row) for row in self.connection().execute(sql, params)]
+    
+    def __len__(self):
+        return self.count()
+
+# ============================================================================
+# SHARED STORE
+# ============================================================================
+
+_lock = threading.Lock()
+_path = None
+_history = None
+_loaded = False
+
+def history_path():
+    """Configured path, else $CLEANFUTURES_HISTORY_DB, else the per-user default"""
+    if _path:
+        return _path
+    env_path = os.environ.get(HISTORY_PATH_ENV_VAR)
+    return Path(env_path) if env_path else DEFAULT_HISTORY_PATH
+
+def configure_history(path):
+    """Use a different history file (None for the default)"""
+    global _path, _history, _loaded
+    with _lock:
+        _path = Path(path) if path else None
+        _history = None
+        _loaded = False
+
+def get_analysis_history():
+    """The process-wide AnalysisHistory, opened on first use
+    
+    Returns None if the history file cannot be opened (e.g. a read-only
+    home directory), so the app keeps working without history.
+    """
+    global _history, _loaded
+    if _loaded:
+        return _history
+    with _lock:
+        if not _loaded:
+            path = history_path()
+            try:
+                _history = AnalysisHistory(path)
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("Analysis history unavailable at %s (%s). Set %s to a writable path.",
+                               path, exc, HISTORY_PATH_ENV_VAR)
+                _history = None
+            _loaded = True
+    return _history
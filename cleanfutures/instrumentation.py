@@ -0,0 +1,229 @@
+"""
+Opt-in wall-time instrumentation of the hot paths.
+
+Stages are timed with `with stage('name'):` blocks or the @timed('name')
+decorator. Instrumentation is off unless CLEANFUTURES_INSTRUMENT is set (or
+enable() is called); while off, a stage costs one flag check, so the hooks
+stay in place in production code.
+
+While on, every stage adds its call count and wall time to process-wide
+totals, exported in the Prometheus text format by prometheus_text(). A
+trace() block (one results page render, one API request) additionally
+collects the stages run inside it, in order, and logs them as one JSON
+line on the cleanfutures.instrumentation logger when it ends. Stages nest:
+a calculator's time includes the facility lookups it makes.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that turns instrumentation on ("1", "true", "yes")
+INSTRUMENT_ENV_VAR = 'CLEANFUTURES_INSTRUMENT'
+
+METRIC_PREFIX = 'cleanfutures'
+
+_enabled = os.environ.get(INSTRUMENT_ENV_VAR, '').strip().lower() in ('1', 'true', 'yes', 'on')
+_lock = threading.Lock()
+_totals = {}
+_current_trace = contextvars.ContextVar('cleanfutures_trace', default=None)
+
+def enable(enabled=True):
+    """Turn instrumentation on or off for the process"""
+    global _enabled
+    _enabled = bool(enabled)
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Clear the process-wide totals"""
+    with _lock:
+        _totals.clear()
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+class _Stage:
+    """Times one block and records it in the totals and the active trace"""
+    
+    __slots__ = ('name', 'trace', 'start')
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def __enter__(self):
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.trace._enter(self.name)
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        seconds = end - self.start
+        with _lock:
+            total = _totals.get(self.name)
+            if total is None:
+                _totals[self.name] = [1, seconds, seconds]
+            else:
+                total[0] += 1
+                total[1] += seconds
+                total[2] = max(total[2], seconds)
+        if self.trace is not None:
+            self.trace._exit(self.name, seconds, end)
+        return False
+
+class _NullStage:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return None
+    
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def stage(name):
+    """Context manager timing a block as stage `name` (no-op while disabled)"""
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+def timed(name):
+    """Decorator timing every call of a function as stage `name`"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def lap(name):
+    """Record the time since the last stage or lap ended in the active trace as stage `name`
+    
+    For sequential sections of a page (rendering, table building) that are
+    not worth wrapping in a block each. Does nothing outside a trace.
+    """
+    trace = _current_trace.get()
+    if trace is None or not _enabled:
+        return
+    now = time.perf_counter()
+    seconds = now - trace._last
+    with _lock:
+        total = _totals.setdefault(name, [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += seconds
+        total[2] = max(total[2], seconds)
+    trace._enter(name)
+    trace._exit(name, seconds, now)
+
+# ============================================================================
+# TRACES
+# ============================================================================
+
+class Trace:
+    """Stages run during one page render or request, in first-run order"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.seconds = None
+        self.started_at = time.time()
+        self._start = self._last = time.perf_counter()
+        self._depth = 0
+    
+    def _enter(self, name):
+        if name not in self.stages:
+            self.stages[name] = {'stage': name, 'depth': self._depth, 'calls': 0, 'seconds': 0.0}
+        self._depth += 1
+    
+    def _exit(self, name, seconds, end):
+        self._depth -= 1
+        entry = self.stages[name]
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        self._last = end
+    
+    def rows(self):
+        """One dict per stage: stage, depth (nesting level), calls and seconds"""
+        return [dict(entry) for entry in self.stages.values()]
+    
+    def to_dict(self):
+        return {
+            'event': 'stage_timings',
+            'trace': self.name,
+            'started_at': self.started_at,
+            'seconds': self.seconds,
+            'stages': {entry['stage']: {'calls': entry['calls'], 'seconds': round(entry['seconds'], 6)}
+                       for entry in self.stages.values()},
+        }
+
+class _TraceBlock:
+    __slots__ = ('trace', 'token')
+    
+    def __init__(self, name):
+        self.trace = Trace(name)
+    
+    def __enter__(self):
+        self.token = _current_trace.set(self.trace)
+        return self.trace
+    
+    def __exit__(self, *exc):
+        _current_trace.reset(self.token)
+        self.trace.seconds = time.perf_counter() - self.trace._start
+        logger.info(json.dumps(self.trace.to_dict()))
+        return False
+
+def trace(name):
+    """Context manager collecting the stages of one unit of work
+    
+    Yields a Trace (None while disabled); its timings are logged as one JSON
+    line when the block exits.
+    """
+    return _TraceBlock(name) if _enabled else _NULL_STAGE
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def stage_totals():
+    """{stage: {'calls', 'seconds', 'max_seconds'}} since start or reset()"""
+    with _lock:
+        return {name: {'calls': calls, 'seconds': seconds, 'max_seconds': longest}
+                for name, (calls, seconds, longest) in sorted(_totals.items())}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_metric(name, metric_type, help_text, samples):
+    """Prometheus text lines for one metric; samples is [(suffix, labels, value)]"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for suffix, labels, value in samples:
+        label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        lines.append(f"{name}{suffix}{{{label_text}}} {value:.9g}" if label_text
+                     else f"{name}{suffix} {value:.9g}")
+    return lines
+
+def prometheus_text(extra_lines=()):
+    """Stage totals in the Prometheus text exposition format"""
+    totals = stage_totals()
+    lines = format_metric(f'{METRIC_PREFIX}_instrumentation_enabled', 'gauge',
+                          "1 while stage timing is switched on", [('', {}, 1 if _enabled else 0)])
+    lines += format_metric(
+        f'{METRIC_PREFIX}_stage_seconds', 'summary', "Wall time spent in each instrumented stage",
+        [sample for name, total in totals.items()
+         for sample in (('_sum', {'stage': name}, total['seconds']), ('_count', {'stage': name}, total['calls']))])
+    lines += format_metric(f'{METRIC_PREFIX}_stage_max_seconds', 'gauge', "Longest single call of each stage",
+                           [('', {'stage': name}, total['max_seconds']) for name, total in totals.items()])
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
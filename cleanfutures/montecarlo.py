@@ -0,0 +1,209 @@
+"""
+Monte Carlo uncertainty analysis for cost, duration and CO2.
+
+Model constants (haul speed, loading/unloading time, base treatment days,
+CO2 per gallon) and any advanced_params rate can be given a probability
+distribution. Samples are drawn and evaluated in vectorized NumPy batches
+through the same kernels as the calculators, and summarized as P10/P50/P90
+per option plus the probability that each option is the one recommended.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .calculators import (
+    AVG_SPEED_MPH,
+    LOADING_TIME_HOURS,
+    UNLOADING_TIME_HOURS,
+    BASE_TREATMENT_DAYS,
+    CO2_LBS_PER_GALLON,
+)
+from .sweep import METRICS, evaluate_grid, resolve_site
+from .vectorized import OPTION_KEYS
+
+# Inputs that accept a distribution, with their nominal values (None = site/rate base case)
+UNCERTAIN_INPUTS = {
+    'avg_speed_mph': AVG_SPEED_MPH,
+    'loading_time': LOADING_TIME_HOURS,
+    'unloading_time': UNLOADING_TIME_HOURS,
+    'base_treatment_days': BASE_TREATMENT_DAYS,
+    'co2_lbs_per_gallon': CO2_LBS_PER_GALLON,
+    'truck_capacity_cy': None,
+    'num_trucks': None,
+    'truck_hourly_rate': None,
+    'excavator_rate': None,
+    'loader_rate': None,
+    'work_hours_per_day': None,
+    'disposal_cost_cy': None,
+    'backfill_cost_cy': None,
+    'onsite_processing_cost_cy': None,
+    'surface_processing_cost_cy': None,
+}
+
+# Inputs that must stay whole numbers when sampled
+INTEGER_INPUTS = ('num_trucks',)
+
+DEFAULT_BATCH_SIZE = 50_000
+PERCENTILES = (10, 50, 90)
+
+# ============================================================================
+# DISTRIBUTIONS
+# ============================================================================
+
+def sample_distribution(spec, size, rng):
+    """Draw samples for one input
+    
+    spec is a number (fixed) or a tuple:
+      ('uniform', low, high)
+      ('triangular', low, mode, high)
+      ('normal', mean, sd)
+      ('lognormal', median, sigma)
+      ('choice', [values], [probabilities])
+    """
+    if np.isscalar(spec):
+        return np.full(size, float(spec))
+    
+    kind, *args = spec
+    if kind == 'uniform':
+        return rng.uniform(args[0], args[1], size)
+    if kind == 'triangular':
+        low, mode, high = args
+        if low == high:
+            return np.full(size, float(mode))
+        return rng.triangular(low, mode, high, size)
+    if kind == 'normal':
+        return rng.normal(args[0], args[1], size)
+    if kind == 'lognormal':
+        return args[0] * np.exp(rng.normal(0.0, args[1], size))
+    if kind == 'choice':
+        return rng.choice(np.asarray(args[0]), size, p=args[1] if len(args) > 1 else None)
+    raise ValueError(f"Unknown distribution '{kind}'")
+
+def spread(nominal, low_pct, high_pct=None):
+    """Triangular distribution from nominal - low_pct% to nominal + high_pct%"""
+    high_pct = low_pct if high_pct is None else high_pct
+    return ('triangular', nominal * (1 - low_pct / 100), nominal, nominal * (1 + high_pct / 100))
+
+# ============================================================================
+# SIMULATION
+# ============================================================================
+
+class MonteCarloResult:
+    """Sampled metrics per option and the recommended option per sample"""
+    
+    def __init__(self, samples, options, recommended):
+        self.samples = samples
+        self.options = options
+        self.recommended = recommended
+    
+    @property
+    def n_samples(self):
+        return len(self.recommended)
+    
+    def recommendation_probability(self):
+        """Probability that each option is recommended"""
+        counts = np.bincount(self.recommended, minlength=len(OPTION_KEYS))
+        return {key: counts[i] / self.n_samples for i, key in enumerate(OPTION_KEYS)}
+    
+    def summary(self):
+        """P10/P50/P90 and mean of every metric, one row per option"""
+        probability = self.recommendation_probability()
+        rows = []
+        for key in OPTION_KEYS:
+            metrics = self.options.get(key)
+            if metrics is None:
+                continue
+            row = {'option': key, 'p_recommended': probability[key]}
+            for metric in METRICS:
+                values = metrics[metric]
+                p10, p50, p90 = np.percentile(values, PERCENTILES)
+                row.update({f'{metric}_p10': p10, f'{metric}_p50': p50,
+                            f'{metric}_p90': p90, f'{metric}_mean': values.mean()})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+def run_monte_carlo(analysis, db, distributions, n_samples=100_000, seed=None,
+                    batch_size=DEFAULT_BATCH_SIZE, site=None):
+    """Simulate a site's three options under uncertain inputs
+    
+    distributions: {input: spec} using UNCERTAIN_INPUTS names and the specs
+    accepted by sample_distribution(). Inputs left out stay at their
+    deterministic values.
+    """
+    unknown = [name for name in distributions if name not in UNCERTAIN_INPUTS]
+    if unknown:
+        raise ValueError(f"No distribution support for: {', '.join(unknown)}")
+    
+    site = site or resolve_site(analysis, db)
+    rng = np.random.default_rng(seed)
+    
+    samples = {name: np.empty(n_samples) for name in distributions}
+    options = {key: None for key in OPTION_KEYS}
+    recommended = np.empty(n_samples, dtype=np.int64)
+    
+    for start in range(0, n_samples, batch_size):
+        stop = min(start + batch_size, n_samples)
+        size = stop - start
+        
+        values = dict(site['base'])
+        for name, spec in distributions.items():
+            drawn = sample_distribution(spec, size, rng)
+            if name in INTEGER_INPUTS:
+                drawn = np.maximum(np.round(drawn), 1)
+            samples[name][start:stop] = drawn
+            values[name] = drawn
+        
+        batch_options, _, batch_recommended = evaluate_grid(site, values, (size,))
+        recommended[start:stop] = batch_recommended
+        
+        for key, metrics in batch_options.items():
+            if metrics is None:
+                continue
+            if options[key] is None:
+                options[key] = {metric: np.empty(n_samples) for metric in METRICS}
+            for metric in METRICS:
+                options[key][metric][start:stop] = np.broadcast_to(metrics[metric], (size,))
+    
+    return MonteCarloResult(samples, options, recommended)
+
+# ============================================================================
+# PORTFOLIO RUNS
+# ============================================================================
+
+_worker_db = None
+
+def _init_worker(db):
+    global _worker_db
+    _worker_db = db
+
+def _simulate_site(args):
+    analysis, distributions, n_samples, seed = args
+    result = run_monte_carlo(analysis, _worker_db, distributions, n_samples, seed=seed)
+    return result.summary()
+
+def run_portfolio_monte_carlo(analyses, db, distributions, n_samples=100_000, seed=None, workers=None):
+    """Monte Carlo summaries for many sites, optionally across a process pool
+    
+    Returns one summary row per (site, option) with a 'site' column holding
+    the position in `analyses`. workers=None runs in-process; workers=0
+    uses one process per CPU.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(analyses))
+    tasks = [(analysis, distributions, n_samples, child) for analysis, child in zip(analyses, seeds)]
+    
+    if workers is None or workers == 1:
+        _init_worker(db)
+        summaries = [_simulate_site(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker, initargs=(db,)) as pool:
+            summaries = list(pool.map(_simulate_site, tasks, chunksize=max(1, len(tasks) // 64)))
+    
+    frames = []
+    for i, summary in enumerate(summaries):
+        summary.insert(0, 'site', i)
+        frames.append(summary)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,207 @@
+"""
+Incremental single-site evaluation.
+
+EvaluationPipeline produces the same result as evaluate_site(), but as a
+graph of stages that each remember their last inputs and output:
+
+    location
+    qualified facilities -> route -> dated prices -> trips -> costs -> scores
+    onsite ------------------------------------------------------------^
+
+A stage re-runs only when one of its own inputs changed - an analysis
+value, the database or distance provider, or the output of a stage it
+depends on. Changing truck_hourly_rate therefore re-prices the options
+without repeating facility lookups, routing or the trip model, and
+changing priorities only re-scores. Keep one pipeline per session (the
+memos hold one analysis); results are shared and must be treated as
+read-only, as with evaluate_site_cached().
+"""
+
+from .calculators import (
+    DEFAULT_PROCESSING_COST_CY,
+    calculate_onsite_remediation,
+    dated_prices,
+    dig_and_haul_costs,
+    dig_and_haul_parameters,
+    dig_and_haul_trips,
+    select_haul_destination,
+    surface_facility_costs,
+    surface_facility_parameters,
+    surface_facility_trips,
+)
+from .facilities import find_k_nearest_cf_facilities, find_k_nearest_qualified_landfills
+from .geo import determine_state_county, get_regulatory_thresholds, get_soil_type
+from .instrumentation import stage
+from .recommendation import generate_recommendation
+from .routing import ROUTE_CANDIDATES, get_distance_provider
+
+# Stages in evaluation order
+STAGES = (
+    'location',
+    'landfill_candidates', 'landfill_route', 'landfill_prices', 'dig_haul_trips', 'dig_haul_costs',
+    'onsite',
+    'cf_candidates', 'cf_route', 'cf_prices', 'surface_trips', 'surface_costs',
+    'scores',
+)
+
+class _Memo:
+    __slots__ = ('inputs', 'value')
+    
+    def __init__(self, inputs, value):
+        self.inputs = inputs
+        self.value = value
+
+def _location(lat, lon, db):
+    state, county = determine_state_county(lat, lon, db)
+    return state, county, get_soil_type(lat, lon, state), get_regulatory_thresholds(state)
+
+def _route(lat, lon, candidates, record_key, provider):
+    if not candidates:
+        return None
+    return select_haul_destination(lat, lon, candidates, record_key, provider)
+
+def _prices(db, table, route, project_date):
+    if route is None:
+        return None
+    return dated_prices(db, table, route[0], project_date)
+
+class EvaluationPipeline:
+    """evaluate_site() as memoized stages, for repeated what-if evaluations
+    
+    After each evaluate() call, `recomputed` lists the stages that ran and
+    `stats` counts runs and reuses per stage.
+    """
+    
+    def __init__(self):
+        self._memos = {}
+        self._parameters = {}
+        self.recomputed = []
+        self.stats = {name: {'runs': 0, 'reused': 0} for name in STAGES}
+    
+    def clear(self):
+        """Forget every memoized stage"""
+        self._memos.clear()
+    
+    def _stage(self, name, fn, *inputs):
+        """fn(*inputs), or the memoized value if the inputs are unchanged"""
+        memo = self._memos.get(name)
+        if memo is not None and len(memo.inputs) == len(inputs) and all(
+                a is b or a == b for a, b in zip(memo.inputs, inputs)):
+            self.stats[name]['reused'] += 1
+            return memo.value
+        with stage(f'pipeline.{name}'):
+            value = fn(*inputs)
+        self._memos[name] = _Memo(inputs, value)
+        self.stats[name]['runs'] += 1
+        self.recomputed.append(name)
+        return value
+    
+    def _db_inputs(self, db):
+        # A reloaded database is a new object (and usually a new version)
+        return id(db), getattr(db, 'version', None)
+    
+    def evaluate(self, analysis, db):
+        """Evaluate an analysis dict; returns the evaluate_site() result"""
+        self.recomputed = []
+        lat = analysis['site_lat']
+        lon = analysis['site_lon']
+        volume_cy = analysis['volume_cy']
+        needs_backfill = analysis['needs_backfill']
+        advanced_params = analysis.get('advanced_params')
+        project_date = analysis.get('project_date')
+        provider = get_distance_provider()
+        k = ROUTE_CANDIDATES if provider else 1
+        db_inputs = self._db_inputs(db)
+        parameters = {'onsite_processing_cost_cy': (advanced_params or {}).get('onsite_processing_cost_cy',
+                                                                               DEFAULT_PROCESSING_COST_CY)}
+    
+        state, county, soil_type, reg_thresholds = self._stage(
+            'location', lambda *_: _location(lat, lon, db), lat, lon, *db_inputs)
+    
+        # Dig & Haul
+        landfills = self._stage(
+            'landfill_candidates',
+            lambda *_: find_k_nearest_qualified_landfills(lat, lon, analysis['tph_level'],
+                                                          analysis['chloride_level'], needs_backfill, db, k=k),
+            lat, lon, analysis['tph_level'], analysis['chloride_level'], needs_backfill, k, *db_inputs)
+        landfill_route = self._stage(
+            'landfill_route', lambda *_: _route(lat, lon, landfills, 'landfill', provider),
+            lat, lon, landfills, provider)
+        landfill_prices = self._stage(
+            'landfill_prices', lambda *_: _prices(db, 'landfills', landfill_route, project_date),
+            landfill_route, project_date, *db_inputs)
+        if landfill_route is None:
+            dig_haul = None
+        else:
+            landfill, rates, fuel_delta = landfill_prices
+            params = dig_and_haul_parameters(advanced_params, landfill, rates, needs_backfill)
+            parameters.update(truck_capacity_cy=params['truck_capacity'], num_trucks=params['num_trucks'],
+                              truck_hourly_rate=params['truck_hourly_rate'],
+                              excavator_rate=params['excavator_rate'], loader_rate=params['loader_rate'],
+                              work_hours_per_day=params['work_hours_per_day'],
+                              disposal_cost_cy=params['disposal_cost'], backfill_cost_cy=params['backfill_cost'],
+                              simulate_schedule=params['simulate_schedule'])
+            trip_inputs = (volume_cy, landfill_route[2], params['truck_capacity'], params['num_trucks'],
+                           params['work_hours_per_day'], params['simulate_schedule'])
+            trips = self._stage('dig_haul_trips', dig_and_haul_trips, *trip_inputs)
+            dig_haul = self._stage(
+                'dig_haul_costs', dig_and_haul_costs, volume_cy, needs_backfill, landfill, landfill_route[1],
+                landfill_route[3], params, trips, fuel_delta, project_date is not None)
+    
+        # Onsite
+        onsite = self._stage(
+            'onsite', calculate_onsite_remediation, volume_cy, lat, lon,
+            analysis.get('soil_permeability', 'medium'), analysis['tph_level'], analysis['chloride_level'],
+            advanced_params)
+    
+        # Surface facility
+        facilities = self._stage(
+            'cf_candidates', lambda *_: find_k_nearest_cf_facilities(lat, lon, db, k=k),
+            lat, lon, k, *db_inputs)
+        cf_route = self._stage(
+            'cf_route', lambda *_: _route(lat, lon, facilities, 'facility', provider),
+            lat, lon, facilities, provider)
+        cf_prices = self._stage(
+            'cf_prices', lambda *_: _prices(db, 'clean_futures_facilities', cf_route, project_date),
+            cf_route, project_date, *db_inputs)
+        if cf_route is None:
+            surface = None
+        else:
+            facility, rates, fuel_delta = cf_prices
+            params = surface_facility_parameters(advanced_params, facility, rates)
+            parameters.setdefault('truck_capacity_cy', params['truck_capacity'])
+            parameters.setdefault('num_trucks', params['num_trucks'])
+            parameters.setdefault('truck_hourly_rate', params['truck_hourly_rate'])
+            parameters['surface_processing_cost_cy'] = params['processing_cost_cy']
+            trips = self._stage('surface_trips', surface_facility_trips,
+                                volume_cy, cf_route[2], params['truck_capacity'])
+            surface = self._stage(
+                'surface_costs', surface_facility_costs, volume_cy, facility, cf_route[1], cf_route[3],
+                params, trips, fuel_delta, project_date is not None)
+    
+        recommended, scores = self._stage(
+            'scores', generate_recommendation, dig_haul, onsite, surface, analysis['priorities'])
+        self._parameters = parameters
+    
+        return {
+            'state': state,
+            'county': county,
+            'soil_type': soil_type,
+            'reg_thresholds': reg_thresholds,
+            'nearest_landfill': landfills[0] if landfills else None,
+            'dig_haul': dig_haul,
+            'onsite': onsite,
+            'surface': surface,
+            'recommended': recommended,
+            'scores': scores
+        }
+    
+    def effective_parameters(self, analysis, db):
+        """advanced_params that reproduce evaluate(analysis, db), with every value explicit
+    
+        Dated equipment rates, facility prices and Simple Mode defaults are
+        filled in, so a what-if that overrides one of them leaves everything
+        else as it was. Options without a destination contribute nothing.
+        """
+        self.evaluate(analysis, db)
+        return dict(self._parameters)
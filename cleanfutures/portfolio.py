@@ -0,0 +1,428 @@
+"""
+Portfolio assignment of many concurrent sites under shared limits.
+
+optimize_portfolio() sends each site's soil to dig & haul at a specific
+landfill, onsite treatment, or a specific Clean Futures surface facility so
+that total cost plus priced CO2 is as low as possible, while every facility
+stays within its daily intake limit over the planning horizon and all
+hauling shares one truck fleet.
+
+Facility limits make this a min-cost flow problem (source -> sites ->
+destinations -> sink), solved exactly by successive shortest paths. The
+fleet limit couples every hauling edge, so it is priced in with a Lagrange
+multiplier on truck-hours that is found by bisection.
+"""
+
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+from .batch import _dated_price_matrix, _prepare_sites, _site_pricing
+from .calculators import (
+    AVG_SPEED_MPH,
+    DEFAULT_TRUCK_CAPACITY_CY,
+    DEFAULT_NUM_TRUCKS,
+    DEFAULT_TRUCK_HOURLY_RATE,
+    DEFAULT_EXCAVATOR_RATE,
+    DEFAULT_LOADER_RATE,
+    DEFAULT_WORK_HOURS_PER_DAY,
+    DEFAULT_PROCESSING_COST_CY,
+)
+from .routing import get_distance_provider
+from .vectorized import (
+    haversine_matrix,
+    landfill_acceptance_mask,
+    dig_and_haul_arrays,
+    onsite_arrays,
+    surface_facility_arrays,
+)
+
+# Facility record field holding the daily intake limit in CY (absent = unlimited)
+CAPACITY_FIELD = 'daily_capacity_cy'
+
+DEFAULT_HORIZON_DAYS = 30
+DEFAULT_CO2_COST_PER_TON = 50
+
+# Bisection steps for the fleet multiplier
+MULTIPLIER_ITERATIONS = 40
+
+# Flow below this many CY is treated as zero
+FLOW_EPSILON = 1e-6
+
+# ============================================================================
+# MIN-COST FLOW
+# ============================================================================
+
+class MinCostFlow:
+    """Min-cost flow by successive shortest paths with Dijkstra potentials
+    
+    Capacities and costs are floats; all edge costs must be non-negative.
+    """
+    
+    def __init__(self, num_nodes):
+        self.num_nodes = num_nodes
+        # Per node: list of [to, residual capacity, cost, index of reverse edge]
+        self.edges = [[] for _ in range(num_nodes)]
+    
+    def add_edge(self, u, v, capacity, cost):
+        """Add a directed edge and return a handle for flow()"""
+        self.edges[u].append([v, capacity, cost, len(self.edges[v])])
+        self.edges[v].append([u, 0.0, -cost, len(self.edges[u]) - 1])
+        return (u, len(self.edges[u]) - 1)
+    
+    def flow(self, handle):
+        """Flow currently on the edge returned by add_edge()"""
+        u, i = handle
+        v, _, _, reverse = self.edges[u][i]
+        return self.edges[v][reverse][1]
+    
+    def solve(self, source, sink, max_flow=math.inf):
+        """Push up to max_flow from source to sink at minimum cost; returns (flow, cost)"""
+        potential = [0.0] * self.num_nodes
+        total_flow = 0.0
+        total_cost = 0.0
+    
+        while total_flow < max_flow - FLOW_EPSILON:
+            dist = [math.inf] * self.num_nodes
+            prev = [None] * self.num_nodes
+            dist[source] = 0.0
+            heap = [(0.0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                pu = potential[u]
+                for i, (v, capacity, cost, _) in enumerate(self.edges[u]):
+                    if capacity <= FLOW_EPSILON:
+                        continue
+                    nd = d + cost + pu - potential[v]
+                    if nd < dist[v] - 1e-12:
+                        dist[v] = nd
+                        prev[v] = (u, i)
+                        heapq.heappush(heap, (nd, v))
+    
+            if dist[sink] == math.inf:
+                break
+            for node in range(self.num_nodes):
+                if dist[node] < math.inf:
+                    potential[node] += dist[node]
+    
+            push = max_flow - total_flow
+            node = sink
+            while node != source:
+                u, i = prev[node]
+                push = min(push, self.edges[u][i][1])
+                node = u
+    
+            node = sink
+            while node != source:
+                u, i = prev[node]
+                edge = self.edges[u][i]
+                edge[1] -= push
+                self.edges[node][edge[3]][1] += push
+                total_cost += push * edge[2]
+                node = u
+            total_flow += push
+    
+        return total_flow, total_cost
+
+# ============================================================================
+# SITE x DESTINATION OPTIONS
+# ============================================================================
+
+def _pair_speeds(provider, site_lat, site_lon, records, distance, allowed):
+    """Road distances and effective speeds for every allowed site/facility pair"""
+    speed = np.full(distance.shape, float(AVG_SPEED_MPH))
+    if provider is None:
+        return distance, speed
+    
+    distance = distance.copy()
+    for i, j in zip(*np.nonzero(allowed)):
+        route = provider.route(site_lat[i], site_lon[i], records[j])
+        if route is not None and route[1] > 0:
+            distance[i, j] = route[0]
+            speed[i, j] = route[0] / route[1]
+    return distance, speed
+
+def portfolio_options(sites, db, advanced_params=None):
+    """Cost, CO2 and truck-hours of every feasible (site, destination) pair
+    
+    Returns (destinations, metrics): destinations is a list of dicts with
+    'option', 'id', 'name' and 'daily_capacity_cy'; metrics maps
+    'total_cost', 'co2_tons', 'truck_hours' and 'project_days' to
+    site x destination arrays, NaN where the pair is not allowed.
+    
+    An optional project_date column prices each site as evaluate_batch()
+    does: dated facility prices, equipment rates and diesel price.
+    """
+    s = _prepare_sites(sites)
+    if np.any(s['volume_cy'] <= 0):
+        raise ValueError("Every site needs a positive volume_cy")
+    landfills = db['landfills']
+    facilities = db['clean_futures_facilities']
+    provider = get_distance_provider()
+    n = len(s['volume_cy'])
+    params = advanced_params or {}
+    pricing, ordinals, rates, fuel_delta = _site_pricing(sites, db)
+    # Per-site dated values as columns, to broadcast across destinations
+    rates = {field: values[:, None] for field, values in rates.items()}
+    fuel_delta = np.asarray(fuel_delta, dtype=float).reshape(-1, 1) if pricing is not None else 0.0
+    
+    def prices(table, records, field):
+        if pricing is None:
+            return np.array([rec[field] for rec in records], dtype=float)[None, :]
+        return _dated_price_matrix(pricing, table, field, len(records), ordinals)
+    
+    truck_capacity = params.get('truck_capacity_cy', DEFAULT_TRUCK_CAPACITY_CY)
+    num_trucks = params.get('num_trucks', DEFAULT_NUM_TRUCKS)
+    truck_hourly_rate = params.get('truck_hourly_rate', rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE))
+    excavator_rate = params.get('excavator_rate', rates.get('excavator_rate', DEFAULT_EXCAVATOR_RATE))
+    loader_rate = params.get('loader_rate', rates.get('loader_rate', DEFAULT_LOADER_RATE))
+    work_hours_per_day = params.get('work_hours_per_day', DEFAULT_WORK_HOURS_PER_DAY)
+    volume = s['volume_cy'][:, None]
+    needs_backfill = s['needs_backfill'][:, None]
+    
+    # Dig & haul to every landfill that accepts the soil
+    lf_allowed = landfill_acceptance_mask(
+        s['tph_level'], s['chloride_level'], s['needs_backfill'],
+        [lf['tph_max_mgkg'] for lf in landfills],
+        [lf['chloride_max_mgkg'] for lf in landfills],
+        [lf['backfill_available'] for lf in landfills],
+    )
+    lf_distance = haversine_matrix(s['site_lat'][:, None], s['site_lon'][:, None],
+                                   [lf['latitude'] for lf in landfills],
+                                   [lf['longitude'] for lf in landfills])
+    lf_distance, lf_speed = _pair_speeds(provider, s['site_lat'], s['site_lon'], landfills,
+                                         lf_distance, lf_allowed)
+    lf_disposal = prices('landfills', landfills, 'disposal_cost_cy')
+    lf_backfill = prices('landfills', landfills, 'backfill_cost_cy')
+    if advanced_params:
+        disposal_cost = params.get('disposal_cost_cy', lf_disposal)
+        backfill_cost = params.get('backfill_cost_cy', lf_backfill)
+    else:
+        disposal_cost = lf_disposal
+        backfill_cost = np.where(needs_backfill, lf_backfill, 0)
+    dig_haul = dig_and_haul_arrays(
+        volume, lf_distance, needs_backfill, truck_capacity, num_trucks,
+        truck_hourly_rate, excavator_rate, loader_rate, work_hours_per_day,
+        disposal_cost, backfill_cost, avg_speed_mph=lf_speed, fuel_price_delta=fuel_delta
+    )
+    
+    # Onsite treatment needs no facility and no trucks
+    onsite = onsite_arrays(s['volume_cy'], s['soil_permeability'], s['tph_level'], s['chloride_level'],
+                           params.get('onsite_processing_cost_cy', DEFAULT_PROCESSING_COST_CY))
+    
+    # Every surface facility is open to every site
+    cf_allowed = np.ones((n, len(facilities)), dtype=bool)
+    cf_distance = haversine_matrix(s['site_lat'][:, None], s['site_lon'][:, None],
+                                   [cf['latitude'] for cf in facilities],
+                                   [cf['longitude'] for cf in facilities])
+    cf_distance, cf_speed = _pair_speeds(provider, s['site_lat'], s['site_lon'], facilities,
+                                         cf_distance, cf_allowed)
+    if advanced_params:
+        surface_processing = params.get('surface_processing_cost_cy', DEFAULT_PROCESSING_COST_CY)
+    else:
+        surface_processing = prices('clean_futures_facilities', facilities, 'processing_cost_cy')
+    surface = surface_facility_arrays(
+        volume, cf_distance, truck_capacity, truck_hourly_rate, surface_processing,
+        np.array([cf['typical_turnaround_days'] for cf in facilities], dtype=float)[None, :],
+        avg_speed_mph=cf_speed, fuel_price_delta=fuel_delta
+    )
+    
+    destinations = (
+        [{'option': 'dig_haul', 'id': lf['id'], 'name': f"{lf['company']} - {lf['site_name']}",
+          CAPACITY_FIELD: lf.get(CAPACITY_FIELD)} for lf in landfills] +
+        [{'option': 'onsite', 'id': 'ONSITE', 'name': 'Onsite Remediation', CAPACITY_FIELD: None}] +
+        [{'option': 'surface', 'id': cf['id'], 'name': cf['facility_name'],
+          CAPACITY_FIELD: cf.get(CAPACITY_FIELD)} for cf in facilities]
+    )
+    
+    def column(values):
+        return np.asarray(values, dtype=float).reshape(n, 1)
+    
+    metrics = {}
+    for key in ('total_cost', 'co2_tons', 'project_days', 'truck_hours'):
+        onsite_values = column(onsite[key]) if key != 'truck_hours' else np.zeros((n, 1))
+        metrics[key] = np.hstack([
+            np.where(lf_allowed, np.broadcast_to(dig_haul[key], lf_allowed.shape), np.nan),
+            onsite_values,
+            np.broadcast_to(surface[key], cf_allowed.shape).astype(float),
+        ])
+    return destinations, metrics
+
+# ============================================================================
+# OPTIMIZATION
+# ============================================================================
+
+class PortfolioResult:
+    """Optimal volume per site and destination, with totals and facility loads"""
+    
+    def __init__(self, site_ids, volume, destinations, metrics, flows, horizon_days,
+                 fleet_hours, fleet_multiplier):
+        self.site_ids = site_ids
+        self.volume = volume
+        self.destinations = destinations
+        self.metrics = metrics
+        self.flows = flows
+        self.horizon_days = horizon_days
+        self.fleet_hours = fleet_hours
+        self.fleet_multiplier = fleet_multiplier
+    
+    def _share(self):
+        return self.flows / self.volume[:, None]
+    
+    def total(self, metric):
+        """Portfolio total of 'total_cost', 'co2_tons' or 'truck_hours'"""
+        return float(np.nansum(self.metrics[metric] * self._share()))
+    
+    def allocations(self):
+        """One row per site and destination that receives soil"""
+        share = self._share()
+        rows = []
+        for i, j in zip(*np.nonzero(self.flows > FLOW_EPSILON)):
+            dest = self.destinations[j]
+            rows.append({
+                'site_id': self.site_ids[i],
+                'option': dest['option'],
+                'destination_id': dest['id'],
+                'destination_name': dest['name'],
+                'volume_cy': self.flows[i, j],
+                'share': share[i, j],
+                'total_cost': self.metrics['total_cost'][i, j] * share[i, j],
+                'co2_tons': self.metrics['co2_tons'][i, j] * share[i, j],
+                'truck_hours': self.metrics['truck_hours'][i, j] * share[i, j],
+                'project_days': self.metrics['project_days'][i, j],
+            })
+        return pd.DataFrame(rows)
+    
+    def assignments(self):
+        """One row per site: the destination taking most of its soil"""
+        main = np.argmax(self.flows, axis=1)
+        split = (self.flows > FLOW_EPSILON).sum(axis=1) > 1
+        allocations = self.allocations()
+        totals = allocations.groupby('site_id', sort=False)[['total_cost', 'co2_tons', 'truck_hours']].sum()
+        rows = []
+        for i, j in enumerate(main):
+            dest = self.destinations[j]
+            rows.append({
+                'site_id': self.site_ids[i],
+                'volume_cy': self.volume[i],
+                'option': dest['option'],
+                'destination_id': dest['id'],
+                'destination_name': dest['name'],
+                'split': bool(split[i]),
+            })
+        frame = pd.DataFrame(rows)
+        return frame.join(totals, on='site_id')
+    
+    def facility_loads(self):
+        """Assigned CY and utilization of each landfill and surface facility"""
+        rows = []
+        for j, dest in enumerate(self.destinations):
+            if dest['option'] == 'onsite':
+                continue
+            assigned = float(self.flows[:, j].sum())
+            daily = dest[CAPACITY_FIELD]
+            capacity = daily * self.horizon_days if daily is not None else None
+            rows.append({
+                'destination_id': dest['id'],
+                'destination_name': dest['name'],
+                'option': dest['option'],
+                'assigned_cy': assigned,
+                'capacity_cy': capacity,
+                'utilization': assigned / capacity if capacity else None,
+            })
+        return pd.DataFrame(rows)
+
+def _solve_flows(volume, unit_cost, capacity):
+    """Min-cost flow of each site's volume over its allowed destinations"""
+    n, num_dest = unit_cost.shape
+    source, sink = 0, 1 + n + num_dest
+    network = MinCostFlow(sink + 1)
+    
+    for i in range(n):
+        network.add_edge(source, 1 + i, float(volume[i]), 0.0)
+    handles = []
+    for i in range(n):
+        for j in range(num_dest):
+            if np.isfinite(unit_cost[i, j]):
+                handles.append((i, j, network.add_edge(1 + i, 1 + n + j, math.inf, float(unit_cost[i, j]))))
+    for j in range(num_dest):
+        network.add_edge(1 + n + j, sink, capacity[j], 0.0)
+    
+    network.solve(source, sink, float(volume.sum()))
+    flows = np.zeros((n, num_dest))
+    for i, j, handle in handles:
+        flows[i, j] = network.flow(handle)
+    return flows
+
+def optimize_portfolio(sites, db, fleet_size=None, horizon_days=DEFAULT_HORIZON_DAYS,
+                       co2_cost_per_ton=DEFAULT_CO2_COST_PER_TON, capacities=None,
+                       advanced_params=None):
+    """Assign every site's volume to its cheapest feasible destinations
+    
+    sites has the evaluate_batch() columns plus an optional 'site_id'. The
+    objective is total cost plus co2_cost_per_ton per ton of CO2. Each
+    landfill and surface facility accepts at most its daily_capacity_cy
+    (from the database, overridden by capacities={id: cy_per_day}, None =
+    unlimited) times horizon_days. fleet_size trucks working the standard
+    day over the horizon bound the portfolio's total truck-hours
+    (None = no fleet limit). A site may be split when a limit binds.
+    
+    The fleet limit is enforced through a truck-hour price found by
+    bisection. The assignments just below and above that price are blended
+    so the fleet is used exactly, which can split a few more sites.
+    """
+    destinations, metrics = portfolio_options(sites, db, advanced_params)
+    volume = np.asarray(sites['volume_cy'], dtype=float)
+    site_ids = list(sites['site_id']) if 'site_id' in sites.columns else list(sites.index)
+    
+    capacities = capacities or {}
+    capacity = []
+    for dest in destinations:
+        daily = capacities.get(dest['id'], dest[CAPACITY_FIELD])
+        dest[CAPACITY_FIELD] = daily
+        capacity.append(math.inf if daily is None else float(daily) * horizon_days)
+    
+    base_cost = (metrics['total_cost'] + co2_cost_per_ton * metrics['co2_tons']) / volume[:, None]
+    hours_per_cy = metrics['truck_hours'] / volume[:, None]
+    
+    def solve(multiplier):
+        flows = _solve_flows(volume, base_cost + multiplier * hours_per_cy, capacity)
+        return flows, float(np.nansum(hours_per_cy * flows))
+    
+    flows, hours = solve(0.0)
+    multiplier = 0.0
+    if fleet_size is None:
+        fleet_hours = None
+    else:
+        work_hours_per_day = (advanced_params or {}).get('work_hours_per_day', DEFAULT_WORK_HOURS_PER_DAY)
+        fleet_hours = fleet_size * work_hours_per_day * horizon_days
+        if hours > fleet_hours:
+            # Onsite uses no trucks, so a high enough price always fits the fleet
+            low, high = 0.0, 1.0
+            low_flows, low_hours = flows, hours
+            flows, hours = solve(high)
+            while hours > fleet_hours:
+                low, high = high, high * 2
+                low_flows, low_hours = flows, hours
+                flows, hours = solve(high)
+            for _ in range(MULTIPLIER_ITERATIONS):
+                middle = (low + high) / 2
+                candidate, candidate_hours = solve(middle)
+                if candidate_hours <= fleet_hours:
+                    high, flows, hours = middle, candidate, candidate_hours
+                else:
+                    low, low_flows, low_hours = middle, candidate, candidate_hours
+                if high - low <= 1e-4 * high:
+                    break
+            multiplier = high
+    
+            # Blend the two bracketing assignments to use exactly the fleet's hours
+            weight = (fleet_hours - hours) / (low_hours - hours)
+            flows = weight * low_flows + (1 - weight) * flows
+    
+    return PortfolioResult(site_ids, volume, destinations, metrics, flows, horizon_days,
+                           fleet_hours, multiplier)
@@ -0,0 +1,171 @@
+"""
+Effective-dated prices and the diesel price series.
+
+Prices in the facilities database can change over time. A facility may carry
+a price_schedule of entries that take effect on a date; the facility's own
+fields remain the price before its first entry:
+
+    {"id": "LF001", "disposal_cost_cy": 25, "backfill_cost_cy": 10,
+     "price_schedule": [{"effective_date": "2026-01-01", "disposal_cost_cy": 28}]}
+
+Two optional top-level lists do the same for the whole basin:
+equipment_rates (truck_hourly_rate, excavator_rate, loader_rate) and
+diesel_prices (usd_per_gallon). Entries only need the fields that change;
+the others carry forward from the previous entry.
+
+Every schedule is flattened into one sorted array of (facility, date) keys,
+so looking up the price in effect on a project date is a binary search -
+bisect for one project, np.searchsorted for a whole batch.
+"""
+
+import bisect
+from datetime import date, datetime
+
+import numpy as np
+
+# Fields that can be scheduled, per facility table
+PRICED_FIELDS = {
+    'landfills': ('disposal_cost_cy', 'backfill_cost_cy'),
+    'clean_futures_facilities': ('processing_cost_cy', 'backfill_cost_cy'),
+}
+EQUIPMENT_RATE_FIELDS = ('truck_hourly_rate', 'excavator_rate', 'loader_rate')
+DIESEL_PRICE_FIELD = 'usd_per_gallon'
+
+SCHEDULE_KEY = 'price_schedule'
+EQUIPMENT_RATES_KEY = 'equipment_rates'
+DIESEL_PRICES_KEY = 'diesel_prices'
+
+# Keys combine a schedule group with a date ordinal (date.toordinal() < 10**6)
+_GROUP_STRIDE = 10**6
+
+# ============================================================================
+# DATES
+# ============================================================================
+
+def to_ordinal(value):
+    """Day number of a date, datetime or ISO date string (None stays None)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+def to_ordinals(values):
+    """Day numbers for an array-like of dates; -1 where a value is missing"""
+    # Imported here so `import cleanfutures` stays free of pandas
+    import pandas as pd
+    
+    parsed = pd.to_datetime(pd.Series(values), errors='raise')
+    days = (parsed.to_numpy(dtype='datetime64[D]').astype(np.int64)
+            + date(1970, 1, 1).toordinal())
+    return np.where(parsed.isna().to_numpy(), -1, days)
+
+# ============================================================================
+# SCHEDULES
+# ============================================================================
+
+class PriceSchedule:
+    """Effective-dated values of some fields for a number of groups
+    
+    groups is a list (one per facility, or a single entry for basin-wide
+    series) of (base_values, entries): base_values maps each field to the
+    value before the first entry (None if there is none) and entries are
+    dicts with an effective_date plus any of the fields.
+    """
+    
+    def __init__(self, groups, fields):
+        self.fields = tuple(fields)
+        self.base = {field: np.array([np.nan if base.get(field) is None else base[field]
+                                      for base, _ in groups], dtype=float)
+                     for field in self.fields}
+    
+        keys = []
+        values = {field: [] for field in self.fields}
+        for g, (base, entries) in enumerate(groups):
+            current = {field: base.get(field) for field in self.fields}
+            for entry in sorted(entries, key=lambda entry: to_ordinal(entry['effective_date'])):
+                for field in self.fields:
+                    if entry.get(field) is not None:
+                        current[field] = entry[field]
+                keys.append(g * _GROUP_STRIDE + to_ordinal(entry['effective_date']))
+                for field in self.fields:
+                    values[field].append(np.nan if current[field] is None else current[field])
+    
+        self.keys = np.array(keys, dtype=np.int64)
+        self._key_list = keys
+        self.values = {field: np.array(column, dtype=float) for field, column in values.items()}
+    
+    def __len__(self):
+        return len(self._key_list)
+    
+    def _row(self, group, ordinal):
+        """Index of the entry in effect for one group on a day, or -1"""
+        row = bisect.bisect_right(self._key_list, group * _GROUP_STRIDE + ordinal) - 1
+        if row >= 0 and self._key_list[row] // _GROUP_STRIDE == group:
+            return row
+        return -1
+    
+    def lookup(self, group, ordinal):
+        """{field: value} in effect for one group on a day (None where unset)"""
+        row = self._row(group, ordinal) if ordinal is not None else -1
+        source = self.values if row >= 0 else self.base
+        index = row if row >= 0 else group
+        return {field: None if np.isnan(source[field][index]) else float(source[field][index])
+                for field in self.fields}
+    
+    def take(self, field, groups, ordinals):
+        """Values of one field for arrays of groups and day numbers
+    
+        Groups of -1 give NaN; days of -1 (no date) give the base value.
+        """
+        groups = np.asarray(groups, dtype=np.int64)
+        ordinals = np.broadcast_to(np.asarray(ordinals, dtype=np.int64), groups.shape)
+        safe_groups = np.maximum(groups, 0)
+        out = self.base[field][safe_groups] if len(self.base[field]) else np.full(groups.shape, np.nan)
+        if len(self._key_list):
+            rows = np.searchsorted(self.keys, safe_groups * _GROUP_STRIDE + ordinals, side='right') - 1
+            dated = (rows >= 0) & (ordinals >= 0)
+            dated &= self.keys[np.maximum(rows, 0)] // _GROUP_STRIDE == safe_groups
+            out = np.where(dated, self.values[field][np.maximum(rows, 0)], out)
+        return np.where(groups >= 0, out, np.nan)
+
+class Pricing:
+    """All price schedules of one facilities database"""
+    
+    def __init__(self, db):
+        self.facilities = {}
+        self._positions = {}
+        for table, fields in PRICED_FIELDS.items():
+            records = db.get(table, [])
+            self.facilities[table] = PriceSchedule(
+                [(rec, rec.get(SCHEDULE_KEY) or []) for rec in records], fields)
+            self._positions[table] = {rec['id']: i for i, rec in enumerate(records)}
+        self.equipment = PriceSchedule([({}, db.get(EQUIPMENT_RATES_KEY) or [])], EQUIPMENT_RATE_FIELDS)
+        self.diesel = PriceSchedule([({}, db.get(DIESEL_PRICES_KEY) or [])], (DIESEL_PRICE_FIELD,))
+    
+    def facility_record(self, table, record, project_date):
+        """Copy of a facility record with the prices in effect on project_date"""
+        ordinal = to_ordinal(project_date)
+        position = self._positions[table].get(record.get('id'))
+        if ordinal is None or position is None:
+            return record
+        prices = self.facilities[table].lookup(position, ordinal)
+        return {**record, **{field: value for field, value in prices.items() if value is not None}}
+    
+    def equipment_rates(self, project_date):
+        """{field: rate} of scheduled equipment rates in effect on project_date"""
+        rates = self.equipment.lookup(0, to_ordinal(project_date))
+        return {field: value for field, value in rates.items() if value is not None}
+    
+    def diesel_price(self, project_date):
+        """Diesel price on project_date, or None without a series entry"""
+        return self.diesel.lookup(0, to_ordinal(project_date))[DIESEL_PRICE_FIELD]
+
+def get_pricing(db):
+    """Price schedules for a database (cached on a FacilitiesDatabase)"""
+    cached = getattr(db, '_cached', None)
+    if cached is not None:
+        return cached('pricing', None, lambda: Pricing(db))
+    return Pricing(db)
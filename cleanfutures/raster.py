@@ -0,0 +1,226 @@
+"""
+Precomputed recommendation raster for the Permian Basin.
+
+build_raster() evaluates a dense lat/lon grid over the questionnaire bounds
+for a few standard site profiles and stores the results as one float32
+array, memory-mapped from a .npy file with a JSON metadata file beside it.
+RecommendationRaster.query() then answers a point in constant time by
+bilinear interpolation of the neighbouring grid nodes, and whole layers can
+be drawn as a map of where each option wins.
+"""
+
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .batch import evaluate_batch
+from .routing import get_distance_provider
+from .vectorized import OPTION_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that overrides the raster location
+RASTER_DIR_ENV_VAR = 'CLEANFUTURES_RASTER_DIR'
+DEFAULT_RASTER_DIR = Path.home() / '.cache' / 'cleanfutures' / 'raster'
+
+# Questionnaire bounds (lat_min, lat_max, lon_min, lon_max)
+PERMIAN_BOUNDS = (30.0, 35.0, -105.0, -100.0)
+DEFAULT_RESOLUTION_DEG = 0.01
+
+# Standard site profiles evaluated at every grid node
+STANDARD_PROFILES = {
+    'small_light': {
+        'label': 'Small spill, light contamination (200 CY)',
+        'volume_cy': 200, 'tph_level': 2000, 'chloride_level': 1000,
+        'needs_backfill': True, 'soil_permeability': 'medium',
+    },
+    'typical': {
+        'label': 'Typical spill (1,000 CY)',
+        'volume_cy': 1000, 'tph_level': 5000, 'chloride_level': 5000,
+        'needs_backfill': True, 'soil_permeability': 'medium',
+    },
+    'large_heavy': {
+        'label': 'Large spill, heavy contamination (5,000 CY)',
+        'volume_cy': 5000, 'tph_level': 15000, 'chloride_level': 15000,
+        'needs_backfill': True, 'soil_permeability': 'medium',
+    },
+}
+
+# Layers stored per profile; categorical layers hold an OPTION_KEYS index (NaN = none)
+LAYERS = (
+    'recommended',
+    'cheapest',
+    'dig_haul_cost_per_cy',
+    'onsite_cost_per_cy',
+    'surface_cost_per_cy',
+    'landfill_miles',
+    'facility_miles',
+)
+CATEGORICAL_LAYERS = ('recommended', 'cheapest')
+
+ARRAY_FILE = 'raster.npy'
+METADATA_FILE = 'raster.json'
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _grid_axes(bounds, resolution):
+    lat_min, lat_max, lon_min, lon_max = bounds
+    lats = lat_min + resolution * np.arange(int(round((lat_max - lat_min) / resolution)) + 1)
+    lons = lon_min + resolution * np.arange(int(round((lon_max - lon_min) / resolution)) + 1)
+    return lats, lons
+
+def _profile_layers(results):
+    """Stack the stored layers from an evaluate_batch() result frame"""
+    option_index = {key: i for i, key in enumerate(OPTION_KEYS)}
+    costs = np.stack([results[f'{key}_cost_per_cy'].to_numpy(dtype=float) for key in OPTION_KEYS], axis=1)
+    any_cost = ~np.isnan(costs).all(axis=1)
+    cheapest = np.full(len(results), np.nan)
+    cheapest[any_cost] = np.nanargmin(costs[any_cost], axis=1)
+    return np.stack([
+        results['recommended'].map(option_index).to_numpy(dtype=float),
+        cheapest,
+        costs[:, 0],
+        costs[:, 1],
+        costs[:, 2],
+        results['dig_haul_distance_miles'].to_numpy(dtype=float),
+        results['surface_distance_miles'].to_numpy(dtype=float),
+    ])
+
+def build_raster(db, output_dir=None, resolution=DEFAULT_RESOLUTION_DEG, bounds=PERMIAN_BOUNDS,
+                 profiles=None, rows_per_chunk=20):
+    """Evaluate every grid node for every profile and write the raster to output_dir
+
+    Rows of the grid are evaluated in chunks with evaluate_batch() and written
+    straight into the memory-mapped output, so memory stays bounded at any
+    resolution. Returns the loaded RecommendationRaster.
+    """
+    output_dir = Path(output_dir or os.environ.get(RASTER_DIR_ENV_VAR) or DEFAULT_RASTER_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    profiles = profiles or STANDARD_PROFILES
+    lats, lons = _grid_axes(bounds, resolution)
+    shape = (len(profiles), len(LAYERS), len(lats), len(lons))
+
+    start = time.perf_counter()
+    tmp_path = output_dir / (ARRAY_FILE + '.tmp.npy')
+    data = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+    grid_lon = np.tile(lons, rows_per_chunk)
+    for p, (name, profile) in enumerate(profiles.items()):
+        for row in range(0, len(lats), rows_per_chunk):
+            rows = lats[row:row + rows_per_chunk]
+            sites = pd.DataFrame({
+                'site_lat': np.repeat(rows, len(lons)),
+                'site_lon': grid_lon[:len(rows) * len(lons)],
+            })
+            for key in ('volume_cy', 'tph_level', 'chloride_level', 'needs_backfill', 'soil_permeability'):
+                sites[key] = profile[key]
+            layers = _profile_layers(evaluate_batch(sites, db))
+            data[p, :, row:row + len(rows), :] = layers.reshape(len(LAYERS), len(rows), len(lons))
+        logger.info("Raster profile %s done (%.1f s)", name, time.perf_counter() - start)
+    data.flush()
+    del data
+
+    provider = get_distance_provider()
+    metadata = {
+        'bounds': list(bounds),
+        'resolution': resolution,
+        'shape': list(shape),
+        'layers': list(LAYERS),
+        'options': list(OPTION_KEYS),
+        'profiles': profiles,
+        'db_version': getattr(db, 'version', None),
+        'provider_version': getattr(getattr(provider, 'graph', None), 'version', None) if provider else None,
+        'built_at': time.time(),
+        'build_seconds': time.perf_counter() - start,
+    }
+    os.replace(tmp_path, output_dir / ARRAY_FILE)
+    tmp_meta = output_dir / (METADATA_FILE + '.tmp')
+    tmp_meta.write_text(json.dumps(metadata, indent=2))
+    os.replace(tmp_meta, output_dir / METADATA_FILE)
+    return RecommendationRaster(output_dir)
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+class RecommendationRaster:
+    """Memory-mapped raster written by build_raster()"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or os.environ.get(RASTER_DIR_ENV_VAR) or DEFAULT_RASTER_DIR)
+        self.metadata = json.loads((self.path / METADATA_FILE).read_text())
+        self.data = np.load(self.path / ARRAY_FILE, mmap_mode='r')
+        self.lat_min, _, self.lon_min, _ = self.metadata['bounds']
+        self.resolution = self.metadata['resolution']
+        self.profiles = list(self.metadata['profiles'])
+        self.layers = self.metadata['layers']
+        self.lats, self.lons = _grid_axes(self.metadata['bounds'], self.resolution)
+
+    def is_current(self, db):
+        """True when the raster was built from this database version"""
+        return self.metadata.get('db_version') == getattr(db, 'version', None)
+
+    def contains(self, lat, lon):
+        lat_min, lat_max, lon_min, lon_max = self.metadata['bounds']
+        return lat_min <= lat <= lat_max and lon_min <= lon <= lon_max
+
+    def layer(self, profile, layer):
+        """(lat, lon) array view of one layer"""
+        return self.data[self.profiles.index(profile), self.layers.index(layer)]
+
+    def query(self, lat, lon, profile):
+        """Interpolated layer values at a point, or None outside the raster
+
+        Continuous layers are interpolated bilinearly from the four
+        surrounding nodes (nearest node where one of them is empty);
+        categorical layers take the nearest node.
+        """
+        if not self.contains(lat, lon):
+            return None
+
+        y = (lat - self.lat_min) / self.resolution
+        x = (lon - self.lon_min) / self.resolution
+        i0 = min(int(math.floor(y)), len(self.lats) - 2)
+        j0 = min(int(math.floor(x)), len(self.lons) - 2)
+        fy, fx = y - i0, x - j0
+        weights = np.array([(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx])
+        nearest = (i0 + int(round(fy)), j0 + int(round(fx)))
+
+        cells = np.asarray(self.data[self.profiles.index(profile), :, i0:i0 + 2, j0:j0 + 2], dtype=float)
+        corners = cells.reshape(len(self.layers), 4)
+        result = {}
+        for k, name in enumerate(self.layers):
+            nearest_value = float(cells[k, nearest[0] - i0, nearest[1] - j0])
+            if name in CATEGORICAL_LAYERS:
+                value = None if math.isnan(nearest_value) else OPTION_KEYS[int(nearest_value)]
+            elif np.isnan(corners[k]).any():
+                value = None if math.isnan(nearest_value) else nearest_value
+            else:
+                value = float(corners[k] @ weights)
+            result[name] = value
+        return result
+
+    def win_map(self, profile, layer='recommended', step=1):
+        """Long-format DataFrame of lat, lon and option for plotting, every `step` nodes"""
+        values = np.asarray(self.layer(profile, layer)[::step, ::step])
+        lat_grid, lon_grid = np.meshgrid(self.lats[::step], self.lons[::step], indexing='ij')
+        valid = ~np.isnan(values)
+        return pd.DataFrame({
+            'lat': lat_grid[valid],
+            'lon': lon_grid[valid],
+            'option': np.array(OPTION_KEYS, dtype=object)[values[valid].astype(int)],
+        })
+
+def load_raster(path=None):
+    """Open the raster at path (or the configured location), or None if not built"""
+    try:
+        return RecommendationRaster(path)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,60 @@
+"""
+Priority-weighted scoring of the remediation options.
+"""
+
+from .instrumentation import timed
+
+@timed('generate_recommendation')
+def generate_recommendation(dig_haul, onsite, surface_facility, user_priorities):
+    """Generate recommendation based on calculations and user priorities"""
+    
+    options = []
+    if dig_haul:
+        options.append(('dig_haul', dig_haul))
+    if onsite:
+        options.append(('onsite', onsite))
+    if surface_facility:
+        options.append(('surface', surface_facility))
+    
+    if not options:
+        return None
+    
+    # Score each option based on priorities
+    scores = {}
+    for opt_type, opt in options:
+        score = 0
+        
+        # Cost priority
+        if user_priorities.get('cost', 'medium') == 'high':
+            # Lower cost = higher score
+            min_cost = min([o[1]['cost_per_cy'] for o in options])
+            score += 40 * (1 - (opt['cost_per_cy'] - min_cost) / min_cost) if min_cost > 0 else 20
+        elif user_priorities.get('cost', 'medium') == 'medium':
+            min_cost = min([o[1]['cost_per_cy'] for o in options])
+            score += 20 * (1 - (opt['cost_per_cy'] - min_cost) / min_cost) if min_cost > 0 else 10
+        
+        # Timeline priority
+        if user_priorities.get('speed', 'medium') == 'high':
+            min_days = min([o[1]['project_days'] for o in options])
+            score += 30 * (1 - (opt['project_days'] - min_days) / min_days) if min_days > 0 else 15
+        elif user_priorities.get('speed', 'medium') == 'medium':
+            min_days = min([o[1]['project_days'] for o in options])
+            score += 15 * (1 - (opt['project_days'] - min_days) / min_days) if min_days > 0 else 7
+        
+        # ESG priority
+        if user_priorities.get('esg', 'medium') == 'high':
+            min_co2 = min([o[1]['co2_tons'] for o in options])
+            score += 30 * (1 - (opt['co2_tons'] - min_co2) / min_co2) if min_co2 > 0 else 15
+            # Bonus for treatment vs disposal
+            if opt_type in ['onsite', 'surface']:
+                score += 10
+        elif user_priorities.get('esg', 'medium') == 'medium':
+            min_co2 = min([o[1]['co2_tons'] for o in options])
+            score += 15 * (1 - (opt['co2_tons'] - min_co2) / min_co2) if min_co2 > 0 else 7
+        
+        scores[opt_type] = score
+    
+    # Find recommendation
+    recommended = max(scores, key=scores.get)
+    
+    return recommended, scores
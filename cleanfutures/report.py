@@ -0,0 +1,332 @@
+"""
+Multi-sheet Excel reports for single analyses and batch results.
+
+ExcelReportWriter takes evaluate_batch() results - site columns followed by
+the result columns, as the batch command produces them - chunk by chunk and
+streams them into an .xlsx file with openpyxl's write-only mode. Rows go to
+a temporary file per sheet as they are appended, so memory stays flat no
+matter how many sites are written. Sheets:
+
+    Summary          one row per site: inputs, location, each option's cost,
+                     timeline and CO2, and the recommendation
+    Cost Breakdown   one row per site and available option: destination,
+                     distance and every cost component
+    Assumptions      rates, defaults and constants behind the numbers
+    Landfills,       the facility records the options were priced from
+    CF Facilities
+
+A sheet that reaches Excel's row limit continues on "Summary (2)" and so on.
+site_result_frame() puts one evaluate_site() result in the same layout, so
+the results page writes its report with the same writer.
+"""
+
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from .calculators import (
+    AVG_SPEED_MPH,
+    LOADING_TIME_HOURS,
+    UNLOADING_TIME_HOURS,
+    EXCAVATION_CAPACITY_CYPH,
+    LOADING_CAPACITY_CYPH,
+    EXCAVATOR_FUEL_GPH,
+    LOADER_FUEL_GPH,
+    TRUCK_FUEL_GPH,
+    CO2_LBS_PER_GALLON,
+    BASE_DIESEL_PRICE_PER_GALLON,
+    BASE_TREATMENT_DAYS,
+    ONSITE_FUEL_GAL_PER_CY,
+    DEFAULT_TRUCK_CAPACITY_CY,
+    DEFAULT_NUM_TRUCKS,
+    DEFAULT_TRUCK_HOURLY_RATE,
+    DEFAULT_EXCAVATOR_RATE,
+    DEFAULT_LOADER_RATE,
+    DEFAULT_WORK_HOURS_PER_DAY,
+    DEFAULT_PROCESSING_COST_CY,
+)
+from .routing import get_distance_provider
+from .vectorized import OPTION_KEYS, OPTION_NAMES
+
+# Rows per worksheet, header included (Excel's limit)
+MAX_SHEET_ROWS = 1_048_576
+
+# Decimal places kept for computed values
+RESULT_DECIMALS = 2
+
+# Per-option result fields (column suffixes) and their headers
+METRIC_FIELDS = {
+    'total_cost': 'Total Cost ($)',
+    'cost_per_cy': 'Cost per CY ($)',
+    'project_days': 'Timeline (days)',
+    'co2_tons': 'CO2 (tons)',
+}
+COST_FIELDS = {
+    'equipment_cost': 'Equipment ($)',
+    'trucking_cost': 'Trucking ($)',
+    'disposal_cost': 'Disposal ($)',
+    'backfill_cost': 'Backfill ($)',
+    'processing_cost': 'Processing ($)',
+    'mobilization_cost': 'Mobilization ($)',
+    'amendment_cost': 'Amendments ($)',
+    'fuel_adjustment': 'Diesel Price Adjustment ($)',
+}
+SUMMARY_METRICS = ('total_cost', 'project_days', 'co2_tons')
+
+# Destination name and distance columns per option
+DESTINATION_COLUMNS = {
+    'dig_haul': ('dig_haul_landfill_name', 'dig_haul_distance_miles'),
+    'onsite': (None, None),
+    'surface': ('surface_facility_name', 'surface_distance_miles'),
+}
+
+# Advanced parameters: (key, label, Simple Mode value); None = per facility
+ASSUMPTION_PARAMETERS = (
+    ('truck_capacity_cy', 'Truck Capacity (CY)', DEFAULT_TRUCK_CAPACITY_CY),
+    ('num_trucks', 'Number of Trucks', DEFAULT_NUM_TRUCKS),
+    ('truck_hourly_rate', 'Truck Hourly Rate ($)', DEFAULT_TRUCK_HOURLY_RATE),
+    ('excavator_rate', 'Excavator Rate ($/hr)', DEFAULT_EXCAVATOR_RATE),
+    ('loader_rate', 'Loader Rate ($/hr)', DEFAULT_LOADER_RATE),
+    ('work_hours_per_day', 'Work Hours/Day', DEFAULT_WORK_HOURS_PER_DAY),
+    ('disposal_cost_cy', 'Landfill Disposal ($/CY)', None),
+    ('backfill_cost_cy', 'Backfill Cost ($/CY)', None),
+    ('onsite_processing_cost_cy', 'Onsite Processing ($/CY)', DEFAULT_PROCESSING_COST_CY),
+    ('surface_processing_cost_cy', 'Surface Facility ($/CY)', None),
+)
+ASSUMPTION_CONSTANTS = (
+    ('Average Truck Speed (mph)', AVG_SPEED_MPH),
+    ('Loading Time (hours)', LOADING_TIME_HOURS),
+    ('Unloading Time (hours)', UNLOADING_TIME_HOURS),
+    ('Excavation Capacity (CY/hr)', EXCAVATION_CAPACITY_CYPH),
+    ('Loading Capacity (CY/hr)', LOADING_CAPACITY_CYPH),
+    ('Excavator Fuel (gal/hr)', EXCAVATOR_FUEL_GPH),
+    ('Loader Fuel (gal/hr)', LOADER_FUEL_GPH),
+    ('Truck Fuel (gal/hr)', TRUCK_FUEL_GPH),
+    ('CO2 per Gallon of Diesel (lbs)', CO2_LBS_PER_GALLON),
+    ('Diesel Price in Hourly Rates ($/gal)', BASE_DIESEL_PRICE_PER_GALLON),
+    ('Onsite Base Treatment (days)', BASE_TREATMENT_DAYS),
+    ('Onsite Fuel (gal/CY)', ONSITE_FUEL_GAL_PER_CY),
+)
+
+FACILITY_SHEETS = (('landfills', 'Landfills'), ('clean_futures_facilities', 'CF Facilities'))
+
+# Option result columns are '<option>_<suffix>' for these suffixes
+RESULT_SUFFIXES = set(METRIC_FIELDS) | set(COST_FIELDS) | {
+    'landfill_id', 'landfill_name', 'facility_id', 'facility_name', 'distance_miles',
+    'backfill_available_at_landfill',
+}
+
+def _is_result_column(column):
+    if column in ('state', 'county', 'recommended') or column.startswith('score_'):
+        return True
+    return any(column.startswith(f'{key}_') and column[len(key) + 1:] in RESULT_SUFFIXES for key in OPTION_KEYS)
+
+def _cells(series, decimals=None):
+    """Column values as Python objects, missing values as None (empty cells)"""
+    if decimals is not None and series.dtype.kind == 'f':
+        series = series.round(decimals)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def _scalar(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+# ============================================================================
+# WORKSHEETS
+# ============================================================================
+
+class _Sheet:
+    """Write-only worksheet that continues on a numbered copy at the row limit"""
+    
+    def __init__(self, workbook, title, header):
+        self.workbook = workbook
+        self.title = title
+        self.header = list(header)
+        self.parts = 0
+        self._open()
+    
+    def _open(self):
+        self.parts += 1
+        ws = self.workbook.create_sheet(self.title if self.parts == 1 else f"{self.title} ({self.parts})")
+        ws.freeze_panes = 'A2'
+        for i, name in enumerate(self.header, start=1):
+            ws.column_dimensions[get_column_letter(i)].width = max(10, min(len(str(name)) + 2, 40))
+        bold = Font(bold=True)
+        cells = []
+        for name in self.header:
+            cell = WriteOnlyCell(ws, value=name)
+            cell.font = bold
+            cells.append(cell)
+        ws.append(cells)
+        self.ws = ws
+        self.rows = 1
+    
+    def append_rows(self, rows):
+        for row in rows:
+            if self.rows >= MAX_SHEET_ROWS:
+                self._open()
+            self.ws.append(row)
+            self.rows += 1
+
+# ============================================================================
+# REPORT WRITER
+# ============================================================================
+
+class ExcelReportWriter:
+    """Stream evaluate_batch() result chunks into a multi-sheet .xlsx report
+    
+    path: file name or binary file object. db: the facilities database the
+    results came from. parameters: advanced parameters the results used
+    (None for Simple Mode). Call write() per chunk and close() once.
+    """
+    
+    def __init__(self, path, db, parameters=None):
+        self.path = path
+        self.db = db
+        self.parameters = parameters or {}
+        self.workbook = Workbook(write_only=True)
+        self.rows = 0
+        self._inputs = None
+        self._summary = None
+        self._breakdown = None
+    
+    def _open_sheets(self, frame):
+        self._inputs = [c for c in frame.columns if not _is_result_column(c) and c != 'site_id']
+        header = ['Site'] + self._inputs + ['State', 'County', 'Recommended', 'Recommended Cost ($)']
+        for key in OPTION_KEYS:
+            header += [f"{OPTION_NAMES[key]} - {METRIC_FIELDS[field]}" for field in SUMMARY_METRICS]
+        self._summary = _Sheet(self.workbook, 'Summary', header)
+        self._breakdown = _Sheet(self.workbook, 'Cost Breakdown',
+                                 ['Site', 'Option', 'Recommended', 'Destination', 'Distance (mi)']
+                                 + list(METRIC_FIELDS.values()) + list(COST_FIELDS.values()))
+    
+    def write(self, frame):
+        """Append one chunk of sites (input columns plus evaluate_batch() columns)"""
+        if self._summary is None:
+            self._open_sheets(frame)
+        n = len(frame)
+        if 'site_id' in frame.columns:
+            sites = _cells(frame['site_id'])
+        else:
+            sites = list(range(self.rows + 1, self.rows + n + 1))
+        recommended = frame['recommended'].to_numpy()
+        recommended_cost = np.full(n, np.nan)
+        for key in OPTION_KEYS:
+            chosen = recommended == key
+            recommended_cost[chosen] = frame[f'{key}_total_cost'].to_numpy(dtype=float)[chosen]
+    
+        columns = [sites] + [_cells(frame[c]) if c in frame.columns else [None] * n for c in self._inputs]
+        columns += [_cells(frame['state']), _cells(frame['county']),
+                    [OPTION_NAMES.get(key, key) for key in recommended],
+                    _cells(pd.Series(recommended_cost), RESULT_DECIMALS)]
+        for key in OPTION_KEYS:
+            columns += [_cells(frame[f'{key}_{field}'], RESULT_DECIMALS) for field in SUMMARY_METRICS]
+        self._summary.append_rows(zip(*columns))
+    
+        # Site-major rows: every available option of a site, then the next site
+        blocks = []
+        for position, key in enumerate(OPTION_KEYS):
+            present = frame[f'{key}_total_cost'].notna().to_numpy()
+            if not present.any():
+                continue
+            rows = np.flatnonzero(present)
+            name_column, distance_column = DESTINATION_COLUMNS[key]
+            block = {
+                'order': rows * len(OPTION_KEYS) + position,
+                'site': [sites[i] for i in rows],
+                'option': OPTION_NAMES[key],
+                'recommended': np.where(recommended[rows] == key, 'Yes', ''),
+                'destination': frame[name_column].to_numpy()[rows] if name_column else None,
+                'distance': frame[distance_column].to_numpy()[rows] if distance_column else np.nan,
+            }
+            for field in list(METRIC_FIELDS) + list(COST_FIELDS):
+                column = f'{key}_{field}'
+                block[field] = frame[column].to_numpy()[rows] if column in frame.columns else np.nan
+            blocks.append(pd.DataFrame(block))
+        if blocks:
+            breakdown = pd.concat(blocks, ignore_index=True).sort_values('order', kind='stable')
+            columns = [_cells(breakdown[c]) for c in ('site', 'option', 'recommended', 'destination')]
+            columns += [_cells(breakdown[c], RESULT_DECIMALS)
+                        for c in ['distance'] + list(METRIC_FIELDS) + list(COST_FIELDS)]
+            self._breakdown.append_rows(zip(*columns))
+        self.rows += n
+    
+    def _write_assumptions(self):
+        sheet = _Sheet(self.workbook, 'Assumptions', ['Assumption', 'Value', 'Notes'])
+        provider = get_distance_provider()
+        rows = [
+            ('Report Generated (UTC)', datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'), ''),
+            ('Facilities Database Version', str(getattr(self.db, 'version', None) or ''), ''),
+            ('Sites', self.rows, ''),
+            ('Haul Distances', 'Road network' if provider else 'Straight line',
+             '' if provider else f"Driven at {AVG_SPEED_MPH} mph"),
+        ]
+        for key, label, default in ASSUMPTION_PARAMETERS:
+            if key in self.parameters:
+                rows.append((label, _scalar(self.parameters[key]), 'As analyzed'))
+            elif default is None:
+                rows.append((label, 'Per facility', 'See the facility sheets'))
+            else:
+                rows.append((label, default, 'Simple Mode default'))
+        rows += [(label, value, '') for label, value in ASSUMPTION_CONSTANTS]
+        rows.append(('Project Dates', '', "Sites with a project_date use the prices and diesel cost "
+                                          "in effect on that date"))
+        sheet.append_rows(rows)
+    
+    def _write_facilities(self):
+        for table, title in FACILITY_SHEETS:
+            records = self.db.get(table) or []
+            fields = list(dict.fromkeys(key for record in records for key in record))
+            sheet = _Sheet(self.workbook, title, fields)
+            sheet.append_rows([_scalar(record.get(field)) for field in fields] for record in records)
+    
+    def close(self):
+        """Write the Assumptions and facility sheets and save the workbook"""
+        if self._summary is None:
+            self._open_sheets(pd.DataFrame(columns=['recommended']))
+        self._write_assumptions()
+        self._write_facilities()
+        self.workbook.save(self.path)
+
+# ============================================================================
+# SINGLE ANALYSIS
+# ============================================================================
+
+def site_result_frame(analysis, result):
+    """One evaluate_site() result as a one-row frame in evaluate_batch() layout"""
+    row = {key: analysis.get(key) for key in ('site_lat', 'site_lon', 'volume_cy', 'tph_level',
+                                               'chloride_level', 'needs_backfill', 'soil_permeability')}
+    for key in ('cost', 'speed', 'esg'):
+        row[f'{key}_priority'] = analysis['priorities'].get(key)
+    if analysis.get('project_date'):
+        row['project_date'] = analysis['project_date']
+    row['state'] = result['state']
+    row['county'] = result['county']
+    
+    dig_haul = result['dig_haul'] or {}
+    surface = result['surface'] or {}
+    row['dig_haul_landfill_name'] = dig_haul.get('landfill_name')
+    row['dig_haul_distance_miles'] = dig_haul.get('distance_miles', np.nan)
+    row['surface_facility_name'] = surface.get('facility_name')
+    row['surface_distance_miles'] = surface.get('distance_miles', np.nan)
+    for key in OPTION_KEYS:
+        option = result[key] or {}
+        for field in list(METRIC_FIELDS) + list(COST_FIELDS):
+            row[f'{key}_{field}'] = float(option.get(field, np.nan))
+    row['recommended'] = result['recommended']
+    return pd.DataFrame([row])
+
+def write_analysis_report(path, analysis, result, db, parameters=None):
+    """Excel report for one analysis and its evaluate_site() result"""
+    writer = ExcelReportWriter(path, db, parameters)
+    writer.write(site_result_frame(analysis, result))
+    writer.close()
@@ -0,0 +1,430 @@
+"""
+Road-network drive distances from an offline road graph.
+
+The graph is loaded from a compact JSON file or an OpenStreetMap XML extract
+(e.g. the Permian counties cut from a Geofabrik download and converted with
+`osmium cat extract.osm.pbf -o extract.osm`). OSM ways are contracted to
+junction-to-junction edges weighted by length and drive time.
+
+For every facility a one-to-all shortest-path search (Dijkstra on the
+reversed graph, minimizing drive time) is run once and persisted as a
+memory-mapped array of (hours, miles) per graph node. A query then only snaps
+the site to its nearest graph node and reads one cell per facility, so
+per-request routing takes milliseconds regardless of graph size.
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+from .geo import EARTH_RADIUS_MILES, haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# Default speeds (mph) by OSM highway class; lease roads are mostly tracks/service
+ROAD_SPEEDS_MPH = {
+    'motorway': 70, 'motorway_link': 45,
+    'trunk': 65, 'trunk_link': 40,
+    'primary': 55, 'primary_link': 35,
+    'secondary': 50, 'secondary_link': 35,
+    'tertiary': 45, 'tertiary_link': 30,
+    'unclassified': 35, 'residential': 25,
+    'service': 20, 'track': 15,
+}
+
+# Off-network leg from the site (or facility gate) to the nearest graph node
+OFFROAD_SPEED_MPH = 15
+OFFROAD_DETOUR_FACTOR = 1.3
+
+# Sites further than this from any road node fall back to straight line
+MAX_SNAP_MILES = 10.0
+
+# Cell size (degrees) of the grid used to snap coordinates to graph nodes
+SNAP_CELL_DEGREES = 0.05
+
+# Default persistent cache location for precomputed facility tables
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'cleanfutures' / 'routes'
+
+# ============================================================================
+# ROAD GRAPH
+# ============================================================================
+
+class RoadGraph:
+    """Directed road graph with per-edge length (miles) and drive time (hours)"""
+    
+    def __init__(self, node_lat, node_lon, edge_from, edge_to, edge_miles, edge_hours):
+        self.node_lat = np.asarray(node_lat, dtype=float)
+        self.node_lon = np.asarray(node_lon, dtype=float)
+        self.edge_from = np.asarray(edge_from, dtype=np.int64)
+        self.edge_to = np.asarray(edge_to, dtype=np.int64)
+        self.edge_miles = np.asarray(edge_miles, dtype=float)
+        self.edge_hours = np.asarray(edge_hours, dtype=float)
+        self._reverse = None
+        self._node_index = None
+        
+        digest = hashlib.sha256()
+        for arr in (self.node_lat, self.node_lon, self.edge_from, self.edge_to,
+                    self.edge_miles, self.edge_hours):
+            digest.update(np.ascontiguousarray(arr).tobytes())
+        self.version = digest.hexdigest()[:16]
+    
+    @property
+    def num_nodes(self):
+        return len(self.node_lat)
+    
+    def reverse_adjacency(self):
+        """Incoming edges per node as lists of (from_node, miles, hours)"""
+        if self._reverse is None:
+            reverse = [[] for _ in range(self.num_nodes)]
+            for u, v, miles, hours in zip(self.edge_from.tolist(), self.edge_to.tolist(),
+                                          self.edge_miles.tolist(), self.edge_hours.tolist()):
+                reverse[v].append((u, miles, hours))
+            self._reverse = reverse
+        return self._reverse
+    
+    def node_index(self):
+        """Grid index over graph nodes for snapping coordinates"""
+        if self._node_index is None:
+            self._node_index = _NodeGrid(self.node_lat, self.node_lon)
+        return self._node_index
+    
+    def snap(self, lat, lon):
+        """Nearest graph node and the straight-line miles to it (None if empty)"""
+        if self.num_nodes == 0:
+            return None
+        return self.node_index().nearest(lat, lon)
+    
+    def save_json(self, path):
+        """Write the graph in the compact JSON format read by from_json"""
+        data = {
+            'nodes': [[lat, lon] for lat, lon in zip(self.node_lat.tolist(), self.node_lon.tolist())],
+            'edges': [[u, v, miles, hours] for u, v, miles, hours in zip(
+                self.edge_from.tolist(), self.edge_to.tolist(),
+                self.edge_miles.tolist(), self.edge_hours.tolist())]
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f)
+    
+    @classmethod
+    def from_json(cls, path):
+        """Load {'nodes': [[lat, lon], ...], 'edges': [[from, to, miles, hours], ...]}"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        nodes = np.array(data['nodes'], dtype=float).reshape(-1, 2)
+        edges = np.array(data['edges'], dtype=float).reshape(-1, 4)
+        return cls(nodes[:, 0], nodes[:, 1], edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3])
+    
+    @classmethod
+    def from_osm(cls, path):
+        """Build a junction-to-junction graph from an OSM XML extract"""
+        coords = {}
+        ways = []
+        
+        for _, elem in ET.iterparse(path, events=('end',)):
+            if elem.tag == 'node':
+                coords[elem.get('id')] = (float(elem.get('lat')), float(elem.get('lon')))
+                elem.clear()
+            elif elem.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in elem.findall('tag')}
+                highway = tags.get('highway')
+                if highway in ROAD_SPEEDS_MPH:
+                    refs = [nd.get('ref') for nd in elem.findall('nd')]
+                    if len(refs) > 1:
+                        ways.append((refs, _way_speed(tags, highway), tags.get('oneway')))
+                elem.clear()
+        
+        # Junctions: way endpoints and nodes shared by more than one way
+        usage = {}
+        for refs, _, _ in ways:
+            for ref in refs:
+                usage[ref] = usage.get(ref, 0) + 1
+        junctions = set()
+        for refs, _, _ in ways:
+            junctions.add(refs[0])
+            junctions.add(refs[-1])
+        junctions.update(ref for ref, count in usage.items() if count > 1)
+        
+        node_ids = {}
+        node_lat, node_lon = [], []
+        edge_from, edge_to, edge_miles, edge_hours = [], [], [], []
+        
+        def node_for(ref):
+            if ref not in node_ids:
+                node_ids[ref] = len(node_lat)
+                node_lat.append(coords[ref][0])
+                node_lon.append(coords[ref][1])
+            return node_ids[ref]
+        
+        for refs, speed, oneway in ways:
+            refs = [ref for ref in refs if ref in coords]
+            if len(refs) < 2:
+                continue
+            if oneway == '-1':
+                refs = refs[::-1]
+            start = refs[0]
+            miles = 0.0
+            for prev, ref in zip(refs, refs[1:]):
+                miles += haversine_distance(*coords[prev], *coords[ref])
+                if ref in junctions or ref == refs[-1]:
+                    u, v = node_for(start), node_for(ref)
+                    edge_from.append(u)
+                    edge_to.append(v)
+                    edge_miles.append(miles)
+                    edge_hours.append(miles / speed)
+                    if oneway not in ('yes', 'true', '1', '-1'):
+                        edge_from.append(v)
+                        edge_to.append(u)
+                        edge_miles.append(miles)
+                        edge_hours.append(miles / speed)
+                    start = ref
+                    miles = 0.0
+        
+        return cls(node_lat, node_lon, edge_from, edge_to, edge_miles, edge_hours)
+
+class _NodeGrid:
+    """Uniform lat/lon bucket grid for nearest-node queries on large graphs
+    
+    Built with one argsort, so it scales to millions of OSM nodes. Queries
+    search rings of cells outward until no unvisited cell can be closer.
+    """
+    
+    def __init__(self, lat, lon, cell=SNAP_CELL_DEGREES):
+        self.lat = lat
+        self.lon = lon
+        self.cell = cell
+        self.lat0 = float(lat.min())
+        self.lon0 = float(lon.min())
+        self.rows = int((lat.max() - self.lat0) // cell) + 1
+        self.cols = int((lon.max() - self.lon0) // cell) + 1
+        
+        keys = self._cell_row(lat) * self.cols + self._cell_col(lon)
+        self.order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[self.order]
+        all_keys = np.arange(self.rows * self.cols)
+        self.starts = np.searchsorted(sorted_keys, all_keys, side='left')
+        self.stops = np.searchsorted(sorted_keys, all_keys, side='right')
+        
+        # Smallest possible miles spanned by one cell (longitude shrinks with latitude)
+        max_abs_lat = max(abs(float(lat.min())), abs(float(lat.max())))
+        self.cell_miles = haversine_distance(max_abs_lat, 0.0, max_abs_lat, cell)
+    
+    def _cell_row(self, lat):
+        return ((np.asarray(lat) - self.lat0) // self.cell).astype(np.int64)
+    
+    def _cell_col(self, lon):
+        return ((np.asarray(lon) - self.lon0) // self.cell).astype(np.int64)
+    
+    def nearest(self, lat, lon):
+        """(node, miles) of the nearest node"""
+        row = int(np.clip(self._cell_row(lat), 0, self.rows - 1))
+        col = int(np.clip(self._cell_col(lon), 0, self.cols - 1))
+        # Rings needed before the query point itself falls inside the grid
+        outside = max(0, int(abs(self._cell_row(lat) - row)), int(abs(self._cell_col(lon) - col)))
+        best_node, best_miles = None, float('inf')
+        
+        for ring in range(max(self.rows, self.cols) + 1):
+            r0, r1 = max(row - ring, 0), min(row + ring, self.rows - 1)
+            c0, c1 = max(col - ring, 0), min(col + ring, self.cols - 1)
+            candidates = []
+            for r in range(r0, r1 + 1):
+                edge_row = r in (row - ring, row + ring)
+                for c in (range(c0, c1 + 1) if edge_row else {c0, c1} & {col - ring, col + ring}):
+                    key = r * self.cols + c
+                    if self.stops[key] > self.starts[key]:
+                        candidates.append(self.order[self.starts[key]:self.stops[key]])
+            if candidates:
+                nodes = np.concatenate(candidates)
+                dlat = np.radians(self.lat[nodes] - lat)
+                dlon = np.radians(self.lon[nodes] - lon)
+                a = (np.sin(dlat / 2) ** 2 +
+                     np.cos(np.radians(lat)) * np.cos(np.radians(self.lat[nodes])) * np.sin(dlon / 2) ** 2)
+                miles = 2 * EARTH_RADIUS_MILES * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+                i = int(np.argmin(miles))
+                if miles[i] < best_miles:
+                    best_node, best_miles = int(nodes[i]), float(miles[i])
+            # Every unvisited cell is at least `ring - outside` cells away
+            if best_node is not None and best_miles <= (ring - outside) * self.cell_miles:
+                break
+        
+        return best_node, haversine_distance(lat, lon, float(self.lat[best_node]), float(self.lon[best_node]))
+
+def _way_speed(tags, highway):
+    """Posted speed from the maxspeed tag, else the highway-class default"""
+    maxspeed = tags.get('maxspeed', '')
+    try:
+        value = float(maxspeed.split()[0])
+        return value if 'mph' in maxspeed else value * 0.621371
+    except (ValueError, IndexError):
+        return ROAD_SPEEDS_MPH[highway]
+
+def load_road_graph(path):
+    """Load a road graph from .json or OSM XML (.osm / .xml)"""
+    path = Path(path)
+    if path.suffix.lower() in ('.osm', '.xml'):
+        return RoadGraph.from_osm(path)
+    if path.suffix.lower() == '.pbf':
+        raise ValueError("PBF extracts are not read directly; convert with "
+                         "`osmium cat extract.osm.pbf -o extract.osm` first")
+    return RoadGraph.from_json(path)
+
+# ============================================================================
+# SHORTEST PATHS
+# ============================================================================
+
+def shortest_paths_to(graph, target):
+    """Fastest drive time (hours) and its length (miles) from every node to target"""
+    reverse = graph.reverse_adjacency()
+    hours = [float('inf')] * graph.num_nodes
+    miles = [float('inf')] * graph.num_nodes
+    hours[target] = 0.0
+    miles[target] = 0.0
+    heap = [(0.0, target)]
+    
+    while heap:
+        h, v = heapq.heappop(heap)
+        if h > hours[v]:
+            continue
+        for u, edge_miles, edge_hours in reverse[v]:
+            nh = h + edge_hours
+            if nh < hours[u]:
+                hours[u] = nh
+                miles[u] = miles[v] + edge_miles
+                heapq.heappush(heap, (nh, u))
+    
+    return np.array([hours, miles], dtype=np.float32)
+
+# ============================================================================
+# DISTANCE PROVIDER
+# ============================================================================
+
+def _facility_key(facility):
+    """Cache key that changes if a facility is renamed or moved"""
+    raw = f"{facility.get('id')}|{facility['latitude']:.6f}|{facility['longitude']:.6f}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+class RoadNetworkDistanceProvider:
+    """Drive distance/time over a road graph with persisted per-facility tables"""
+    
+    def __init__(self, graph, cache_dir=None, max_snap_miles=MAX_SNAP_MILES):
+        self.graph = graph
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_snap_miles = max_snap_miles
+        self._tables = {}
+        self._gate_miles = {}
+        self._last_snap = (None, None)
+        self._lock = threading.Lock()
+    
+    def _table_path(self, facility):
+        return self.cache_dir / self.graph.version / f"{_facility_key(facility)}.npy"
+    
+    def facility_table(self, facility):
+        """(2, num_nodes) array of hours/miles to the facility gate, built once"""
+        key = _facility_key(facility)
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+        
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                return table
+            
+            path = self._table_path(facility)
+            snapped = self.graph.snap(facility['latitude'], facility['longitude'])
+            if snapped is None or snapped[1] > self.max_snap_miles:
+                table = False  # facility is off the network
+            elif path.exists():
+                table = np.load(path, mmap_mode='r')
+            else:
+                table = shortest_paths_to(self.graph, snapped[0])
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.stem + '.tmp.npy')
+                np.save(tmp, table)
+                os.replace(tmp, path)
+                logger.info("Precomputed road distances to %s (%s)", facility.get('id'), path)
+            if snapped is not None:
+                self._gate_miles[key] = snapped[1]
+            self._tables[key] = table
+        return table
+    
+    def precompute(self, facilities):
+        """Build and persist tables for every facility up front"""
+        for facility in facilities:
+            self.facility_table(facility)
+    
+    def _snap_site(self, lat, lon):
+        """Snap a site, reusing the last result when candidates share a site"""
+        last_point, last_snap = self._last_snap
+        if last_point == (lat, lon):
+            return last_snap
+        snapped = self.graph.snap(lat, lon)
+        self._last_snap = ((lat, lon), snapped)
+        return snapped
+    
+    def route(self, lat, lon, facility):
+        """(drive_miles, drive_hours) from site to facility, or None to fall back"""
+        table = self.facility_table(facility)
+        if table is False:
+            return None
+        
+        snapped = self._snap_site(lat, lon)
+        if snapped is None or snapped[1] > self.max_snap_miles:
+            return None
+        node, snap_miles = snapped
+        
+        network_hours = float(table[0, node])
+        network_miles = float(table[1, node])
+        if not np.isfinite(network_hours):
+            return None
+        
+        # Off-network legs: site to its road node and facility gate to its road node
+        offroad_miles = (snap_miles + self._gate_miles[_facility_key(facility)]) * OFFROAD_DETOUR_FACTOR
+        
+        return network_miles + offroad_miles, network_hours + offroad_miles / OFFROAD_SPEED_MPH
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    """Convert OSM extracts and precompute facility distance tables"""
+    import argparse
+    from .facilities import configure_facilities_database, load_facilities_database
+    
+    parser = argparse.ArgumentParser(prog='python -m cleanfutures.roads',
+                                     description=main.__doc__)
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    convert = sub.add_parser('convert', help="Convert an OSM XML extract to the compact JSON graph")
+    convert.add_argument('osm')
+    convert.add_argument('output')
+    
+    precompute = sub.add_parser('precompute', help="Precompute drive-time tables for every facility")
+    precompute.add_argument('graph')
+    precompute.add_argument('--facilities-db', default=None)
+    precompute.add_argument('--cache-dir', default=os.environ.get('CLEANFUTURES_ROUTE_CACHE'))
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    if args.command == 'convert':
+        graph = RoadGraph.from_osm(args.osm)
+        graph.save_json(args.output)
+        print(f"{graph.num_nodes:,} nodes, {len(graph.edge_from):,} edges -> {args.output}")
+    else:
+        if args.facilities_db:
+            configure_facilities_database(args.facilities_db)
+        db = load_facilities_database()
+        provider = RoadNetworkDistanceProvider(load_road_graph(args.graph), cache_dir=args.cache_dir)
+        provider.precompute(db['landfills'] + db['clean_futures_facilities'])
+        print(f"Tables for graph {provider.graph.version} in {provider.cache_dir / provider.graph.version}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Pluggable haul distance providers.
+
+By default haul legs use straight-line haversine distance at the fixed
+average truck speed. When a road graph is configured (see roads.py), a
+road-network provider supplies drive distance and drive time instead, and
+haversine remains the fallback for anything it cannot route.
+
+A provider implements route(lat, lon, facility) and returns
+(distance_miles, drive_hours), or None if it cannot route that leg.
+"""
+
+import os
+import threading
+
+# Environment variables that enable road-network routing
+ROAD_GRAPH_ENV_VAR = 'CLEANFUTURES_ROAD_GRAPH'
+ROUTE_CACHE_ENV_VAR = 'CLEANFUTURES_ROUTE_CACHE'
+
+# Straight-line candidates re-ranked by drive time when routing on roads
+ROUTE_CANDIDATES = 5
+
+_lock = threading.Lock()
+_provider = None
+_configured = False
+
+def set_distance_provider(provider):
+    """Install a distance provider for the process (None = straight line)"""
+    global _provider, _configured
+    with _lock:
+        _provider = provider
+        _configured = True
+
+def configure_distance_provider(graph_path=None, cache_dir=None):
+    """Load a road graph and install a road-network provider for it
+    
+    With no graph_path the provider is reset to straight-line distances.
+    """
+    if not graph_path:
+        set_distance_provider(None)
+        return None
+    
+    from .roads import RoadNetworkDistanceProvider, load_road_graph
+    provider = RoadNetworkDistanceProvider(load_road_graph(graph_path), cache_dir=cache_dir)
+    set_distance_provider(provider)
+    return provider
+
+def get_distance_provider():
+    """Return the active provider, configuring it from the environment on first use"""
+    if not _configured:
+        with _lock:
+            if _configured:
+                return _provider
+        graph_path = os.environ.get(ROAD_GRAPH_ENV_VAR)
+        if graph_path:
+            return configure_distance_provider(graph_path, os.environ.get(ROUTE_CACHE_ENV_VAR))
+        set_distance_provider(None)
+    return _provider
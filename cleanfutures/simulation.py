@@ -0,0 +1,251 @@
+"""
+Discrete-event simulation of the dig & haul cycle.
+
+The closed-form schedule in calculate_dig_and_haul() divides trips by a
+fractional trips-per-day rate. This module plays the job out instead: the
+excavator digs into a stockpile, the loader fills one truck at a time, trucks
+drive to the landfill, queue at the gate, unload and return. Equipment only
+works inside the daily shift, a truck is only loaded if it can unload before
+the gate closes that day, and the gate only unloads while it is open. Events
+are kept in a heap ordered by time, so a 50,000 CY job runs in about a tenth
+of a second.
+"""
+
+import heapq
+import math
+
+from .calculators import (
+    EXCAVATION_CAPACITY_CYPH,
+    LOADING_CAPACITY_CYPH,
+    UNLOADING_TIME_HOURS,
+    DEFAULT_TRUCK_CAPACITY_CY,
+    DEFAULT_NUM_TRUCKS,
+    DEFAULT_WORK_HOURS_PER_DAY,
+)
+
+# Clock hour the site shift (and, by default, the landfill gate) opens
+SHIFT_START_HOUR = 7
+
+# Trucks the landfill gate can unload at the same time
+DEFAULT_GATE_LANES = 1
+
+# Reasons a truck can be idle while on the clock
+IDLE_REASONS = ('waiting_for_loader', 'waiting_for_soil', 'gate_queue', 'shift_end', 'released')
+
+_EPSILON = 1e-9
+
+# ============================================================================
+# OPERATING HOURS
+# ============================================================================
+
+class Shifts:
+    """Daily operating window of `length` hours opening at `start` o'clock
+    
+    Times are hours since midnight of the first day.
+    """
+    
+    def __init__(self, start, length):
+        self.start = start
+        self.length = min(length, 24)
+    
+    def worked(self, t):
+        """Operating hours elapsed between the first opening and time t"""
+        day = math.floor((t - self.start) / 24)
+        into_day = t - self.start - 24 * day
+        return max(day, 0) * self.length + (min(max(into_day, 0), self.length) if day >= 0 else 0)
+    
+    def worked_between(self, t0, t1):
+        """Operating hours inside [t0, t1]"""
+        return self.worked(t1) - self.worked(t0)
+    
+    def open_at(self, t):
+        """Earliest time >= t when the window is open"""
+        day = math.floor((t - self.start) / 24)
+        begin = self.start + 24 * day
+        if t < begin + self.length - _EPSILON:
+            return max(t, begin)
+        return begin + 24
+    
+    def closes(self, t):
+        """Closing time of the window that is open at time t"""
+        day = math.floor((t - self.start) / 24)
+        return self.start + 24 * day + self.length
+    
+    def advance(self, t, hours):
+        """Time at which `hours` of operating time starting at t are complete"""
+        target = self.worked(self.open_at(t)) + hours
+        day = math.floor(target / self.length)
+        remainder = target - day * self.length
+        if remainder < _EPSILON and day > 0:
+            day, remainder = day - 1, self.length
+        return self.start + 24 * day + remainder
+
+# ============================================================================
+# SIMULATION
+# ============================================================================
+
+def simulate_dig_and_haul(volume_cy, travel_time_hours, truck_capacity=DEFAULT_TRUCK_CAPACITY_CY,
+                          num_trucks=DEFAULT_NUM_TRUCKS, work_hours_per_day=DEFAULT_WORK_HOURS_PER_DAY,
+                          excavation_rate=EXCAVATION_CAPACITY_CYPH, loading_rate=LOADING_CAPACITY_CYPH,
+                          unloading_time=UNLOADING_TIME_HOURS, gate_lanes=DEFAULT_GATE_LANES,
+                          gate_hours=None, shift_start=SHIFT_START_HOUR):
+    """Simulate excavation, loading, hauling and unloading until all soil is delivered
+    
+    travel_time_hours is the one-way drive. gate_hours is (open_hour,
+    close_hour) for the landfill gate; None uses the site shift.
+    
+    Returns a dict with project_days, trips, truck_hours (time trucks are on
+    the job before being released), productive_truck_hours, truck and
+    equipment utilization, and truck_idle_hours broken down by IDLE_REASONS.
+    """
+    shifts = Shifts(shift_start, work_hours_per_day)
+    if gate_hours is None:
+        gate = shifts
+    else:
+        gate = Shifts(gate_hours[0], gate_hours[1] - gate_hours[0])
+    
+    loads = [truck_capacity] * int(volume_cy // truck_capacity)
+    if volume_cy - truck_capacity * len(loads) > _EPSILON:
+        loads.append(volume_cy - truck_capacity * len(loads))
+    haul_and_unload = travel_time_hours + unloading_time
+    
+    events = []
+    sequence = 0
+    
+    def schedule(time, kind, truck=None):
+        nonlocal sequence
+        heapq.heappush(events, (time, sequence, kind, truck))
+        sequence += 1
+    
+    # Job state
+    dug = 0.0
+    taken = 0.0
+    next_load = 0
+    loader_busy = False
+    loader_hours = 0.0
+    excavator_hours = 0.0
+    at_site = list(range(num_trucks))
+    gate_queue = []
+    gate_free = gate_lanes
+    gate_wakeup = None
+    site_wakeup = None
+    productive = 0.0
+    delivered = 0
+    finish = shift_start
+    
+    # Idle time accounting, integrated between consecutive events
+    idle = dict.fromkeys(IDLE_REASONS, 0.0)
+    last_time = shift_start
+    site_reason = 'waiting_for_soil'
+    
+    def excavate(now):
+        nonlocal dug, excavator_hours
+        if dug >= volume_cy - _EPSILON:
+            return
+        amount = min(truck_capacity, volume_cy - dug)
+        hours = amount / excavation_rate
+        excavator_hours += hours
+        dug += amount
+        schedule(shifts.advance(now, hours), 'dug')
+    
+    def dispatch(now):
+        """Start loading the next truck if the loader, soil and clock allow"""
+        nonlocal loader_busy, next_load, taken, loader_hours, site_reason, site_wakeup, productive
+        if loader_busy or not at_site or next_load >= len(loads):
+            site_reason = 'waiting_for_loader' if loader_busy else 'released'
+            return
+    
+        # A truck is only loaded if it can unload before the gate closes,
+        # unless the haul is longer than the gate is ever open
+        amount = loads[next_load]
+        load_hours = amount / loading_rate
+        opens = shifts.open_at(now)
+        arrival = now + load_hours + travel_time_hours
+        fits = arrival + unloading_time <= gate.closes(gate.open_at(now)) + _EPSILON
+        if opens > now + _EPSILON or (not fits and load_hours + haul_and_unload <= gate.length):
+            site_reason = 'shift_end'
+            wake = opens if opens > now + _EPSILON else shifts.open_at(shifts.closes(now))
+            if site_wakeup is None or site_wakeup <= now:
+                site_wakeup = wake
+                schedule(wake, 'site_opens')
+            return
+        if dug - taken < amount - _EPSILON:
+            site_reason = 'waiting_for_soil'
+            return
+    
+        truck = at_site.pop(0)
+        taken += amount
+        loader_busy = True
+        loader_hours += load_hours
+        productive += load_hours
+        next_load += 1
+        site_reason = 'waiting_for_loader'
+        schedule(now + load_hours, 'loaded', truck)
+    
+    def start_unloading(now):
+        nonlocal gate_free, gate_wakeup, productive
+        while gate_free and gate_queue:
+            opens = gate.open_at(now)
+            if opens > now + _EPSILON:
+                if gate_wakeup is None or gate_wakeup <= now:
+                    gate_wakeup = opens
+                    schedule(opens, 'gate_opens')
+                return
+            truck = gate_queue.pop(0)
+            gate_free -= 1
+            productive += unloading_time
+            schedule(now + unloading_time, 'unloaded', truck)
+    
+    excavate(shift_start)
+    
+    while events:
+        now, _, kind, truck = heapq.heappop(events)
+    
+        # Charge the time since the last event to whatever trucks were doing
+        worked = shifts.worked_between(last_time, now)
+        if worked > 0:
+            if at_site and next_load < len(loads):
+                idle[site_reason] += worked * len(at_site)
+            idle['gate_queue'] += worked * len(gate_queue)
+        last_time = now
+    
+        if kind == 'dug':
+            excavate(now)
+        elif kind == 'loaded':
+            loader_busy = False
+            productive += travel_time_hours
+            schedule(now + travel_time_hours, 'at_gate', truck)
+        elif kind == 'at_gate':
+            gate_queue.append(truck)
+            start_unloading(now)
+        elif kind == 'gate_opens':
+            start_unloading(now)
+        elif kind == 'unloaded':
+            gate_free += 1
+            delivered += 1
+            finish = now
+            start_unloading(now)
+            productive += travel_time_hours
+            schedule(now + travel_time_hours, 'returned', truck)
+        elif kind == 'returned':
+            at_site.append(truck)
+    
+        dispatch(now)
+    
+    project_days = max(1, math.floor((finish - shift_start - _EPSILON) / 24) + 1)
+    on_job = productive + sum(idle[reason] for reason in IDLE_REASONS if reason != 'released')
+    available = max(num_trucks * project_days * shifts.length, on_job)
+    idle['released'] = available - on_job
+    equipment_hours = project_days * shifts.length
+    
+    return {
+        'project_days': project_days,
+        'finish_hour': finish - shift_start,
+        'trips': delivered,
+        'truck_hours': on_job,
+        'productive_truck_hours': productive,
+        'truck_utilization': productive / available,
+        'truck_idle_hours': idle,
+        'excavator_utilization': excavator_hours / equipment_hours,
+        'loader_utilization': loader_hours / equipment_hours,
+    }
@@ -0,0 +1,279 @@
+"""
+Siting optimizer for new Clean Futures surface facilities.
+
+propose_facilities() picks k new facility locations from a grid of candidate
+points so that hauling a set of historical spills to their cheapest facility
+(existing or new) costs as little as possible, counting trucking, processing
+and priced CO2 exactly as calculate_surface_facility() does.
+
+The spill x candidate cost matrix is computed once with NumPy, in row
+chunks into a single float32 array (the only full-size allocation). Sites are
+added greedily, keeping each spill's best and second-best open facility so
+an addition only takes an elementwise minimum instead of a full recompute;
+a swap (add-drop) local search then moves sites while it still pays off.
+Distances are straight-line.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .batch import _chunk_bounds, _dated_price_matrix, _prepare_sites, _site_pricing
+from .calculators import (
+    DEFAULT_TRUCK_CAPACITY_CY,
+    DEFAULT_TRUCK_HOURLY_RATE,
+    DEFAULT_PROCESSING_COST_CY,
+)
+from .raster import PERMIAN_BOUNDS
+from .vectorized import haversine_matrix, surface_facility_arrays
+
+DEFAULT_CANDIDATE_SPACING_DEG = 0.05
+DEFAULT_CO2_COST_PER_TON = 50
+DEFAULT_TURNAROUND_DAYS = 30
+
+# Candidate grid extends this far beyond the spills (degrees)
+CANDIDATE_MARGIN_DEG = 0.25
+
+# Local search stops after this many improving swaps
+MAX_SWAPS = 100
+
+# ============================================================================
+# COSTS
+# ============================================================================
+
+def candidate_grid(site_lat, site_lon, spacing=DEFAULT_CANDIDATE_SPACING_DEG, bounds=PERMIAN_BOUNDS):
+    """Grid of candidate (lat, lon) points around the spills, clipped to bounds"""
+    lat_min = max(np.min(site_lat) - CANDIDATE_MARGIN_DEG, bounds[0])
+    lat_max = min(np.max(site_lat) + CANDIDATE_MARGIN_DEG, bounds[1])
+    lon_min = max(np.min(site_lon) - CANDIDATE_MARGIN_DEG, bounds[2])
+    lon_max = min(np.max(site_lon) + CANDIDATE_MARGIN_DEG, bounds[3])
+    lats = np.arange(lat_min, lat_max + spacing / 2, spacing)
+    lons = np.arange(lon_min, lon_max + spacing / 2, spacing)
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+    return lat_grid.ravel(), lon_grid.ravel()
+
+def haul_costs(sites, lat, lon, processing_cost_cy, co2_cost_per_ton=DEFAULT_CO2_COST_PER_TON,
+               truck_capacity=DEFAULT_TRUCK_CAPACITY_CY, truck_hourly_rate=DEFAULT_TRUCK_HOURLY_RATE,
+               fuel_price_delta=0.0, dtype=float):
+    """Site x facility matrix of surface facility cost plus priced CO2
+    
+    processing_cost_cy is one price per facility or a site x facility
+    matrix; truck_hourly_rate and fuel_price_delta may be per-site arrays.
+    The result (of dtype) is allocated once and filled in row chunks of at
+    most MAX_MATRIX_CELLS cells, so no other full-size array is built.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    volume = sites['volume_cy']
+    
+    # Cost is affine in distance, so the kernel at 0 and 1 mile gives every pair
+    def priced(distance_miles):
+        surface = surface_facility_arrays(volume, distance_miles, truck_capacity, truck_hourly_rate,
+                                          0.0, DEFAULT_TURNAROUND_DAYS, fuel_price_delta=fuel_price_delta)
+        return surface['total_cost'] + co2_cost_per_ton * surface['co2_tons']
+    
+    fixed = priced(0.0)
+    per_mile = priced(1.0) - fixed
+    processing_cost_cy = np.asarray(processing_cost_cy, dtype=float)
+    per_facility = processing_cost_cy.ndim < 2
+    if per_facility:
+        processing_cost_cy = np.broadcast_to(processing_cost_cy, lat.shape)[None, :]
+    
+    costs = np.empty((len(volume), len(lat)), dtype=dtype)
+    for start, stop in _chunk_bounds(len(volume), len(lat)):
+        rows = slice(start, stop)
+        chunk = haversine_matrix(sites['site_lat'][rows, None], sites['site_lon'][rows, None],
+                                 lat[None, :], lon[None, :])
+        chunk *= per_mile[rows, None]
+        chunk += fixed[rows, None]
+        chunk += volume[rows, None] * (processing_cost_cy if per_facility else processing_cost_cy[rows])
+        costs[rows] = chunk
+    return costs
+
+# ============================================================================
+# OPTIMIZATION
+# ============================================================================
+
+class _OpenSet:
+    """Best and second-best open facility per spill, updated incrementally"""
+    
+    def __init__(self, n_sites):
+        self.best = np.full(n_sites, np.inf)
+        self.best_id = np.full(n_sites, -1)
+        self.second = np.full(n_sites, np.inf)
+    
+    def add(self, costs, facility_id):
+        """Open a facility whose cost column is `costs`"""
+        better = costs < self.best
+        self.second = np.where(better, self.best, np.minimum(self.second, costs))
+        self.best = np.where(better, costs, self.best)
+        self.best_id = np.where(better, facility_id, self.best_id)
+    
+    def total(self):
+        return float(self.best.sum())
+
+def _rebuild(fixed_costs, cost_matrix, chosen):
+    """Open set of the fixed facilities plus the chosen candidates"""
+    open_set = _OpenSet(cost_matrix.shape[0])
+    for f in range(fixed_costs.shape[1]):
+        open_set.add(fixed_costs[:, f], -1 - f)
+    for j in chosen:
+        open_set.add(cost_matrix[:, j], j)
+    return open_set
+
+def _savings(best, costs):
+    """Saving from opening each column of costs; with nothing open, minus its total"""
+    if np.isinf(best).all():
+        return -costs.sum(axis=0, dtype=float)
+    savings = np.zeros(costs.shape[1])
+    for start, stop in _chunk_bounds(*costs.shape):
+        savings += np.maximum(best[start:stop, None] - costs[start:stop], 0).sum(axis=0)
+    return savings
+
+def _greedy_add(open_set, cost_matrix, chosen, k):
+    """Add the candidate with the largest saving until k are chosen"""
+    for _ in range(k - len(chosen)):
+        savings = _savings(open_set.best, cost_matrix)
+        savings[chosen] = -np.inf
+        j = int(np.argmax(savings))
+        chosen.append(j)
+        open_set.add(cost_matrix[:, j], j)
+    return chosen
+
+def _best_swap(open_set, cost_matrix, chosen):
+    """Most improving (position in chosen, new candidate) swap, or None"""
+    total = open_set.total()
+    best_gain = 1e-9 * total
+    best_pair = None
+    for position, j_out in enumerate(chosen):
+        # Cost of each spill once j_out is closed, then with each candidate opened instead
+        fallback = np.where(open_set.best_id == j_out, open_set.second, open_set.best)
+        gains = np.full(cost_matrix.shape[1], total)
+        for start, stop in _chunk_bounds(*cost_matrix.shape):
+            gains -= np.minimum(fallback[start:stop, None], cost_matrix[start:stop]).sum(axis=0)
+        gains[chosen] = -np.inf
+        j_in = int(np.argmax(gains))
+        if gains[j_in] > best_gain:
+            best_gain, best_pair = gains[j_in], (position, j_in)
+    return best_pair
+
+class SitingResult:
+    """Proposed facility locations and what each one saves"""
+    
+    def __init__(self, candidates, chosen, cost_matrix, fixed_costs, site_ids, existing_ids,
+                 processing_cost_cy):
+        self.candidate_lat, self.candidate_lon = candidates
+        self.site_ids = site_ids
+        self.existing_ids = existing_ids
+        self.processing_cost_cy = processing_cost_cy
+    
+        open_set = _rebuild(fixed_costs, cost_matrix, [])
+        self.baseline_cost = open_set.total() if existing_ids else None
+    
+        # Re-add the chosen sites greedily so each one's marginal saving is known
+        self.chosen = []
+        self.totals = []
+        remaining = list(chosen)
+        while remaining:
+            savings = _savings(open_set.best, cost_matrix[:, remaining])
+            j = remaining.pop(int(np.argmax(savings)))
+            self.chosen.append(j)
+            open_set.add(cost_matrix[:, j], j)
+            self.totals.append(open_set.total())
+        self.total_cost = self.totals[-1] if self.totals else self.baseline_cost
+        self._open_set = open_set
+    
+    def _facility_id(self, index):
+        if index < 0:
+            return self.existing_ids[-1 - index]
+        return f"NEW{self.chosen.index(index) + 1:03d}"
+    
+    def sites(self):
+        """One row per proposed site, in order of marginal benefit"""
+        previous = [self.baseline_cost] + self.totals[:-1]
+        rows = []
+        for rank, (j, total, before) in enumerate(zip(self.chosen, self.totals, previous), start=1):
+            rows.append({
+                'id': f"NEW{rank:03d}",
+                'latitude': float(self.candidate_lat[j]),
+                'longitude': float(self.candidate_lon[j]),
+                'marginal_savings': None if before is None else before - total,
+                'total_cost': total,
+                'spills_served': int((self._open_set.best_id == j).sum()),
+            })
+        return pd.DataFrame(rows)
+    
+    def assignments(self):
+        """Cheapest facility and its cost for every spill with the proposed sites open"""
+        return pd.DataFrame({
+            'site_id': self.site_ids,
+            'facility_id': [self._facility_id(int(index)) for index in self._open_set.best_id],
+            'cost': self._open_set.best,
+        })
+    
+    def proposed_facilities(self):
+        """clean_futures_facilities records for the proposed sites"""
+        return [{
+            'id': f"NEW{rank:03d}",
+            'facility_name': f"Proposed Facility {rank}",
+            'region': 'Proposed',
+            'latitude': round(float(self.candidate_lat[j]), 4),
+            'longitude': round(float(self.candidate_lon[j]), 4),
+            'processing_cost_cy': self.processing_cost_cy,
+            'includes_backfill': True,
+            'backfill_cost_cy': 0,
+            'typical_turnaround_days': DEFAULT_TURNAROUND_DAYS,
+            'notes': "Proposed by the siting optimizer",
+        } for rank, j in enumerate(self.chosen, start=1)]
+
+def propose_facilities(sites, db, k, spacing=DEFAULT_CANDIDATE_SPACING_DEG, candidates=None,
+                       co2_cost_per_ton=DEFAULT_CO2_COST_PER_TON,
+                       processing_cost_cy=DEFAULT_PROCESSING_COST_CY, include_existing=True):
+    """Choose k new surface facility locations for a set of spills
+    
+    sites has site_lat, site_lon and volume_cy columns (plus an optional
+    site_id). candidates is an optional (lats, lons) pair; by default a grid
+    with the given spacing around the spills is used. Existing
+    clean_futures_facilities stay open unless include_existing is False.
+    An optional project_date column prices each spill with the truck rate,
+    diesel price and existing facility prices in effect on that date.
+    """
+    s = _prepare_sites(sites)
+    site_ids = list(sites['site_id']) if 'site_id' in sites.columns else list(sites.index)
+    if candidates is None:
+        candidates = candidate_grid(s['site_lat'], s['site_lon'], spacing)
+    cand_lat, cand_lon = (np.asarray(values, dtype=float) for values in candidates)
+    if k > len(cand_lat):
+        raise ValueError(f"Only {len(cand_lat)} candidate locations for k={k}")
+    
+    pricing, ordinals, rates, fuel_delta = _site_pricing(sites, db)
+    trucking = {'truck_hourly_rate': rates.get('truck_hourly_rate', DEFAULT_TRUCK_HOURLY_RATE),
+                'fuel_price_delta': fuel_delta}
+    
+    # Stored as float32 (cent-level rounding on costs of this size) to halve the largest array
+    cost_matrix = haul_costs(s, cand_lat, cand_lon, processing_cost_cy, co2_cost_per_ton, dtype=np.float32,
+                             **trucking)
+    existing = db['clean_futures_facilities'] if include_existing else []
+    if existing:
+        if pricing is None:
+            existing_processing = [cf['processing_cost_cy'] for cf in existing]
+        else:
+            existing_processing = _dated_price_matrix(pricing, 'clean_futures_facilities', 'processing_cost_cy',
+                                                      len(existing), ordinals)
+        fixed_costs = haul_costs(s, [cf['latitude'] for cf in existing], [cf['longitude'] for cf in existing],
+                                 existing_processing, co2_cost_per_ton, **trucking)
+    else:
+        fixed_costs = np.empty((len(site_ids), 0))
+    
+    open_set = _rebuild(fixed_costs, cost_matrix, [])
+    chosen = _greedy_add(open_set, cost_matrix, [], k)
+    
+    for _ in range(MAX_SWAPS):
+        swap = _best_swap(open_set, cost_matrix, chosen)
+        if swap is None:
+            break
+        position, j_in = swap
+        chosen[position] = j_in
+        open_set = _rebuild(fixed_costs, cost_matrix, chosen)
+    
+    return SitingResult((cand_lat, cand_lon), chosen, cost_matrix, fixed_costs, site_ids,
+                        [cf['id'] for cf in existing], processing_cost_cy)
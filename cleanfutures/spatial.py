@@ -0,0 +1,144 @@
+"""
+Spatial index for nearest-facility queries.
+
+Facilities are stored as 3-D unit vectors in a k-d tree. Straight-line
+(chord) distance on the unit sphere is monotonic in great-circle distance,
+so nearest-by-chord is nearest-by-haversine. Each tree node also keeps the
+maximum of selected numeric fields over its subtree, which lets acceptance
+thresholds (TPH max, chloride max, backfill availability) prune whole
+branches instead of being checked record by record.
+"""
+
+import heapq
+import math
+
+from .geo import haversine_distance
+
+LEAF_SIZE = 8
+
+def to_unit_vector(lat, lon):
+    """Convert degrees latitude/longitude to a 3-D unit vector"""
+    lat_rad = math.radians(lat)
+    lon_rad = math.radians(lon)
+    cos_lat = math.cos(lat_rad)
+    return (cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad))
+
+class _Node:
+    __slots__ = ('lo', 'hi', 'maxima', 'items', 'left', 'right')
+    
+    def __init__(self, lo, hi, maxima, items=None, left=None, right=None):
+        self.lo = lo
+        self.hi = hi
+        self.maxima = maxima
+        self.items = items
+        self.left = left
+        self.right = right
+
+def _box_distance_sq(point, lo, hi):
+    """Squared distance from a point to an axis-aligned box (0 if inside)"""
+    total = 0.0
+    for x, a, b in zip(point, lo, hi):
+        if x < a:
+            total += (a - x) ** 2
+        elif x > b:
+            total += (x - b) ** 2
+    return total
+
+class FacilityIndex:
+    """k-d tree over facility records with threshold-aware k-nearest search
+    
+    records: list of facility dicts with 'latitude' and 'longitude'.
+    threshold_fields: numeric/boolean fields that queries may require a
+    minimum value for; their subtree maxima are stored for pruning.
+    """
+    
+    def __init__(self, records, threshold_fields=()):
+        self.records = records
+        self.threshold_fields = tuple(threshold_fields)
+        points = [to_unit_vector(rec['latitude'], rec['longitude']) for rec in records]
+        values = [tuple(rec[field] for field in self.threshold_fields) for rec in records]
+        items = [(points[i], values[i], i) for i in range(len(records))]
+        self.root = self._build(items) if items else None
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def _build(self, items):
+        lo = tuple(min(item[0][d] for item in items) for d in range(3))
+        hi = tuple(max(item[0][d] for item in items) for d in range(3))
+        maxima = tuple(max(item[1][f] for item in items) for f in range(len(self.threshold_fields)))
+        
+        if len(items) <= LEAF_SIZE:
+            return _Node(lo, hi, maxima, items=items)
+        
+        # Split on the widest dimension at the median
+        axis = max(range(3), key=lambda d: hi[d] - lo[d])
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        return _Node(lo, hi, maxima, left=self._build(items[:mid]), right=self._build(items[mid:]))
+    
+    def _required(self, minimums):
+        """Turn a {field: minimum} dict into (position, minimum) pairs"""
+        if not minimums:
+            return ()
+        required = []
+        for field, minimum in minimums.items():
+            if field not in self.threshold_fields:
+                raise KeyError(f"'{field}' is not an indexed threshold field")
+            required.append((self.threshold_fields.index(field), minimum))
+        return tuple(required)
+    
+    def nearest(self, lat, lon, k=1, minimums=None, accept=None):
+        """k nearest records satisfying the thresholds, closest first
+        
+        minimums: {field: value} - record[field] must be >= value.
+        accept: optional extra predicate on the record dict.
+        Returns a list of (record, distance_miles).
+        """
+        if self.root is None or k <= 0:
+            return []
+        
+        required = self._required(minimums)
+        point = to_unit_vector(lat, lon)
+        
+        def satisfies(values):
+            for pos, minimum in required:
+                if values[pos] < minimum:
+                    return False
+            return True
+        
+        # Best-first search: frontier is ordered by lower-bound distance
+        counter = 0
+        frontier = [(_box_distance_sq(point, self.root.lo, self.root.hi), counter, self.root)]
+        found = []  # max-heap of (-dist_sq, index) holding the best k
+        
+        while frontier:
+            bound, _, node = heapq.heappop(frontier)
+            if len(found) == k and bound > -found[0][0]:
+                break
+            
+            if node.items is not None:
+                for p, values, idx in node.items:
+                    if required and not satisfies(values):
+                        continue
+                    if accept is not None and not accept(self.records[idx]):
+                        continue
+                    dist_sq = (p[0] - point[0]) ** 2 + (p[1] - point[1]) ** 2 + (p[2] - point[2]) ** 2
+                    if len(found) < k:
+                        heapq.heappush(found, (-dist_sq, -idx))
+                    elif dist_sq < -found[0][0]:
+                        heapq.heapreplace(found, (-dist_sq, -idx))
+                continue
+            
+            for child in (node.left, node.right):
+                if required and not satisfies(child.maxima):
+                    continue  # nothing in this subtree can qualify
+                counter += 1
+                heapq.heappush(frontier, (_box_distance_sq(point, child.lo, child.hi), counter, child))
+        
+        results = []
+        for _, neg_idx in sorted(found, key=lambda item: (-item[0], -item[1])):
+            rec = self.records[-neg_idx]
+            results.append((rec, haversine_distance(lat, lon, rec['latitude'], rec['longitude'])))
+        
+        return results
@@ -0,0 +1,321 @@
+"""
+SQLite backend for the facilities database.
+
+A .sqlite file holds the same records as permian_facilities_db.json, one row
+per facility with the full record stored as JSON. Columns for the id,
+coordinates, county/region and the acceptance thresholds are generated from
+the record and indexed, and each facility table has an R*Tree over its
+coordinates kept in sync by triggers. Nearest-facility lookups therefore read
+only the facilities inside a box around the site, and an edit is a plain SQL
+update of one row:
+
+    UPDATE landfills SET record = json_set(record, '$.disposal_cost_cy', 28)
+    WHERE id = 'LF001';
+
+The file runs in WAL mode so edits don't block readers, and every change
+bumps a revision counter that the facility store uses to reload. Convert the
+JSON file with import_json_database() or `python -m cleanfutures db import`,
+then point --facilities-db (or CLEANFUTURES_FACILITIES_DB) at the .sqlite
+file. Needs SQLite 3.38+ (JSON functions and generated columns).
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+from .facilities import FacilitiesDatabase, INDEX_THRESHOLD_FIELDS
+from .geo import EARTH_RADIUS_MILES, haversine_distance
+
+FACILITY_TABLES = ('landfills', 'clean_futures_facilities')
+
+# Generated, indexed columns per table besides id, latitude and longitude
+TABLE_COLUMNS = {
+    'landfills': {
+        'county': 'TEXT',
+        'tph_max_mgkg': 'REAL',
+        'chloride_max_mgkg': 'REAL',
+        'backfill_available': 'INTEGER',
+    },
+    'clean_futures_facilities': {
+        'region': 'TEXT',
+    },
+}
+TABLE_INDEXES = {
+    'landfills': (('county',), ('tph_max_mgkg', 'chloride_max_mgkg', 'backfill_available')),
+    'clean_futures_facilities': (('region',),),
+}
+
+# Bounded nearest search: the first box is sized to hold about this many
+# facilities per requested match, then grows by SEARCH_GROWTH until k
+# qualifying matches lie within its radius
+SEARCH_FACILITIES_PER_MATCH = 8
+MAX_INITIAL_SEARCH_MILES = 50
+SEARCH_GROWTH = 4
+
+# ============================================================================
+# SCHEMA AND IMPORT
+# ============================================================================
+
+def _schema(table):
+    """CREATE statements for one facility table, its indexes, R*Tree and triggers"""
+    columns = [
+        "id TEXT GENERATED ALWAYS AS (json_extract(record, '$.id')) STORED NOT NULL",
+        "latitude REAL GENERATED ALWAYS AS (json_extract(record, '$.latitude')) STORED NOT NULL",
+        "longitude REAL GENERATED ALWAYS AS (json_extract(record, '$.longitude')) STORED NOT NULL",
+    ]
+    for column, sql_type in TABLE_COLUMNS[table].items():
+        columns.append(f"{column} {sql_type} GENERATED ALWAYS AS (json_extract(record, '$.{column}')) STORED")
+    bump = "UPDATE meta SET value = value + 1 WHERE key = 'revision';"
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {table} (rowid INTEGER PRIMARY KEY, record TEXT NOT NULL, "
+        + ", ".join(columns) + ")",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_id ON {table}(id)",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {table}_rtree VALUES (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude);
+            {bump}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_update AFTER UPDATE ON {table} BEGIN
+            UPDATE {table}_rtree SET min_lat = new.latitude, max_lat = new.latitude,
+                min_lon = new.longitude, max_lon = new.longitude WHERE id = new.rowid;
+            {bump}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON {table} BEGIN
+            DELETE FROM {table}_rtree WHERE id = old.rowid;
+            {bump}
+        END""",
+    ]
+    for columns in TABLE_INDEXES[table]:
+        statements.append(f"CREATE INDEX IF NOT EXISTS {table}_{'_'.join(columns)} ON {table}({', '.join(columns)})")
+    return statements
+
+def create_database(path):
+    """Create (or upgrade) the schema in a SQLite file and return a connection"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        conn.execute("INSERT OR IGNORE INTO meta VALUES ('revision', 0)")
+        conn.execute("INSERT OR IGNORE INTO meta VALUES ('database_id', ?)", (uuid.uuid4().hex,))
+        # Non-facility sections of the JSON file, stored whole
+        conn.execute("CREATE TABLE IF NOT EXISTS documents (name TEXT PRIMARY KEY, body TEXT NOT NULL)")
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS documents_{event.lower()} AFTER {event} ON documents BEGIN
+                UPDATE meta SET value = value + 1 WHERE key = 'revision';
+            END""")
+        for table in FACILITY_TABLES:
+            for statement in _schema(table):
+                conn.execute(statement)
+    return conn
+
+def import_json_database(json_path, sqlite_path, prune=False):
+    """Load a facilities JSON file into a SQLite database, creating it if needed
+    
+    Records are upserted by id, so several files (e.g. one per basin) can be
+    imported into the same database. With prune, facilities missing from the
+    JSON file are deleted. Returns the record count per table.
+    """
+    data = json.loads(Path(json_path).read_text())
+    conn = create_database(sqlite_path)
+    counts = {}
+    try:
+        with conn:
+            for table in FACILITY_TABLES:
+                records = data.get(table, [])
+                conn.executemany(
+                    f"INSERT INTO {table}(record) VALUES (?) "
+                    f"ON CONFLICT(id) DO UPDATE SET record = excluded.record WHERE record != excluded.record",
+                    [(json.dumps(rec),) for rec in records])
+                if prune:
+                    ids = [rec['id'] for rec in records]
+                    conn.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT value FROM json_each(?))",
+                                 (json.dumps(ids),))
+                counts[table] = len(records)
+            for name, body in data.items():
+                if name not in FACILITY_TABLES:
+                    conn.execute("INSERT INTO documents VALUES (?, ?) "
+                                 "ON CONFLICT(name) DO UPDATE SET body = excluded.body WHERE body != excluded.body",
+                                 (name, json.dumps(body)))
+    finally:
+        conn.close()
+    return counts
+
+def sqlite_version(path):
+    """Version string that changes with every committed edit"""
+    conn = sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+    except sqlite3.DatabaseError as exc:
+        raise ValueError(f"{path} is not a facilities database: {exc}") from None
+    finally:
+        conn.close()
+    return f"{meta['database_id'][:8]}-{meta['revision']}"
+
+# ============================================================================
+# DATABASE
+# ============================================================================
+
+class SQLiteFacilitiesDatabase(FacilitiesDatabase):
+    """Facilities database backed by a SQLite file
+    
+    Point lookups go through the R*Tree (see lookup_index). Indexing the
+    object like the JSON dict (db['landfills']) loads that whole table once,
+    for callers such as batch evaluation that need every record.
+    """
+    
+    def __init__(self, path, version=None, load_seconds=0.0):
+        super().__init__({}, path=Path(path), version=version, load_seconds=load_seconds)
+        self._local = threading.local()
+        self._load_lock = threading.Lock()
+        self._records = {}
+    
+    def __reduce__(self):
+        # Each process opens its own connections
+        return (SQLiteFacilitiesDatabase, (self.path, self.version, self.load_seconds))
+    
+    def connection(self):
+        """Read-only connection for the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+    
+    def __missing__(self, key):
+        with self._load_lock:
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+            conn = self.connection()
+            if key in FACILITY_TABLES:
+                value = [json.loads(row[0]) for row in conn.execute(f"SELECT record FROM {key} ORDER BY rowid")]
+            else:
+                row = conn.execute("SELECT body FROM documents WHERE name = ?", (key,)).fetchone()
+                if row is None:
+                    raise KeyError(key)
+                value = json.loads(row[0])
+            dict.__setitem__(self, key, value)
+            return value
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def __contains__(self, key):
+        return self.get(key) is not None
+    
+    def record(self, table, rowid):
+        """Parsed record for one row, cached"""
+        key = (table, rowid)
+        rec = self._records.get(key)
+        if rec is None:
+            row = self.connection().execute(f"SELECT record FROM {table} WHERE rowid = ?", (rowid,)).fetchone()
+            rec = json.loads(row[0])
+            self._records[key] = rec
+        return rec
+    
+    def lookup_index(self, table):
+        return self._cached('rtree', table, lambda: RTreeIndex(self, table))
+    
+    def stats(self):
+        conn = self.connection()
+        return {
+            'path': str(self.path),
+            'version': self.version,
+            'landfills': conn.execute("SELECT COUNT(*) FROM landfills").fetchone()[0],
+            'clean_futures_facilities': conn.execute("SELECT COUNT(*) FROM clean_futures_facilities").fetchone()[0],
+            'load_seconds': self.load_seconds,
+            'loaded_at': self.loaded_at
+        }
+
+def _search_box(lat, lon, radius_miles):
+    """(lat_min, lat_max, lon_min, lon_max) containing every point within radius, or None
+    
+    None means the circle reaches a pole or the antimeridian and the whole
+    table has to be searched.
+    """
+    angle = radius_miles / EARTH_RADIUS_MILES
+    lat_rad = math.radians(lat)
+    lat_min, lat_max = lat_rad - angle, lat_rad + angle
+    if lat_min <= -math.pi / 2 or lat_max >= math.pi / 2:
+        return None
+    delta_lon = math.asin(math.sin(angle) / math.cos(lat_rad))
+    lon_rad = math.radians(lon)
+    if lon_rad - delta_lon <= -math.pi or lon_rad + delta_lon >= math.pi:
+        return None
+    return (math.degrees(lat_min), math.degrees(lat_max),
+            math.degrees(lon_rad - delta_lon), math.degrees(lon_rad + delta_lon))
+
+class RTreeIndex:
+    """Bounded nearest-facility queries against one SQLite facility table
+    
+    Same nearest() interface as FacilityIndex. Only facilities inside a box
+    around the site that also meet the acceptance minimums are read; the box
+    grows until it holds k matches within its inscribed radius, which makes
+    the answer exact.
+    """
+    
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.threshold_fields = INDEX_THRESHOLD_FIELDS.get(table, ())
+    
+        # Average facilities per square mile over the table's extent
+        count, lat_min, lat_max, lon_min, lon_max = db.connection().execute(
+            f"SELECT COUNT(*), MIN(min_lat), MAX(max_lat), MIN(min_lon), MAX(max_lon) FROM {table}_rtree"
+        ).fetchone()
+        if count:
+            miles_per_degree = math.radians(EARTH_RADIUS_MILES)
+            area = (max(lat_max - lat_min, 0.1) * miles_per_degree
+                    * max(lon_max - lon_min, 0.1) * miles_per_degree * math.cos(math.radians((lat_min + lat_max) / 2)))
+            self.density = count / area
+        else:
+            self.density = 0.0
+    
+    def _initial_radius(self, k):
+        if not self.density:
+            return MAX_INITIAL_SEARCH_MILES
+        return min(MAX_INITIAL_SEARCH_MILES, math.sqrt(SEARCH_FACILITIES_PER_MATCH * k / (math.pi * self.density)))
+    
+    def _conditions(self, minimums):
+        conditions, params = [], []
+        for field, minimum in (minimums or {}).items():
+            if field not in self.threshold_fields:
+                raise KeyError(f"'{field}' is not an indexed threshold field")
+            conditions.append(f"f.{field} >= ?")
+            params.append(float(minimum))
+        return conditions, params
+    
+    def nearest(self, lat, lon, k=1, minimums=None):
+        """k nearest records satisfying the thresholds, closest first
+    
+        Returns a list of (record, distance_miles).
+        """
+        if k <= 0:
+            return []
+        conditions, params = self._conditions(minimums)
+        conn = self.db.connection()
+        radius = self._initial_radius(k)
+        while True:
+            box = _search_box(lat, lon, radius)
+            if box is None:
+                sql = f"SELECT f.rowid, f.latitude, f.longitude FROM {self.table} f"
+                box_params = []
+                where = conditions
+            else:
+                # CROSS JOIN keeps the R*Tree as the outer loop
+                sql = (f"SELECT f.rowid, f.latitude, f.longitude FROM {self.table}_rtree r "
+                       f"CROSS JOIN {self.table} f ON f.rowid = r.id")
+                box_params = list(box)
+                where = ["r.max_lat >= ?", "r.min_lat <= ?", "r.max_lon >= ?", "r.min_lon <= ?"] + conditions
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            found = sorted((haversine_distance(lat, lon, row_lat, row_lon), rowid)
+                           for rowid, row_lat, row_lon in conn.execute(sql, box_params + params))
+            if box is None or (len(found) >= k and found[k - 1][0] <= radius):
+                return [(self.db.record(self.table, rowid), distance) for distance, rowid in found[:k]]
+            radius *= SEARCH_GROWTH
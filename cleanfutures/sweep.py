@@ -0,0 +1,352 @@
+"""
+Scenario sweeps and sensitivity analysis for a single site.
+
+The haul destinations for a site do not depend on volume, equipment or
+pricing, so they are resolved once; every swept parameter then becomes one
+axis of an open NumPy grid and the array kernels broadcast over the full
+Cartesian product in a single pass. Grids of 10^5-10^6 points evaluate in
+well under a second.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .calculators import (
+    AVG_SPEED_MPH,
+    LOADING_TIME_HOURS,
+    UNLOADING_TIME_HOURS,
+    BASE_TREATMENT_DAYS,
+    CO2_LBS_PER_GALLON,
+    DEFAULT_PROCESSING_COST_CY,
+    calculate_volume_cy,
+    dated_prices,
+    dig_and_haul_parameters,
+    select_haul_destination,
+    surface_facility_parameters,
+)
+from .facilities import find_k_nearest_qualified_landfills, find_k_nearest_cf_facilities
+from .routing import ROUTE_CANDIDATES, get_distance_provider
+from .vectorized import (
+    OPTION_KEYS,
+    dig_and_haul_arrays,
+    onsite_arrays,
+    surface_facility_arrays,
+    recommendation_arrays,
+)
+
+# Parameters that can be swept, with a display label
+SWEEP_PARAMETERS = {
+    'volume_cy': 'Volume (CY)',
+    'depth_ft': 'Depth (ft)',
+    'surface_area_sqft': 'Surface Area (sq ft)',
+    'num_trucks': 'Number of Trucks',
+    'truck_capacity_cy': 'Truck Capacity (CY)',
+    'truck_hourly_rate': 'Truck Hourly Rate ($)',
+    'excavator_rate': 'Excavator Rate ($/hr)',
+    'loader_rate': 'Loader Rate ($/hr)',
+    'work_hours_per_day': 'Work Hours/Day',
+    'disposal_cost_cy': 'Landfill Disposal ($/CY)',
+    'backfill_cost_cy': 'Backfill Cost ($/CY)',
+    'onsite_processing_cost_cy': 'Onsite Processing ($/CY)',
+    'surface_processing_cost_cy': 'Surface Facility ($/CY)',
+    'cost_priority': 'Cost Importance',
+    'speed_priority': 'Speed Importance',
+    'esg_priority': 'ESG/Sustainability',
+}
+
+PRIORITY_PARAMETERS = ('cost_priority', 'speed_priority', 'esg_priority')
+METRICS = ('total_cost', 'cost_per_cy', 'project_days', 'co2_tons')
+
+# Price stand-ins for an option with no destination (its results are dropped)
+NO_LANDFILL = {'disposal_cost_cy': 0, 'backfill_cost_cy': 0}
+NO_FACILITY = {'processing_cost_cy': DEFAULT_PROCESSING_COST_CY}
+
+# ============================================================================
+# BASE CASE
+# ============================================================================
+
+def _haul_speed(miles, hours, source):
+    """Effective haul speed (mph) for a resolved destination"""
+    if source == 'straight_line' or not hours:
+        return AVG_SPEED_MPH
+    return miles / hours
+
+def resolve_site(analysis, db):
+    """Resolve haul destinations and base-case parameters for a site
+    
+    Uses the same parameter choices and dated prices (for an analysis with a
+    project_date) as the scalar calculators, so an unswept grid point
+    reproduces calculate_* exactly.
+    """
+    lat, lon = analysis['site_lat'], analysis['site_lon']
+    needs_backfill = analysis['needs_backfill']
+    advanced_params = analysis.get('advanced_params')
+    project_date = analysis.get('project_date')
+    provider = get_distance_provider()
+    k = ROUTE_CANDIDATES if provider else 1
+    
+    site = {
+        'needs_backfill': needs_backfill,
+        'soil_permeability': analysis.get('soil_permeability', 'medium'),
+        'tph_level': analysis['tph_level'],
+        'chloride_level': analysis['chloride_level'],
+        'landfill': None,
+        'facility': None,
+        'fuel_price_delta': 0.0,
+    }
+    # Equipment rates and the diesel price depend only on the project date
+    rates = {}
+    
+    landfills = find_k_nearest_qualified_landfills(lat, lon, analysis['tph_level'], analysis['chloride_level'],
+                                                   needs_backfill, db, k=k)
+    if landfills:
+        landfill, miles, hours, source = select_haul_destination(lat, lon, landfills, 'landfill', provider)
+        landfill, rates, site['fuel_price_delta'] = dated_prices(db, 'landfills', landfill, project_date)
+        site.update(landfill=landfill, landfill_miles=miles, landfill_speed=_haul_speed(miles, hours, source))
+    
+    facilities = find_k_nearest_cf_facilities(lat, lon, db, k=k)
+    if facilities:
+        facility, miles, hours, source = select_haul_destination(lat, lon, facilities, 'facility', provider)
+        facility, rates, site['fuel_price_delta'] = dated_prices(db, 'clean_futures_facilities', facility,
+                                                                 project_date)
+        site.update(facility=facility, facility_miles=miles, facility_speed=_haul_speed(miles, hours, source))
+    
+    haul = dig_and_haul_parameters(advanced_params, site['landfill'] or NO_LANDFILL, rates, needs_backfill)
+    surface = surface_facility_parameters(advanced_params, site['facility'] or NO_FACILITY, rates)
+    base = {
+        'truck_capacity_cy': haul['truck_capacity'],
+        'num_trucks': haul['num_trucks'],
+        'truck_hourly_rate': haul['truck_hourly_rate'],
+        'excavator_rate': haul['excavator_rate'],
+        'loader_rate': haul['loader_rate'],
+        'work_hours_per_day': haul['work_hours_per_day'],
+        'disposal_cost_cy': haul['disposal_cost'],
+        'backfill_cost_cy': haul['backfill_cost'],
+        'onsite_processing_cost_cy': (advanced_params or {}).get('onsite_processing_cost_cy',
+                                                                 DEFAULT_PROCESSING_COST_CY),
+        'surface_processing_cost_cy': surface['processing_cost_cy'],
+    }
+    
+    base['volume_cy'] = analysis['volume_cy']
+    base['surface_area_sqft'] = analysis.get('surface_area_sqft')
+    base['depth_ft'] = analysis.get('depth_ft')
+    for key in PRIORITY_PARAMETERS:
+        base[key] = analysis['priorities'].get(key.replace('_priority', ''), 'medium')
+    site['base'] = base
+    
+    return site
+
+# ============================================================================
+# GRID EVALUATION
+# ============================================================================
+
+class SweepResult:
+    """Metrics for every point of a Cartesian parameter grid
+    
+    axes: {parameter: values} in grid axis order.
+    options: {option_key: {metric: array}} with the grid's shape (None if the
+    option is unavailable at this site).
+    scores: grid shape + (3,) in OPTION_KEYS order; recommended: option index.
+    """
+    
+    def __init__(self, axes, options, scores, recommended):
+        self.axes = axes
+        self.options = options
+        self.scores = scores
+        self.recommended = recommended
+    
+    @property
+    def shape(self):
+        return self.recommended.shape
+    
+    @property
+    def size(self):
+        return self.recommended.size
+    
+    def recommendation_share(self):
+        """Fraction of grid points on which each option is recommended"""
+        counts = np.bincount(self.recommended.ravel(), minlength=len(OPTION_KEYS))
+        return {key: counts[i] / self.size for i, key in enumerate(OPTION_KEYS)}
+    
+    def to_frame(self):
+        """Flatten the grid into one row per point"""
+        grids = np.meshgrid(*self.axes.values(), indexing='ij')
+        data = {name: grid.ravel() for name, grid in zip(self.axes, grids)}
+        for key, metrics in self.options.items():
+            if metrics is None:
+                continue
+            for metric in METRICS:
+                data[f'{key}_{metric}'] = np.broadcast_to(metrics[metric], self.shape).ravel()
+        data['recommended'] = np.array(OPTION_KEYS, dtype=object)[self.recommended.ravel()]
+        return pd.DataFrame(data)
+
+def _grid_values(site, ranges):
+    """Base parameters with each swept parameter reshaped onto its own axis"""
+    names = list(ranges)
+    unknown = [name for name in names if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Cannot sweep: {', '.join(unknown)}")
+    
+    axes = {name: np.asarray(ranges[name]) for name in names}
+    values = dict(site['base'])
+    for i, name in enumerate(names):
+        shape = [1] * len(names)
+        shape[i] = len(axes[name])
+        values[name] = axes[name].reshape(shape)
+    
+    # Volume follows area x depth when either is swept
+    if 'depth_ft' in ranges or 'surface_area_sqft' in ranges:
+        if values['depth_ft'] is None or values['surface_area_sqft'] is None:
+            raise ValueError("Sweeping depth or area needs surface_area_sqft and depth_ft in the analysis")
+        if 'volume_cy' in ranges:
+            raise ValueError("Sweep volume or depth/area, not both")
+        values['volume_cy'] = calculate_volume_cy(values['surface_area_sqft'], values['depth_ft'])
+    
+    return axes, values
+
+def evaluate_grid(site, values, shape):
+    """Evaluate the three options and the recommendation over broadcast values
+    
+    values may also carry the model constants avg_speed_mph, loading_time,
+    unloading_time, base_treatment_days and co2_lbs_per_gallon (e.g. sampled
+    arrays), and fuel_price_delta to override the site's dated diesel price.
+    A varied avg_speed_mph scales the site's haul speed relative to the
+    nominal 45 mph, so road-network drive times scale proportionally.
+    """
+    options = {}
+    speed_scale = values.get('avg_speed_mph', AVG_SPEED_MPH) / AVG_SPEED_MPH
+    trip = {
+        'loading_time': values.get('loading_time', LOADING_TIME_HOURS),
+        'unloading_time': values.get('unloading_time', UNLOADING_TIME_HOURS),
+        'co2_lbs_per_gallon': values.get('co2_lbs_per_gallon', CO2_LBS_PER_GALLON),
+        'fuel_price_delta': values.get('fuel_price_delta', site.get('fuel_price_delta', 0.0)),
+    }
+    
+    if site['landfill'] is not None:
+        options['dig_haul'] = dig_and_haul_arrays(
+            values['volume_cy'], site['landfill_miles'], site['needs_backfill'],
+            values['truck_capacity_cy'], values['num_trucks'], values['truck_hourly_rate'],
+            values['excavator_rate'], values['loader_rate'], values['work_hours_per_day'],
+            values['disposal_cost_cy'], values['backfill_cost_cy'],
+            avg_speed_mph=site['landfill_speed'] * speed_scale, **trip
+        )
+    else:
+        options['dig_haul'] = None
+    
+    options['onsite'] = onsite_arrays(
+        values['volume_cy'], site['soil_permeability'], site['tph_level'], site['chloride_level'],
+        values['onsite_processing_cost_cy'],
+        base_treatment_days=values.get('base_treatment_days', BASE_TREATMENT_DAYS),
+        co2_lbs_per_gallon=trip['co2_lbs_per_gallon']
+    )
+    
+    if site['facility'] is not None:
+        options['surface'] = surface_facility_arrays(
+            values['volume_cy'], site['facility_miles'], values['truck_capacity_cy'],
+            values['truck_hourly_rate'], values['surface_processing_cost_cy'],
+            site['facility']['typical_turnaround_days'],
+            avg_speed_mph=site['facility_speed'] * speed_scale, **trip
+        )
+    else:
+        options['surface'] = None
+    
+    stacked = {}
+    for metric in ('cost_per_cy', 'project_days', 'co2_tons'):
+        stacked[metric] = np.stack([
+            np.broadcast_to(options[key][metric], shape) if options[key] is not None else np.full(shape, np.nan)
+            for key in OPTION_KEYS
+        ], axis=-1)
+    available = np.broadcast_to(np.array([options[key] is not None for key in OPTION_KEYS]), shape + (3,))
+    
+    priorities = [np.asarray(values[key]) for key in PRIORITY_PARAMETERS]
+    scores, recommended = recommendation_arrays(stacked['cost_per_cy'], stacked['project_days'],
+                                                stacked['co2_tons'], available, *priorities)
+    
+    return options, scores, recommended
+
+def run_sweep(analysis, db, ranges, site=None):
+    """Evaluate every combination of the given parameter ranges for one site
+    
+    ranges: {parameter: sequence of values} using SWEEP_PARAMETERS names.
+    Parameters not swept stay at the analysis' base-case values.
+    """
+    site = site or resolve_site(analysis, db)
+    axes, values = _grid_values(site, ranges)
+    shape = tuple(len(v) for v in axes.values())
+    options, scores, recommended = evaluate_grid(site, values, shape)
+    return SweepResult(axes, options, scores, recommended)
+
+# ============================================================================
+# SENSITIVITY VIEWS
+# ============================================================================
+
+def tornado(analysis, db, ranges, option='dig_haul', metric='total_cost', site=None):
+    """One-at-a-time swing of an option metric across each parameter's range
+    
+    Returns a DataFrame sorted by swing with the metric at the low and high
+    end of every numeric parameter range, others held at the base case.
+    """
+    site = site or resolve_site(analysis, db)
+    base_result = run_sweep(analysis, db, {}, site=site)
+    if base_result.options[option] is None:
+        raise ValueError(f"Option '{option}' is not available for this site")
+    base_value = float(np.asarray(base_result.options[option][metric]).ravel()[0])
+    
+    rows = []
+    for name, values in ranges.items():
+        if name in PRIORITY_PARAMETERS:
+            continue
+        low, high = min(values), max(values)
+        result = run_sweep(analysis, db, {name: [low, high]}, site=site)
+        at_low, at_high = np.broadcast_to(result.options[option][metric], (2,))
+        rows.append({
+            'parameter': name,
+            'label': SWEEP_PARAMETERS[name],
+            'low_value': low,
+            'high_value': high,
+            'metric_at_low': float(at_low),
+            'metric_at_high': float(at_high),
+            'swing': abs(float(at_high) - float(at_low)),
+        })
+    
+    frame = pd.DataFrame(rows, columns=['parameter', 'label', 'low_value', 'high_value',
+                                        'metric_at_low', 'metric_at_high', 'swing'])
+    frame.attrs['base_value'] = base_value
+    return frame.sort_values('swing', ascending=False, ignore_index=True)
+
+def break_even(analysis, db, x_param, x_values, option_a, option_b, metric='total_cost',
+               y_param=None, y_values=None, site=None):
+    """Values of x_param at which option_a's metric crosses option_b's
+    
+    Example: the volume at which onsite beats dig & haul. With y_param the
+    crossing is found for every y value, giving a break-even curve. Returns a
+    DataFrame with one row per crossing (linear interpolation between grid
+    points) and the option that is cheaper above it.
+    """
+    ranges = {x_param: x_values}
+    if y_param:
+        ranges = {y_param: y_values, x_param: x_values}
+    result = run_sweep(analysis, db, ranges, site=site)
+    
+    a, b = result.options[option_a], result.options[option_b]
+    if a is None or b is None:
+        raise ValueError("Both options must be available for this site")
+    diff = np.broadcast_to(a[metric] - b[metric], result.shape).astype(float)
+    if not y_param:
+        diff = diff[None, :]
+    xs = np.asarray(x_values, dtype=float)
+    ys = np.asarray(y_values) if y_param else [None]
+    
+    rows = []
+    for row, y in zip(diff, ys):
+        signs = np.sign(row)
+        for i in np.nonzero(signs[:-1] * signs[1:] < 0)[0]:
+            x0, x1, d0, d1 = xs[i], xs[i + 1], row[i], row[i + 1]
+            crossing = x0 + (x1 - x0) * d0 / (d0 - d1)
+            record = {x_param: crossing, 'better_above': option_a if d1 < 0 else option_b}
+            if y_param:
+                record = {y_param: y, **record}
+            rows.append(record)
+    
+    columns = ([y_param] if y_param else []) + [x_param, 'better_above']
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,274 @@
+"""
+NumPy array kernels for the remediation calculators.
+
+Each kernel mirrors the scalar calculator in calculators.py operation for
+operation, so element-wise results match the per-site functions exactly.
+Inputs broadcast against each other, which lets the same kernels serve
+batch evaluation (one value per site) and parameter grids.
+"""
+
+import numpy as np
+
+from .geo import EARTH_RADIUS_MILES
+from .calculators import (
+    AVG_SPEED_MPH,
+    LOADING_TIME_HOURS,
+    UNLOADING_TIME_HOURS,
+    EXCAVATOR_FUEL_GPH,
+    LOADER_FUEL_GPH,
+    TRUCK_FUEL_GPH,
+    CO2_LBS_PER_GALLON,
+    BASE_TREATMENT_DAYS,
+    ONSITE_FUEL_GAL_PER_CY,
+)
+
+# Column order used for per-option score arrays
+OPTION_KEYS = ('dig_haul', 'onsite', 'surface')
+
+# Display name of each option, as in evaluate_site()'s option_name
+OPTION_NAMES = {
+    'dig_haul': 'Dig & Haul to Landfill',
+    'onsite': 'Clean Futures Onsite Remediation',
+    'surface': 'Clean Futures Surface Facility',
+}
+
+# Score weights per priority level: (weight, fallback when the minimum is zero)
+COST_WEIGHTS = {'high': (40, 20), 'medium': (20, 10)}
+SPEED_WEIGHTS = {'high': (30, 15), 'medium': (15, 7)}
+ESG_WEIGHTS = {'high': (30, 15), 'medium': (15, 7)}
+ESG_TREATMENT_BONUS = 10
+
+# ============================================================================
+# DISTANCE
+# ============================================================================
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """Great-circle distance in miles between broadcastable coordinate arrays"""
+    lat1 = np.asarray(lat1, dtype=float)
+    lon1 = np.asarray(lon1, dtype=float)
+    lat2 = np.asarray(lat2, dtype=float)
+    lon2 = np.asarray(lon2, dtype=float)
+    
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    delta_lat = np.radians(lat2 - lat1)
+    delta_lon = np.radians(lon2 - lon1)
+    
+    a = np.sin(delta_lat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    
+    return EARTH_RADIUS_MILES * c
+
+def landfill_acceptance_mask(tph_level, chloride_level, needs_backfill,
+                             tph_max, chloride_max, backfill_available):
+    """Boolean site x landfill mask of landfills that accept each site's soil"""
+    tph_level = np.asarray(tph_level, dtype=float)[:, None]
+    chloride_level = np.asarray(chloride_level, dtype=float)[:, None]
+    needs_backfill = np.asarray(needs_backfill, dtype=bool)[:, None]
+    
+    accepts_tph = (tph_level <= 0) | (tph_level <= np.asarray(tph_max, dtype=float)[None, :])
+    accepts_chloride = (chloride_level <= 0) | (chloride_level <= np.asarray(chloride_max, dtype=float)[None, :])
+    has_backfill = ~needs_backfill | np.asarray(backfill_available, dtype=bool)[None, :]
+    
+    return accepts_tph & accepts_chloride & has_backfill
+
+def nearest_in_matrix(distances, mask=None):
+    """Index and distance of the nearest allowed column per row (-1 / NaN when none)"""
+    if mask is not None:
+        distances = np.where(mask, distances, np.inf)
+    if distances.shape[1] == 0:
+        n = distances.shape[0]
+        return np.full(n, -1, dtype=np.int64), np.full(n, np.nan)
+    
+    idx = np.argmin(distances, axis=1)
+    nearest = np.take_along_axis(distances, idx[:, None], axis=1)[:, 0]
+    found = np.isfinite(nearest)
+    
+    return np.where(found, idx, -1), np.where(found, nearest, np.nan)
+
+def k_nearest_in_matrix(distances, mask=None, k=1):
+    """(n, k) indices and distances of the k nearest allowed columns, nearest first"""
+    if mask is not None:
+        distances = np.where(mask, distances, np.inf)
+    n, m = distances.shape
+    idx = np.full((n, k), -1, dtype=np.int64)
+    nearest = np.full((n, k), np.nan)
+    if m == 0:
+        return idx, nearest
+    
+    kk = min(k, m)
+    part = np.argpartition(distances, kk - 1, axis=1)[:, :kk] if kk < m else np.tile(np.arange(m), (n, 1))
+    part_dist = np.take_along_axis(distances, part, axis=1)
+    order = np.argsort(part_dist, axis=1, kind='stable')
+    top = np.take_along_axis(part, order, axis=1)
+    top_dist = np.take_along_axis(part_dist, order, axis=1)
+    found = np.isfinite(top_dist)
+    
+    idx[:, :kk] = np.where(found, top, -1)
+    nearest[:, :kk] = np.where(found, top_dist, np.nan)
+    return idx, nearest
+
+# ============================================================================
+# OPTION KERNELS
+# ============================================================================
+
+def trip_time_hours(distance_miles, avg_speed_mph=AVG_SPEED_MPH,
+                    loading_time=LOADING_TIME_HOURS, unloading_time=UNLOADING_TIME_HOURS):
+    """Round-trip cycle time in hours for a one-way haul distance"""
+    travel_time_hours = distance_miles / avg_speed_mph
+    return loading_time + travel_time_hours + unloading_time + travel_time_hours + loading_time
+
+def dig_and_haul_arrays(volume_cy, distance_miles, needs_backfill, truck_capacity, num_trucks,
+                        truck_hourly_rate, excavator_rate, loader_rate, work_hours_per_day,
+                        disposal_cost, backfill_cost, avg_speed_mph=AVG_SPEED_MPH,
+                        loading_time=LOADING_TIME_HOURS, unloading_time=UNLOADING_TIME_HOURS,
+                        co2_lbs_per_gallon=CO2_LBS_PER_GALLON, fuel_price_delta=0.0):
+    """Vectorized calculate_dig_and_haul for already-selected landfills
+    
+    fuel_price_delta is the dated diesel price minus the base price the
+    hourly rates assume; fuel_adjustment is 0 without one.
+    """
+    trip_time = trip_time_hours(distance_miles, avg_speed_mph, loading_time, unloading_time)
+    
+    num_trips = np.ceil(volume_cy / truck_capacity)
+    trips_per_truck_per_day = work_hours_per_day / trip_time
+    total_trips_per_day = trips_per_truck_per_day * num_trucks
+    project_days = np.ceil(num_trips / total_trips_per_day)
+    project_hours = project_days * work_hours_per_day
+    
+    total_equipment_hours = project_hours
+    equipment_cost = (excavator_rate + loader_rate) * total_equipment_hours
+    
+    total_truck_hours = num_trips * trip_time
+    trucking_cost = total_truck_hours * truck_hourly_rate
+    
+    disposal_total = volume_cy * disposal_cost
+    backfill_total = np.where(needs_backfill, volume_cy * backfill_cost, 0)
+    
+    total_fuel = (EXCAVATOR_FUEL_GPH * total_equipment_hours +
+                  LOADER_FUEL_GPH * total_equipment_hours +
+                  TRUCK_FUEL_GPH * total_truck_hours)
+    fuel_adjustment = fuel_price_delta * total_fuel
+    
+    total_cost = equipment_cost + trucking_cost + disposal_total + backfill_total + fuel_adjustment
+    
+    return {
+        'total_cost': total_cost,
+        'cost_per_cy': total_cost / volume_cy,
+        'project_days': project_days,
+        'co2_tons': total_fuel * co2_lbs_per_gallon / 2000,
+        'equipment_cost': equipment_cost,
+        'trucking_cost': trucking_cost,
+        'disposal_cost': disposal_total,
+        'backfill_cost': backfill_total,
+        'fuel_adjustment': fuel_adjustment,
+        'truck_hours': total_truck_hours,
+        'fuel_gallons': total_fuel,
+    }
+
+def onsite_arrays(volume_cy, soil_permeability, tph_level, chloride_level, processing_cost_cy,
+                  base_treatment_days=BASE_TREATMENT_DAYS, co2_lbs_per_gallon=CO2_LBS_PER_GALLON):
+    """Vectorized calculate_onsite_remediation"""
+    soil_permeability = np.asarray(soil_permeability)
+    
+    treatment_days = np.where(soil_permeability == 'high', base_treatment_days * 0.7,
+                              np.where(soil_permeability == 'low', base_treatment_days * 1.5,
+                                       base_treatment_days * 1.0))
+    treatment_days = np.where(np.asarray(tph_level) > 3000, treatment_days * 1.2, treatment_days)
+    treatment_days = np.where(np.asarray(chloride_level) > 7000, treatment_days * 1.2, treatment_days)
+    treatment_days = np.trunc(treatment_days)
+    
+    total_processing_cost = volume_cy * processing_cost_cy
+    mobilization_cost = np.where(volume_cy < 1000, 5000, 10000)
+    amendment_cost = np.where(soil_permeability == 'low', volume_cy * 3, volume_cy * 1)
+    
+    total_cost = total_processing_cost + mobilization_cost + amendment_cost
+    fuel_gallons = volume_cy * ONSITE_FUEL_GAL_PER_CY
+    
+    return {
+        'total_cost': total_cost,
+        'cost_per_cy': total_cost / volume_cy,
+        'project_days': treatment_days,
+        'co2_tons': fuel_gallons * co2_lbs_per_gallon / 2000,
+        'processing_cost': total_processing_cost,
+        'mobilization_cost': mobilization_cost,
+        'amendment_cost': amendment_cost,
+        'fuel_gallons': fuel_gallons,
+    }
+
+def surface_facility_arrays(volume_cy, distance_miles, truck_capacity, truck_hourly_rate,
+                            processing_cost_cy, turnaround_days, avg_speed_mph=AVG_SPEED_MPH,
+                            loading_time=LOADING_TIME_HOURS, unloading_time=UNLOADING_TIME_HOURS,
+                            co2_lbs_per_gallon=CO2_LBS_PER_GALLON, fuel_price_delta=0.0):
+    """Vectorized calculate_surface_facility for already-selected facilities"""
+    trip_time = trip_time_hours(distance_miles, avg_speed_mph, loading_time, unloading_time)
+    
+    num_trips = np.ceil(volume_cy / truck_capacity)
+    total_truck_hours = num_trips * trip_time
+    
+    trucking_cost = total_truck_hours * truck_hourly_rate
+    processing_cost = volume_cy * processing_cost_cy
+    
+    total_fuel = TRUCK_FUEL_GPH * total_truck_hours
+    fuel_adjustment = fuel_price_delta * total_fuel
+    total_cost = trucking_cost + processing_cost + fuel_adjustment
+    
+    return {
+        'total_cost': total_cost,
+        'cost_per_cy': total_cost / volume_cy,
+        'project_days': np.broadcast_to(np.asarray(turnaround_days, dtype=float), np.shape(total_cost)),
+        'co2_tons': total_fuel * co2_lbs_per_gallon / 2000,
+        'trucking_cost': trucking_cost,
+        'processing_cost': processing_cost,
+        'fuel_adjustment': fuel_adjustment,
+        'truck_hours': total_truck_hours,
+        'fuel_gallons': total_fuel,
+    }
+
+# ============================================================================
+# RECOMMENDATION
+# ============================================================================
+
+def _priority_term(values, available, levels, weights):
+    """Score contribution of one priority for every option column"""
+    minimum = np.min(np.where(available, values, np.inf), axis=-1, keepdims=True)
+    safe_minimum = np.where(minimum > 0, minimum, 1.0)
+    
+    # Per-level weights are resolved on the (small) priority array, not the grid
+    levels = np.asarray(levels)[..., None]
+    weight = np.zeros(levels.shape)
+    fallback = np.zeros(levels.shape)
+    for level, (level_weight, level_fallback) in weights.items():
+        weight = np.where(levels == level, level_weight, weight)
+        fallback = np.where(levels == level, level_fallback, fallback)
+    
+    relative = 1 - (values - minimum) / safe_minimum
+    return np.where(minimum > 0, weight * relative, fallback)
+
+def recommendation_arrays(cost_per_cy, project_days, co2_tons, available,
+                          cost_priority, speed_priority, esg_priority):
+    """Vectorized generate_recommendation over (..., 3) option arrays
+    
+    Option columns follow OPTION_KEYS. Returns (scores, recommended_index);
+    scores for unavailable options are NaN.
+    """
+    cost_per_cy = np.asarray(cost_per_cy, dtype=float)
+    project_days = np.asarray(project_days, dtype=float)
+    co2_tons = np.asarray(co2_tons, dtype=float)
+    available = np.asarray(available, dtype=bool)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = np.zeros(cost_per_cy.shape)
+        scores = scores + _priority_term(cost_per_cy, available, cost_priority, COST_WEIGHTS)
+        scores = scores + _priority_term(project_days, available, speed_priority, SPEED_WEIGHTS)
+        scores = scores + _priority_term(co2_tons, available, esg_priority, ESG_WEIGHTS)
+    
+    # Bonus for treatment vs disposal
+    treatment = np.array([False, True, True])
+    bonus = np.where((np.asarray(esg_priority)[..., None] == 'high') & treatment, ESG_TREATMENT_BONUS, 0)
+    scores = scores + bonus
+    
+    scores = np.where(available, scores, np.nan)
+    recommended = np.argmax(np.where(available, scores, -np.inf), axis=-1)
+    
+    return scores, recommended
@@ -0,0 +1,51 @@
+"""
+Shared fixtures: the bundled facilities database, a copy of it with dated
+prices, and seeded synthetic sites (see benchmarks/synthetic.py).
+"""
+
+import json
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.synthetic import make_sites
+from cleanfutures.facilities import DEFAULT_DB_PATH, FacilitiesDatabase
+
+SITE_COUNT = 300
+
+def _random_date(rng):
+    return (date(2024, 1, 1) + timedelta(days=rng.randint(0, 1200))).isoformat()
+
+@pytest.fixture(scope='session')
+def raw_database():
+    return json.loads(DEFAULT_DB_PATH.read_text())
+
+@pytest.fixture(scope='session')
+def db(raw_database):
+    return FacilitiesDatabase(raw_database, version='bundled')
+
+@pytest.fixture(scope='session')
+def dated_db(raw_database):
+    """Bundled database with price schedules, equipment rates and diesel prices"""
+    rng = random.Random(5)
+    data = json.loads(json.dumps(raw_database))
+    for table, price_field in (('landfills', 'disposal_cost_cy'), ('clean_futures_facilities', 'processing_cost_cy')):
+        for record in data[table]:
+            record['price_schedule'] = [{'effective_date': _random_date(rng),
+                                         price_field: round(rng.uniform(10, 40), 2),
+                                         'backfill_cost_cy': round(rng.uniform(5, 20), 2)}
+                                        for _ in range(rng.randint(1, 4))]
+    data['equipment_rates'] = [{'effective_date': '2025-01-01', 'truck_hourly_rate': 140, 'loader_rate': 160},
+                               {'effective_date': '2025-07-01', 'excavator_rate': 210}]
+    data['diesel_prices'] = [{'effective_date': _random_date(rng), 'usd_per_gallon': round(rng.uniform(3, 5), 3)}
+                             for _ in range(30)]
+    return FacilitiesDatabase(data, version='dated')
+
+@pytest.fixture(scope='session')
+def sites():
+    """Synthetic sites with a project_date on two thirds of them (some before any schedule)"""
+    rng = random.Random(7)
+    frame = make_sites(SITE_COUNT, seed=3)
+    frame['project_date'] = [rng.choice([None, _random_date(rng), '2023-01-01']) for _ in range(SITE_COUNT)]
+    return frame
@@ -0,0 +1,85 @@
+"""evaluate_batch() against evaluate_site(), site by site"""
+
+import math
+
+import pandas as pd
+import pytest
+
+from cleanfutures import evaluate_site
+from cleanfutures.batch import evaluate_batch
+from cleanfutures.sweep import run_sweep
+from cleanfutures.vectorized import OPTION_KEYS
+
+ADVANCED_PARAMS = [
+    None,
+    {'truck_capacity_cy': 20, 'num_trucks': 5, 'disposal_cost_cy': 30},
+    {'truck_hourly_rate': 99, 'surface_processing_cost_cy': 21},
+]
+
+# evaluate_site() option fields and the evaluate_batch() columns holding them
+OPTION_FIELDS = {
+    'dig_haul': ('total_cost', 'cost_per_cy', 'project_days', 'co2_tons', 'distance_miles', 'equipment_cost',
+                 'trucking_cost', 'disposal_cost', 'backfill_cost'),
+    'onsite': ('total_cost', 'cost_per_cy', 'project_days', 'co2_tons', 'processing_cost',
+               'mobilization_cost', 'amendment_cost'),
+    'surface': ('total_cost', 'cost_per_cy', 'project_days', 'co2_tons', 'distance_miles', 'trucking_cost',
+                'processing_cost'),
+}
+
+def _analysis(row, advanced_params):
+    project_date = row.get('project_date')
+    return {
+        'site_lat': row['site_lat'],
+        'site_lon': row['site_lon'],
+        'tph_level': int(row['tph_level']),
+        'chloride_level': int(row['chloride_level']),
+        'volume_cy': row['volume_cy'],
+        'needs_backfill': bool(row['needs_backfill']),
+        'priorities': {'cost': row['cost_priority'], 'speed': row['speed_priority'], 'esg': row['esg_priority']},
+        'advanced_params': advanced_params,
+        'soil_permeability': row['soil_permeability'],
+        'project_date': None if pd.isna(project_date) else project_date,
+    }
+
+def _assert_matches(row, expected):
+    assert row['state'] == expected['state']
+    assert row['county'] == expected['county']
+    assert row['recommended'] == expected['recommended']
+    for key, fields in OPTION_FIELDS.items():
+        option = expected[key]
+        if option is None:
+            assert pd.isna(row[f'{key}_total_cost'])
+            continue
+        for field in fields:
+            assert math.isclose(row[f'{key}_{field}'], option[field], rel_tol=1e-9, abs_tol=1e-9), (key, field)
+        if 'fuel_adjustment' in option:
+            assert math.isclose(row[f'{key}_fuel_adjustment'], option['fuel_adjustment'], abs_tol=1e-9)
+    for key in OPTION_KEYS:
+        if key in expected['scores']:
+            assert math.isclose(row[f'score_{key}'], expected['scores'][key], rel_tol=1e-9, abs_tol=1e-9)
+
+@pytest.mark.parametrize('advanced_params', ADVANCED_PARAMS)
+def test_batch_matches_evaluate_site(db, sites, advanced_params):
+    undated = sites.drop(columns='project_date')
+    results = evaluate_batch(undated, db, advanced_params)
+    for row, result in zip(undated.to_dict('records'), results.to_dict('records')):
+        _assert_matches(result, evaluate_site(_analysis(row, advanced_params), db))
+    assert 'dig_haul_fuel_adjustment' not in results
+
+@pytest.mark.parametrize('advanced_params', ADVANCED_PARAMS)
+def test_batch_matches_evaluate_site_with_dated_prices(dated_db, sites, advanced_params):
+    results = evaluate_batch(sites, dated_db, advanced_params)
+    for row, result in zip(sites.to_dict('records'), results.to_dict('records')):
+        _assert_matches(result, evaluate_site(_analysis(row, advanced_params), dated_db))
+
+def test_sweep_base_point_matches_evaluate_site(dated_db, sites):
+    for row in sites.head(50).to_dict('records'):
+        analysis = _analysis(row, ADVANCED_PARAMS[1])
+        expected = evaluate_site(analysis, dated_db)
+        sweep = run_sweep(analysis, dated_db, {})
+        for key in OPTION_KEYS:
+            if expected[key] is None:
+                assert sweep.options[key] is None
+            else:
+                assert math.isclose(float(sweep.options[key]['total_cost'].ravel()[0]), expected[key]['total_cost'],
+                                    rel_tol=1e-9)
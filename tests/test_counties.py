@@ -0,0 +1,52 @@
+"""Bundled county boundaries: known county seats and the banded point-in-polygon test"""
+
+import numpy as np
+import pytest
+
+from cleanfutures.counties import DEFAULT_COUNTIES_PATH, CountyIndex
+
+# County seats (lat, lon), several of them a few miles from a county line
+SEATS = {
+    ('Texas', 'REEVES'): (31.4229, -103.4932),      # Pecos, just west of the Pecos River
+    ('Texas', 'WARD'): (31.5946, -102.8927),        # Monahans
+    ('Texas', 'LOVING'): (31.7049, -103.5985),      # Mentone
+    ('Texas', 'PECOS'): (30.8935, -102.8791),       # Fort Stockton
+    ('Texas', 'CRANE'): (31.3974, -102.3501),
+    ('Texas', 'ECTOR'): (31.8457, -102.3676),       # Odessa
+    ('Texas', 'MIDLAND'): (31.9974, -102.0779),
+    ('Texas', 'WINKLER'): (31.8579, -103.0930),     # Kermit
+    ('Texas', 'CULBERSON'): (31.0418, -104.8302),   # Van Horn
+    ('Texas', 'HOWARD'): (32.2504, -101.4787),      # Big Spring
+    ('New Mexico', 'EDDY'): (32.4207, -104.2288),   # Carlsbad
+    ('New Mexico', 'LEA'): (32.9487, -103.3485),    # Lovington
+}
+
+def _inside(edges, x, y):
+    """Even-odd test of every point against every edge"""
+    x1, y1, x2, y2 = (edges[:, i] for i in range(4))
+    crosses = ((y1 > y[:, None]) != (y2 > y[:, None])) & (x[:, None] < x1 + (y[:, None] - y1) * (x2 - x1) / (y2 - y1))
+    return np.count_nonzero(crosses, axis=1) % 2 == 1
+
+@pytest.fixture(scope='module')
+def index():
+    return CountyIndex.from_file(DEFAULT_COUNTIES_PATH)
+
+@pytest.mark.parametrize('expected', list(SEATS))
+def test_county_seats(index, expected):
+    assert index.locate(*SEATS[expected]) == expected
+
+def test_box_is_covered(index):
+    # Only the corners in Mexico and Oklahoma lie outside the Texas / New Mexico counties
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(30, 35, 50000)
+    lon = rng.uniform(-105, -100, 50000)
+    assert (index.locate_many(lat, lon) < 0).mean() < 0.01
+
+def test_bands_match_full_edge_test(index):
+    rng = np.random.default_rng(1)
+    lat = rng.uniform(29.5, 35.5, 4000)
+    lon = rng.uniform(-105.5, -99.5, 4000)
+    for county in index.counties:
+        expected = _inside(county.edges, lon, lat)
+        assert (county.contains_many(lon, lat) == expected).all(), county.name
+        assert [county.contains(x, y) for x, y in zip(lon[:500], lat[:500])] == expected[:500].tolist(), county.name
@@ -0,0 +1,61 @@
+"""Analysis history: appends, searches and the append-only triggers"""
+
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from cleanfutures import evaluate_site
+from cleanfutures.history import AnalysisHistory
+
+ANALYSIS = {
+    'site_lat': 31.8,
+    'site_lon': -102.3,
+    'tph_level': 3000,
+    'chloride_level': 0,
+    'volume_cy': 1200,
+    'needs_backfill': True,
+    'priorities': {'cost': 'high', 'speed': 'medium', 'esg': 'low'},
+    'advanced_params': None,
+    'soil_permeability': 'medium',
+}
+
+@pytest.fixture
+def history(tmp_path):
+    return AnalysisHistory(tmp_path / 'history.sqlite')
+
+def test_record_and_get_round_trip(history, db):
+    result = evaluate_site(ANALYSIS, db)
+    entry_id = history.record(ANALYSIS, result, db_version=db.version)
+    entry = history.get(entry_id)
+    assert entry['analysis'] == ANALYSIS
+    assert entry['result']['recommended'] == result['recommended']
+    assert entry['county'] == result['county']
+    assert entry['total_cost'] == pytest.approx(result[result['recommended']]['total_cost'])
+    assert entry['db_version'] == 'bundled'
+
+def test_entries_cannot_be_changed_or_deleted(history, db):
+    entry_id = history.record(ANALYSIS, evaluate_site(ANALYSIS, db))
+    conn = history.connection()
+    with pytest.raises(sqlite3.DatabaseError, match='append-only'):
+        with conn:
+            conn.execute("UPDATE analyses SET total_cost = 0 WHERE id = ?", (entry_id,))
+    with pytest.raises(sqlite3.DatabaseError, match='append-only'):
+        with conn:
+            conn.execute("DELETE FROM analyses WHERE id = ?", (entry_id,))
+    assert len(history) == 1
+    assert history.get(entry_id)['total_cost'] > 0
+
+def test_search_pages_newest_first(history, db):
+    result = evaluate_site(ANALYSIS, db)
+    for day in range(1, 8):
+        history.record(ANALYSIS, result, created_at=datetime(2026, 3, day, tzinfo=timezone.utc))
+    seen = []
+    page = history.search(limit=3)
+    while True:
+        seen.extend(row['created_at'][:10] for row in page['rows'])
+        if page['next'] is None:
+            break
+        page = history.search(after=page['next'], limit=3)
+    assert seen == [f"2026-03-0{day}" for day in range(7, 0, -1)]
+    assert history.count(date_from='2026-03-03', date_to='2026-03-05') == 3
@@ -0,0 +1,69 @@
+"""k-d tree and SQLite R*Tree lookups against the columnar scan of the JSON records"""
+
+import json
+import math
+
+import pytest
+
+from benchmarks.synthetic import make_analyses, make_database
+from cleanfutures.facilities import (
+    SCAN_MAX_FACILITIES,
+    FacilitiesDatabase,
+    find_k_nearest_cf_facilities,
+    find_k_nearest_qualified_landfills,
+)
+from cleanfutures.spatial import FacilityIndex
+from cleanfutures.sqlitedb import RTreeIndex, SQLiteFacilitiesDatabase, import_json_database
+
+K = 5
+
+@pytest.fixture(scope='module')
+def synthetic_db():
+    return make_database(SCAN_MAX_FACILITIES + 1000, seed=11)
+
+@pytest.fixture(scope='module')
+def lookups():
+    return make_analyses(200, seed=12)
+
+def _scanned(data):
+    """Database that always scans its columnar tables"""
+    db = FacilitiesDatabase(data)
+    db.lookup_index = lambda table: None
+    return db
+
+def _nearest(db, a):
+    landfills = find_k_nearest_qualified_landfills(a['site_lat'], a['site_lon'], a['tph_level'], a['chloride_level'],
+                                                   a['needs_backfill'], db, k=K)
+    facilities = find_k_nearest_cf_facilities(a['site_lat'], a['site_lon'], db, k=K)
+    return ([(entry['landfill']['id'], entry['distance_miles']) for entry in landfills],
+            [(entry['facility']['id'], entry['distance_miles']) for entry in facilities])
+
+def _assert_same(got, expected):
+    for got_entries, expected_entries in zip(got, expected):
+        assert [key for key, _ in got_entries] == [key for key, _ in expected_entries]
+        for (_, got_miles), (_, expected_miles) in zip(got_entries, expected_entries):
+            assert math.isclose(got_miles, expected_miles, rel_tol=1e-9)
+
+def test_kd_tree_matches_scan(synthetic_db, lookups):
+    assert isinstance(synthetic_db.lookup_index('landfills'), FacilityIndex)
+    scanned = _scanned(dict(synthetic_db))
+    for a in lookups:
+        _assert_same(_nearest(synthetic_db, a), _nearest(scanned, a))
+
+def test_sqlite_matches_scan(synthetic_db, lookups, tmp_path):
+    json_path = tmp_path / 'facilities.json'
+    json_path.write_text(json.dumps(dict(synthetic_db)))
+    sqlite_path = tmp_path / 'facilities.sqlite'
+    import_json_database(json_path, sqlite_path)
+    sqlite_db = SQLiteFacilitiesDatabase(sqlite_path)
+    assert isinstance(sqlite_db.lookup_index('landfills'), RTreeIndex)
+    
+    scanned = _scanned(json.loads(json_path.read_text()))
+    for a in lookups:
+        _assert_same(_nearest(sqlite_db, a), _nearest(scanned, a))
+
+def test_unqualified_lookups_are_empty(synthetic_db):
+    # No landfill accepts more than 20,000 mg/kg TPH
+    args = (31.8, -102.3, 10**6, 0, False)
+    assert find_k_nearest_qualified_landfills(*args, synthetic_db, k=K) == []
+    assert find_k_nearest_qualified_landfills(*args, dict(synthetic_db), k=K) == []
@@ -0,0 +1,69 @@
+"""Dated-price bisection against a brute-force replay of each schedule"""
+
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from cleanfutures.pricing import PriceSchedule, to_ordinal, to_ordinals
+
+FIELDS = ('disposal_cost_cy', 'backfill_cost_cy')
+START = date(2024, 1, 1).toordinal()
+
+@pytest.fixture(scope='module')
+def groups():
+    rng = random.Random(3)
+    groups = []
+    for _ in range(60):
+        base = {field: rng.choice([None, round(rng.uniform(5, 40), 2)]) for field in FIELDS}
+        # Repeated dates and entries setting only some fields are both allowed
+        entries = [{'effective_date': date.fromordinal(START + rng.randint(0, 60) * 7).isoformat(),
+                    **{field: round(rng.uniform(5, 40), 2) for field in FIELDS if rng.random() < 0.6}}
+                   for _ in range(rng.randint(0, 6))]
+        groups.append((base, entries))
+    return groups
+
+def _brute_force(group, ordinal):
+    """Values in effect on a day: the base values with every entry up to that day applied in date order"""
+    base, entries = group
+    current = dict(base)
+    for entry in sorted(entries, key=lambda entry: to_ordinal(entry['effective_date'])):
+        if ordinal is not None and to_ordinal(entry['effective_date']) <= ordinal:
+            current.update({field: entry[field] for field in FIELDS if entry.get(field) is not None})
+    return {field: current.get(field) for field in FIELDS}
+
+def test_lookup_matches_brute_force(groups):
+    schedule = PriceSchedule(groups, FIELDS)
+    for g, group in enumerate(groups):
+        for ordinal in [None] + list(range(START - 3, START + 61 * 7, 3)):
+            assert schedule.lookup(g, ordinal) == _brute_force(group, ordinal), (g, ordinal)
+
+def test_take_matches_lookup(groups):
+    schedule = PriceSchedule(groups, FIELDS)
+    rng = np.random.default_rng(4)
+    group_ids = rng.integers(-1, len(groups), 5000)
+    ordinals = np.where(rng.random(5000) < 0.1, -1, rng.integers(START - 10, START + 450, 5000))
+    for field in FIELDS:
+        values = schedule.take(field, group_ids, ordinals)
+        for g, ordinal, value in zip(group_ids, ordinals, values):
+            if g < 0:
+                assert np.isnan(value)
+                continue
+            expected = schedule.lookup(int(g), None if ordinal < 0 else int(ordinal))[field]
+            assert (np.isnan(value) if expected is None else value == expected), (g, ordinal, field)
+
+def test_take_broadcasts_site_dates_over_facilities(groups):
+    schedule = PriceSchedule(groups, FIELDS)
+    # Entries take effect on whole weeks from START, so the last two days are effective dates
+    ordinals = np.array([START - 1, START + 98, START + 399])[:, None]
+    facilities = np.broadcast_to(np.arange(len(groups)), (len(ordinals), len(groups)))
+    matrix = schedule.take('disposal_cost_cy', facilities, ordinals)
+    assert matrix.shape == (3, len(groups))
+    for i, ordinal in enumerate(ordinals[:, 0]):
+        expected = [_brute_force(group, int(ordinal))['disposal_cost_cy'] for group in groups]
+        assert [None if np.isnan(value) else value for value in matrix[i]] == expected
+
+def test_to_ordinals_marks_missing_dates():
+    days = to_ordinals(['2025-03-01', None, '2024-01-01'])
+    assert days.tolist() == [to_ordinal('2025-03-01'), -1, START]